@@ -1,8 +1,11 @@
+import asyncio
+import atexit
 import base64
 import io
 import json
 import logging
 import logging.handlers
+import multiprocessing
 import os
 import random
 import re
@@ -11,10 +14,12 @@ import tempfile
 import threading
 import time
 import uuid
-from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from queue import Queue
-from typing import Any, AnyStr, Generator, Mapping, NoReturn
+from typing import Any, AnyStr, Callable, Generator, Iterable, Mapping, NoReturn
 
 import openai
 import requests
@@ -39,6 +44,17 @@ from pydantic import BaseModel, Field, field_validator
 from wand.image import Image as WandImage
 
 import utils
+from chat_stream import (
+    END_OF_STREAM,
+    LEGACY_PROTOCOL,
+    SSE_HEADERS,
+    SSE_PROTOCOL,
+    STREAM_PROTOCOLS,
+    ChatEventLoop,
+    ChatStreamBuffer,
+    ChatStreamRegistry,
+    iter_chat_stream,
+)
 from dynamic_prompts import (
     FollowUpState,
     GridDynamicPromptInfo,
@@ -70,8 +86,18 @@ from image_models import (
     create_request_from_form_data,
     create_success_response,
 )
-from novelai_client import NovelAIAPIError, NovelAIClient, NovelAIClientError, NovelAIModel
-from tool_framework import ToolExecutor, ToolRegistry
+from novelai_client import (
+    DEFAULT_POOL_SIZE,
+    NovelAIAPIError,
+    NovelAIClient,
+    NovelAIClientError,
+    NovelAIModel,
+    NovelAIRetryPolicy,
+    count_retries,
+)
+from novelai_scheduler import NovelAIRequestClass, NovelAIScheduler, novelai_request
+from tag_suggestions import TagIndex, TagSuggestionCache, load_tag_dump
+from tool_framework import WRITE_BACK, ToolExecutor, ToolRegistry, ToolStorageCache
 from tools.calculator_tool import CalculatorTool
 from vibe_encoder import VibeEncoderService
 from vibe_models import VibeReference
@@ -129,11 +155,97 @@ app = Flask(__name__)
 
 # Initialize the OpenAI client
 client = openai.OpenAI()
+async_client = openai.AsyncOpenAI()
 
 
 STABILITY_API_KEY = os.environ.get("STABILITY_API_KEY")
 NOVELAI_API_KEY = os.environ.get("NOVELAI_API_KEY")
 
+# Connections kept open to each NovelAI host by the shared client; with NOVELAI_PREWARM
+# they are opened at startup instead of by the first generation
+NOVELAI_POOL_SIZE = int(os.environ.get("NOVELAI_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+NOVELAI_PREWARM = os.environ.get("NOVELAI_PREWARM", "true").lower() == "true"
+
+# Refused (429), failed and timed-out NovelAI requests are retried with jittered exponential
+# backoff, at most NOVELAI_RETRY_ATTEMPTS attempts within NOVELAI_RETRY_DEADLINE_SECONDS
+NOVELAI_RETRY_ATTEMPTS = int(os.environ.get("NOVELAI_RETRY_ATTEMPTS", "4"))
+NOVELAI_RETRY_DEADLINE_SECONDS = float(os.environ.get("NOVELAI_RETRY_DEADLINE_SECONDS", "300"))
+
+# Generations the NovelAI account runs at once; further requests wait in a queue that
+# lets interactive generations ahead of grid cells and vibe previews
+NOVELAI_CONCURRENCY = int(os.environ.get("NOVELAI_CONCURRENCY", "1"))
+
+# NovelAI tag suggestions kept for reuse by all users: at most TAG_SUGGESTION_CACHE_SIZE
+# answers, each for TAG_SUGGESTION_CACHE_TTL_SECONDS. NovelAI returns at most
+# NOVELAI_TAG_SUGGESTION_LIMIT suggestions, so an answer with fewer holds every matching
+# tag and also answers longer queries
+TAG_SUGGESTION_CACHE_SIZE = int(os.environ.get("TAG_SUGGESTION_CACHE_SIZE", "2048"))
+TAG_SUGGESTION_CACHE_TTL_SECONDS = float(os.environ.get("TAG_SUGGESTION_CACHE_TTL_SECONDS", "3600"))
+NOVELAI_TAG_SUGGESTION_LIMIT = int(os.environ.get("NOVELAI_TAG_SUGGESTION_LIMIT", "10"))
+
+# Local tag database answering autocomplete before NovelAI is asked: a CSV or JSON dump
+# of tags, post counts and aliases loaded at startup, and where tags learned from
+# NovelAI's suggestions are kept between runs (neither is used if unset)
+TAG_INDEX_PATH = os.environ.get("TAG_INDEX_PATH")
+TAG_INDEX_LEARNED_PATH = os.environ.get("TAG_INDEX_LEARNED_PATH")
+
+# Vibe encodings kept in memory for generations that reuse them, such as grid cells
+VIBE_ENCODING_CACHE_SIZE = int(os.environ.get("VIBE_ENCODING_CACHE_SIZE", "128"))
+
+# Threads shared by all requests for encoding and saving the images of multi-sample
+# generations in parallel
+IMAGE_SAVE_WORKERS = int(os.environ.get("IMAGE_SAVE_WORKERS", "4"))
+
+# Default /chat wire protocol; clients can still request "legacy" per request while migrating
+CHAT_STREAM_PROTOCOL = os.environ.get("CHAT_STREAM_PROTOCOL", SSE_PROTOCOL)
+
+# Engine that generates chat responses: "async" runs every response on one shared
+# event loop, "thread" starts a worker thread per response
+ASYNC_CHAT_ENGINE = "async"
+THREAD_CHAT_ENGINE = "thread"
+CHAT_ENGINE = os.environ.get("CHAT_ENGINE", ASYNC_CHAT_ENGINE)
+
+# Minimum seconds between checkpoints of a response's partial text while it streams
+CHAT_CHECKPOINT_INTERVAL_SECONDS = 2.0
+
+# Most messages GET /chat returns in one window; clients page back with ?before=
+CHAT_MESSAGE_PAGE_MAX = int(os.environ.get("CHAT_MESSAGE_PAGE_MAX", "200"))
+
+# Background title generation for new conversations: worker threads, and how many
+# conversations may wait for a title before new ones keep their temporary name
+TITLE_GENERATION_WORKERS = int(os.environ.get("TITLE_GENERATION_WORKERS", "2"))
+TITLE_GENERATION_MAX_PENDING = int(os.environ.get("TITLE_GENERATION_MAX_PENDING", "32"))
+
+# Tool calls made in one response run concurrently, on at most TOOL_CALL_WORKERS threads
+# shared by all responses; a call that has not finished after TOOL_CALL_TIMEOUT_SECONDS
+# is reported back to the model as timed out
+TOOL_CALL_WORKERS = int(os.environ.get("TOOL_CALL_WORKERS", "8"))
+TOOL_CALL_TIMEOUT_SECONDS = float(os.environ.get("TOOL_CALL_TIMEOUT_SECONDS", "30"))
+
+# Tools whose execution profile asks for a worker thread share TOOL_THREAD_WORKERS threads;
+# each tool asking for worker processes gets TOOL_PROCESS_WORKERS of its own
+TOOL_THREAD_WORKERS = int(os.environ.get("TOOL_THREAD_WORKERS", "8"))
+TOOL_PROCESS_WORKERS = int(os.environ.get("TOOL_PROCESS_WORKERS", "2"))
+
+# Results of deterministic tools (such as the calculator) kept for reuse across
+# conversations; 0 disables the cache
+TOOL_RESULT_CACHE_SIZE = int(os.environ.get("TOOL_RESULT_CACHE_SIZE", "1024"))
+
+# Tool storage is cached in memory: "write_back" writes changes at the end of each turn
+# and every TOOL_STORAGE_FLUSH_INTERVAL_SECONDS, "write_through" writes them immediately
+TOOL_STORAGE_DURABILITY = os.environ.get("TOOL_STORAGE_DURABILITY", WRITE_BACK)
+TOOL_STORAGE_FLUSH_INTERVAL_SECONDS = float(
+    os.environ.get("TOOL_STORAGE_FLUSH_INTERVAL_SECONDS", "5")
+)
+TOOL_STORAGE_CACHE_SIZE = int(os.environ.get("TOOL_STORAGE_CACHE_SIZE", "256"))
+
+# Calculator calls run in CALCULATOR_SANDBOX_WORKERS worker processes (0 runs them
+# in-process), each capped at CALCULATOR_MEMORY_LIMIT_MB and killed after
+# CALCULATOR_TIMEOUT_SECONDS. A timeout kills only the worker running that call
+CALCULATOR_SANDBOX_WORKERS = int(os.environ.get("CALCULATOR_SANDBOX_WORKERS", "2"))
+CALCULATOR_TIMEOUT_SECONDS = float(os.environ.get("CALCULATOR_TIMEOUT_SECONDS", "2"))
+CALCULATOR_MEMORY_LIMIT_MB = int(os.environ.get("CALCULATOR_MEMORY_LIMIT_MB", "256"))
+
 SECRET_KEY_FILENAME = "secret-key.txt"
 if not os.path.isfile(SECRET_KEY_FILENAME):
     with open(SECRET_KEY_FILENAME, "a") as f:
@@ -257,6 +369,8 @@ class GeneratedImageData:
     prompt: str
     image_name: str
     metadata: dict[str, str] = field(default_factory=dict)
+    # Every image of a multi-sample generation, this one first; empty for a single image
+    samples: list["GeneratedImageData"] = field(default_factory=list)
 
 
 @dataclass
@@ -435,6 +549,99 @@ class AgentPreset(BaseModel):
         return v
 
 
+class ResponseUsage(BaseModel):
+    """Pydantic model for the token counts and timings of one assistant response."""
+
+    input_tokens: int = Field(0, description="Input tokens, including continuations")
+    cached_tokens: int = Field(0, description="Input tokens served from the prompt cache")
+    output_tokens: int = Field(0, description="Output tokens, including reasoning tokens")
+    reasoning_tokens: int = Field(0, description="Output tokens spent on reasoning")
+    time_to_first_token_ms: int | None = Field(
+        None, description="Milliseconds until the first text delta, None if no text streamed"
+    )
+    duration_ms: int = Field(0, description="Milliseconds from the request to the end of the stream")
+    tool_ms: int = Field(0, description="Milliseconds spent in tool calls, summed over all calls")
+    tool_calls: int = Field(0, description="Number of tool calls made")
+
+
+class UsageTotals(BaseModel):
+    """Pydantic model for usage summed over many responses."""
+
+    responses: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    duration_ms: int = 0
+    tool_ms: int = 0
+    tool_calls: int = 0
+    # Only responses that streamed text have a time to first token
+    first_token_responses: int = 0
+    time_to_first_token_ms: int = 0
+
+    def add(self, usage: ResponseUsage) -> None:
+        """Add one response's usage to the totals."""
+        self.responses += 1
+        self.input_tokens += usage.input_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.output_tokens += usage.output_tokens
+        self.reasoning_tokens += usage.reasoning_tokens
+        self.duration_ms += usage.duration_ms
+        self.tool_ms += usage.tool_ms
+        self.tool_calls += usage.tool_calls
+        if usage.time_to_first_token_ms is not None:
+            self.first_token_responses += 1
+            self.time_to_first_token_ms += usage.time_to_first_token_ms
+
+    def summary(self) -> dict[str, Any]:
+        """Totals plus per-response averages, for the usage endpoint."""
+        responses = self.responses or 1
+        return {
+            "responses": self.responses,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "reasoning_tokens": self.reasoning_tokens,
+            "tool_calls": self.tool_calls,
+            "cached_percent": round(self.cached_tokens / self.input_tokens * 100, 1)
+            if self.input_tokens
+            else 0.0,
+            "avg_duration_ms": round(self.duration_ms / responses),
+            "avg_tool_ms": round(self.tool_ms / responses),
+            "avg_time_to_first_token_ms": round(
+                self.time_to_first_token_ms / self.first_token_responses
+            )
+            if self.first_token_responses
+            else None,
+        }
+
+
+class UsageRollups(BaseModel):
+    """Pydantic model for a user's usage, in total and per agent preset and reasoning level."""
+
+    total: UsageTotals = Field(default_factory=UsageTotals)
+    presets: dict[str, dict[str, UsageTotals]] = Field(
+        default_factory=dict,
+        description="Totals keyed by agent preset ID, then reasoning level",
+    )
+
+    def add(self, agent_preset_id: str | None, reasoning_level: str | None, usage: ResponseUsage) -> None:
+        """Add one response's usage to the total and to its preset and reasoning level."""
+        self.total.add(usage)
+        levels = self.presets.setdefault(agent_preset_id or "default", {})
+        levels.setdefault(reasoning_level or "default", UsageTotals()).add(usage)
+
+    def summary(self) -> dict[str, Any]:
+        """Summaries of every rollup, for the usage endpoint."""
+        return {
+            "total": self.total.summary(),
+            "presets": {
+                preset_id: {level: totals.summary() for level, totals in levels.items()}
+                for preset_id, levels in self.presets.items()
+            },
+        }
+
+
 class ChatMessage(BaseModel):
     """Pydantic model for individual chat messages."""
 
@@ -454,6 +661,12 @@ class ChatMessage(BaseModel):
     reasoning_level: str | None = Field(
         None, description="Reasoning level used for this message"
     )
+    interrupted: bool = Field(
+        False, description="True if the response stopped before it was complete"
+    )
+    usage: ResponseUsage | None = Field(
+        None, description="Token counts and timings for assistant messages"
+    )
 
     @field_validator("reasoning_data")
     @classmethod
@@ -486,6 +699,14 @@ class ChatMessage(BaseModel):
         return v
 
 
+class StreamCheckpoint(BaseModel):
+    """Pydantic model for the partial text of a response that is still streaming."""
+
+    stream_id: str = Field(..., description="ID of the chat stream that produced the text")
+    text: str = Field(..., description="Text accumulated so far")
+    updated_at: int = Field(..., description="Unix timestamp of the checkpoint")
+
+
 class Conversation(BaseModel):
     """Pydantic model for complete conversation structure."""
 
@@ -498,6 +719,9 @@ class Conversation(BaseModel):
     last_response_id: str | None = Field(
         None, description="Last response ID for conversation continuity"
     )
+    stream_checkpoint: StreamCheckpoint | None = Field(
+        None, description="Partial text of the response currently being streamed"
+    )
 
     def add_message(
         self,
@@ -508,6 +732,8 @@ class Conversation(BaseModel):
         agent_preset_id: str | None = None,
         model: str | None = None,
         reasoning_level: str | None = None,
+        interrupted: bool = False,
+        usage: ResponseUsage | None = None,
     ) -> None:
         """Add a message to the conversation."""
         message = ChatMessage(
@@ -519,17 +745,29 @@ class Conversation(BaseModel):
             agent_preset_id=agent_preset_id,
             model=model,
             reasoning_level=reasoning_level,
+            interrupted=interrupted,
+            usage=usage,
         )
         self.messages.append(message)
         self.last_update = int(time.time())
 
-        # Update last_response_id if this is an assistant message with a response_id
-        if role == "assistant" and response_id:
-            self.last_response_id = response_id
+        if role == "assistant":
+            # The response is stored, so its streaming checkpoint is no longer needed
+            self.stream_checkpoint = None
 
-    def get_message_list(self) -> list[dict[str, str]]:
-        """Get formatted message list for frontend compatibility."""
-        return [{"role": msg.role, "text": msg.text} for msg in self.messages]
+            # Update last_response_id if this is an assistant message with a response_id
+            if response_id:
+                self.last_response_id = response_id
+
+    def get_message_list(self, start: int = 0, end: int | None = None) -> list[dict[str, Any]]:
+        """Get formatted message list for frontend compatibility, optionally only messages[start:end]."""
+        message_list: list[dict[str, Any]] = []
+        for msg in self.messages[start:end]:
+            message: dict[str, Any] = {"role": msg.role, "text": msg.text}
+            if msg.interrupted:
+                message["interrupted"] = True
+            message_list.append(message)
+        return message_list
 
 
 class UserConversations(BaseModel):
@@ -704,6 +942,7 @@ class ConversationManager(UserFileManager):
         agent_preset_id: str | None = None,
         model: str | None = None,
         reasoning_level: str | None = None,
+        usage: ResponseUsage | None = None,
     ) -> None:
         """Add a message to a conversation."""
         user_conversations = self._load_user_conversations(username)
@@ -723,9 +962,64 @@ class ConversationManager(UserFileManager):
             agent_preset_id,
             model,
             reasoning_level,
+            usage=usage,
+        )
+
+        self._save_user_conversations(username, user_conversations)
+
+    def save_stream_checkpoint(
+        self, username: str, conversation_id: str, stream_id: str, text: str
+    ) -> None:
+        """Persist the partial text of a streaming response so it survives a crash."""
+        user_conversations = self._load_user_conversations(username)
+
+        conversation = user_conversations.get_conversation(conversation_id)
+        if not conversation:
+            raise ValueError(
+                f"Conversation {conversation_id} not found for user {username}"
+            )
+
+        conversation.stream_checkpoint = StreamCheckpoint(
+            stream_id=stream_id, text=text, updated_at=int(time.time())
         )
+        self._save_user_conversations(username, user_conversations)
+
+    def recover_interrupted_response(
+        self, username: str, conversation_id: str, stream_id: str | None = None
+    ) -> bool:
+        """
+        Turn a leftover streaming checkpoint into an interrupted assistant message.
+
+        A checkpoint only outlives its stream when the response never got saved,
+        e.g. because the worker failed or the server restarted mid-answer.
+
+        Args:
+            username: Owner of the conversation
+            conversation_id: Conversation to check
+            stream_id: If given, only recover the checkpoint written by this stream
+
+        Returns:
+            True if an interrupted message was added
+        """
+        user_conversations = self._load_user_conversations(username)
+
+        conversation = user_conversations.get_conversation(conversation_id)
+        if not conversation or not conversation.stream_checkpoint:
+            return False
 
+        checkpoint = conversation.stream_checkpoint
+        if stream_id is not None and checkpoint.stream_id != stream_id:
+            return False
+
+        if checkpoint.text:
+            conversation.add_message("assistant", checkpoint.text, interrupted=True)
+            logging.warning(
+                f"Recovered interrupted response for conversation {conversation_id} "
+                f"({len(checkpoint.text)} chars)"
+            )
+        conversation.stream_checkpoint = None
         self._save_user_conversations(username, user_conversations)
+        return bool(checkpoint.text)
 
     def get_last_response_id(self, username: str, conversation_id: str) -> str | None:
         """Get the last response ID for conversation continuity."""
@@ -809,7 +1103,7 @@ class ConversationManager(UserFileManager):
 
     def get_message_list(
         self, username: str, conversation_id: str
-    ) -> list[dict[str, str]]:
+    ) -> list[dict[str, Any]]:
         """Get formatted message list for frontend compatibility."""
         conversation = self.get_conversation(username, conversation_id)
         if not conversation:
@@ -818,6 +1112,34 @@ class ConversationManager(UserFileManager):
         # Use the Pydantic model's get_message_list method
         return conversation.get_message_list()
 
+    def get_message_window(
+        self,
+        username: str,
+        conversation_id: str,
+        limit: int | None = None,
+        before: int | None = None,
+    ) -> tuple[list[dict[str, Any]], int, int]:
+        """
+        Get the formatted messages in a window that ends before a message index.
+
+        Args:
+            username: Username who owns the conversation
+            conversation_id: Conversation to read
+            limit: Maximum number of messages to return (None for no limit)
+            before: Index of the first message not to include (None for the end)
+
+        Returns:
+            Tuple of (messages, index of the first message returned, total messages)
+        """
+        conversation = self.get_conversation(username, conversation_id)
+        if not conversation:
+            return [], 0, 0
+
+        total = len(conversation.messages)
+        end = total if before is None else min(before, total)
+        start = 0 if limit is None else max(0, end - limit)
+        return conversation.get_message_list(start, end), start, total
+
     def get_message_reasoning_data(
         self, username: str, conversation_id: str, message_index: int
     ) -> dict[str, Any] | None:
@@ -1178,6 +1500,43 @@ code
             return self.get_default_preset()
 
 
+class UsageManager(UserFileManager):
+    """Keeps each user's usage rollups, updated as assistant responses are saved."""
+
+    def __init__(self, static_folder: str):
+        super().__init__(static_folder, "usage")
+
+    def _load_rollups(self, username: str) -> UsageRollups:
+        """Load a user's rollups, starting empty if the file is missing or invalid."""
+        user_file = self._get_user_file_path(username)
+        data = load_json_file_with_backup(user_file, "usage", username, {})
+        try:
+            return UsageRollups.model_validate(data)
+        except ValueError as e:
+            logging.error(f"Invalid usage data for {username}: {e}")
+            return UsageRollups()
+
+    def record_response(
+        self,
+        username: str,
+        agent_preset_id: str | None,
+        reasoning_level: str | None,
+        usage: ResponseUsage,
+    ) -> None:
+        """Add a response's usage to the user's rollups."""
+        with self._get_user_lock(username):
+            rollups = self._load_rollups(username)
+            rollups.add(agent_preset_id, reasoning_level, usage)
+            save_json_file_atomic(
+                self._get_user_file_path(username), rollups.model_dump(), "usage", username
+            )
+
+    def get_rollups(self, username: str) -> UsageRollups:
+        """Get the user's rollups."""
+        with self._get_user_lock(username):
+            return self._load_rollups(username)
+
+
 class ResponsesAPIClient:
     """Client wrapper for OpenAI Responses API with support for multiple models and reasoning levels."""
 
@@ -1203,11 +1562,27 @@ class ResponsesAPIClient:
         "none": {"effort": "none"},
     }
 
-    def __init__(self, openai_client: openai.OpenAI, tool_registry: ToolRegistry | None = None):
+    # Instructions used when the agent preset has none
+    DEFAULT_INSTRUCTIONS = """You are CodeGPT, a large language model trained by OpenAI, based on the GPT-5 architecture.
+You are trained to act and respond like a professional software engineer would, with vast knowledge of every programming language and excellent reasoning skills. You write industry-standard clean, elegant, idomatic code. You output code in Markdown format like so:
+```lang
+code
+```"""
+
+    def __init__(
+        self,
+        openai_client: openai.OpenAI,
+        tool_registry: ToolRegistry | None = None,
+        async_client: openai.AsyncOpenAI | None = None,
+    ):
         self.client = openai_client
+        self.async_client = async_client
         self.tool_registry = tool_registry
         self.default_model = "gpt-5.4"
         self.default_reasoning_level = "medium"
+        # Tools arrays by enabled tool names, so every request for a preset sends
+        # byte-identical tool definitions
+        self._tools_arrays: dict[tuple[str, ...], list[dict[str, Any]]] = {}
 
     def _get_model_metadata(self, model: str) -> str:
         """Get knowledge cutoff and current date metadata for a model."""
@@ -1216,31 +1591,39 @@ class ResponsesAPIClient:
         return f"Knowledge cutoff: {knowledge_cutoff}. Current date: {current_date}."
 
     def _enhance_instructions_with_metadata(self, instructions: str, model: str) -> str:
-        """Enhance agent instructions with model metadata (knowledge cutoff and current date)."""
+        """Enhance agent instructions with model metadata (knowledge cutoff and current date).
+
+        The metadata goes at the end: the provider caches prompts by prefix, and
+        the date changes daily, so everything before it stays cacheable.
+        """
         metadata = self._get_model_metadata(model)
 
         # Check if instructions already contain metadata to avoid duplication
         if "Knowledge cutoff:" in instructions and "Current date:" in instructions:
             return instructions
 
-        # Add metadata at the beginning of instructions after any existing model identification
-        lines = instructions.split("\n")
-        first_line = lines[0].lower() if lines else ""
+        return f"{instructions}\n\n{metadata}"
 
-        # Check if first line contains specific model identification (like "CodeGPT" or "GPT-5")
-        has_model_id = any(
-            keyword in first_line
-            for keyword in ["CodeGPT", "ChatGPT", "GPT-5", "GPT-4", "large language model"]
+    def build_instructions(self, instructions: str | None, model: str | None) -> str:
+        """Build the instructions sent with a request: the preset's (or default) instructions plus metadata.
+
+        Continuations of a response must send exactly the same instructions so
+        the provider's prompt cache is hit.
+        """
+        return self._enhance_instructions_with_metadata(
+            instructions or self.DEFAULT_INSTRUCTIONS, self._validate_model(model)
         )
 
-        if has_model_id and len(lines) > 0:
-            # Insert metadata after the first line (model identification)
-            enhanced_lines = [lines[0], metadata] + lines[1:]
-        else:
-            # Insert metadata at the beginning
-            enhanced_lines = [metadata] + lines
+    def get_prompt_cache_key(self, username: str | None, agent_preset_id: str | None) -> str:
+        """Stable prompt_cache_key for requests sharing a prompt prefix.
 
-        return "\n".join(enhanced_lines)
+        Requests with the same key are routed to the same prompt cache. The
+        built-in default preset's prefix is the same for everyone; custom presets
+        belong to one user.
+        """
+        if not agent_preset_id or agent_preset_id == "default":
+            return "preset:default"
+        return f"preset:{username}:{agent_preset_id}"
 
     def create_response(
         self,
@@ -1252,56 +1635,59 @@ class ResponsesAPIClient:
         reasoning_level: str | None = None,
         instructions: str | None = None,
         enabled_tools: list[str] | None = None,
+        prompt_cache_key: str | None = None,
     ) -> Any:
         """Create a response using the Responses API with model and reasoning level support."""
         try:
-            # Validate and set model with fallback to default
-            validated_model = self._validate_model(model)
-
-            # Validate and get reasoning configuration
-            reasoning_config = self._get_reasoning_config(
-                reasoning_level, validated_model
-            )
-
-            # Use custom instructions from agent preset or fall back to default
-            default_instructions = """You are CodeGPT, a large language model trained by OpenAI, based on the GPT-5 architecture.
-You are trained to act and respond like a professional software engineer would, with vast knowledge of every programming language and excellent reasoning skills. You write industry-standard clean, elegant, idomatic code. You output code in Markdown format like so:
-```lang
-code
-```"""
-
-            # Get base instructions and enhance with model metadata
-            base_instructions = instructions or default_instructions
-            enhanced_instructions = self._enhance_instructions_with_metadata(
-                base_instructions, validated_model
+            params = self._build_response_params(
+                input_text,
+                previous_response_id,
+                stream,
+                username,
+                model,
+                reasoning_level,
+                instructions,
+                enabled_tools,
+                prompt_cache_key,
             )
+            return self.client.responses.create(**params)
 
-            # Build tools array from enabled_tools list
-            tools = self._build_tools_array(enabled_tools or ["web_search"])
-
-            params: dict[str, Any] = {
-                "model": validated_model,
-                "input": input_text,
-                "stream": stream,
-                "store": True,  # Store responses for conversation continuity
-                "tools": tools,
-                "instructions": enhanced_instructions,
-            }
-
-            # Add reasoning configuration if available
-            if reasoning_config:
-                params["reasoning"] = reasoning_config
-                logging.debug(f"Added reasoning configuration: {reasoning_config}")
-
-            # Add previous response ID for conversation continuity
-            if previous_response_id:
-                params["previous_response_id"] = previous_response_id
+        except openai.RateLimitError as e:
+            return self._handle_rate_limit_error(e)
+        except openai.APIError as e:
+            return self._handle_api_error(e)
+        except Exception as e:
+            return self._handle_general_error(e)
 
-            # Add user identifier for better caching and abuse detection
-            if username:
-                params["user"] = username
+    async def create_response_async(
+        self,
+        input_text: str,
+        previous_response_id: str | None = None,
+        stream: bool = True,
+        username: str | None = None,
+        model: str | None = None,
+        reasoning_level: str | None = None,
+        instructions: str | None = None,
+        enabled_tools: list[str] | None = None,
+        prompt_cache_key: str | None = None,
+    ) -> Any:
+        """Create a response with the AsyncOpenAI client; same parameters and error results as create_response."""
+        try:
+            if self.async_client is None:
+                raise RuntimeError("No async OpenAI client configured")
 
-            return self.client.responses.create(**params)
+            params = self._build_response_params(
+                input_text,
+                previous_response_id,
+                stream,
+                username,
+                model,
+                reasoning_level,
+                instructions,
+                enabled_tools,
+                prompt_cache_key,
+            )
+            return await self.async_client.responses.create(**params)
 
         except openai.RateLimitError as e:
             return self._handle_rate_limit_error(e)
@@ -1310,6 +1696,67 @@ code
         except Exception as e:
             return self._handle_general_error(e)
 
+    def _build_response_params(
+        self,
+        input_text: str,
+        previous_response_id: str | None,
+        stream: bool,
+        username: str | None,
+        model: str | None,
+        reasoning_level: str | None,
+        instructions: str | None,
+        enabled_tools: list[str] | None,
+        prompt_cache_key: str | None = None,
+    ) -> dict[str, Any]:
+        """Build the Responses API request parameters shared by the sync and async clients.
+
+        Parameters are laid out for prompt caching: the tools and the static part
+        of the instructions form a prefix that is the same for every request of a
+        preset, and the date is at the end of the instructions.
+        """
+        # Validate and set model with fallback to default
+        validated_model = self._validate_model(model)
+
+        # Validate and get reasoning configuration
+        reasoning_config = self._get_reasoning_config(
+            reasoning_level, validated_model
+        )
+
+        # Use custom instructions from agent preset or fall back to default,
+        # enhanced with model metadata
+        enhanced_instructions = self.build_instructions(instructions, validated_model)
+
+        # Build tools array from enabled_tools list
+        tools = self._build_tools_array(enabled_tools or ["web_search"])
+
+        params: dict[str, Any] = {
+            "model": validated_model,
+            "input": input_text,
+            "stream": stream,
+            "store": True,  # Store responses for conversation continuity
+            "tools": tools,
+            "instructions": enhanced_instructions,
+        }
+
+        # Add reasoning configuration if available
+        if reasoning_config:
+            params["reasoning"] = reasoning_config
+            logging.debug(f"Added reasoning configuration: {reasoning_config}")
+
+        # Add previous response ID for conversation continuity
+        if previous_response_id:
+            params["previous_response_id"] = previous_response_id
+
+        # Add user identifier for abuse detection
+        if username:
+            params["user"] = username
+
+        # Route requests sharing this prompt prefix to the same prompt cache
+        if prompt_cache_key:
+            params["prompt_cache_key"] = prompt_cache_key
+
+        return params
+
     def _handle_rate_limit_error(self, error: openai.RateLimitError) -> dict[str, str]:
         """Handle rate limiting errors with detailed logging and user guidance."""
         logging.error(f"Rate limit exceeded: {error}")
@@ -1468,6 +1915,10 @@ code
         of enabled tool names. Handles both built-in OpenAI tools (like web_search)
         and custom backend tools (like calculator).
         
+        Arrays are built once per list of tool names (in practice, per agent
+        preset) and reused, so requests share a cacheable prompt prefix. The
+        returned list must not be modified.
+        
         Args:
             enabled_tools: List of tool names to enable (e.g., ['web_search', 'calculator'])
         
@@ -1482,6 +1933,15 @@ code
             #     {'type': 'function', 'function': {...}}
             # ]
         """
+        key = tuple(enabled_tools)
+        tools = self._tools_arrays.get(key)
+        if tools is None:
+            tools = self._create_tools_array(enabled_tools)
+            self._tools_arrays[key] = tools
+        return tools
+
+    def _create_tools_array(self, enabled_tools: list[str]) -> list[dict[str, Any]]:
+        """Build a new tools array; see _build_tools_array."""
         tools = []
         
         for tool_name in enabled_tools:
@@ -1660,26 +2120,239 @@ Generate only the title (no quotes, no extra text)."""
         return f"Chat - {date_str}"
 
 
+class ConversationTitleGenerator:
+    """Generate titles for new conversations on a bounded background executor.
+
+    Titles are generated off the request path so a new chat's response can start
+    streaming immediately. Only one title is generated per conversation at a time,
+    and when too many are waiting new conversations keep their temporary name.
+    """
+
+    def __init__(
+        self,
+        responses_client: ResponsesAPIClient,
+        conversation_manager: ConversationManager,
+        max_workers: int = TITLE_GENERATION_WORKERS,
+        max_pending: int = TITLE_GENERATION_MAX_PENDING,
+    ):
+        self.responses_client = responses_client
+        self.conversation_manager = conversation_manager
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="title-generation"
+        )
+        self._pending: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        username: str,
+        conversation_id: str,
+        user_message: str,
+        on_title: Callable[[str], None] | None = None,
+    ) -> bool:
+        """
+        Queue title generation for a conversation.
+
+        Args:
+            username: Owner of the conversation
+            conversation_id: Conversation to title
+            user_message: First user message, used to generate the title
+            on_title: Called with the stored title once it has been saved
+
+        Returns:
+            True if queued, False if the conversation already has a title pending
+            or the queue is full
+        """
+        key = (username, conversation_id)
+        with self._lock:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                logging.warning(
+                    f"Title generation queue full, keeping temporary title for conversation {conversation_id}"
+                )
+                return False
+            self._pending.add(key)
+
+        try:
+            self._executor.submit(self._generate, key, user_message, on_title)
+        except RuntimeError:
+            # The executor is shut down while the app exits
+            with self._lock:
+                self._pending.discard(key)
+            return False
+        return True
+
+    def is_pending(self, username: str, conversation_id: str) -> bool:
+        """Check if a title is still being generated for a conversation."""
+        with self._lock:
+            return (username, conversation_id) in self._pending
+
+    def _generate(
+        self,
+        key: tuple[str, str],
+        user_message: str,
+        on_title: Callable[[str], None] | None,
+    ) -> None:
+        """Generate and store the title, then report it through on_title."""
+        username, conversation_id = key
+        try:
+            # Generate title using the user's first message
+            generated_title = self.responses_client.generate_conversation_title(
+                user_message
+            )
+
+            # Update the conversation with the generated title
+            success = self.conversation_manager.update_conversation_title(
+                username, conversation_id, generated_title
+            )
+            if not success:
+                logging.warning(
+                    f"Failed to update title for conversation {conversation_id}"
+                )
+                return
+
+            logging.info(
+                f"Successfully generated title '{generated_title}' for conversation {conversation_id}"
+            )
+            if on_title:
+                # Report the title as stored, after sanitizing for storage
+                conversation = self.conversation_manager.get_conversation(
+                    username, conversation_id
+                )
+                on_title(conversation.chat_name if conversation else generated_title)
+
+        except Exception as e:
+            logging.error(
+                f"Error generating title for conversation {conversation_id}: {e}",
+                exc_info=True,
+            )
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
 # Initialize the conversation manager
 conversation_manager = ConversationManager(app.static_folder or "static")
 
+# Replay buffers of in-flight chat responses, for clients that reconnect mid-stream
+chat_stream_registry = ChatStreamRegistry()
+
+# Event loop shared by all responses generated with the async chat engine
+chat_event_loop = ChatEventLoop()
+
 # Initialize the agent preset manager
 agent_preset_manager = AgentPresetManager(app.static_folder or "static")
 
+# Per-user token and latency rollups of saved responses
+usage_manager = UsageManager(app.static_folder or "static")
+
 # Initialize the tool registry and register tools
 tool_registry = ToolRegistry()
-tool_registry.register_tool(CalculatorTool())
+tool_registry.register_tool(
+    CalculatorTool(
+        sandbox_workers=CALCULATOR_SANDBOX_WORKERS,
+        timeout=CALCULATOR_TIMEOUT_SECONDS,
+        memory_limit_mb=CALCULATOR_MEMORY_LIMIT_MB,
+    )
+)
 logging.info("Tool registry initialized with calculator tool")
 
+# Cache tool storage files across calls, writing pending changes on exit
+tool_storage_cache = ToolStorageCache(
+    durability=TOOL_STORAGE_DURABILITY,
+    max_entries=TOOL_STORAGE_CACHE_SIZE,
+    flush_interval=TOOL_STORAGE_FLUSH_INTERVAL_SECONDS,
+)
+atexit.register(tool_storage_cache.close)
+
 # Initialize the tool executor
-tool_executor = ToolExecutor(tool_registry)
+tool_executor = ToolExecutor(
+    tool_registry,
+    storage_cache=tool_storage_cache,
+    thread_workers=TOOL_THREAD_WORKERS,
+    process_workers=TOOL_PROCESS_WORKERS,
+    result_cache_size=TOOL_RESULT_CACHE_SIZE,
+)
+atexit.register(tool_executor.close)
+# Spawned workers import this module again, so they must not start workers of their own.
+# Starting them now keeps the first calls from waiting the seconds that takes
+if multiprocessing.parent_process() is None:
+    tool_executor.start_process_workers()
 logging.info("Tool executor initialized")
 
+# Threads shared by all responses for running their tool calls concurrently
+tool_call_executor = ThreadPoolExecutor(
+    max_workers=TOOL_CALL_WORKERS, thread_name_prefix="tool-call"
+)
+
 # Initialize the Responses API client with tool registry
-responses_client = ResponsesAPIClient(client, tool_registry=tool_registry)
+responses_client = ResponsesAPIClient(
+    client, tool_registry=tool_registry, async_client=async_client
+)
+
+# Titles for new conversations are generated in the background
+title_generator = ConversationTitleGenerator(responses_client, conversation_manager)
+
+# Keeps NovelAI generations within the account's concurrency limit
+novelai_scheduler = NovelAIScheduler(NOVELAI_CONCURRENCY)
+
+# One NovelAI client for the whole process, so requests reuse its open connections
+novelai_client = NovelAIClient(
+    NOVELAI_API_KEY or "",
+    pool_size=NOVELAI_POOL_SIZE,
+    retry_policy=NovelAIRetryPolicy(
+        max_attempts=NOVELAI_RETRY_ATTEMPTS, deadline=NOVELAI_RETRY_DEADLINE_SECONDS
+    ),
+    scheduler=novelai_scheduler,
+)
+if NOVELAI_API_KEY and NOVELAI_PREWARM:
+    threading.Thread(target=novelai_client.prewarm, name="novelai-prewarm", daemon=True).start()
+
+# Answers tag autocomplete queries from local tags or recent NovelAI suggestions where it can
+tag_index = TagIndex()
+tag_suggestion_cache = TagSuggestionCache(
+    lambda model, prompt, lang: novelai_client.suggest_tags(model=model, prompt=prompt, lang=lang),
+    max_entries=TAG_SUGGESTION_CACHE_SIZE,
+    ttl=TAG_SUGGESTION_CACHE_TTL_SECONDS,
+    result_limit=NOVELAI_TAG_SUGGESTION_LIMIT,
+    index=tag_index,
+)
+
+
+def load_tag_index() -> None:
+    """Load the tag dump and previously learned tags into the tag index."""
+    try:
+        if TAG_INDEX_PATH:
+            tag_index.add(load_tag_dump(TAG_INDEX_PATH), complete=True)
+        if TAG_INDEX_LEARNED_PATH:
+            tag_index.load_learned(TAG_INDEX_LEARNED_PATH)
+        tag_index.rebuild()
+        logging.info(f"Tag index loaded with {len(tag_index)} tags")
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to load tag index: {e}")
+
+
+if TAG_INDEX_PATH or TAG_INDEX_LEARNED_PATH:
+    # Large dumps take a few seconds to index; NovelAI answers until then
+    threading.Thread(target=load_tag_index, name="tag-index-load", daemon=True).start()
+if TAG_INDEX_LEARNED_PATH:
+    atexit.register(tag_index.save_learned, TAG_INDEX_LEARNED_PATH)
+
+# Threads shared by all requests for saving the images of multi-sample generations
+image_save_executor = ThreadPoolExecutor(
+    max_workers=IMAGE_SAVE_WORKERS, thread_name_prefix="image-save"
+)
+
+# Next free image index of each user, so concurrent requests never share a file name
+image_index_lock = threading.Lock()
+next_image_index: dict[str, int] = {}
 
 # Initialize vibe-related services
-vibe_storage_manager = VibeStorageManager(app.static_folder or "static")
+vibe_storage_manager = VibeStorageManager(
+    app.static_folder or "static", encoding_cache_size=VIBE_ENCODING_CACHE_SIZE
+)
 
 # Global progress tracking for vibe processing
 vibe_progress_tracker: dict[str, dict[str, Any]] = {}
@@ -1688,8 +2361,10 @@ vibe_progress_lock = threading.Lock()
 logging.info("Vibe services initialized")
 
 
-def resolve_vibe_params(username: str, vibe_params: list[dict[str, Any]]) -> list[VibeReference]:
-    """Resolve vibe GUIDs to VibeReference objects with encoded data."""
+def resolve_vibe_params(username: str, vibe_params: list[dict[str, Any]] | None) -> list[VibeReference] | None:
+    """Resolve vibe GUIDs to VibeReference objects with encoded data, or None if no vibes were requested."""
+    if not vibe_params:
+        return None
     
     vibes: list[VibeReference] = []
     for param in vibe_params:
@@ -1700,21 +2375,14 @@ def resolve_vibe_params(username: str, vibe_params: list[dict[str, Any]]) -> lis
         if not guid:
             continue
         
-        # Load the vibe collection from storage
-        collection = vibe_storage_manager.load_collection(username, guid)
-        if not collection:
-            logging.warning(f"Vibe collection {guid} not found for user {username}")
-            continue
-        
-        # Get the encoding for the requested strength
-        encoding_key = str(encoding_strength)
-        encoding = collection.encodings.get(encoding_key)
-        if not encoding:
-            logging.warning(f"Encoding strength {encoding_strength} not found for vibe {guid}")
+        # Only the encoding for the requested strength, kept in memory after the first read
+        encoded_data = vibe_storage_manager.get_encoding(username, guid, encoding_strength)
+        if encoded_data is None:
+            logging.warning(f"Encoding strength {encoding_strength} of vibe {guid} not found for user {username}")
             continue
         
         vibes.append(VibeReference(
-            encoded_data=encoding.encoded_data,
+            encoded_data=encoded_data,
             reference_strength=reference_strength
         ))
     
@@ -1736,7 +2404,6 @@ def process_vibe_encoding_background(username: str, collection_guid: str, image_
             }
         
         # Initialize services
-        novelai_client = NovelAIClient(NOVELAI_API_KEY)
         encoder_service = VibeEncoderService(novelai_client, vibe_storage_manager)
         
         # Progress callback for encoding phase
@@ -1750,10 +2417,19 @@ def process_vibe_encoding_background(username: str, collection_guid: str, image_
                         "message": message
                     })
         
+        # Report the queue position while previews wait behind other NovelAI work
+        def queue_position_callback(position: int) -> None:
+            with vibe_progress_lock:
+                if collection_guid in vibe_progress_tracker:
+                    vibe_progress_tracker[collection_guid]["message"] = (
+                        f"Waiting for NovelAI ({position} requests ahead)"
+                    )
+
         # Encode the vibe with progress tracking
-        collection = encoder_service.encode_vibe_with_guid(
-            username, collection_guid, image_path, name, model, encoding_progress_callback
-        )
+        with novelai_request(username, NovelAIRequestClass.BACKGROUND, queue_position_callback):
+            collection = encoder_service.encode_vibe_with_guid(
+                username, collection_guid, image_path, name, model, encoding_progress_callback
+            )
         
         # Transition to preview phase
         with vibe_progress_lock:
@@ -1782,7 +2458,8 @@ def process_vibe_encoding_background(username: str, collection_guid: str, image_
         
         # Generate previews with progress tracking
         preview_generator = VibePreviewGenerator(novelai_client, vibe_storage_manager)
-        preview_generator.generate_previews(username, collection, preview_progress_callback)
+        with novelai_request(username, NovelAIRequestClass.BACKGROUND, queue_position_callback):
+            preview_generator.generate_previews(username, collection, preview_progress_callback)
         
         # Mark as complete
         with vibe_progress_lock:
@@ -1884,6 +2561,7 @@ def generate_novelai_image(
     character_prompts: list[dict[str, str]] | None = None,
     followup_state: dict[str, FollowUpState] | None = None,
     vibes: list | None = None,
+    n_samples: int = 1,
 ) -> GeneratedImageData:
     if not app.static_folder:
         raise ValueError("Flask static folder not defined")
@@ -1917,28 +2595,28 @@ def generate_novelai_image(
     width = size[0]
     height = size[1]
 
-    # Create NovelAI client
-    client = NovelAIClient(NOVELAI_API_KEY)
-
     try:
-        # Generate image using the client
-        image_bytes = client.generate_image(  # type: ignore
-            prompt=revised_prompt,
-            negative_prompt=negative_prompt,
-            width=width,
-            height=height,
-            seed=seed,
-            strength=strength,
-            noise=noise,
-            variety=variety,
-            character_prompts=processed_character_prompts,
-            vibes=vibes,
-        )
-
-        if upscale:
-            image_bytes = client.upscale_image(image_bytes, width, height)
+        with count_retries() as retry_count, novelai_request(username):
+            # Generate images using the client
+            images = novelai_client.generate_images(  # type: ignore
+                prompt=revised_prompt,
+                negative_prompt=negative_prompt,
+                width=width,
+                height=height,
+                seed=seed,
+                strength=strength,
+                noise=noise,
+                variety=variety,
+                character_prompts=processed_character_prompts,
+                vibes=vibes,
+                n_samples=n_samples,
+            )
 
-        file_bytes = io.BytesIO(image_bytes)
+            if upscale:
+                images = [
+                    novelai_client.upscale_image(image_bytes, width, height)
+                    for image_bytes in images
+                ]
 
         # Build image metadata
         image_metadata: dict[str, str] = {
@@ -1950,6 +2628,8 @@ def generate_novelai_image(
         }
         if negative_prompt:
             image_metadata["Negative Prompt"] = negative_prompt
+        if retry_count.retries:
+            image_metadata["NovelAI Retries"] = str(retry_count.retries)
 
         # Add character prompt metadata using shared utility
         if character_prompts and processed_character_prompts:
@@ -1958,15 +2638,8 @@ def generate_novelai_image(
             )
             image_metadata.update(char_metadata)
 
-        saved_data = process_image_response(
-            file_bytes, prompt, revised_prompt, username, image_metadata
-        )
-        return GeneratedImageData(
-            saved_data.local_image_path,
-            revised_prompt,
-            prompt,
-            saved_data.image_name,
-            image_metadata,
+        return save_generated_images(
+            images, prompt, revised_prompt, username, image_metadata, seed
         )
 
     except NovelAIAPIError as e:
@@ -1991,6 +2664,8 @@ def generate_novelai_inpaint_image(
     grid_dynamic_prompt: GridDynamicPromptInfo | None = None,
     character_prompts: list[dict[str, str]] | None = None,
     followup_state: dict[str, FollowUpState] | None = None,
+    vibes: list[VibeReference] | None = None,
+    n_samples: int = 1,
 ) -> GeneratedImageData:
     """Generate an inpainted image using NovelAI and return processed data."""
     if not app.static_folder:
@@ -2024,26 +2699,24 @@ def generate_novelai_inpaint_image(
 
     width, height = size
 
-    # Create NovelAI client
-    client = NovelAIClient(NOVELAI_API_KEY)
-
     try:
-        # Generate inpainted image using the client
-        image_bytes = client.generate_inpaint_image(  # type: ignore
-            base_image=base_image,
-            mask=mask,
-            prompt=revised_prompt,
-            negative_prompt=negative_prompt,
-            strength=strength,
-            noise=noise,
-            width=width,
-            height=height,
-            seed=seed,
-            variety=variety,
-            character_prompts=processed_character_prompts,
-        )
-
-        file_bytes = io.BytesIO(image_bytes)
+        with count_retries() as retry_count, novelai_request(username):
+            # Generate inpainted images using the client
+            images = novelai_client.generate_inpaint_images(  # type: ignore
+                base_image=base_image,
+                mask=mask,
+                prompt=revised_prompt,
+                negative_prompt=negative_prompt,
+                strength=strength,
+                noise=noise,
+                width=width,
+                height=height,
+                seed=seed,
+                variety=variety,
+                character_prompts=processed_character_prompts,
+                vibes=vibes,
+                n_samples=n_samples,
+            )
 
         # Build image metadata
         image_metadata: dict[str, str] = {
@@ -2057,6 +2730,8 @@ def generate_novelai_inpaint_image(
         }
         if negative_prompt:
             image_metadata["Negative Prompt"] = negative_prompt
+        if retry_count.retries:
+            image_metadata["NovelAI Retries"] = str(retry_count.retries)
 
         # Add character prompt metadata using shared utility
         if character_prompts and processed_character_prompts:
@@ -2065,15 +2740,8 @@ def generate_novelai_inpaint_image(
             )
             image_metadata.update(char_metadata)
 
-        saved_data = process_image_response(
-            file_bytes, prompt, revised_prompt, username, image_metadata
-        )
-        return GeneratedImageData(
-            saved_data.local_image_path,
-            revised_prompt,
-            prompt,
-            saved_data.image_name,
-            image_metadata,
+        return save_generated_images(
+            images, prompt, revised_prompt, username, image_metadata, seed
         )
 
     except NovelAIAPIError as e:
@@ -2095,6 +2763,8 @@ def generate_novelai_img2img_image(
     noise: float = 0.2,
     variety: bool = False,
     followup_state: dict[str, FollowUpState] | None = None,
+    vibes: list[VibeReference] | None = None,
+    n_samples: int = 1,
 ) -> GeneratedImageData:
     """Generate an img2img image using NovelAI and return processed data."""
     if not app.static_folder:
@@ -2113,24 +2783,22 @@ def generate_novelai_img2img_image(
 
     width, height = size
 
-    # Create NovelAI client
-    client = NovelAIClient(NOVELAI_API_KEY)
-
     try:
-        # Generate img2img image using the client
-        image_bytes = client.generate_img2img_image(  # type: ignore
-            base_image=base_image,
-            prompt=revised_prompt,
-            negative_prompt=negative_prompt,
-            strength=strength,
-            noise=noise,
-            width=width,
-            height=height,
-            seed=seed,
-            variety=variety,
-        )
-
-        file_bytes = io.BytesIO(image_bytes)
+        with count_retries() as retry_count, novelai_request(username):
+            # Generate img2img images using the client
+            images = novelai_client.generate_img2img_images(  # type: ignore
+                base_image=base_image,
+                prompt=revised_prompt,
+                negative_prompt=negative_prompt,
+                strength=strength,
+                noise=noise,
+                width=width,
+                height=height,
+                seed=seed,
+                variety=variety,
+                vibes=vibes,
+                n_samples=n_samples,
+            )
 
         # Build image metadata
         image_metadata: dict[str, str] = {
@@ -2144,16 +2812,11 @@ def generate_novelai_img2img_image(
         }
         if negative_prompt:
             image_metadata["Negative Prompt"] = negative_prompt
+        if retry_count.retries:
+            image_metadata["NovelAI Retries"] = str(retry_count.retries)
 
-        saved_data = process_image_response(
-            file_bytes, prompt, revised_prompt, username, image_metadata
-        )
-        return GeneratedImageData(
-            saved_data.local_image_path,
-            revised_prompt,
-            prompt,
-            saved_data.image_name,
-            image_metadata,
+        return save_generated_images(
+            images, prompt, revised_prompt, username, image_metadata, seed
         )
 
     except NovelAIAPIError as e:
@@ -2557,12 +3220,36 @@ def get_file_count(username: str, static_folder: str) -> int:
     return file_count
 
 
+def reserve_image_indexes(username: str, static_folder: str, count: int) -> int:
+    """
+    Reserve consecutive image file indexes for a user.
+
+    Indexes are handed out under a lock and never handed out twice, even when the
+    images of an earlier reservation are not on disk yet.
+
+    Args:
+        username: User the images are saved for
+        static_folder: Flask static folder holding the user's images
+        count: Number of indexes to reserve
+
+    Returns:
+        The first reserved index
+    """
+    with image_index_lock:
+        first_index = max(
+            get_file_count(username, static_folder), next_image_index.get(username, 0)
+        )
+        next_image_index[username] = first_index + count
+    return first_index
+
+
 def process_image_response(
     image_response_bytes: io.BytesIO,
     before_prompt: str,
     after_prompt: str,
     username: str,
     metadata_to_add: dict[str, str],
+    file_index: int | None = None,
 ) -> SavedImageData:
     if not app.static_folder:
         raise ValueError("Flask static folder not defined")
@@ -2591,7 +3278,10 @@ def process_image_response(
         .replace(" ", "_")[:30]
     )
 
-    file_count = get_file_count(username, app.static_folder)
+    # Images saved in parallel are given their indexes up front so their names differ
+    file_count = file_index
+    if file_count is None:
+        file_count = reserve_image_indexes(username, app.static_folder, 1)
 
     image_name = f"{str(file_count).zfill(10)}-{cleaned_prompt}.png"
     image_thumb_name = f"{str(file_count).zfill(10)}-{cleaned_prompt}.thumb.jpg"
@@ -2624,6 +3314,78 @@ def process_image_response(
     return SavedImageData(local_image_path, image_name)
 
 
+def save_generated_images(
+    images: list[bytes],
+    prompt: str,
+    revised_prompt: str,
+    username: str,
+    image_metadata: dict[str, str],
+    seed: int,
+) -> GeneratedImageData:
+    """
+    Save the images of one generation, which were generated on consecutive seeds.
+
+    A single image is saved on the calling thread. Several are saved in parallel on
+    the image save threads, under file names reserved for the user before any is
+    written, so concurrent requests never overwrite each other's images.
+
+    Args:
+        images: Raw bytes of each image, in seed order
+        prompt: Prompt as the user wrote it
+        revised_prompt: Prompt the images were generated from
+        username: User the images are saved for
+        image_metadata: Metadata written to the images; each is given its own seed
+        seed: Seed of the first image
+
+    Returns:
+        Data of the first image, with every image in samples if there are several
+    """
+    if not app.static_folder:
+        raise ValueError("Flask static folder not defined")
+
+    if len(images) == 1:
+        saved_data = process_image_response(
+            io.BytesIO(images[0]), prompt, revised_prompt, username, image_metadata
+        )
+        return GeneratedImageData(
+            saved_data.local_image_path,
+            revised_prompt,
+            prompt,
+            saved_data.image_name,
+            image_metadata,
+        )
+
+    os.makedirs(os.path.join(app.static_folder, "images", username), exist_ok=True)
+    first_index = reserve_image_indexes(username, app.static_folder, len(images))
+    pending = []
+    for sample, image_bytes in enumerate(images):
+        metadata = {**image_metadata, "seed": str(seed + sample)}
+        future = image_save_executor.submit(
+            process_image_response,
+            io.BytesIO(image_bytes),
+            prompt,
+            revised_prompt,
+            username,
+            metadata,
+            first_index + sample,
+        )
+        pending.append((future, metadata))
+
+    samples = []
+    for future, metadata in pending:
+        saved_data = future.result()
+        samples.append(
+            GeneratedImageData(
+                saved_data.local_image_path,
+                revised_prompt,
+                prompt,
+                saved_data.image_name,
+                metadata,
+            )
+        )
+    return replace(samples[0], samples=samples)
+
+
 def generate_seed_for_provider(provider: str) -> int | None:
     if provider == "stabilityai":
         return random.getrandbits(32)
@@ -2825,11 +3587,14 @@ def generate_image_grid(
                 )
             # Override seed with the locked grid seed
             image_request.seed = seed
-            # Generate the image using the unified handler
-            if image_request.operation == Operation.INPAINT:
-                response = _handle_inpainting_request(image_request)
-            else:
-                response = _handle_generation_request(image_request)
+            # A cell shows one image, so extra samples would only cost Anlas and fill the gallery
+            image_request.n_samples = 1
+            # Generate the image using the unified handler, queued behind interactive generations
+            with novelai_request(username, NovelAIRequestClass.GRID):
+                if image_request.operation == Operation.INPAINT:
+                    response = _handle_inpainting_request(image_request)
+                else:
+                    response = _handle_generation_request(image_request)
 
             if response.success:
                 # Convert the response to GeneratedImageData format
@@ -3186,6 +3951,7 @@ def handle_image_request():
                     "operation": response.operation,
                     "timestamp": response.timestamp,
                     "metadata": response.metadata,
+                    "images": response.images,
                 }
             )
         else:
@@ -3206,6 +3972,22 @@ def handle_image_request():
         return create_internal_error(error=e, message="Image request failed")
 
 
+def _describe_samples(generated_data: GeneratedImageData) -> list[dict[str, Any]] | None:
+    """Describe each image of a multi-sample generation for the response, None for one image."""
+    samples = getattr(generated_data, "samples", None)
+    if not isinstance(samples, list) or not samples:
+        return None
+    return [
+        {
+            "image_path": sample.local_image_path,
+            "image_name": sample.image_name,
+            "revised_prompt": sample.revised_prompt,
+            "metadata": sample.metadata,
+        }
+        for sample in samples
+    ]
+
+
 def _handle_generation_request(
     image_request: ImageGenerationRequest,
 ) -> ImageOperationResponse:
@@ -3250,10 +4032,7 @@ def _handle_generation_request(
             if image_request.character_prompts:
                 character_prompts = image_request.character_prompts
 
-            # Resolve vibe GUIDs to VibeReference objects
-            vibes = None
-            if image_request.vibe_params:
-                vibes = resolve_vibe_params(session["username"], image_request.vibe_params)
+            vibes = resolve_vibe_params(session["username"], image_request.vibe_params)
 
             generated_data = generate_novelai_image(
                 prompt=image_request.prompt,
@@ -3269,6 +4048,7 @@ def _handle_generation_request(
                 character_prompts=character_prompts,
                 followup_state=followup_state,
                 vibes=vibes,
+                n_samples=image_request.n_samples,
             )
         else:
             raise ValueError(f"Unsupported provider: {image_request.provider.value}")
@@ -3280,6 +4060,7 @@ def _handle_generation_request(
             operation=image_request.operation,
             revised_prompt=generated_data.revised_prompt,
             metadata=generated_data.metadata,
+            images=_describe_samples(generated_data),
         )
 
     except Exception as e:
@@ -3343,6 +4124,8 @@ def _handle_inpainting_request(
             except IOError as e:
                 raise IOError(f"Failed to read image files: {str(e)}")
 
+            vibes = resolve_vibe_params(session["username"], image_request.vibe_params)
+
             generated_data = generate_novelai_inpaint_image(
                 base_image=base_image_data,
                 mask=mask_data,
@@ -3357,6 +4140,8 @@ def _handle_inpainting_request(
                 character_prompts=image_request.character_prompts,
                 grid_dynamic_prompt=image_request.grid_dynamic_prompt,
                 followup_state=followup_state,
+                vibes=vibes,
+                n_samples=image_request.n_samples,
             )
         else:
             raise ValueError(
@@ -3374,6 +4159,7 @@ def _handle_inpainting_request(
             provider=image_request.provider,
             operation=image_request.operation,
             revised_prompt=revised_prompt,
+            images=_describe_samples(generated_data),
         )
 
     except (ValueError, FileNotFoundError, IOError) as e:
@@ -3419,6 +4205,8 @@ def _handle_img2img_request(image_request: Img2ImgRequest) -> ImageOperationResp
         # Initialize follow-up state for this generation
         followup_state = init_followup_state()
 
+        vibes = resolve_vibe_params(session["username"], image_request.vibe_params)
+
         generated_data = generate_novelai_img2img_image(
             base_image=base_image_data,
             prompt=image_request.prompt,
@@ -3430,6 +4218,8 @@ def _handle_img2img_request(image_request: Img2ImgRequest) -> ImageOperationResp
             seed=seed,
             variety=image_request.variety,
             followup_state=followup_state,
+            vibes=vibes,
+            n_samples=image_request.n_samples,
         )
 
         revised_prompt = getattr(generated_data, "revised_prompt", None)
@@ -3443,6 +4233,7 @@ def _handle_img2img_request(image_request: Img2ImgRequest) -> ImageOperationResp
             provider=image_request.provider,
             operation=image_request.operation,
             revised_prompt=revised_prompt,
+            images=_describe_samples(generated_data),
         )
 
     except Exception as e:
@@ -3490,6 +4281,8 @@ def _handle_combined_request(image_request) -> ImageOperationResponse:
 
         followup_state = init_followup_state()
 
+        vibes = resolve_vibe_params(session["username"], image_request.vibe_params)
+
         # Use NovelAI inpainting with the painted image as base
         generated_data = generate_novelai_inpaint_image(
             base_image=base_image_data,
@@ -3505,6 +4298,8 @@ def _handle_combined_request(image_request) -> ImageOperationResponse:
             character_prompts=image_request.character_prompts,
             grid_dynamic_prompt=image_request.grid_dynamic_prompt,
             followup_state=followup_state,
+            vibes=vibes,
+            n_samples=image_request.n_samples,
         )
 
         return create_success_response(
@@ -3513,6 +4308,7 @@ def _handle_combined_request(image_request) -> ImageOperationResponse:
             provider=image_request.provider,
             operation=image_request.operation,
             revised_prompt=getattr(generated_data, "revised_prompt", None),
+            images=_describe_samples(generated_data),
         )
 
     except (ValueError, FileNotFoundError, IOError) as e:
@@ -3552,7 +4348,14 @@ def _get_aspect_ratio_from_dimensions(width: int, height: int) -> str:
             return "9:16"  # Default for portrait
 
 
-EOS_STR = "␆␄"
+def parse_message_window_arg(name: str) -> int | None:
+    """Parse the limit or before query argument of a message window, None if absent."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"{name} must be a non-negative integer")
+    return int(value)
 
 
 @app.route("/chat", methods=["GET", "POST"])  # type: ignore
@@ -3574,9 +4377,35 @@ def converse():
         if not conversation_id:
             raise ValueError("conversation_id was empty")
 
-        # Use ConversationManager to get message list
-        message_list = conversation_manager.get_message_list(username, conversation_id)
-        return json.dumps({"threadId": conversation_id, "messages": message_list})
+        # Long conversations are loaded a window at a time, newest first
+        window: dict[str, int | None] = {}
+        for arg in ("limit", "before"):
+            try:
+                window[arg] = parse_message_window_arg(arg)
+            except ValueError as e:
+                return create_validation_error(str(e), field=arg)
+        limit = window["limit"]
+        if limit is not None:
+            limit = min(max(limit, 1), CHAT_MESSAGE_PAGE_MAX)
+
+        # A checkpoint without a live stream means the response was cut off
+        active_stream = chat_stream_registry.get(username, conversation_id)
+        if active_stream is None or active_stream.finished:
+            conversation_manager.recover_interrupted_response(username, conversation_id)
+
+        message_list, first_index, total_messages = conversation_manager.get_message_window(
+            username, conversation_id, limit, window["before"]
+        )
+        chat_data: dict[str, Any] = {
+            "threadId": conversation_id,
+            "messages": message_list,
+            "firstIndex": first_index,
+            "totalMessages": total_messages,
+        }
+        if active_stream is not None and not active_stream.finished:
+            # Let the client reattach to the response that is still streaming
+            chat_data["activeStreamId"] = active_stream.stream_id
+        return json.dumps(chat_data)
 
     elif request.method == "POST":
         if not request.json:
@@ -3586,6 +4415,13 @@ def converse():
         if not user_input:
             return create_validation_error("No input provided", field="user_input")
 
+        stream_protocol = request.json.get("stream_protocol") or CHAT_STREAM_PROTOCOL
+        if stream_protocol not in STREAM_PROTOCOLS:
+            return create_validation_error(
+                f"Unsupported stream protocol: {stream_protocol}",
+                field="stream_protocol",
+            )
+
         # Get agent preset and reasoning level parameters
         agent_preset_id = request.json.get("agent_preset_id")
         reasoning_level = request.json.get("reasoning_level")
@@ -3614,6 +4450,9 @@ def converse():
         )
 
         # Handle existing conversation or create new one
+        is_new_conversation = False
+        # Messages the client has not seen yet: the user message, plus a recovered partial response
+        new_message_count = 1
         if conversation_id:
             # Check if conversation exists
             conversation = conversation_manager.get_conversation(
@@ -3622,57 +4461,241 @@ def converse():
             if not conversation:
                 return create_not_found_error("Conversation", conversation_id)
 
+            # Surface a response that was cut off before continuing the conversation
+            if not chat_stream_registry.is_active(username, conversation_id):
+                recovered = conversation_manager.recover_interrupted_response(
+                    username, conversation_id
+                )
+                new_message_count += int(recovered)
+
         else:
             # Create new conversation with temporary title
             chat_name = request.json.get("chat_name", "New Chat")
             conversation_id = conversation_manager.create_conversation(
                 username, chat_name
             )
+            is_new_conversation = True
 
-            # Generate title asynchronously for new conversations
-            def generate_title_async():
-                """Generate and update conversation title asynchronously."""
-                try:
-                    # Generate title using the user's first message
-                    generated_title = responses_client.generate_conversation_title(
-                        user_input
+        # Add user message to conversation
+        conversation_manager.add_message(username, conversation_id, "user", user_input)
+
+        # Get previous response ID for conversation continuity
+        previous_response_id = conversation_manager.get_last_response_id(
+            username, conversation_id
+        )
+
+        # Send only the new messages, the client already has the earlier ones
+        message_list, first_index, total_messages = conversation_manager.get_message_window(
+            username, conversation_id, new_message_count
+        )
+
+        def create_event_processor(
+            processor_class: type[StreamEventProcessor],
+            openai_client: Any,
+            stream_buffer: ChatStreamBuffer,
+            username: str,
+            conversation_id: str,
+            model: str | None,
+            instructions: str,
+            enabled_tools: list[str],
+            prompt_cache_key: str,
+        ) -> StreamEventProcessor:
+            """Create the event processor with all needed context for tool execution."""
+
+            def save_checkpoint(text: str) -> None:
+                conversation_manager.save_stream_checkpoint(
+                    username, conversation_id, stream_buffer.stream_id, text
+                )
+
+            return processor_class(
+                event_queue=stream_buffer,
+                tool_executor=tool_executor,
+                username=username,
+                conversation_id=conversation_id,
+                openai_client=openai_client,
+                model=model or "gpt-5.4",
+                # Build tools array for the event processor
+                tools=responses_client._build_tools_array(enabled_tools),
+                instructions=instructions,
+                prompt_cache_key=prompt_cache_key,
+                checkpoint_callback=save_checkpoint,
+                tool_call_executor=tool_call_executor,
+            )
+
+        def api_error_event(error_response: dict[str, Any]) -> str:
+            """Encode the error result of create_response for the frontend."""
+            return json.dumps(
+                {
+                    "type": "error",
+                    "message": error_response.get("message", "An error occurred"),
+                    "error_code": error_response.get("error", "unknown_error"),
+                    "user_action": error_response.get("user_action", "Please try again."),
+                }
+            )
+
+        def save_response(
+            event_processor: StreamEventProcessor,
+            stream_buffer: ChatStreamBuffer,
+            username: str,
+            conversation_id: str,
+            model: str | None,
+            reasoning_level: str | None,
+            agent_preset_id: str | None,
+        ) -> None:
+            """Store the streamed assistant response, reporting storage problems to the frontend."""
+            # Get the response ID, final text, and reasoning data for storage
+            response_id = event_processor.get_response_id()
+            final_text = event_processor.accumulated_text
+
+            # Get reasoning data with graceful degradation
+            reasoning_data = None
+            try:
+                reasoning_data = event_processor.get_reasoning_data()
+                if reasoning_data:
+                    logging.debug(
+                        f"Successfully retrieved reasoning data for response {response_id}"
+                    )
+                else:
+                    logging.debug(
+                        f"No reasoning data available for response {response_id}"
                     )
+            except Exception as e:
+                logging.warning(
+                    f"Failed to retrieve reasoning data for response {response_id}: {e}"
+                )
+                # Continue without reasoning data - chat functionality should not be affected
 
-                    # Update the conversation with the generated title
-                    success = conversation_manager.update_conversation_title(
-                        username, conversation_id, generated_title
+            usage = event_processor.get_usage()
+
+            if final_text and response_id:
+                try:
+                    # Store assistant response in conversation with reasoning data and agent preset metadata
+                    conversation_manager.add_message(
+                        username,
+                        conversation_id,
+                        "assistant",
+                        final_text,
+                        response_id,
+                        reasoning_data,
+                        agent_preset_id=agent_preset_id,
+                        model=model,
+                        reasoning_level=reasoning_level,
+                        usage=usage,
                     )
 
-                    if success:
+                    # Log reasoning data status for debugging
+                    if reasoning_data:
                         logging.info(
-                            f"Successfully generated title '{generated_title}' for conversation {conversation_id}"
+                            f"Saved assistant response with reasoning data for conversation {conversation_id}"
                         )
                     else:
-                        logging.warning(
-                            f"Failed to update title for conversation {conversation_id}"
+                        logging.info(
+                            f"Saved assistant response without reasoning data for conversation {conversation_id}"
+                        )
+
+                    # The rollups are only statistics, a failure must not look like a lost response
+                    try:
+                        usage_manager.record_response(
+                            username, agent_preset_id, reasoning_level, usage
                         )
+                    except Exception as e:
+                        logging.warning(f"Failed to record usage for response {response_id}: {e}")
 
+                except ConversationStorageError as e:
+                    logging.error(f"Failed to save assistant response: {e}")
+                    stream_buffer.put(
+                        json.dumps(
+                            {
+                                "type": "error",
+                                "message": "Response received but failed to save. Your conversation may be incomplete.",
+                                "error_code": "storage_error",
+                                "user_action": "Try refreshing the page or contact support if the issue persists.",
+                            }
+                        )
+                    )
                 except Exception as e:
                     logging.error(
-                        f"Error generating title for conversation {conversation_id}: {e}",
+                        f"Unexpected error saving assistant response: {e}",
                         exc_info=True,
                     )
+                    stream_buffer.put(
+                        json.dumps(
+                            {
+                                "type": "error",
+                                "message": "Failed to save the response. Please try again.",
+                                "error_code": "save_error",
+                                "user_action": "Try sending your message again.",
+                            }
+                        )
+                    )
+            elif not final_text:
+                logging.warning(
+                    f"Empty response received for conversation {conversation_id}"
+                )
+                stream_buffer.put(
+                    json.dumps(
+                        {
+                            "type": "error",
+                            "message": "Received an empty response. Please try again.",
+                            "error_code": "empty_response",
+                            "user_action": "Try rephrasing your message or try again.",
+                        }
+                    )
+                )
 
-            generate_title_async()
+        def stream_error_event(error: Exception) -> str:
+            """Log an error that ended the chat worker and encode it for the frontend."""
+            if isinstance(error, ConnectionError):
+                logging.error(f"Connection error in stream thread: {error}")
+                return json.dumps(
+                    {
+                        "type": "error",
+                        "message": "Connection lost while processing your request. Please check your internet connection.",
+                        "error_code": "connection_error",
+                        "user_action": "Check your internet connection and try again.",
+                    }
+                )
+            if isinstance(error, TimeoutError):
+                logging.error(f"Timeout error in stream thread: {error}")
+                return json.dumps(
+                    {
+                        "type": "error",
+                        "message": "Request timed out. Please try again.",
+                        "error_code": "timeout_error",
+                        "user_action": "Try again or check your connection.",
+                    }
+                )
+            logging.error(
+                f"Unexpected error in responses stream thread: {error}", exc_info=error
+            )
+            return json.dumps(
+                {
+                    "type": "error",
+                    "message": "An unexpected error occurred while processing your request.",
+                    "error_code": "stream_thread_error",
+                    "user_action": "Try again or refresh the page if the problem continues.",
+                }
+            )
 
-        # Add user message to conversation
-        conversation_manager.add_message(username, conversation_id, "user", user_input)
+        def finish_stream(
+            stream_buffer: ChatStreamBuffer, username: str, conversation_id: str
+        ) -> None:
+            """Keep the partial text of an unsaved response and close the stream."""
+            try:
+                conversation_manager.recover_interrupted_response(
+                    username, conversation_id, stream_buffer.stream_id
+                )
+            except Exception as e:
+                logging.error(f"Failed to store interrupted response: {e}")
 
-        # Get previous response ID for conversation continuity
-        previous_response_id = conversation_manager.get_last_response_id(
-            username, conversation_id
-        )
+            # The turn is over, write the tools' cached storage changes
+            tool_executor.flush_storage(username, conversation_id)
 
-        # Get current message list for frontend
-        message_list = conversation_manager.get_message_list(username, conversation_id)
+            # Let the response generator finish instead of waiting forever
+            stream_buffer.put(END_OF_STREAM)
 
         def start_responses_stream_thread(
-            event_queue: Queue[str],
+            stream_buffer: ChatStreamBuffer,
             user_input: str,
             previous_response_id: str | None,
             username: str,
@@ -3684,25 +4707,26 @@ def converse():
         ):
             """Start streaming thread using Responses API with comprehensive error handling."""
             try:
-                # Create response using Responses API with model, reasoning level, instructions, and enabled tools
-                instructions = agent_preset.instructions if agent_preset else None
+                # Create response using Responses API with model, reasoning level, instructions, and enabled tools.
+                # The continuations after tool calls reuse the same instructions and cache key.
+                instructions = responses_client.build_instructions(
+                    agent_preset.instructions if agent_preset else None, model
+                )
                 enabled_tools = agent_preset.enabled_tools if agent_preset else ["web_search"]
-                
-                # Build tools array for the event processor
-                tools = responses_client._build_tools_array(enabled_tools)
-                
-                # Create event processor with all needed context for tool execution
-                event_processor = StreamEventProcessor(
-                    event_queue=event_queue,
-                    tool_executor=tool_executor,
-                    username=username,
-                    conversation_id=conversation_id,
-                    openai_client=responses_client.client,
-                    model=model or "gpt-5.4",
-                    tools=tools,
-                    instructions=instructions,
+                prompt_cache_key = responses_client.get_prompt_cache_key(username, agent_preset_id)
+
+                event_processor = create_event_processor(
+                    StreamEventProcessor,
+                    responses_client.client,
+                    stream_buffer,
+                    username,
+                    conversation_id,
+                    model,
+                    instructions,
+                    enabled_tools,
+                    prompt_cache_key,
                 )
-                
+
                 stream = responses_client.create_response(
                     input_text=user_input,
                     previous_response_id=previous_response_id,
@@ -3712,190 +4736,221 @@ def converse():
                     reasoning_level=reasoning_level,
                     instructions=instructions,
                     enabled_tools=enabled_tools,
+                    prompt_cache_key=prompt_cache_key,
                 )
 
                 # Check if we got an error response
                 if isinstance(stream, dict) and "error" in stream:
-                    error_data = {
-                        "type": "error",
-                        "message": stream.get("message", "An error occurred"),
-                        "error_code": stream.get("error", "unknown_error"),
-                        "user_action": stream.get("user_action", "Please try again."),
-                    }
-                    event_queue.put(json.dumps(error_data))
+                    stream_buffer.put(api_error_event(stream))
                     return
 
                 # Process the stream
                 event_processor.process_stream(stream)
 
-                # Get the response ID, final text, and reasoning data for storage
-                response_id = event_processor.get_response_id()
-                final_text = event_processor.accumulated_text
+                save_response(
+                    event_processor,
+                    stream_buffer,
+                    username,
+                    conversation_id,
+                    model,
+                    reasoning_level,
+                    agent_preset_id,
+                )
 
-                # Get reasoning data with graceful degradation
-                reasoning_data = None
-                try:
-                    reasoning_data = event_processor.get_reasoning_data()
-                    if reasoning_data:
-                        logging.debug(
-                            f"Successfully retrieved reasoning data for response {response_id}"
-                        )
-                    else:
-                        logging.debug(
-                            f"No reasoning data available for response {response_id}"
-                        )
-                except Exception as e:
-                    logging.warning(
-                        f"Failed to retrieve reasoning data for response {response_id}: {e}"
-                    )
-                    # Continue without reasoning data - chat functionality should not be affected
+            except Exception as e:
+                stream_buffer.put(stream_error_event(e))
+            finally:
+                finish_stream(stream_buffer, username, conversation_id)
 
-                if final_text and response_id:
-                    try:
-                        # Store assistant response in conversation with reasoning data and agent preset metadata
-                        conversation_manager.add_message(
-                            username,
-                            conversation_id,
-                            "assistant",
-                            final_text,
-                            response_id,
-                            reasoning_data,
-                            agent_preset_id=agent_preset_id,
-                            model=model,
-                            reasoning_level=reasoning_level,
-                        )
+        async def run_responses_stream_async(
+            stream_buffer: ChatStreamBuffer,
+            user_input: str,
+            previous_response_id: str | None,
+            username: str,
+            conversation_id: str,
+            model: str | None = None,
+            reasoning_level: str | None = None,
+            agent_preset_id: str | None = None,
+            agent_preset: AgentPreset | None = None,
+        ):
+            """Async counterpart of start_responses_stream_thread, run on the shared chat event loop."""
+            try:
+                instructions = responses_client.build_instructions(
+                    agent_preset.instructions if agent_preset else None, model
+                )
+                enabled_tools = agent_preset.enabled_tools if agent_preset else ["web_search"]
+                prompt_cache_key = responses_client.get_prompt_cache_key(username, agent_preset_id)
 
-                        # Log reasoning data status for debugging
-                        if reasoning_data:
-                            logging.info(
-                                f"Saved assistant response with reasoning data for conversation {conversation_id}"
-                            )
-                        else:
-                            logging.info(
-                                f"Saved assistant response without reasoning data for conversation {conversation_id}"
-                            )
+                event_processor = create_event_processor(
+                    AsyncStreamEventProcessor,
+                    responses_client.async_client,
+                    stream_buffer,
+                    username,
+                    conversation_id,
+                    model,
+                    instructions,
+                    enabled_tools,
+                    prompt_cache_key,
+                )
 
-                    except ConversationStorageError as e:
-                        logging.error(f"Failed to save assistant response: {e}")
-                        event_queue.put(
-                            json.dumps(
-                                {
-                                    "type": "error",
-                                    "message": "Response received but failed to save. Your conversation may be incomplete.",
-                                    "error_code": "storage_error",
-                                    "user_action": "Try refreshing the page or contact support if the issue persists.",
-                                }
-                            )
-                        )
-                    except Exception as e:
-                        logging.error(
-                            f"Unexpected error saving assistant response: {e}",
-                            exc_info=True,
-                        )
-                        event_queue.put(
+                stream = await responses_client.create_response_async(
+                    input_text=user_input,
+                    previous_response_id=previous_response_id,
+                    stream=True,
+                    username=username,
+                    model=model,
+                    reasoning_level=reasoning_level,
+                    instructions=instructions,
+                    enabled_tools=enabled_tools,
+                    prompt_cache_key=prompt_cache_key,
+                )
+
+                if isinstance(stream, dict) and "error" in stream:
+                    stream_buffer.put(api_error_event(stream))
+                    return
+
+                await event_processor.process_stream_async(stream)  # type: ignore[attr-defined]
+
+                # Conversation storage is file based, keep it off the event loop
+                await asyncio.to_thread(
+                    save_response,
+                    event_processor,
+                    stream_buffer,
+                    username,
+                    conversation_id,
+                    model,
+                    reasoning_level,
+                    agent_preset_id,
+                )
+
+            except Exception as e:
+                stream_buffer.put(stream_error_event(e))
+            finally:
+                await asyncio.to_thread(
+                    finish_stream, stream_buffer, username, conversation_id
+                )
+
+        def start_chat_response(
+            stream_buffer: ChatStreamBuffer,
+            conversation_id: str,
+            user_input: str,
+            previous_response_id: str | None,
+            message_list: list[dict[str, Any]],
+            model: str | None = None,
+            reasoning_level: str | None = None,
+            agent_preset_id: str | None = None,
+            agent_preset: AgentPreset | None = None,
+        ) -> None:
+            """Send the new messages and start generating the response on the configured engine."""
+            # firstIndex lets the client append the messages to the window it has loaded
+            stream_buffer.put(
+                json.dumps(
+                    {
+                        "type": "message_list",
+                        "threadId": conversation_id,
+                        "messages": message_list,
+                        "firstIndex": first_index,
+                        "totalMessages": total_messages,
+                    }
+                )
+            )
+
+            if is_new_conversation:
+
+                def send_title(title: str) -> None:
+                    # Titles that arrive after the response ended are picked up on the next list refresh
+                    if not stream_buffer.finished:
+                        stream_buffer.put(
                             json.dumps(
                                 {
-                                    "type": "error",
-                                    "message": "Failed to save the response. Please try again.",
-                                    "error_code": "save_error",
-                                    "user_action": "Try sending your message again.",
+                                    "type": "conversation_title",
+                                    "threadId": conversation_id,
+                                    "title": title,
                                 }
                             )
                         )
-                elif not final_text:
-                    logging.warning(
-                        f"Empty response received for conversation {conversation_id}"
-                    )
-                    event_queue.put(
-                        json.dumps(
-                            {
-                                "type": "error",
-                                "message": "Received an empty response. Please try again.",
-                                "error_code": "empty_response",
-                                "user_action": "Try rephrasing your message or try again.",
-                            }
-                        )
-                    )
 
-            except ConnectionError as e:
-                logging.error(f"Connection error in stream thread: {e}")
-                event_queue.put(
-                    json.dumps(
-                        {
-                            "type": "error",
-                            "message": "Connection lost while processing your request. Please check your internet connection.",
-                            "error_code": "connection_error",
-                            "user_action": "Check your internet connection and try again.",
-                        }
-                    )
-                )
-            except TimeoutError as e:
-                logging.error(f"Timeout error in stream thread: {e}")
-                event_queue.put(
-                    json.dumps(
-                        {
-                            "type": "error",
-                            "message": "Request timed out. Please try again.",
-                            "error_code": "timeout_error",
-                            "user_action": "Try again or check your connection.",
-                        }
-                    )
-                )
-            except Exception as e:
-                logging.error(
-                    f"Unexpected error in responses stream thread: {e}", exc_info=True
-                )
-                event_queue.put(
-                    json.dumps(
-                        {
-                            "type": "error",
-                            "message": "An unexpected error occurred while processing your request.",
-                            "error_code": "stream_thread_error",
-                            "user_action": "Try again or refresh the page if the problem continues.",
-                        }
-                    )
-                )
+                # Generate the title in the background so the response starts streaming right away
+                title_generator.submit(username, conversation_id, user_input, send_title)
+
+            args = (
+                stream_buffer,
+                user_input,
+                previous_response_id,
+                username,
+                conversation_id,
+                model,
+                reasoning_level,
+                agent_preset_id,
+                agent_preset,
+            )
+            if CHAT_ENGINE == THREAD_CHAT_ENGINE:
+                # Start the Responses API stream in a separate thread
+                threading.Thread(target=start_responses_stream_thread, args=args).start()
+            else:
+                chat_event_loop.submit(run_responses_stream_async(*args))
 
         def stream_events(
+            stream_buffer: ChatStreamBuffer,
             conversation_id: str,
             user_input: str,
             previous_response_id: str | None,
-            message_list: list[dict[str, str]],
+            message_list: list[dict[str, Any]],
             model: str | None = None,
             reasoning_level: str | None = None,
             agent_preset_id: str | None = None,
             agent_preset: AgentPreset | None = None,
         ) -> Generator[Any | AnyStr]:
             """Stream events to frontend using new Responses API."""
-            # Send initial message list
-            yield f"{json.dumps(json.dumps({'type': 'message_list', 'threadId': conversation_id, 'messages': message_list}))}{EOS_STR}"
-
-            event_queue: Queue[Any] = Queue()
+            start_chat_response(
+                stream_buffer,
+                conversation_id,
+                user_input,
+                previous_response_id,
+                message_list,
+                model,
+                reasoning_level,
+                agent_preset_id,
+                agent_preset,
+            )
 
-            # Start the Responses API stream in a separate thread
-            threading.Thread(
-                target=start_responses_stream_thread,
-                args=(
-                    event_queue,
-                    user_input,
-                    previous_response_id,
-                    username,
-                    conversation_id,
-                    model,
-                    reasoning_level,
-                    agent_preset_id,
-                    agent_preset,
-                ),
-            ).start()
+            # Yield frames as events come in, until the worker signals the end of the stream.
+            # The worker keeps running if the client disconnects, so it can reattach later.
+            yield from iter_chat_stream(stream_buffer, stream_protocol)
+
+        stream_buffer = chat_stream_registry.create(username, conversation_id)
+
+        if request.json.get("detach"):
+            # The client reads the events from /chat/stream, which an ASGI server
+            # can serve from the event loop without holding a request thread
+            start_chat_response(
+                stream_buffer,
+                conversation_id,
+                user_input,
+                previous_response_id,
+                message_list,
+                model,
+                effective_reasoning_level,
+                agent_preset_id,
+                agent_preset,
+            )
+            return {"threadId": conversation_id, "streamId": stream_buffer.stream_id}, 202
 
-            # Yield from queue as events come
-            while True:
-                event = event_queue.get()  # This will block until an item is available
-                yield event + EOS_STR
+        if stream_protocol == LEGACY_PROTOCOL:
+            mimetype = "text/plain"
+            headers = None
+        else:
+            mimetype = "text/event-stream"
+            headers = {
+                **SSE_HEADERS,
+                "X-Chat-Conversation-Id": conversation_id,
+                "X-Chat-Stream-Id": stream_buffer.stream_id,
+            }
 
         return Response(
             stream_with_context(
                 stream_events(
+                    stream_buffer,
                     conversation_id,
                     user_input,
                     previous_response_id,
@@ -3906,9 +4961,49 @@ def converse():
                     agent_preset,
                 )
             ),  # type: ignore
-            mimetype="text/plain",
+            mimetype=mimetype,
+            headers=headers,
+        )
+
+
+@app.route("/chat/stream/<conversation_id>", methods=["GET"])  # type: ignore
+def resume_chat_stream(conversation_id: str):
+    """Reattach to a chat response, replaying the events after Last-Event-ID before continuing live."""
+    if "username" not in session:
+        return redirect(url_for("login"))
+
+    username = session["username"]
+
+    raw_last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+        "last_event_id", "0"
+    )
+    try:
+        last_event_id = int(raw_last_event_id)
+    except ValueError:
+        last_event_id = -1
+    if last_event_id < 0:
+        return create_validation_error(
+            "last_event_id must be a non-negative integer", field="last_event_id"
         )
 
+    stream_buffer = chat_stream_registry.get(
+        username, conversation_id, request.args.get("stream_id")
+    )
+    if stream_buffer is None:
+        return create_not_found_error("Chat stream", conversation_id)
+
+    return Response(
+        stream_with_context(
+            iter_chat_stream(stream_buffer, SSE_PROTOCOL, last_event_id)
+        ),  # type: ignore
+        mimetype="text/event-stream",
+        headers={
+            **SSE_HEADERS,
+            "X-Chat-Conversation-Id": conversation_id,
+            "X-Chat-Stream-Id": stream_buffer.stream_id,
+        },
+    )
+
 
 @app.route("/chat/reasoning/<conversation_id>/<int:message_index>", methods=["GET"])
 def get_message_reasoning(conversation_id: str, message_index: int):
@@ -4021,6 +5116,17 @@ def get_message_reasoning(conversation_id: str, message_index: int):
         ), 500
 
 
+@dataclass
+class RunningToolCall:
+    """A tool call that was started while a response streamed and has not been collected yet."""
+
+    item_id: str
+    tool_call: dict[str, Any]
+    parameters: dict[str, Any]
+    future: "Future[dict[str, Any]] | asyncio.Future[dict[str, Any]]"
+    started_at: float = field(default_factory=time.monotonic)
+
+
 class StreamEventProcessor:
     """Process streaming responses from the Responses API to replace AssistantEventHandler."""
 
@@ -4034,15 +5140,38 @@ class StreamEventProcessor:
         model: str | None = None,
         tools: list[dict[str, Any]] | None = None,
         instructions: str | None = None,
+        checkpoint_callback: Callable[[str], None] | None = None,
+        tool_call_executor: Executor | None = None,
+        tool_call_timeout: float = TOOL_CALL_TIMEOUT_SECONDS,
+        prompt_cache_key: str | None = None,
     ):
         self.event_queue = event_queue
         self.tool_executor = tool_executor
+        # Runs the tool calls of a response concurrently; without one they run inline
+        self.tool_call_executor = tool_call_executor
+        self.tool_call_timeout = tool_call_timeout
         self.username = username
         self.conversation_id = conversation_id
         self.openai_client = openai_client
         self.model = model or "gpt-5.4"
         self.tools = tools or []
         self.instructions = instructions
+        self.prompt_cache_key = prompt_cache_key
+        # Token counts summed over the response and its continuations
+        self.usage: dict[str, int] = {
+            "input_tokens": 0,
+            "cached_tokens": 0,
+            "output_tokens": 0,
+            "reasoning_tokens": 0,
+        }
+        # Timings for the usage record; the processor is created just before the request
+        self._started_at = time.monotonic()
+        self._first_token_at: float | None = None
+        self._tool_seconds = 0.0
+        self._tool_call_count = 0
+        # Called with the partial text at most every CHAT_CHECKPOINT_INTERVAL_SECONDS
+        self.checkpoint_callback = checkpoint_callback
+        self._last_checkpoint_time = time.monotonic()
         self.current_response_id: str | None = None
         self.accumulated_text = ""
         self.reasoning_data: dict[str, Any] = {
@@ -4061,20 +5190,28 @@ class StreamEventProcessor:
         self.tool_calls: dict[str, dict[str, Any]] = {}
         # Track pending function outputs to submit
         self.pending_function_outputs: list[dict[str, Any]] = []
+        # Tool calls started in the current response, in call order
+        self._running_tool_calls: list[RunningToolCall] = []
 
     def process_stream(self, stream: Any) -> None:
         """Process the entire stream of ResponseStreamEvent objects with comprehensive error handling."""
         try:
             for event in stream:
                 self._handle_stream_event(event)
+            self._collect_tool_results()
             
             # After processing the stream, check if we have pending function outputs
             # If so, submit them and continue processing
             while self.pending_function_outputs and self.openai_client:
                 self._submit_function_outputs_and_continue()
                 
-        except ConnectionError as e:
-            logging.error(f"Connection error during stream processing: {e}")
+        except Exception as e:
+            self._report_stream_error(e)
+
+    def _report_stream_error(self, error: Exception) -> None:
+        """Log a stream processing failure and send the matching error event to the frontend."""
+        if isinstance(error, ConnectionError):
+            logging.error(f"Connection error during stream processing: {error}")
             self.event_queue.put(
                 json.dumps(
                     {
@@ -4085,8 +5222,8 @@ class StreamEventProcessor:
                     }
                 )
             )
-        except TimeoutError as e:
-            logging.error(f"Timeout error during stream processing: {e}")
+        elif isinstance(error, TimeoutError):
+            logging.error(f"Timeout error during stream processing: {error}")
             self.event_queue.put(
                 json.dumps(
                     {
@@ -4097,8 +5234,8 @@ class StreamEventProcessor:
                     }
                 )
             )
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON parsing error during stream processing: {e}")
+        elif isinstance(error, json.JSONDecodeError):
+            logging.error(f"JSON parsing error during stream processing: {error}")
             self.event_queue.put(
                 json.dumps(
                     {
@@ -4109,8 +5246,8 @@ class StreamEventProcessor:
                     }
                 )
             )
-        except Exception as e:
-            logging.error(f"Unexpected error processing stream: {e}", exc_info=True)
+        else:
+            logging.error(f"Unexpected error processing stream: {error}", exc_info=error)
             self.event_queue.put(
                 json.dumps(
                     {
@@ -4279,10 +5416,31 @@ class StreamEventProcessor:
         elif hasattr(event, "output_text") and hasattr(event.output_text, "delta"):
             delta_text = str(event.output_text.delta)
 
+        if self._first_token_at is None:
+            self._first_token_at = time.monotonic()
         self.accumulated_text += delta_text
 
         self.event_queue.put(json.dumps({"type": "text_delta", "delta": delta_text}))
 
+        if (
+            self.checkpoint_callback
+            and time.monotonic() - self._last_checkpoint_time
+            >= CHAT_CHECKPOINT_INTERVAL_SECONDS
+        ):
+            self._checkpoint_accumulated_text()
+
+    def _checkpoint_accumulated_text(self) -> None:
+        """Hand the partial response text to the checkpoint callback."""
+        self._last_checkpoint_time = time.monotonic()
+        self._run_checkpoint_callback(self.accumulated_text)
+
+    def _run_checkpoint_callback(self, text: str) -> None:
+        """Call the checkpoint callback without letting a failure interrupt the stream."""
+        try:
+            self.checkpoint_callback(text)  # type: ignore[misc]
+        except Exception as e:
+            logging.warning(f"Failed to checkpoint partial response text: {e}")
+
     def _handle_output_text_done(self, event: Any) -> None:
         """Handle response.output_text.done event - text output is complete."""
         final_text = self.accumulated_text
@@ -4355,12 +5513,55 @@ class StreamEventProcessor:
         elif hasattr(event, "id"):
             self.current_response_id = event.id
 
+        self._record_usage(getattr(getattr(event, "response", None), "usage", None))
+
         self.event_queue.put(
             json.dumps(
                 {"type": "response_done", "response_id": self.current_response_id}
             )
         )
 
+    def _record_usage(self, usage: Any) -> None:
+        """Add a completed response's token counts to the totals and log how much of the prompt was cached."""
+        if usage is None:
+            return
+        input_tokens = getattr(usage, "input_tokens", None) or 0
+        output_tokens = getattr(usage, "output_tokens", None) or 0
+        cached_tokens = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", None) or 0
+        reasoning_tokens = (
+            getattr(getattr(usage, "output_tokens_details", None), "reasoning_tokens", None) or 0
+        )
+        if not isinstance(input_tokens, int):
+            return
+        self.usage["input_tokens"] += input_tokens
+        self.usage["cached_tokens"] += cached_tokens
+        self.usage["output_tokens"] += output_tokens
+        self.usage["reasoning_tokens"] += reasoning_tokens
+        cached_percent = cached_tokens / input_tokens * 100 if input_tokens else 0.0
+        logging.info(
+            f"Response {self.current_response_id} usage: input_tokens={input_tokens}, "
+            f"cached_tokens={cached_tokens} ({cached_percent:.0f}%), output_tokens={output_tokens}, "
+            f"reasoning_tokens={reasoning_tokens}, prompt_cache_key={self.prompt_cache_key}"
+        )
+
+    def get_usage(self) -> ResponseUsage:
+        """Token counts and timings of the response so far, measured from when the processor was created."""
+        now = time.monotonic()
+        return ResponseUsage(
+            **self.usage,
+            time_to_first_token_ms=round((self._first_token_at - self._started_at) * 1000)
+            if self._first_token_at is not None
+            else None,
+            duration_ms=round((now - self._started_at) * 1000),
+            tool_ms=round(self._tool_seconds * 1000),
+            tool_calls=self._tool_call_count,
+        )
+
+    def _record_tool_time(self, seconds: float) -> None:
+        """Add a finished tool call's duration to the response's tool time."""
+        self._tool_seconds += seconds
+        self._tool_call_count += 1
+
     def get_response_id(self) -> str | None:
         """Get the response ID from the processed stream for conversation continuity."""
         return self.current_response_id
@@ -4945,98 +6146,235 @@ class StreamEventProcessor:
             # Continue processing - don't block chat functionality
     
     def _execute_tool_call(self, item_id: str) -> None:
-        """Execute a tool call and store result for submission back to API."""
+        """Start a ready tool call on the tool call executor, or run it inline without one."""
         try:
-            tool_call = self.tool_calls.get(item_id)
-            if not tool_call:
-                logging.error(f"Tool call {item_id} not found")
+            prepared = self._prepare_tool_call(item_id)
+            if prepared is None:
                 return
-            
-            tool_name = tool_call["name"]
-            call_id = tool_call.get("call_id")
-            arguments_str = tool_call["arguments"]
-            
-            logging.debug(f"Executing tool call: {tool_name} (call_id={call_id})")
-            
-            # Parse arguments JSON
-            try:
-                parameters = json.loads(arguments_str) if arguments_str else {}
-            except json.JSONDecodeError as e:
-                logging.error(f"Failed to parse tool arguments: {e}")
-                tool_call["status"] = "error"
-                tool_call["error"] = f"Invalid arguments: {str(e)}"
-                # Still need to submit error back to API
-                if call_id:
-                    self.pending_function_outputs.append({
-                        "type": "function_call_output",
-                        "call_id": call_id,
-                        "output": json.dumps({"error": f"Invalid arguments: {str(e)}"})
-                    })
+            tool_call, parameters = prepared
+
+            if self.tool_call_executor is None:
+                started_at = time.monotonic()
+                result = self._call_tool(tool_call, parameters)
+                self._record_tool_time(time.monotonic() - started_at)
+                self._record_tool_result(item_id, tool_call, parameters, result)
                 return
-            
-            # Execute tool if we have executor and conversation context
-            if self.tool_executor and self.username and self.conversation_id:
-                result = self.tool_executor.execute_tool_call(
-                    tool_name=tool_name,
-                    parameters=parameters,
-                    username=self.username,
-                    conversation_id=self.conversation_id
-                )
-                
-                # Update tool call with result
-                tool_call["status"] = "completed" if result.get("success") else "error"
-                tool_call["result"] = result
-                
-                # Get the tool instance for formatting
-                tool_instance = self.tool_executor.registry.get_tool(tool_name)
-                
-                # Store tool output in reasoning_data for display in modal
-                tool_output_record = {
-                    "tool_name": tool_name,
-                    "input": parameters,
-                    "output": result,
-                    "success": result.get("success", False),
-                    "timestamp": int(time.time()),
-                }
-                
-                # Add formatted display strings if tool provides them
-                if tool_instance:
-                    tool_output_record["input_display"] = tool_instance.format_input_for_display(parameters)
-                    tool_output_record["output_display"] = tool_instance.format_output_for_display(result)
-                
-                self.reasoning_data["tool_outputs"].append(tool_output_record)
-                
-                # Store function output for submission back to API
-                if call_id:
-                    self.pending_function_outputs.append({
-                        "type": "function_call_output",
-                        "call_id": call_id,
-                        "output": json.dumps(result)
-                    })
-                    logging.debug(f"Stored function output for call_id={call_id}")
-                
-                # Send tool execution status to frontend
-                self.event_queue.put(
-                    json.dumps({
-                        "type": "tool_call_completed",
-                        "item_id": item_id,
-                        "tool_name": tool_name,
-                        "success": result.get("success", False),
-                        "result": result
-                    })
-                )
-                
-                logging.debug(f"Tool call {item_id} completed: success={result.get('success')}")
-            else:
-                logging.warning(f"Cannot execute tool call {item_id}: missing executor or context")
-                tool_call["status"] = "error"
-                tool_call["error"] = "Tool executor not available"
+
+            # The stream keeps being processed while the call runs, so later calls
+            # in the same response start as soon as their arguments are complete
+            future = self.tool_call_executor.submit(self._call_tool, tool_call, parameters)
+            self._running_tool_calls.append(
+                RunningToolCall(item_id, tool_call, parameters, future)
+            )
                 
         except Exception as e:
-            logging.error(f"Error executing tool call {item_id}: {e}", exc_info=True)
-            if item_id in self.tool_calls:
-                self.tool_calls[item_id]["status"] = "error"
-                self.tool_calls[item_id]["error"] = str(e)
+            self._record_tool_failure(item_id, e)
+
+    def _call_tool(self, tool_call: dict[str, Any], parameters: dict[str, Any]) -> dict[str, Any]:
+        """Execute a tool call through the tool executor."""
+        return self.tool_executor.execute_tool_call(  # type: ignore[union-attr]
+            tool_name=tool_call["name"],
+            parameters=parameters,
+            username=self.username,  # type: ignore[arg-type]
+            conversation_id=self.conversation_id  # type: ignore[arg-type]
+        )
+
+    def _collect_tool_results(self) -> None:
+        """Wait for the running tool calls, reporting each as it finishes and storing results in call order."""
+        running, self._running_tool_calls = self._running_tool_calls, []
+        calls_by_future = {call.future: call for call in running}
+        results: dict[str, dict[str, Any] | None] = {}
+        pending = set(calls_by_future)
+
+        while pending:
+            done, pending = wait_for_futures(
+                pending,
+                timeout=self._seconds_until_tool_timeout(calls_by_future[f] for f in pending),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                call = calls_by_future[future]
+                results[call.item_id] = self._finish_tool_call(call, future.exception(), future)
+
+            for future in [f for f in pending if self._tool_call_timed_out(calls_by_future[f])]:
+                # The worker thread cannot be interrupted; its late result is discarded
+                future.cancel()
+                pending.discard(future)
+                call = calls_by_future[future]
+                results[call.item_id] = self._finish_tool_call(call, None, None)
+
+        self._store_tool_results(running, results)
+
+    def _seconds_until_tool_timeout(self, calls: Iterable[RunningToolCall]) -> float:
+        """Seconds until the first of the given tool calls times out."""
+        started_at = min(call.started_at for call in calls)
+        return max(0.0, started_at + self.tool_call_timeout - time.monotonic())
+
+    def _tool_call_timed_out(self, call: RunningToolCall) -> bool:
+        """Check if a tool call has run longer than the tool call timeout."""
+        return time.monotonic() - call.started_at >= self.tool_call_timeout
+
+    def _finish_tool_call(
+        self,
+        call: RunningToolCall,
+        error: BaseException | None,
+        future: "Future[dict[str, Any]] | asyncio.Future[dict[str, Any]] | None",
+    ) -> dict[str, Any] | None:
+        """Report a finished tool call to the frontend as soon as it completes.
+
+        Returns:
+            The tool result (a timeout error result when future is None), or None
+            if the call raised instead of returning a result.
+        """
+        self._record_tool_time(time.monotonic() - call.started_at)
+        if error is not None:
+            self._record_tool_failure(call.item_id, error)
+            return None
+        if future is None:
+            logging.warning(
+                f"Tool call {call.item_id} ({call.tool_call['name']}) timed out after {self.tool_call_timeout}s"
+            )
+            result: dict[str, Any] = {
+                "success": False,
+                "error": f"Tool call timed out after {self.tool_call_timeout:g} seconds",
+                "error_code": "timeout",
+                "tool_name": call.tool_call["name"],
+            }
+        else:
+            result = future.result()
+        self._report_tool_result(call.item_id, call.tool_call, result)
+        return result
+
+    def _store_tool_results(
+        self,
+        running: list[RunningToolCall],
+        results: dict[str, dict[str, Any] | None],
+    ) -> None:
+        """Store collected tool results for the modal and the API in the order the calls were made."""
+        for call in running:
+            result = results.get(call.item_id)
+            if result is not None:
+                self._store_tool_result(call.tool_call, call.parameters, result)
+
+    def _prepare_tool_call(self, item_id: str) -> tuple[dict[str, Any], dict[str, Any]] | None:
+        """Parse a ready tool call's arguments and check that it can be executed.
+
+        Returns:
+            (tool_call, parameters) tuple, or None if the call cannot run. Invalid
+            arguments are still reported back to the API as a function output.
+        """
+        tool_call = self.tool_calls.get(item_id)
+        if not tool_call:
+            logging.error(f"Tool call {item_id} not found")
+            return None
+        
+        tool_name = tool_call["name"]
+        call_id = tool_call.get("call_id")
+        arguments_str = tool_call["arguments"]
+        
+        logging.debug(f"Executing tool call: {tool_name} (call_id={call_id})")
+        
+        # Parse arguments JSON
+        try:
+            parameters = json.loads(arguments_str) if arguments_str else {}
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to parse tool arguments: {e}")
+            tool_call["status"] = "error"
+            tool_call["error"] = f"Invalid arguments: {str(e)}"
+            # Still need to submit error back to API
+            if call_id:
+                self.pending_function_outputs.append({
+                    "type": "function_call_output",
+                    "call_id": call_id,
+                    "output": json.dumps({"error": f"Invalid arguments: {str(e)}"})
+                })
+            return None
+        
+        # Execute tool if we have executor and conversation context
+        if not (self.tool_executor and self.username and self.conversation_id):
+            logging.warning(f"Cannot execute tool call {item_id}: missing executor or context")
+            tool_call["status"] = "error"
+            tool_call["error"] = "Tool executor not available"
+            return None
+
+        return tool_call, parameters
+
+    def _record_tool_result(
+        self,
+        item_id: str,
+        tool_call: dict[str, Any],
+        parameters: dict[str, Any],
+        result: dict[str, Any],
+    ) -> None:
+        """Store a tool result for the modal and the API, and notify the frontend."""
+        self._store_tool_result(tool_call, parameters, result)
+        self._report_tool_result(item_id, tool_call, result)
+
+    def _store_tool_result(
+        self,
+        tool_call: dict[str, Any],
+        parameters: dict[str, Any],
+        result: dict[str, Any],
+    ) -> None:
+        """Store a tool result in the reasoning data and queue its output for the API."""
+        tool_name = tool_call["name"]
+        call_id = tool_call.get("call_id")
+
+        # Get the tool instance for formatting
+        tool_instance = self.tool_executor.registry.get_tool(tool_name)  # type: ignore[union-attr]
+        
+        # Store tool output in reasoning_data for display in modal
+        tool_output_record = {
+            "tool_name": tool_name,
+            "input": parameters,
+            "output": result,
+            "success": result.get("success", False),
+            "timestamp": int(time.time()),
+        }
+        
+        # Add formatted display strings if tool provides them
+        if tool_instance:
+            tool_output_record["input_display"] = tool_instance.format_input_for_display(parameters)
+            tool_output_record["output_display"] = tool_instance.format_output_for_display(result)
+        
+        self.reasoning_data["tool_outputs"].append(tool_output_record)
+        
+        # Store function output for submission back to API
+        if call_id:
+            self.pending_function_outputs.append({
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": json.dumps(result)
+            })
+            logging.debug(f"Stored function output for call_id={call_id}")
+
+    def _report_tool_result(
+        self, item_id: str, tool_call: dict[str, Any], result: dict[str, Any]
+    ) -> None:
+        """Update the tool call's status and send its result to the frontend."""
+        # Update tool call with result
+        tool_call["status"] = "completed" if result.get("success") else "error"
+        tool_call["result"] = result
+
+        # Send tool execution status to frontend
+        self.event_queue.put(
+            json.dumps({
+                "type": "tool_call_completed",
+                "item_id": item_id,
+                "tool_name": tool_call["name"],
+                "success": result.get("success", False),
+                "result": result
+            })
+        )
+        
+        logging.debug(f"Tool call {item_id} completed: success={result.get('success')}")
+
+    def _record_tool_failure(self, item_id: str, error: BaseException) -> None:
+        """Mark a tool call as failed after an unexpected exception."""
+        logging.error(f"Error executing tool call {item_id}: {error}", exc_info=error)
+        if item_id in self.tool_calls:
+            self.tool_calls[item_id]["status"] = "error"
+            self.tool_calls[item_id]["error"] = str(error)
 
     def _submit_function_outputs_and_continue(self, max_retries: int = 2) -> None:
         """Submit pending function outputs to the API and continue processing the response."""
@@ -5055,29 +6393,15 @@ class StreamEventProcessor:
             try:
                 logging.debug(f"Submitting {len(function_outputs)} function output(s) to continue conversation (attempt {attempt + 1})")
                 
-                # Create a new response with the function outputs as input
-                params: dict[str, Any] = {
-                    "model": self.model,
-                    "input": function_outputs,
-                    "previous_response_id": self.current_response_id,
-                    "stream": True,
-                    "store": True,
-                }
-                
-                # Add tools if available
-                if self.tools:
-                    params["tools"] = self.tools
-                
-                # Add instructions if available
-                if self.instructions:
-                    params["instructions"] = self.instructions
-                
                 # Make the API call to continue the conversation
-                continuation_stream = self.openai_client.responses.create(**params)
+                continuation_stream = self.openai_client.responses.create(
+                    **self._build_continuation_params(function_outputs)
+                )
                 
                 # Process the continuation stream
                 for event in continuation_stream:
                     self._handle_stream_event(event)
+                self._collect_tool_results()
                     
                 logging.debug("Function output submission and continuation completed")
                 return  # Success, exit the retry loop
@@ -5110,6 +6434,32 @@ class StreamEventProcessor:
                 )
                 break  # Don't retry non-API errors
 
+    def _build_continuation_params(
+        self, function_outputs: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Build the request that continues the response with the given function outputs."""
+        # Create a new response with the function outputs as input
+        params: dict[str, Any] = {
+            "model": self.model,
+            "input": function_outputs,
+            "previous_response_id": self.current_response_id,
+            "stream": True,
+            "store": True,
+        }
+        
+        # Add tools if available
+        if self.tools:
+            params["tools"] = self.tools
+        
+        # Add instructions if available
+        if self.instructions:
+            params["instructions"] = self.instructions
+
+        if self.prompt_cache_key:
+            params["prompt_cache_key"] = self.prompt_cache_key
+
+        return params
+
     def get_reasoning_data(self) -> dict[str, Any] | None:
         """Get the reasoning data from the processed stream with comprehensive error handling."""
         try:
@@ -5147,6 +6497,158 @@ class StreamEventProcessor:
             return None
 
 
+class AsyncStreamEventProcessor(StreamEventProcessor):
+    """StreamEventProcessor for the asyncio chat engine.
+
+    Every event is handled by the same methods as the synchronous processor, so
+    the events sent to the frontend and the stored reasoning data are identical.
+    Only the I/O is different: the stream is consumed with ``async for``, tool
+    calls run as tasks through ToolExecutor.execute_tool_call_async(), function
+    outputs are submitted with the AsyncOpenAI client, and checkpoints are
+    written from a worker thread.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Checkpoint being written in a worker thread; one at a time, so they land in order
+        self._checkpoint_write: asyncio.Future[None] | None = None
+
+    async def process_stream_async(self, stream: Any) -> None:
+        """Process an async stream of ResponseStreamEvent objects with comprehensive error handling."""
+        try:
+            async for event in stream:
+                self._handle_stream_event(event)
+            await self._collect_tool_results_async()
+
+            # Submit function outputs and process the continuation, as process_stream does
+            while self.pending_function_outputs and self.openai_client:
+                await self._submit_function_outputs_and_continue_async()
+
+        except Exception as e:
+            self._report_stream_error(e)
+        finally:
+            # A checkpoint landing after the response is saved would be recovered as a duplicate
+            if self._checkpoint_write is not None:
+                await self._checkpoint_write
+
+    def _execute_tool_call(self, item_id: str) -> None:
+        """Start a ready tool call as a task so it runs while the stream is still being processed."""
+        try:
+            prepared = self._prepare_tool_call(item_id)
+            if prepared is None:
+                return
+            tool_call, parameters = prepared
+
+            task = asyncio.ensure_future(self._call_tool_async(tool_call, parameters))
+            self._running_tool_calls.append(
+                RunningToolCall(item_id, tool_call, parameters, task)
+            )
+
+        except Exception as e:
+            self._record_tool_failure(item_id, e)
+
+    async def _call_tool_async(
+        self, tool_call: dict[str, Any], parameters: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Execute a tool call without blocking the event loop."""
+        return await self.tool_executor.execute_tool_call_async(  # type: ignore[union-attr]
+            tool_name=tool_call["name"],
+            parameters=parameters,
+            username=self.username,  # type: ignore[arg-type]
+            conversation_id=self.conversation_id,  # type: ignore[arg-type]
+        )
+
+    async def _collect_tool_results_async(self) -> None:
+        """Async counterpart of _collect_tool_results."""
+        running, self._running_tool_calls = self._running_tool_calls, []
+        calls_by_task = {call.future: call for call in running}
+        results: dict[str, dict[str, Any] | None] = {}
+        pending = set(calls_by_task)
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,  # type: ignore[arg-type]
+                timeout=self._seconds_until_tool_timeout(calls_by_task[t] for t in pending),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                call = calls_by_task[task]
+                results[call.item_id] = self._finish_tool_call(call, task.exception(), task)
+
+            for task in [t for t in pending if self._tool_call_timed_out(calls_by_task[t])]:
+                task.cancel()
+                pending.discard(task)
+                call = calls_by_task[task]
+                results[call.item_id] = self._finish_tool_call(call, None, None)
+
+        self._store_tool_results(running, results)
+
+    def _checkpoint_accumulated_text(self) -> None:
+        """Write the checkpoint from a worker thread so file I/O never stalls the loop."""
+        if self._checkpoint_write is not None and not self._checkpoint_write.done():
+            # Retried on the next delta once the previous write is done
+            return
+        self._last_checkpoint_time = time.monotonic()
+        self._checkpoint_write = asyncio.get_running_loop().run_in_executor(
+            None, self._run_checkpoint_callback, self.accumulated_text
+        )
+
+    async def _submit_function_outputs_and_continue_async(self, max_retries: int = 2) -> None:
+        """Submit pending function outputs with the async client and process the continuation."""
+        if not self.pending_function_outputs or not self.openai_client:
+            return
+
+        if not self.current_response_id:
+            logging.error("Cannot submit function outputs: no current response ID")
+            return
+
+        # Collect all pending outputs before retry loop
+        function_outputs = self.pending_function_outputs.copy()
+        self.pending_function_outputs.clear()
+
+        for attempt in range(max_retries + 1):
+            try:
+                logging.debug(f"Submitting {len(function_outputs)} function output(s) to continue conversation (attempt {attempt + 1})")
+
+                continuation_stream = await self.openai_client.responses.create(
+                    **self._build_continuation_params(function_outputs)
+                )
+
+                async for event in continuation_stream:
+                    self._handle_stream_event(event)
+                await self._collect_tool_results_async()
+
+                logging.debug("Function output submission and continuation completed")
+                return  # Success, exit the retry loop
+
+            except openai.APIError as e:
+                # Transient API errors - retry if we have attempts left
+                if attempt < max_retries:
+                    wait_time = (attempt + 1) * 0.5  # 0.5s, 1s backoff
+                    logging.warning(f"OpenAI API error (attempt {attempt + 1}/{max_retries + 1}), retrying in {wait_time}s: {e}")
+                    await asyncio.sleep(wait_time)
+                    continue
+                else:
+                    logging.error(f"Error submitting function outputs after {max_retries + 1} attempts: {e}", exc_info=True)
+                    self.event_queue.put(
+                        json.dumps({
+                            "type": "error",
+                            "message": "OpenAI service temporarily unavailable. Please try again.",
+                            "error_code": "api_error"
+                        })
+                    )
+            except Exception as e:
+                logging.error(f"Error submitting function outputs: {e}", exc_info=True)
+                self.event_queue.put(
+                    json.dumps({
+                        "type": "error",
+                        "message": "Error processing tool results. Please try again.",
+                        "error_code": "tool_continuation_error"
+                    })
+                )
+                break  # Don't retry non-API errors
+
+
 # StreamingEventHandler removed - now using StreamEventProcessor for Responses API
 
 
@@ -5721,11 +7223,58 @@ def handle_agent_preset(preset_id: str):
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/tools/stats", methods=["GET"])
+def tool_stats():
+    """Return call counts and latency for each tool called since startup."""
+    if "username" not in session:
+        return create_authentication_error()
+
+    return jsonify({"tools": tool_executor.get_stats()})
+
+
+@app.route("/novelai/stats", methods=["GET"])
+def novelai_stats():
+    """Return request counts, connection pool use, queueing and tag suggestion caching of the shared NovelAI client."""
+    if "username" not in session:
+        return create_authentication_error()
+
+    return jsonify(
+        {
+            **novelai_client.get_pool_stats(),
+            "queue": novelai_scheduler.get_stats(),
+            "tag_suggestions": tag_suggestion_cache.get_stats(),
+            "vibe_encodings": vibe_storage_manager.get_encoding_cache_stats(),
+        }
+    )
+
+
+@app.route("/novelai/queue", methods=["GET"])
+def novelai_queue():
+    """Return where the user's NovelAI generations are in the queue, for showing while they wait."""
+    if "username" not in session:
+        return create_authentication_error()
+
+    return jsonify(novelai_scheduler.get_queue(session["username"]))
+
+
+@app.route("/usage", methods=["GET"])
+def chat_usage():
+    """Return the user's token and latency rollups, in total and per agent preset and reasoning level."""
+    if "username" not in session:
+        return create_authentication_error()
+
+    try:
+        return jsonify(usage_manager.get_rollups(session["username"]).summary())
+    except Exception as e:
+        logging.error(f"Error loading usage for {session['username']}: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+
 # NovelAI Tag Suggestion Endpoint
 
 @app.route("/novelai/suggest-tags", methods=["GET"])
 def novelai_suggest_tags():
-    """Proxy tag suggestions from NovelAI API."""
+    """Suggest tags from the local tag index, or from NovelAI through the suggestion cache."""
     if "username" not in session:
         return create_authentication_error()
 
@@ -5739,8 +7288,7 @@ def novelai_suggest_tags():
         return jsonify({"tags": []})
 
     try:
-        client = NovelAIClient(NOVELAI_API_KEY)
-        tags = client.suggest_tags(model=model, prompt=prompt)
+        tags = tag_suggestion_cache.suggest(model, prompt)
         return jsonify({"tags": tags})
     except (NovelAIAPIError, NovelAIClientError) as e:
         return create_internal_error(error=e, message=str(e))
@@ -5852,7 +7400,7 @@ def get_vibe(guid: str):
     username = session["username"]
     
     try:
-        collection = vibe_storage_manager.load_collection(username, guid)
+        collection = vibe_storage_manager.load_collection_metadata(username, guid)
         
         if not collection:
             return create_not_found_error(f"Vibe collection '{guid}' not found")
@@ -5930,7 +7478,7 @@ def get_vibe_preview(guid: str, enc_strength: str, ref_strength: str):
             )
         
         # Load the collection
-        collection = vibe_storage_manager.load_collection(username, guid)
+        collection = vibe_storage_manager.load_collection_metadata(username, guid)
         
         if not collection:
             return create_not_found_error(f"Vibe collection '{guid}' not found")
@@ -5976,7 +7524,7 @@ def get_vibe_progress(guid: str):
         # If no active progress, check if collection exists
         collection = None
         if not has_active_progress:
-            collection = vibe_storage_manager.load_collection(username, guid)
+            collection = vibe_storage_manager.load_collection_metadata(username, guid)
             if not collection:
                 return create_not_found_error(f"Vibe collection '{guid}' not found")
         
@@ -5993,7 +7541,7 @@ def get_vibe_progress(guid: str):
                 # If no progress tracking yet, wait a bit for background thread to start
                 if not current_progress:
                     # Check if collection exists and has previews (already complete)
-                    coll = collection or vibe_storage_manager.load_collection(username, guid)
+                    coll = collection or vibe_storage_manager.load_collection_metadata(username, guid)
                     if coll and coll.preview_images:
                         yield f"data: {json.dumps({'phase': 'complete', 'step': 30, 'total': 30, 'message': 'Vibe collection ready', 'complete': True})}\n\n"
                         break
@@ -0,0 +1,169 @@
+"""
+ASGI entry point for the app.
+
+Run with an ASGI server, e.g. ``uvicorn chat_asgi:application``. Chat stream
+reads (``GET /chat/stream/<conversation_id>``) are served directly on the
+server's event loop, which also runs the async chat engine, so an open chat
+stream does not hold a thread. Every other request is handed to the Flask app
+through asgiref's WSGI adapter.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from http.cookies import SimpleCookie
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app, chat_event_loop, chat_stream_registry
+from chat_stream import SSE_HEADERS, SSE_PROTOCOL, aiter_chat_stream
+from error_handlers import create_not_found_error, create_validation_error
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+CHAT_STREAM_PATH = re.compile(r"^/chat/stream/(?P<conversation_id>[^/]+)$")
+
+flask_application = WsgiToAsgi(app)
+
+
+def get_session_username(headers: dict[str, str]) -> str | None:
+    """Read the username from Flask's signed session cookie, or None if there is no valid session."""
+    cookie = SimpleCookie(headers.get("cookie", ""))
+    morsel = cookie.get(app.config["SESSION_COOKIE_NAME"])
+    serializer = app.session_interface.get_signing_serializer(app)  # type: ignore[attr-defined]
+    if morsel is None or serializer is None:
+        return None
+
+    try:
+        session_data = serializer.loads(
+            morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds())
+        )
+    except Exception:
+        return None
+    return session_data.get("username")
+
+
+async def send_json(send: Send, body: dict[str, Any], status: int) -> None:
+    """Send a complete JSON response."""
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+
+async def serve_chat_stream(
+    scope: Scope, receive: Receive, send: Send, conversation_id: str
+) -> None:
+    """Serve GET /chat/stream/<conversation_id> like the Flask route, without a thread per stream."""
+    headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in scope["headers"]
+    }
+    query = parse_qs(scope.get("query_string", b"").decode())
+
+    username = get_session_username(headers)
+    if username is None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 302,
+                "headers": [(b"location", b"/login")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    raw_last_event_id = headers.get("last-event-id") or query.get("last_event_id", ["0"])[0]
+    try:
+        last_event_id = int(raw_last_event_id)
+    except ValueError:
+        last_event_id = -1
+    if last_event_id < 0:
+        await send_json(
+            send,
+            *create_validation_error(
+                "last_event_id must be a non-negative integer", field="last_event_id"
+            ),
+        )
+        return
+
+    stream_buffer = chat_stream_registry.get(
+        username, conversation_id, query.get("stream_id", [None])[0]
+    )
+    if stream_buffer is None:
+        await send_json(send, *create_not_found_error("Chat stream", conversation_id))
+        return
+
+    response_headers = {
+        **SSE_HEADERS,
+        "Content-Type": "text/event-stream; charset=utf-8",
+        "X-Chat-Conversation-Id": conversation_id,
+        "X-Chat-Stream-Id": stream_buffer.stream_id,
+    }
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in response_headers.items()
+            ],
+        }
+    )
+
+    # Stop following the buffer as soon as the client goes away
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for frame in aiter_chat_stream(stream_buffer, SSE_PROTOCOL, last_event_id):
+            if disconnected.is_set():
+                break
+            await send(
+                {"type": "http.response.body", "body": frame.encode(), "more_body": True}
+            )
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+
+
+async def lifespan(receive: Receive, send: Send) -> None:
+    """Attach the chat engine to the server's event loop for the lifetime of the server."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            chat_event_loop.attach(asyncio.get_running_loop())
+            logging.info("Chat engine attached to the ASGI server event loop")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    """ASGI application: chat streams on the event loop, everything else through Flask."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    if scope["type"] == "http" and scope["method"] == "GET":
+        match = CHAT_STREAM_PATH.match(scope["path"])
+        if match:
+            await serve_chat_stream(scope, receive, send, match.group("conversation_id"))
+            return
+
+    await flask_application(scope, receive, send)
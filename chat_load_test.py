@@ -0,0 +1,193 @@
+"""
+Load test comparing the two chat engines' capacity for concurrent streams.
+
+Runs offline: the OpenAI stream is replaced by fake events with a fixed delay
+between them, so the numbers measure the engine, not the network. Each engine
+and concurrency level runs in its own process so peak RSS is not shared.
+
+    python chat_load_test.py                      # 100, 1000 and 5000 streams
+    python chat_load_test.py --streams 200 --events 10 --interval 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+ENGINES = ("thread", "async")
+
+
+def fake_events(count: int) -> list[SimpleNamespace]:
+    """Responses API events for a plain text answer of `count` deltas."""
+    events = [SimpleNamespace(type="response.created", response=SimpleNamespace(id="resp_load"))]
+    events += [
+        SimpleNamespace(type="response.output_text.delta", delta=f"token {i} ")
+        for i in range(count)
+    ]
+    return events
+
+
+def fake_stream(count: int, interval: float):
+    """Yield events with a blocking delay, like the sync OpenAI stream."""
+    for event in fake_events(count):
+        time.sleep(interval)
+        yield event
+
+
+async def fake_async_stream(count: int, interval: float):
+    """Yield events with a non-blocking delay, like the AsyncOpenAI stream."""
+    for event in fake_events(count):
+        await asyncio.sleep(interval)
+        yield event
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_thread_engine(streams: int, events: int, interval: float) -> dict:
+    """One producer thread and one reader thread per stream, as the WSGI path does."""
+    from app import StreamEventProcessor
+    from chat_stream import END_OF_STREAM, SSE_PROTOCOL, ChatStreamBuffer, iter_chat_stream
+
+    peak_threads = threading.active_count()
+    failed = 0
+    frames = 0
+    frames_lock = threading.Lock()
+
+    def produce(buffer: ChatStreamBuffer) -> None:
+        StreamEventProcessor(buffer).process_stream(fake_stream(events, interval))  # type: ignore[arg-type]
+        buffer.put(END_OF_STREAM)
+
+    def read(buffer: ChatStreamBuffer) -> None:
+        nonlocal frames
+        count = sum(1 for _ in iter_chat_stream(buffer, SSE_PROTOCOL))
+        with frames_lock:
+            frames += count
+
+    start = time.perf_counter()
+    threads = []
+    for i in range(streams):
+        buffer = ChatStreamBuffer(f"stream_{i}")
+        for target in (produce, read):
+            thread = threading.Thread(target=target, args=(buffer,), daemon=True)
+            try:
+                thread.start()
+            except RuntimeError:
+                failed += 1
+                continue
+            threads.append(thread)
+        peak_threads = max(peak_threads, threading.active_count())
+
+    for thread in threads:
+        thread.join()
+    return {
+        "wall_seconds": time.perf_counter() - start,
+        "peak_threads": peak_threads,
+        "failed_threads": failed,
+        "frames": frames,
+    }
+
+
+def run_async_engine(streams: int, events: int, interval: float) -> dict:
+    """All producers and readers as tasks on one event loop, as the ASGI path does."""
+    from app import AsyncStreamEventProcessor
+    from chat_stream import END_OF_STREAM, SSE_PROTOCOL, ChatStreamBuffer, aiter_chat_stream
+
+    peak_threads = threading.active_count()
+
+    async def produce(buffer: ChatStreamBuffer) -> None:
+        processor = AsyncStreamEventProcessor(buffer)  # type: ignore[arg-type]
+        await processor.process_stream_async(fake_async_stream(events, interval))
+        buffer.put(END_OF_STREAM)
+
+    async def read(buffer: ChatStreamBuffer) -> int:
+        return len([frame async for frame in aiter_chat_stream(buffer, SSE_PROTOCOL)])
+
+    async def run_all() -> int:
+        nonlocal peak_threads
+        tasks = []
+        for i in range(streams):
+            buffer = ChatStreamBuffer(f"stream_{i}")
+            tasks.append(asyncio.create_task(read(buffer)))
+            tasks.append(asyncio.create_task(produce(buffer)))
+
+        # Sample the thread count while the streams are running
+        while not all(task.done() for task in tasks):
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(interval)
+        return sum(count for count in await asyncio.gather(*tasks) if count)
+
+    start = time.perf_counter()
+    frames = asyncio.run(run_all())
+    return {
+        "wall_seconds": time.perf_counter() - start,
+        "peak_threads": peak_threads,
+        "failed_threads": 0,
+        "frames": frames,
+    }
+
+
+def run_single(engine: str, streams: int, events: int, interval: float) -> dict:
+    """Run one engine at one concurrency level in this process."""
+    runner = run_thread_engine if engine == "thread" else run_async_engine
+    result = runner(streams, events, interval)
+    result.update(engine=engine, streams=streams, peak_rss_mb=peak_rss_mb())
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--events", type=int, default=20, help="text deltas per stream")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between events")
+    parser.add_argument("--engine", choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # The app builds its OpenAI clients at import time; they are never called here
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+
+    if args.engine:
+        # Child process: run one configuration and report it as JSON
+        print(json.dumps(run_single(args.engine, args.streams[0], args.events, args.interval)))
+        return
+
+    print(f"{'engine':<8}{'streams':>9}{'wall s':>9}{'threads':>9}{'failed':>8}{'RSS MB':>9}{'frames':>10}")
+    for streams in args.streams:
+        for engine in ENGINES:
+            output = subprocess.run(
+                [
+                    sys.executable, __file__,
+                    "--engine", engine,
+                    "--streams", str(streams),
+                    "--events", str(args.events),
+                    "--interval", str(args.interval),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if output.returncode != 0:
+                print(f"{engine:<8}{streams:>9}  failed: {output.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            rss = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+            print(
+                f"{engine:<8}{streams:>9}{result['wall_seconds']:>9.2f}{result['peak_threads']:>9}"
+                f"{result['failed_threads']:>8}{rss:>9}{result['frames']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
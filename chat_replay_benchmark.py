@@ -0,0 +1,341 @@
+"""
+Replay benchmark for the chat pipeline's own overhead.
+
+Recorded Responses API event streams are replayed at full speed through
+StreamEventProcessor and the /chat frame generator. A fake OpenAI client
+serves the recorded continuation streams and recorded tool results stand in
+for the tools, so the numbers exclude OpenAI and tool latency and the replay
+runs offline. Fixtures live in tests/fixtures/chat_streams; the test suite
+replays each one to check its frame count.
+
+    python chat_replay_benchmark.py                            # every fixture
+    python chat_replay_benchmark.py text reasoning --iterations 500
+    python chat_replay_benchmark.py --save bench.json          # keep a baseline
+    python chat_replay_benchmark.py --baseline bench.json      # exit 1 on regressions
+    python chat_replay_benchmark.py --record web_search --prompt "Latest Python release?"
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "chat_streams")
+
+# Replays are short, allow a slower run before calling it a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def to_namespace(value: Any) -> Any:
+    """Turn a recorded event dict into attribute access, like the SDK's event models."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(item) for item in value]
+    return value
+
+
+def list_fixtures() -> list[str]:
+    """Names of the recorded streams, without the .json extension."""
+    return sorted(name[:-5] for name in os.listdir(FIXTURE_DIR) if name.endswith(".json"))
+
+
+def load_fixture(name: str) -> dict[str, Any]:
+    """Load a recorded stream by name."""
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+class ReplayResponses:
+    """Fake responses API that returns the recorded continuation streams in order."""
+
+    def __init__(self, streams: list[list[Any]]):
+        self._streams = iter(streams)
+        self.calls: list[dict[str, Any]] = []
+
+    def create(self, **params):
+        self.calls.append(params)
+        return iter(next(self._streams))
+
+
+class ReplayToolExecutor:
+    """Stands in for ToolExecutor, answering each call with its recorded result."""
+
+    def __init__(self, tool_results: list[dict[str, Any]], registry: Any):
+        # The processor formats results for display with the registered tools
+        self.registry = registry
+        self._results = {
+            (record["tool"], json.dumps(record["parameters"], sort_keys=True)): record["result"]
+            for record in tool_results
+        }
+
+    def execute_tool_call(self, tool_name: str, parameters: dict[str, Any], username: str, conversation_id: str):
+        return self._results[(tool_name, json.dumps(parameters, sort_keys=True))]
+
+
+class RecordingResponses:
+    """Wraps the real responses API and keeps every streamed event."""
+
+    def __init__(self, responses: Any):
+        self._responses = responses
+        self.streams: list[list[dict[str, Any]]] = []
+
+    def create(self, **params):
+        return self.record(self._responses.create(**params))
+
+    def record(self, stream: Any):
+        events: list[dict[str, Any]] = []
+        self.streams.append(events)
+        for event in stream:
+            events.append(event.model_dump(mode="json"))
+            yield event
+
+
+class RecordingToolExecutor:
+    """Wraps the real ToolExecutor and keeps every call's result."""
+
+    def __init__(self, tool_executor: Any):
+        self._tool_executor = tool_executor
+        self.registry = tool_executor.registry
+        self.results: list[dict[str, Any]] = []
+
+    def execute_tool_call(self, tool_name: str, parameters: dict[str, Any], username: str, conversation_id: str):
+        result = self._tool_executor.execute_tool_call(tool_name, parameters, username, conversation_id)
+        self.results.append({"tool": tool_name, "parameters": parameters, "result": result})
+        return result
+
+
+def prepare_streams(fixture: dict[str, Any]) -> list[list[Any]]:
+    """Convert the recorded events once, so the timed replay only measures the pipeline."""
+    return [[to_namespace(event) for event in stream] for stream in fixture["streams"]]
+
+
+def replay(fixture: dict[str, Any], streams: list[list[Any]] | None = None) -> dict[str, Any]:
+    """
+    Replay a recorded stream through the processor and the SSE frame generator once.
+
+    Returns:
+        Dictionary with the event and frame counts, frame bytes, final text and
+        the wall and CPU seconds of each stage
+    """
+    from app import StreamEventProcessor, tool_registry
+    from chat_stream import END_OF_STREAM, SSE_PROTOCOL, ChatStreamBuffer, iter_chat_stream
+
+    streams = streams if streams is not None else prepare_streams(fixture)
+    first, continuations = streams[0], streams[1:]
+    # Big enough that the frame stage sees every event of the finished stream
+    buffer = ChatStreamBuffer("replay", max_events=1 << 20)
+    processor = StreamEventProcessor(
+        buffer,  # type: ignore[arg-type]
+        tool_executor=ReplayToolExecutor(fixture.get("tool_results", []), tool_registry),  # type: ignore[arg-type]
+        username="benchmark",
+        conversation_id="replay",
+        openai_client=SimpleNamespace(responses=ReplayResponses(continuations)),
+        model=fixture.get("model"),
+    )
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    processor.process_stream(iter(first))
+    buffer.put(END_OF_STREAM)
+    process_wall, process_cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    frames = 0
+    frame_bytes = 0
+    for frame in iter_chat_stream(buffer, SSE_PROTOCOL):
+        frames += 1
+        frame_bytes += len(frame.encode("utf-8"))
+    frame_wall, frame_cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    return {
+        "events": sum(len(stream) for stream in streams),
+        "frames": frames,
+        "frame_bytes": frame_bytes,
+        "text": processor.accumulated_text,
+        "process_wall": process_wall,
+        "process_cpu": process_cpu,
+        "frame_wall": frame_wall,
+        "frame_cpu": frame_cpu,
+    }
+
+
+def measure_peak_allocation(fixture: dict[str, Any], streams: list[list[Any]]) -> int:
+    """Peak bytes allocated by one replay, traced separately so tracing does not skew the timings."""
+    tracemalloc.start()
+    try:
+        replay(fixture, streams)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(name: str, iterations: int = 100) -> dict[str, Any]:
+    """Replay a fixture `iterations` times and summarize throughput, CPU and allocations."""
+    fixture = load_fixture(name)
+    streams = prepare_streams(fixture)
+    replay(fixture, streams)  # warm up imports and caches
+
+    totals = {"process_wall": 0.0, "process_cpu": 0.0, "frame_wall": 0.0, "frame_cpu": 0.0}
+    result: dict[str, Any] = {}
+    for _ in range(iterations):
+        result = replay(fixture, streams)
+        for key in totals:
+            totals[key] += result[key]
+
+    events = result["events"] * iterations
+    frames = result["frames"] * iterations
+    peak = measure_peak_allocation(fixture, streams)
+    return {
+        "fixture": name,
+        "iterations": iterations,
+        "events": result["events"],
+        "frames": result["frames"],
+        "frame_bytes": result["frame_bytes"],
+        "events_per_sec": events / totals["process_wall"] if totals["process_wall"] else 0.0,
+        "cpu_us_per_event": totals["process_cpu"] / events * 1e6,
+        "cpu_us_per_frame": totals["frame_cpu"] / frames * 1e6 if frames else 0.0,
+        "peak_alloc_bytes_per_event": peak / result["events"],
+    }
+
+
+def compare_to_baseline(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """
+    Compare results with a saved run.
+
+    Returns:
+        A message for each fixture whose frame count changed or whose CPU per
+        event or frame grew by more than `tolerance`
+    """
+    previous = {result["fixture"]: result for result in baseline}
+    problems = []
+    for result in results:
+        before = previous.get(result["fixture"])
+        if before is None:
+            continue
+        if result["frames"] != before["frames"]:
+            problems.append(f"{result['fixture']}: {result['frames']} frames, baseline had {before['frames']}")
+        for key in ("cpu_us_per_event", "cpu_us_per_frame"):
+            if before[key] and result[key] > before[key] * (1 + tolerance):
+                problems.append(
+                    f"{result['fixture']}: {key} {result[key]:.1f}, baseline {before[key]:.1f} "
+                    f"(+{(result[key] / before[key] - 1) * 100:.0f}%)"
+                )
+    return problems
+
+
+def record(name: str, prompt: str, model: str | None, reasoning_level: str | None, enabled_tools: list[str]) -> None:
+    """Record a real Responses API exchange, including tool continuations, as a fixture."""
+    from app import StreamEventProcessor, responses_client, tool_executor
+    from chat_stream import ChatStreamBuffer
+
+    recorder = RecordingResponses(responses_client.client.responses)
+    tools = RecordingToolExecutor(tool_executor)
+    instructions = responses_client.build_instructions(None, model)
+    stream = responses_client.create_response(
+        input_text=prompt,
+        stream=True,
+        model=model,
+        reasoning_level=reasoning_level,
+        instructions=instructions,
+        enabled_tools=enabled_tools,
+    )
+    if isinstance(stream, dict) and "error" in stream:
+        raise SystemExit(f"Request failed: {stream.get('message')}")
+
+    processor = StreamEventProcessor(
+        ChatStreamBuffer("record"),  # type: ignore[arg-type]
+        tool_executor=tools,  # type: ignore[arg-type]
+        username="benchmark",
+        conversation_id="record",
+        openai_client=SimpleNamespace(responses=recorder),
+        model=model,
+        tools=responses_client._build_tools_array(enabled_tools),
+        instructions=instructions,
+    )
+    processor.process_stream(recorder.record(stream))
+
+    fixture: dict[str, Any] = {
+        "description": prompt,
+        "model": model,
+        "streams": recorder.streams,
+        "tool_results": tools.results,
+    }
+    result = replay(fixture)
+    fixture["expected"] = {"frames": result["frames"], "text": result["text"]}
+
+    path = os.path.join(FIXTURE_DIR, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(fixture, file, indent=1, ensure_ascii=False)
+        file.write("\n")
+    print(f"Recorded {result['events']} events in {len(recorder.streams)} streams to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="*", help="fixtures to replay (default: all)")
+    parser.add_argument("--iterations", type=int, default=100, help="replays per fixture")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--save", metavar="PATH", help="write the results to PATH as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="exit 1 if slower than the results in PATH")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--record", metavar="NAME", help="record a new fixture from the real API instead")
+    parser.add_argument("--prompt", help="prompt to send when recording")
+    parser.add_argument("--model", help="model to record with")
+    parser.add_argument("--reasoning-level", choices=("high", "medium", "low", "none"))
+    parser.add_argument("--tools", nargs="*", default=["web_search"], help="tools to enable when recording")
+    parser.add_argument("--log-level", default="WARNING", help="app log level during the replays")
+    args = parser.parse_args()
+
+    if not args.record:
+        # The app builds its OpenAI clients at import time; replays never call them
+        os.environ.setdefault("OPENAI_API_KEY", "replay-benchmark")
+
+    # Importing the app configures logging, so the level is set afterwards
+    import app  # noqa: F401
+
+    logging.getLogger().setLevel(args.log_level)
+
+    if args.record:
+        if not args.prompt:
+            parser.error("--record needs a --prompt")
+        record(args.record, args.prompt, args.model, args.reasoning_level, args.tools)
+        return
+
+    results = [run_benchmark(name, args.iterations) for name in args.fixtures or list_fixtures()]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            f"{'fixture':<16}{'events':>8}{'frames':>8}{'events/s':>12}"
+            f"{'CPU us/event':>14}{'CPU us/frame':>14}{'peak B/event':>14}"
+        )
+        for result in results:
+            print(
+                f"{result['fixture']:<16}{result['events']:>8}{result['frames']:>8}"
+                f"{result['events_per_sec']:>12.0f}{result['cpu_us_per_event']:>14.1f}"
+                f"{result['cpu_us_per_frame']:>14.1f}{result['peak_alloc_bytes_per_event']:>14.0f}"
+            )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            problems = compare_to_baseline(results, json.load(file), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
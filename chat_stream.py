@@ -0,0 +1,394 @@
+"""
+Wire protocol for the streaming /chat endpoint.
+
+The chat worker thread puts JSON-encoded event payloads (one JSON object per
+event, each carrying its own "type" field) into a stream buffer. This module
+turns those payloads into response frames. Two formats are supported:
+
+- ``sse`` (protocol version 1): Server-Sent Events served as text/event-stream.
+  Each payload is written once, unmodified, as the ``data`` line of a frame with
+  a monotonically increasing ``id`` that clients can use to resume. Idle periods
+  produce ``heartbeat`` frames and the stream finishes with an ``end`` frame.
+- ``legacy``: the original text/plain format where every payload is terminated
+  by ``EOS_STR``. Kept behind the ``stream_protocol`` flag while clients migrate.
+
+The ChatStreamBuffer of each in-flight response keeps a bounded window of recent
+events, so a client that lost its connection can reattach with the last event
+id it saw and have the missed frames replayed before the live stream continues.
+
+Buffers can be read from plain threads (iter_chat_stream, used by the Flask
+routes) and from coroutines (aiter_chat_stream, used by the ASGI entry point).
+ChatEventLoop is the single event loop that runs the async chat engine.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Any, AsyncIterator, Coroutine, Iterator, TypeVar
+
+T = TypeVar("T")
+
+CHAT_STREAM_PROTOCOL_VERSION = 1
+
+SSE_PROTOCOL = "sse"
+LEGACY_PROTOCOL = "legacy"
+STREAM_PROTOCOLS = {SSE_PROTOCOL, LEGACY_PROTOCOL}
+
+# Frame terminator used by the legacy text/plain protocol
+EOS_STR = "␆␄"
+
+# Seconds without an event before a heartbeat frame is sent on SSE streams
+HEARTBEAT_INTERVAL_SECONDS = 15.0
+
+# Sentinel the worker puts into the buffer once it has nothing more to send
+END_OF_STREAM = None
+
+# Maximum number of events kept per response for replay after a reconnect
+REPLAY_BUFFER_SIZE = 4096
+
+# Seconds a finished stream stays available for reconnecting clients
+FINISHED_STREAM_RETENTION_SECONDS = 120.0
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Ask nginx-style proxies not to buffer the stream
+    "X-Chat-Stream-Protocol": f"{SSE_PROTOCOL}/{CHAT_STREAM_PROTOCOL_VERSION}",
+}
+
+
+def format_sse_frame(data: str, event_id: int | None = None, event: str | None = None) -> str:
+    """
+    Build a single Server-Sent Events frame.
+
+    Args:
+        data: JSON payload for the frame; must not contain raw newlines (json.dumps output never does)
+        event_id: Optional id clients echo back as Last-Event-ID when resuming
+        event: Optional SSE event name for transport-level frames
+
+    Returns:
+        The encoded frame, terminated by a blank line
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+def format_legacy_frame(data: str) -> str:
+    """Build a frame in the legacy text/plain protocol."""
+    return data + EOS_STR
+
+
+def heartbeat_frame() -> str:
+    """Build the SSE frame sent when the stream has been idle for a heartbeat interval."""
+    return format_sse_frame(json.dumps({"type": "heartbeat"}), event="heartbeat")
+
+
+def end_frame() -> str:
+    """Build the SSE frame that tells the client no further events will follow."""
+    return format_sse_frame(json.dumps({"type": "stream_end"}), event="end")
+
+
+def gap_frame(missed_from: int, resumed_at: int) -> str:
+    """Build the SSE frame sent when events older than the replay window were requested."""
+    return format_sse_frame(
+        json.dumps({"type": "replay_gap", "missed_from": missed_from, "resumed_at": resumed_at}),
+        event="gap",
+    )
+
+
+class ChatStreamBuffer:
+    """
+    Bounded replay buffer for the events of one in-flight chat response.
+
+    The chat worker uses it in place of a Queue: put() assigns each payload the
+    next event id and wakes any readers. Readers never consume events, so any
+    number of connections can follow the same response from any event id still
+    inside the window.
+    """
+
+    def __init__(self, stream_id: str, max_events: int = REPLAY_BUFFER_SIZE):
+        self.stream_id = stream_id
+        self.finished = False
+        self.finished_at: float | None = None
+        self._events: deque[tuple[int, str]] = deque(maxlen=max_events)
+        self._next_id = 1
+        self._condition = threading.Condition()
+        # Coroutines waiting for new events, woken through their own event loop
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def last_event_id(self) -> int:
+        """Id of the most recent event, or 0 if nothing has been sent yet."""
+        return self._next_id - 1
+
+    def put(self, payload: str | None) -> None:
+        """Append a JSON-encoded payload, or mark the stream finished on END_OF_STREAM."""
+        with self._condition:
+            if payload is END_OF_STREAM:
+                self.finished = True
+                self.finished_at = time.time()
+            else:
+                self._events.append((self._next_id, payload))
+                self._next_id += 1
+            self._condition.notify_all()
+
+            for loop, wakeup in self._async_waiters:
+                loop.call_soon_threadsafe(wakeup.set)
+            self._async_waiters.clear()
+
+    def read_after(
+        self, last_event_id: int, timeout: float | None = None
+    ) -> tuple[list[tuple[int, str]], int, bool]:
+        """
+        Return the buffered events that follow last_event_id, waiting up to timeout for new ones.
+
+        Args:
+            last_event_id: Id of the last event the reader has already seen
+            timeout: Seconds to wait when nothing newer is available; None waits indefinitely
+
+        Returns:
+            Tuple of (events as (id, payload) pairs, id of the oldest buffered event,
+            whether the stream has finished). When the stream has finished the
+            returned events are everything that will ever follow last_event_id.
+        """
+        with self._condition:
+            if last_event_id >= self.last_event_id and not self.finished:
+                self._condition.wait(timeout)
+            return self._snapshot_after(last_event_id)
+
+    async def read_after_async(
+        self, last_event_id: int, timeout: float | None = None
+    ) -> tuple[list[tuple[int, str]], int, bool]:
+        """Coroutine version of read_after() that waits without blocking the event loop."""
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        with self._condition:
+            if last_event_id < self.last_event_id or self.finished:
+                return self._snapshot_after(last_event_id)
+            self._async_waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        with self._condition:
+            if waiter in self._async_waiters:
+                self._async_waiters.remove(waiter)
+            return self._snapshot_after(last_event_id)
+
+    def _snapshot_after(self, last_event_id: int) -> tuple[list[tuple[int, str]], int, bool]:
+        """Collect the events after last_event_id. Caller must hold the condition lock."""
+        first_id = self._events[0][0] if self._events else self._next_id
+        # Event ids are contiguous, so the start offset can be computed directly
+        start = max(last_event_id + 1 - first_id, 0)
+        events = list(islice(self._events, start, None))
+        return events, first_id, self.finished
+
+
+class ChatStreamRegistry:
+    """
+    Replay buffers of in-flight and recently finished chat responses.
+
+    Buffers are keyed by (username, conversation_id); starting a new response in a
+    conversation replaces the previous buffer. Finished buffers are dropped once
+    they are older than the retention window.
+    """
+
+    def __init__(
+        self,
+        max_events: int = REPLAY_BUFFER_SIZE,
+        retention_seconds: float = FINISHED_STREAM_RETENTION_SECONDS,
+    ):
+        self.max_events = max_events
+        self.retention_seconds = retention_seconds
+        self._streams: dict[tuple[str, str], ChatStreamBuffer] = {}
+        self._lock = threading.Lock()
+
+    def create(self, username: str, conversation_id: str) -> ChatStreamBuffer:
+        """Create and register the buffer for a new response in a conversation."""
+        buffer = ChatStreamBuffer(str(uuid.uuid4()), self.max_events)
+        with self._lock:
+            self._prune_finished()
+            self._streams[(username, conversation_id)] = buffer
+        return buffer
+
+    def get(
+        self, username: str, conversation_id: str, stream_id: str | None = None
+    ) -> ChatStreamBuffer | None:
+        """
+        Look up the buffer of a conversation's current response.
+
+        Args:
+            username: Owner of the conversation
+            conversation_id: Conversation the response belongs to
+            stream_id: If given, only return the buffer when it belongs to this response
+
+        Returns:
+            The buffer, or None if there is no (matching) response within the retention window
+        """
+        with self._lock:
+            self._prune_finished()
+            buffer = self._streams.get((username, conversation_id))
+        if buffer is None or (stream_id is not None and buffer.stream_id != stream_id):
+            return None
+        return buffer
+
+    def is_active(self, username: str, conversation_id: str) -> bool:
+        """Check whether a response is still being streamed for a conversation."""
+        buffer = self.get(username, conversation_id)
+        return buffer is not None and not buffer.finished
+
+    def _prune_finished(self) -> None:
+        """Drop finished buffers older than the retention window. Caller must hold the lock."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            key
+            for key, buffer in self._streams.items()
+            if buffer.finished_at is not None and buffer.finished_at < cutoff
+        ]
+        for key in expired:
+            del self._streams[key]
+
+
+def _render_frames(
+    events: list[tuple[int, str]],
+    first_id: int,
+    finished: bool,
+    cursor: int,
+    protocol: str,
+) -> tuple[list[str], int]:
+    """
+    Encode one read from a stream buffer as response frames.
+
+    Returns:
+        Tuple of (frames, id of the last event included)
+    """
+    frames = []
+    if cursor + 1 < first_id and events and protocol == SSE_PROTOCOL:
+        # The client asked for events that already fell out of the replay window
+        frames.append(gap_frame(cursor + 1, first_id))
+
+    for event_id, payload in events:
+        cursor = event_id
+        if protocol == SSE_PROTOCOL:
+            frames.append(format_sse_frame(payload, event_id=event_id))
+        else:
+            frames.append(format_legacy_frame(payload))
+
+    if protocol == SSE_PROTOCOL:
+        if finished:
+            frames.append(end_frame())
+        elif not events:
+            frames.append(heartbeat_frame())
+    return frames, cursor
+
+
+def iter_chat_stream(
+    buffer: ChatStreamBuffer,
+    protocol: str = SSE_PROTOCOL,
+    last_event_id: int = 0,
+    heartbeat_interval: float = HEARTBEAT_INTERVAL_SECONDS,
+) -> Iterator[str]:
+    """
+    Follow a chat stream buffer as response frames until the stream finishes.
+
+    Args:
+        buffer: Replay buffer the chat worker writes its JSON-encoded payloads to
+        protocol: SSE_PROTOCOL or LEGACY_PROTOCOL
+        last_event_id: Id of the last event the client has already received; 0 replays from the start
+        heartbeat_interval: Seconds of inactivity before an SSE heartbeat is sent
+
+    Yields:
+        Encoded frames ready to be written to the response body
+    """
+    if protocol not in STREAM_PROTOCOLS:
+        raise ValueError(f"Unknown chat stream protocol: {protocol}")
+
+    cursor = last_event_id
+    while True:
+        events, first_id, finished = buffer.read_after(
+            cursor, heartbeat_interval if protocol == SSE_PROTOCOL else None
+        )
+        frames, cursor = _render_frames(events, first_id, finished, cursor, protocol)
+        yield from frames
+        if finished:
+            return
+
+
+async def aiter_chat_stream(
+    buffer: ChatStreamBuffer,
+    protocol: str = SSE_PROTOCOL,
+    last_event_id: int = 0,
+    heartbeat_interval: float = HEARTBEAT_INTERVAL_SECONDS,
+) -> AsyncIterator[str]:
+    """Async version of iter_chat_stream() for serving streams from an event loop."""
+    if protocol not in STREAM_PROTOCOLS:
+        raise ValueError(f"Unknown chat stream protocol: {protocol}")
+
+    cursor = last_event_id
+    while True:
+        events, first_id, finished = await buffer.read_after_async(
+            cursor, heartbeat_interval if protocol == SSE_PROTOCOL else None
+        )
+        frames, cursor = _render_frames(events, first_id, finished, cursor, protocol)
+        for frame in frames:
+            yield frame
+        if finished:
+            return
+
+
+class ChatEventLoop:
+    """
+    The single asyncio event loop that runs every async chat response.
+
+    By default the loop is started on a daemon thread the first time it is
+    needed, which lets Flask request threads hand work to it. When the app is
+    served by an ASGI server the server's own loop is attached instead, so chat
+    streams and HTTP connections share one loop.
+    """
+
+    def __init__(self, name: str = "chat-event-loop"):
+        self.name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The loop chat work runs on, started on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = self._start_background_loop()
+            return self._loop
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Run chat work on an already running loop, e.g. the ASGI server's."""
+        with self._lock:
+            self._loop = loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """Schedule a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _start_background_loop(self) -> asyncio.AbstractEventLoop:
+        """Create a new loop and run it forever on a daemon thread."""
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        threading.Thread(target=run, name=self.name, daemon=True).start()
+        ready.wait()
+        return loop
@@ -35,6 +35,10 @@ class Quality(str, Enum):
     LOW = "low"
 
 
+# Most images one NovelAI request may generate
+NOVELAI_MAX_SAMPLES = 4
+
+
 class NovelAIModel(str, Enum):
     """NovelAI model options."""
 
@@ -82,6 +86,7 @@ class ImageGenerationRequest:
     noise: float = 0.2
     grid_dynamic_prompt: GridDynamicPromptInfo | None = None
     vibe_params: list[dict[str, Any]] | None = None  # List of {guid, encoding_strength, reference_strength}
+    n_samples: int = 1  # Images generated by one request, on consecutive seeds (NovelAI only)
 
     def __post_init__(self):
         """Validate prompt and dimensions after object initialization."""
@@ -94,6 +99,10 @@ class ImageGenerationRequest:
             raise ValueError("Strength must be between 0.0 and 1.0")
         if not 0.0 <= self.noise <= 1.0:
             raise ValueError("Noise must be between 0.0 and 1.0")
+        if not 1 <= self.n_samples <= NOVELAI_MAX_SAMPLES:
+            raise ValueError(f"Number of samples must be between 1 and {NOVELAI_MAX_SAMPLES}")
+        if self.n_samples > 1 and self.provider != Provider.NOVELAI:
+            raise ValueError(f"Provider {self.provider.value} generates one sample at a time")
 
         # Validate dimensions for specific providers
         if self.provider == Provider.OPENAI:
@@ -176,6 +185,9 @@ class ImageOperationResponse:
     operation: str | None = None
     timestamp: int | None = None
     metadata: dict[str, Any] = field(default_factory=dict)
+    # Every image the request generated, the one above first, each with its
+    # image_path, image_name, revised_prompt and metadata
+    images: list[dict[str, Any]] = field(default_factory=list)
 
 
 class ImageRequestValidator:
@@ -312,6 +324,13 @@ def create_request_from_form_data(
         noise = float(form_data.get("noise", "0.2"))
     except (ValueError, TypeError):
         noise = 0.2
+    # The samples field stays in the form when another provider is selected
+    n_samples = 1
+    if provider == Provider.NOVELAI:
+        try:
+            n_samples = int(form_data.get("n_samples") or "1")
+        except (ValueError, TypeError):
+            n_samples = 1
 
     # Extract vibe parameters from form data (NovelAI only)
     vibe_params: list[dict[str, Any]] | None = None
@@ -365,6 +384,8 @@ def create_request_from_form_data(
             seed=seed,
             strength=strength,
             noise=noise,
+            n_samples=n_samples,
+            vibe_params=vibe_params,
             base_image_path=form_data.get("base_image_path", ""),
             mask_path=form_data.get("mask_path", ""),
         )
@@ -384,6 +405,8 @@ def create_request_from_form_data(
             base_image_path=form_data.get("base_image_path", ""),
             strength=strength,
             noise=noise,
+            n_samples=n_samples,
+            vibe_params=vibe_params,
         )
     elif operation == Operation.COMBINED:
         return CombinedRequest(
@@ -402,6 +425,8 @@ def create_request_from_form_data(
             mask_path=form_data.get("mask_path", ""),
             strength=strength,
             noise=noise,
+            n_samples=n_samples,
+            vibe_params=vibe_params,
         )
     else:
         return ImageGenerationRequest(
@@ -418,6 +443,7 @@ def create_request_from_form_data(
             seed=seed,
             strength=strength,
             noise=noise,
+            n_samples=n_samples,
             vibe_params=vibe_params,
         )
 
@@ -429,10 +455,21 @@ def create_success_response(
     operation: Operation,
     revised_prompt: str | None = None,
     metadata: dict[str, Any] | None = None,
+    images: list[dict[str, Any]] | None = None,
 ) -> ImageOperationResponse:
     """Create a successful image operation response with metadata."""
     import time
 
+    if images is None:
+        images = [
+            {
+                "image_path": image_path,
+                "image_name": image_name,
+                "revised_prompt": revised_prompt,
+                "metadata": metadata or {},
+            }
+        ]
+
     return ImageOperationResponse(
         success=True,
         image_path=image_path,
@@ -442,6 +479,7 @@ def create_success_response(
         operation=operation.value,
         timestamp=int(time.time()),
         metadata=metadata or {},
+        images=images,
     )
 
 
@@ -9,13 +9,25 @@ import base64
 import io
 import json
 import math
+import random
+import struct
+import threading
+import time
 import zipfile
+import zlib
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
 from enum import Enum
 from typing import Any
 
+import numpy as np
 import requests
 from PIL import Image as PILImage
+from requests.adapters import HTTPAdapter
+
+from novelai_scheduler import NovelAIScheduler
 
 # Import VibeReference from image_models to avoid circular imports
 from typing import TYPE_CHECKING
@@ -23,6 +35,32 @@ if TYPE_CHECKING:
     from image_models import VibeReference
 
 
+# Upscaling is served from a different host than generation
+NOVELAI_API_URL = "https://api.novelai.net"
+
+# Connections a client keeps open to each NovelAI host unless told otherwise
+DEFAULT_POOL_SIZE = 8
+
+# Inpainting masks are made of square blocks of this many pixels, the latent resolution
+MASK_BLOCK_SIZE = 8
+
+# Mask pixels brighter than this are painted (inpainted), the rest are kept
+MASK_THRESHOLD = 128
+
+# Bytes read from the network at a time when extracting a zipped image
+ZIP_STREAM_CHUNK_SIZE = 64 * 1024
+
+_ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_ZIP_DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+_ZIP_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x01\x02"
+_ZIP_END_SIGNATURE = b"PK\x05\x06"
+_ZIP_FLAG_ENCRYPTED = 0x01
+_ZIP_FLAG_DATA_DESCRIPTOR = 0x08
+_ZIP64_SIZE = 0xFFFFFFFF
+_ZIP64_EXTRA_ID = 0x0001
+
+
 class NovelAIModel(str, Enum):
     """Available NovelAI models for image generation."""
 
@@ -53,6 +91,279 @@ class NovelAIAPIError(NovelAIClientError):
         super().__init__(f"NovelAI API Error {status_code}: {message}")
 
 
+@dataclass(frozen=True)
+class NovelAITimeouts:
+    """(connect, read) timeouts in seconds for each kind of NovelAI request.
+
+    Generation can legitimately take minutes under load, so its read timeout is long;
+    tag suggestions back an autocomplete and are given up on quickly.
+    """
+
+    generate: tuple[float, float] = (5.0, 180.0)
+    encode_vibe: tuple[float, float] = (5.0, 60.0)
+    upscale: tuple[float, float] = (5.0, 120.0)
+    suggest_tags: tuple[float, float] = (3.0, 10.0)
+
+
+@dataclass(frozen=True)
+class NovelAIRetryPolicy:
+    """When and for how long to retry a NovelAI request that failed.
+
+    Waits grow exponentially from base_delay up to max_delay, with full jitter so requests
+    refused together (NovelAI answers 429 while another generation of the account is
+    running) do not all retry at the same moment. A Retry-After header sets the least
+    wait. No retry is started that could not begin before deadline seconds have passed
+    since the first attempt.
+    """
+
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 16.0
+    deadline: float = 300.0
+    # Statuses retried for requests that are safe to repeat
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    # Statuses meaning the request was refused before any work was done, so they are
+    # retried even for generations, which spend Anlas
+    refused_statuses: frozenset[int] = frozenset({429})
+
+    def should_retry_status(self, status_code: int, idempotent: bool) -> bool:
+        """Whether a response with this status should be retried."""
+        statuses = self.retry_statuses if idempotent else self.refused_statuses
+        return status_code in statuses
+
+    def should_retry_error(self, error: Exception, idempotent: bool) -> bool:
+        """Whether a request that raised this network error should be retried.
+
+        A connect timeout means the request was never sent, so it is always safe to retry;
+        other failures may have happened after the server started working on it.
+        """
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        return idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def backoff(self, retry: int, retry_after: float | None = None) -> float:
+        """Seconds to wait before the given retry (1 for the first)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(value: Any) -> float | None:
+    """Parse a Retry-After header, given in seconds or as an HTTP date, into seconds."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+@dataclass
+class NovelAIRetryCount:
+    """Retries made by the requests of one thread inside count_retries()."""
+
+    retries: int = 0
+
+
+_retry_counts = threading.local()
+
+
+@contextmanager
+def count_retries() -> Iterator[NovelAIRetryCount]:
+    """
+    Count the retries of the NovelAI requests the current thread makes inside the block.
+
+    Yields:
+        Count updated as requests are retried
+    """
+    retry_count = NovelAIRetryCount()
+    previous = getattr(_retry_counts, "current", None)
+    _retry_counts.current = retry_count
+    try:
+        yield retry_count
+    finally:
+        _retry_counts.current = previous
+
+
+class _ChunkReader:
+    """Reads from an iterator of chunks, holding on to no more than the unread part of one."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def read(self, size: int) -> bytes:
+        """Read exactly size bytes, raising BadZipFile if the chunks run out first."""
+        parts = []
+        while size > 0:
+            if not self._pending:
+                try:
+                    self._pending = memoryview(next(self._chunks))
+                except StopIteration:
+                    raise zipfile.BadZipFile("ZIP archive is truncated") from None
+                continue
+            part = self._pending[:size]
+            self._pending = self._pending[len(part) :]
+            parts.append(part)
+            size -= len(part)
+        return b"".join(parts)
+
+    def chunks(self) -> Iterator[memoryview]:
+        """Yield the rest of the chunks, starting with the unread part of the current one."""
+        if self._pending:
+            pending, self._pending = self._pending, memoryview(b"")
+            yield pending
+        for chunk in self._chunks:
+            yield memoryview(chunk)
+
+    def push_back(self, data: bytes | memoryview) -> None:
+        """Return data taken from chunks() but not used, to be read again first."""
+        self._pending = memoryview(data)
+
+
+def iter_zip_members(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Extract the files of a ZIP archive in order while the archive is being downloaded.
+
+    Files are read from their local headers rather than the central directory at the end,
+    so the archive itself is never held in memory: each chunk is decompressed (or, for a
+    stored file, copied) once into the buffer of the file it belongs to. From the first
+    file using a feature this does not read, such as ZIP64 sizes, the rest of the archive
+    is buffered and read with zipfile instead.
+
+    Args:
+        chunks: The archive, in chunks as they arrive
+
+    Yields:
+        Contents of each file in the archive
+
+    Raises:
+        zipfile.BadZipFile: If the archive is truncated, encrypted or corrupt
+    """
+    reader = _ChunkReader(chunks)
+    first = True
+    while True:
+        # An empty archive is only its end record, shorter than a file header
+        header = reader.read(4)
+        if header in (_ZIP_CENTRAL_DIRECTORY_SIGNATURE, _ZIP_END_SIGNATURE):
+            return
+        if header != _ZIP_LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(
+                "Response is not a ZIP archive" if first else "ZIP archive is corrupt: bad file header"
+            )
+        first = False
+        header += reader.read(_ZIP_LOCAL_HEADER.size - 4)
+        (
+            _signature,
+            _version,
+            flags,
+            method,
+            _modified_time,
+            _modified_date,
+            expected_crc,
+            compressed_size,
+            size,
+            name_length,
+            extra_length,
+        ) = _ZIP_LOCAL_HEADER.unpack(header)
+        if flags & _ZIP_FLAG_ENCRYPTED:
+            raise zipfile.BadZipFile("ZIP archive is encrypted")
+        name_and_extra = reader.read(name_length + extra_length)
+        header += name_and_extra
+
+        has_descriptor = bool(flags & _ZIP_FLAG_DATA_DESCRIPTOR)
+        if (
+            method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+            or (method == zipfile.ZIP_STORED and has_descriptor)
+            or _ZIP64_SIZE in (compressed_size, size)
+            or _has_zip64_extra(name_and_extra[name_length:])
+        ):
+            yield from _extract_buffered(header, reader)
+            return
+
+        output = io.BytesIO()
+        crc = 0
+        if method == zipfile.ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            for chunk in reader.chunks():
+                try:
+                    data = decompressor.decompress(chunk)
+                except zlib.error as e:
+                    raise zipfile.BadZipFile(f"ZIP archive is corrupt: {e}") from e
+                output.write(data)
+                crc = zlib.crc32(data, crc)
+                if decompressor.eof:
+                    reader.push_back(decompressor.unused_data)
+                    break
+            else:
+                raise zipfile.BadZipFile("ZIP archive is truncated")
+        else:
+            remaining = compressed_size
+            chunks_left = reader.chunks()
+            while remaining:
+                chunk = next(chunks_left, None)
+                if chunk is None:
+                    raise zipfile.BadZipFile("ZIP archive is truncated")
+                data = chunk[:remaining]
+                output.write(data)
+                crc = zlib.crc32(data, crc)
+                remaining -= len(data)
+                if not remaining:
+                    reader.push_back(chunk[len(data) :])
+
+        if has_descriptor:
+            # The CRC and sizes follow the data, after an optional signature
+            descriptor = reader.read(4)
+            if descriptor == _ZIP_DATA_DESCRIPTOR_SIGNATURE:
+                descriptor = reader.read(4)
+            (expected_crc,) = struct.unpack("<I", descriptor)
+            reader.read(8)
+        elif output.tell() != size:
+            raise zipfile.BadZipFile("ZIP archive is corrupt: file size does not match its header")
+        if crc != expected_crc:
+            raise zipfile.BadZipFile("ZIP archive is corrupt: bad CRC-32")
+        # The buffer is handed over rather than copied, as nothing else refers to it
+        yield output.getvalue()
+
+
+def _has_zip64_extra(extra: bytes) -> bool:
+    """Whether a file header's extra field has a ZIP64 record."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        record_id, record_size = struct.unpack_from("<HH", extra, offset)
+        if record_id == _ZIP64_EXTRA_ID:
+            return True
+        offset += 4 + record_size
+    return False
+
+
+def _extract_buffered(header: bytes, reader: _ChunkReader) -> Iterator[bytes]:
+    """
+    Read the files of the rest of an archive with zipfile, once all of it has arrived.
+
+    The archive is buffered from the header of the file being read; zipfile finds where
+    that is from the size of the central directory, and the files before it are skipped.
+    """
+    archive = io.BytesIO()
+    archive.write(header)
+    for chunk in reader.chunks():
+        archive.write(chunk)
+    archive.seek(0)
+    try:
+        with zipfile.ZipFile(archive) as zipped_file:
+            for info in zipped_file.infolist():
+                if info.header_offset >= 0:
+                    yield zipped_file.read(info)
+    except (RuntimeError, NotImplementedError, zlib.error) as e:
+        raise zipfile.BadZipFile(str(e)) from e
+
+
 @dataclass
 class NovelAIGenerationPayload:
     """Payload structure for NovelAI image generation requests."""
@@ -86,20 +397,191 @@ class NovelAIImg2ImgPayload(NovelAIGenerationPayload):
 class NovelAIClient:
     """Client for interacting with the NovelAI API."""
 
-    def __init__(self, api_key: str, base_url: str = "https://image.novelai.net"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://image.novelai.net",
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeouts: NovelAITimeouts | None = None,
+        retry_policy: NovelAIRetryPolicy | None = None,
+        scheduler: NovelAIScheduler | None = None,
+    ):
         """
         Initialize the NovelAI client.
 
+        The client keeps connections open between requests, so one instance should be
+        shared by every caller in the process rather than created per request.
+
         Args:
             api_key: NovelAI API key for authentication
             base_url: Base URL for the NovelAI API
+            pool_size: Connections kept open to each NovelAI host; requests beyond this
+                still run, but their connections are closed afterwards
+            timeouts: Connect and read timeouts per kind of request
+            retry_policy: When to retry refused, failed and timed-out requests
+            scheduler: Limits how many generations run at once; each generation,
+                vibe encoding and upscale holds one of its slots, including retries
         """
         self.api_key = api_key
         self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeouts = timeouts or NovelAITimeouts()
+        self.retry_policy = retry_policy or NovelAIRetryPolicy()
+        self.scheduler = scheduler
         self.session = requests.Session()
         self.session.headers.update(
             {"authorization": f"Bearer {api_key}", "content-type": "application/json"}
         )
+        # One pool per host: generation on base_url, upscaling on NOVELAI_API_URL
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._adapter = adapter
+
+        self._stats_lock = threading.Lock()
+        self._request_count = 0
+        self._timeout_count = 0
+        self._network_error_count = 0
+        self._retry_count = 0
+
+    def _send(
+        self, method: str, url: str, timeout: tuple[float, float], **kwargs: Any
+    ) -> requests.Response:
+        """Send a request on the shared session, counting it and any network failure."""
+        error = None
+        try:
+            return getattr(self.session, method)(url, timeout=timeout, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with self._stats_lock:
+                self._request_count += 1
+                if isinstance(error, requests.Timeout):
+                    self._timeout_count += 1
+                elif error is not None:
+                    self._network_error_count += 1
+
+    def _send_with_retries(
+        self,
+        method: str,
+        url: str,
+        timeout: tuple[float, float],
+        idempotent: bool,
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Send a request, retrying it as the retry policy allows.
+
+        Args:
+            method: Session method to call ("get" or "post")
+            url: URL to request
+            timeout: (connect, read) timeout of each attempt; retries have it cut short
+                so they do not outlast the deadline
+            idempotent: Whether repeating the request is harmless; generations are not,
+                as an attempt the server worked on may already have spent Anlas
+            deadline: Seconds all attempts may take, the policy's deadline by default
+            **kwargs: Passed on to the session method
+
+        Returns:
+            The last response, which is not 200 if retries ran out
+
+        Raises:
+            requests.RequestException: If the last attempt failed without a response
+        """
+        policy = self.retry_policy
+        deadline = policy.deadline if deadline is None else deadline
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            attempt_timeout = timeout
+            if attempt > 1:
+                remaining = max(deadline - (time.monotonic() - started), 0.001)
+                attempt_timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+            try:
+                response = self._send(method, url, attempt_timeout, **kwargs)
+            except requests.RequestException as e:
+                if attempt >= policy.max_attempts or not policy.should_retry_error(e, idempotent):
+                    raise
+                delay = policy.backoff(attempt)
+                if time.monotonic() - started + delay >= deadline:
+                    raise
+            else:
+                if attempt >= policy.max_attempts or not policy.should_retry_status(
+                    response.status_code, idempotent
+                ):
+                    return response
+                delay = policy.backoff(attempt, parse_retry_after(response.headers.get("retry-after")))
+                if time.monotonic() - started + delay >= deadline:
+                    return response
+                # A streamed response holds its connection until closed
+                response.close()
+
+            with self._stats_lock:
+                self._retry_count += 1
+            retry_count = getattr(_retry_counts, "current", None)
+            if retry_count is not None:
+                retry_count.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def _generation_slot(self):
+        """Slot of the scheduler for a request of the current thread, if there is a scheduler."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.request_slot()
+
+    def prewarm(self) -> dict[str, bool]:
+        """
+        Open a connection to each NovelAI host so the first real request skips the handshake.
+
+        Failures are not raised; the connection is simply opened on first use instead.
+
+        Returns:
+            Whether a connection could be opened, by host URL
+        """
+        results = {}
+        for url in (self.base_url, NOVELAI_API_URL):
+            try:
+                self.session.head(url, timeout=self.timeouts.suggest_tags)
+                results[url] = True
+            except requests.RequestException:
+                results[url] = False
+        return results
+
+    def get_pool_stats(self) -> dict[str, Any]:
+        """
+        Report request counts and the state of the connection pool of each host.
+
+        Returns:
+            Dictionary with request, timeout and network error counts, and per host the
+            requests sent, connections opened (the rest reused one) and idle connections
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            idle_connections = 0
+            if pool.pool is not None:
+                idle_connections = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            hosts[pool.host] = {
+                "requests": pool.num_requests,
+                "connections_opened": pool.num_connections,
+                "idle_connections": idle_connections,
+            }
+
+        with self._stats_lock:
+            return {
+                "requests": self._request_count,
+                "timeouts": self._timeout_count,
+                "network_errors": self._network_error_count,
+                "retries": self._retry_count,
+                "pool_size": self.pool_size,
+                "hosts": hosts,
+            }
 
     def _build_common_parameters(
         self,
@@ -114,6 +596,7 @@ class NovelAIClient:
         noise: float = 0.2,
         variety: bool = False,
         character_prompts: list[dict[str, str]] | None = None,
+        n_samples: int = 1,
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -131,11 +614,15 @@ class NovelAIClient:
             noise: NovelAI `noise` schedule strength
             variety: Enable variety mode for more diverse outputs
             character_prompts: List of character-specific prompts
+            n_samples: Number of images to generate from the request
             **kwargs: Additional parameters to override defaults
 
         Returns:
             Dictionary of common parameters for NovelAI API
         """
+        if n_samples < 1:
+            raise ValueError("n_samples must be at least 1")
+
         # Build character captions
         char_captions_positive = []
         char_captions_negative = []
@@ -178,7 +665,7 @@ class NovelAIClient:
             "legacy": False,
             "legacy_uc": False,
             "legacy_v3_extend": False,
-            "n_samples": 1,
+            "n_samples": n_samples,
             "noise": noise,
             "noise_schedule": "karras",
             "normalize_reference_strength_multiple": True,
@@ -219,7 +706,12 @@ class NovelAIClient:
         return parameters
 
     def _make_request(
-        self, endpoint: str, payload: dict[str, Any]
+        self,
+        endpoint: str,
+        payload: dict[str, Any],
+        timeout: tuple[float, float] | None = None,
+        idempotent: bool = False,
+        stream: bool = False,
     ) -> requests.Response:
         """
         Make a request to the NovelAI API.
@@ -227,6 +719,11 @@ class NovelAIClient:
         Args:
             endpoint: API endpoint to call
             payload: Request payload
+            timeout: (connect, read) timeout in seconds, the generation timeout by default
+            idempotent: Whether the request is safe to retry after server errors and
+                timeouts; requests that are not are only retried when refused
+            stream: Return as soon as the headers arrive, leaving the body to be read
+                from the response, which must then be closed
 
         Returns:
             Response object from the API
@@ -238,7 +735,15 @@ class NovelAIClient:
         url = f"{self.base_url}/{endpoint}"
 
         try:
-            response = self.session.post(url, data=json.dumps(payload))
+            with self._generation_slot():
+                response = self._send_with_retries(
+                    "post",
+                    url,
+                    timeout or self.timeouts.generate,
+                    idempotent,
+                    data=json.dumps(payload),
+                    stream=stream,
+                )
 
             if response.status_code != 200:
                 try:
@@ -254,11 +759,43 @@ class NovelAIClient:
         except NovelAIAPIError:
             # Re-raise API errors as-is
             raise
+        except requests.Timeout as e:
+            raise NovelAIClientError(f"Request to {endpoint} timed out: {str(e)}")
         except requests.RequestException as e:
             raise NovelAIClientError(f"Network error: {str(e)}")
         except Exception as e:
             raise NovelAIClientError(f"Network error: {str(e)}")
 
+    def _read_zipped_images(self, response: requests.Response, description: str) -> list[bytes]:
+        """
+        Extract the images from a streamed ZIP response as it downloads, then close it.
+
+        Args:
+            response: Response made with stream=True
+            description: What the images are, for error messages
+
+        Returns:
+            Raw bytes of each image, in archive order
+
+        Raises:
+            NovelAIClientError: If the download fails or the archive cannot be read
+        """
+        chunks = response.iter_content(ZIP_STREAM_CHUNK_SIZE)
+        try:
+            images = list(iter_zip_members(chunks))
+            # Read anything left after the central directory so the connection is reused
+            for _ in chunks:
+                pass
+            if not images:
+                raise zipfile.BadZipFile("ZIP archive is empty")
+            return images
+        except zipfile.BadZipFile as e:
+            raise NovelAIClientError(f"Failed to extract {description} from response: {str(e)}")
+        except requests.RequestException as e:
+            raise NovelAIClientError(f"Network error while downloading {description}: {str(e)}")
+        finally:
+            response.close()
+
     def suggest_tags(self, model: str, prompt: str, lang: str = "en") -> list[dict]:
         """
         Get tag suggestions for an incomplete tag query.
@@ -276,7 +813,16 @@ class NovelAIClient:
         """
         url = "https://image.novelai.net/ai/generate-image/suggest-tags"
         try:
-            response = self.session.get(url, params={"model": model, "prompt": prompt, "lang": lang})
+            # Suggestions are only useful while the user is typing, so retries stop once
+            # a single attempt would have timed out
+            response = self._send_with_retries(
+                "get",
+                url,
+                self.timeouts.suggest_tags,
+                True,
+                deadline=self.timeouts.suggest_tags[1],
+                params={"model": model, "prompt": prompt, "lang": lang},
+            )
             if response.status_code != 200:
                 try:
                     error_body = response.json()
@@ -287,6 +833,8 @@ class NovelAIClient:
             return response.json().get("tags", [])
         except NovelAIAPIError:
             raise
+        except requests.Timeout as e:
+            raise NovelAIClientError(f"Tag suggestion request timed out: {str(e)}")
         except requests.RequestException as e:
             raise NovelAIClientError(f"Network error: {str(e)}")
 
@@ -325,7 +873,9 @@ class NovelAIClient:
             "model": model
         }
         
-        response = self._make_request("ai/encode-vibe", payload)
+        response = self._make_request(
+            "ai/encode-vibe", payload, timeout=self.timeouts.encode_vibe, idempotent=True
+        )
         
         # NovelAI returns binary vibe data (application/binary), not JSON
         # We need to base64 encode the raw binary response
@@ -336,7 +886,7 @@ class NovelAIClient:
         encoded_data = base64.b64encode(response.content).decode("ascii")
         return encoded_data
 
-    def generate_image(
+    def generate_images(
         self,
         prompt: str,
         negative_prompt: str | None = None,
@@ -349,10 +899,11 @@ class NovelAIClient:
         variety: bool = False,
         character_prompts: list[dict[str, str]] | None = None,
         vibes: list[VibeReference] | None = None,
+        n_samples: int = 1,
         **kwargs,
-    ) -> bytes:
+    ) -> list[bytes]:
         """
-        Generate an image using NovelAI's text-to-image model.
+        Generate images using NovelAI's text-to-image model.
 
         Args:
             prompt: Text prompt for image generation
@@ -366,10 +917,12 @@ class NovelAIClient:
             variety: Enable variety mode for more diverse outputs
             character_prompts: List of character-specific prompts
             vibes: List of vibe references to apply to generation
+            n_samples: Number of images to generate; NovelAI gives them consecutive seeds
+                starting at seed
             **kwargs: Additional parameters for the generation
 
         Returns:
-            Raw image bytes from the generated image
+            Raw bytes of the generated images, in seed order
 
         Raises:
             NovelAIAPIError: If the API returns an error
@@ -390,6 +943,7 @@ class NovelAIClient:
             noise=noise,
             variety=variety,
             character_prompts=character_prompts,
+            n_samples=n_samples,
             **kwargs,
         )
 
@@ -413,24 +967,57 @@ class NovelAIClient:
             "parameters": parameters,
         }
 
-        response = self._make_request("ai/generate-image", payload)
+        response = self._make_request("ai/generate-image", payload, stream=True)
+        return self._read_zipped_images(response, "image")
 
-        # Extract image from ZIP response
-        try:
-            zipped_file = zipfile.ZipFile(io.BytesIO(response.content))
-            image_bytes = zipped_file.read(zipped_file.infolist()[0])
-            return image_bytes
-        except (zipfile.BadZipFile, IndexError) as e:
-            raise NovelAIClientError(f"Failed to extract image from response: {str(e)}")
+    def generate_image(
+        self,
+        prompt: str,
+        negative_prompt: str | None = None,
+        width: int = 1024,
+        height: int = 1024,
+        seed: int = 0,
+        steps: int = 28,
+        scale: float = 6.0,
+        strength: float = 0.6,
+        variety: bool = False,
+        character_prompts: list[dict[str, str]] | None = None,
+        vibes: list[VibeReference] | None = None,
+        **kwargs,
+    ) -> bytes:
+        """
+        Generate an image using NovelAI's text-to-image model.
+
+        Takes the same arguments as generate_images(), without n_samples.
+
+        Returns:
+            Raw image bytes from the generated image
+        """
+        return self.generate_images(
+            prompt,
+            negative_prompt,
+            width,
+            height,
+            seed,
+            steps,
+            scale,
+            strength,
+            variety,
+            character_prompts,
+            vibes,
+            **kwargs,
+        )[0]
 
     def _process_novelai_mask(self, mask_bytes: bytes) -> bytes:
         """
         Process a mask for NovelAI inpainting according to their specific requirements.
 
-        NovelAI requires masks to be processed in a very specific way:
-        1. Start with a mask the size of the base image with completely black or white pixels
-        2. Scale the mask down by 12.5% (1/8 scale) using no interpolation
-        3. Upscale back to original size with no interpolation, creating 8x8 pixel blocks
+        NovelAI inpaints in 8x8 pixel blocks, the resolution of its latent space, and
+        expects a mask of pure black and white blocks of that size:
+        1. Threshold the mask to painted (white) and kept (black) pixels
+        2. Mark each 8x8 block painted if any of its pixels is, so thin brush strokes
+           are not lost
+        3. Expand the blocks back to the original size and encode a 1-bit PNG
 
         Args:
             mask_bytes: Raw mask image bytes
@@ -442,36 +1029,32 @@ class NovelAIClient:
             NovelAIClientError: If mask processing fails
         """
         try:
-            # Open the mask image
             mask_image = PILImage.open(io.BytesIO(mask_bytes))
-            original_size = mask_image.size
-
-            # Convert to grayscale if not already
             if mask_image.mode != "L":
                 mask_image = mask_image.convert("L")
-
-            # Ensure completely black or white pixels (threshold at 128)
-            mask_array = mask_image.point(lambda x: 255 if x > 128 else 0, mode="1")
-
-            # Step 1: Scale down by 12.5% (1/8 scale) with no interpolation
-            small_width = max(1, original_size[0] // 8)  # Ensure at least 1 pixel
-            small_height = max(1, original_size[1] // 8)  # Ensure at least 1 pixel
-
-            # Use NEAREST (no interpolation) for downscaling
-            small_mask = mask_array.resize(
-                (small_width, small_height), PILImage.Resampling.NEAREST
+            pixels = np.asarray(mask_image)
+            height, width = pixels.shape
+
+            # Edge blocks are completed with kept pixels
+            rows = -(-height // MASK_BLOCK_SIZE)
+            columns = -(-width // MASK_BLOCK_SIZE)
+            padding = ((0, rows * MASK_BLOCK_SIZE - height), (0, columns * MASK_BLOCK_SIZE - width))
+            if padding != ((0, 0), (0, 0)):
+                pixels = np.pad(pixels, padding)
+
+            # Brightest pixel of each block, over its rows and then its columns; a block
+            # is painted if that pixel is, which is any of its pixels being painted
+            block_max = (
+                pixels.reshape(rows, MASK_BLOCK_SIZE, columns * MASK_BLOCK_SIZE)
+                .max(axis=1)
+                .reshape(rows, columns, MASK_BLOCK_SIZE)
+                .max(axis=2)
             )
+            blocks = block_max > MASK_THRESHOLD
 
-            # Step 2: Scale back up to original size with no interpolation
-            # This creates the 8x8 pixel block effect that NovelAI expects
-            processed_mask = small_mask.resize(
-                original_size, PILImage.Resampling.NEAREST
-            )
+            processed = blocks.repeat(MASK_BLOCK_SIZE, axis=0).repeat(MASK_BLOCK_SIZE, axis=1)
+            processed_mask = PILImage.fromarray(np.ascontiguousarray(processed[:height, :width]))
 
-            # Convert back to RGB for consistency
-            processed_mask = processed_mask.convert("RGB")
-
-            # Save to bytes
             mask_buffer = io.BytesIO()
             processed_mask.save(mask_buffer, format="PNG")
             return mask_buffer.getvalue()
@@ -479,7 +1062,7 @@ class NovelAIClient:
         except Exception as e:
             raise NovelAIClientError(f"Failed to process NovelAI mask: {str(e)}")
 
-    def generate_inpaint_image(
+    def generate_inpaint_images(
         self,
         base_image: bytes,
         mask: bytes,
@@ -495,10 +1078,11 @@ class NovelAIClient:
         variety: bool = False,
         character_prompts: list[dict[str, str]] | None = None,
         vibes: list[VibeReference] | None = None,
+        n_samples: int = 1,
         **kwargs,
-    ) -> bytes:
+    ) -> list[bytes]:
         """
-        Generate an inpainted image using NovelAI's inpainting model.
+        Generate inpainted images using NovelAI's inpainting model.
 
         Args:
             base_image: Base image bytes to inpaint
@@ -515,10 +1099,12 @@ class NovelAIClient:
             variety: Enable variety mode for more diverse outputs
             character_prompts: List of character-specific prompts
             vibes: List of vibe references to apply to generation
+            n_samples: Number of images to generate; NovelAI gives them consecutive seeds
+                starting at seed
             **kwargs: Additional parameters for the generation
 
         Returns:
-            Raw image bytes from the inpainted image
+            Raw bytes of the inpainted images, in seed order
 
         Raises:
             NovelAIAPIError: If the API returns an error
@@ -546,6 +1132,7 @@ class NovelAIClient:
             noise=noise,
             variety=variety,
             character_prompts=character_prompts,
+            n_samples=n_samples,
             **kwargs,
         )
 
@@ -573,19 +1160,54 @@ class NovelAIClient:
             "parameters": parameters,
         }
 
-        response = self._make_request("ai/generate-image", payload)
+        response = self._make_request("ai/generate-image", payload, stream=True)
+        return self._read_zipped_images(response, "inpainted image")
 
-        # Extract image from ZIP response
-        try:
-            zipped_file = zipfile.ZipFile(io.BytesIO(response.content))
-            image_bytes = zipped_file.read(zipped_file.infolist()[0])
-            return image_bytes
-        except (zipfile.BadZipFile, IndexError) as e:
-            raise NovelAIClientError(
-                f"Failed to extract inpainted image from response: {str(e)}"
-            )
+    def generate_inpaint_image(
+        self,
+        base_image: bytes,
+        mask: bytes,
+        prompt: str,
+        negative_prompt: str | None = None,
+        strength: float = 1.0,
+        noise: float = 0.2,
+        width: int = 1024,
+        height: int = 1024,
+        seed: int = 0,
+        steps: int = 28,
+        scale: float = 6.0,
+        variety: bool = False,
+        character_prompts: list[dict[str, str]] | None = None,
+        vibes: list[VibeReference] | None = None,
+        **kwargs,
+    ) -> bytes:
+        """
+        Generate an inpainted image using NovelAI's inpainting model.
 
-    def generate_img2img_image(
+        Takes the same arguments as generate_inpaint_images(), without n_samples.
+
+        Returns:
+            Raw image bytes from the inpainted image
+        """
+        return self.generate_inpaint_images(
+            base_image,
+            mask,
+            prompt,
+            negative_prompt,
+            strength,
+            noise,
+            width,
+            height,
+            seed,
+            steps,
+            scale,
+            variety,
+            character_prompts,
+            vibes,
+            **kwargs,
+        )[0]
+
+    def generate_img2img_images(
         self,
         base_image: bytes,
         prompt: str,
@@ -600,10 +1222,11 @@ class NovelAIClient:
         variety: bool = False,
         character_prompts: list[dict[str, str]] | None = None,
         vibes: list[VibeReference] | None = None,
+        n_samples: int = 1,
         **kwargs,
-    ) -> bytes:
+    ) -> list[bytes]:
         """
-        Generate an image using NovelAI's img2img model.
+        Generate images using NovelAI's img2img model.
 
         Args:
             base_image: Base image bytes to use as reference
@@ -619,10 +1242,12 @@ class NovelAIClient:
             variety: Enable variety mode for more diverse outputs
             character_prompts: List of character-specific prompts
             vibes: List of vibe references to apply to generation
+            n_samples: Number of images to generate; NovelAI gives them consecutive seeds
+                starting at seed
             **kwargs: Additional parameters for the generation
 
         Returns:
-            Raw image bytes from the generated image
+            Raw bytes of the generated images, in seed order
 
         Raises:
             NovelAIAPIError: If the API returns an error
@@ -646,6 +1271,7 @@ class NovelAIClient:
             noise=noise,
             variety=variety,
             character_prompts=character_prompts,
+            n_samples=n_samples,
             **kwargs,
         )
 
@@ -671,17 +1297,50 @@ class NovelAIClient:
             "parameters": parameters
         }
 
-        response = self._make_request("ai/generate-image", payload)
+        response = self._make_request("ai/generate-image", payload, stream=True)
+        return self._read_zipped_images(response, "img2img image")
 
-        # Extract image from ZIP response
-        try:
-            zipped_file = zipfile.ZipFile(io.BytesIO(response.content))
-            image_bytes = zipped_file.read(zipped_file.infolist()[0])
-            return image_bytes
-        except (zipfile.BadZipFile, IndexError) as e:
-            raise NovelAIClientError(
-                f"Failed to extract img2img image from response: {str(e)}"
-            )
+    def generate_img2img_image(
+        self,
+        base_image: bytes,
+        prompt: str,
+        negative_prompt: str | None = None,
+        strength: float = 0.7,
+        noise: float = 0.2,
+        width: int = 1024,
+        height: int = 1024,
+        seed: int = 0,
+        steps: int = 28,
+        scale: float = 6.0,
+        variety: bool = False,
+        character_prompts: list[dict[str, str]] | None = None,
+        vibes: list[VibeReference] | None = None,
+        **kwargs,
+    ) -> bytes:
+        """
+        Generate an image using NovelAI's img2img model.
+
+        Takes the same arguments as generate_img2img_images(), without n_samples.
+
+        Returns:
+            Raw image bytes from the generated image
+        """
+        return self.generate_img2img_images(
+            base_image,
+            prompt,
+            negative_prompt,
+            strength,
+            noise,
+            width,
+            height,
+            seed,
+            steps,
+            scale,
+            variety,
+            character_prompts,
+            vibes,
+            **kwargs,
+        )[0]
 
     def upscale_image(
         self,
@@ -746,10 +1405,14 @@ class NovelAIClient:
         }
 
         # Make upscale request to different endpoint
-        upscale_url = "https://api.novelai.net/ai/upscale"
+        upscale_url = f"{NOVELAI_API_URL}/ai/upscale"
 
         try:
-            response = self.session.post(upscale_url, json=data)
+            # Images are shrunk to a size upscaled without spending Anlas, so repeating is harmless
+            with self._generation_slot():
+                response = self._send_with_retries(
+                    "post", upscale_url, self.timeouts.upscale, True, json=data, stream=True
+                )
 
             if response.status_code != 200:
                 try:
@@ -760,19 +1423,13 @@ class NovelAIClient:
 
                 raise NovelAIAPIError(response.status_code, error_message)
 
-            # Extract upscaled image from ZIP response
-            try:
-                zipped_file = zipfile.ZipFile(io.BytesIO(response.content))
-                upscaled_image_bytes = zipped_file.read(zipped_file.infolist()[0])
-                return upscaled_image_bytes
-            except (zipfile.BadZipFile, IndexError) as e:
-                raise NovelAIClientError(
-                    f"Failed to extract upscaled image from response: {str(e)}"
-                )
+            return self._read_zipped_images(response, "upscaled image")[0]
 
         except NovelAIAPIError:
             # Re-raise API errors as-is
             raise
+        except requests.Timeout as e:
+            raise NovelAIClientError(f"Upscale request timed out: {str(e)}")
         except requests.RequestException as e:
             raise NovelAIClientError(f"Network error during upscale: {str(e)}")
         except Exception as e:
@@ -0,0 +1,261 @@
+"""
+Account-level scheduling of NovelAI generations.
+
+A NovelAI account only runs a limited number of generations at once and refuses the
+rest with 429. NovelAIScheduler holds requests back so no more than that many are sent,
+and decides who goes next: interactive generations before grid cells before background
+work such as vibe previews, and within a class the user served longest ago first, so
+one user's batch does not hold up everyone else.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+
+class NovelAIRequestClass(IntEnum):
+    """Kinds of NovelAI work, in the order they are let through."""
+
+    INTERACTIVE = 0
+    GRID = 1
+    BACKGROUND = 2
+
+
+@dataclass
+class NovelAIRequestContext:
+    """Who a thread's NovelAI requests are made for, set by novelai_request()."""
+
+    username: str
+    request_class: NovelAIRequestClass
+    # Called with the number of requests ahead whenever it changes while waiting
+    on_position: Callable[[int], None] | None = None
+
+
+_request_contexts = threading.local()
+
+
+@contextmanager
+def novelai_request(
+    username: str,
+    request_class: NovelAIRequestClass | None = None,
+    on_position: Callable[[int], None] | None = None,
+) -> Iterator[NovelAIRequestContext]:
+    """
+    Attribute the NovelAI requests the current thread makes inside the block to a user.
+
+    Args:
+        username: User the requests are made for
+        request_class: Kind of work; by default that of an enclosing block, so a grid
+            keeps its class through the generation functions it calls, or interactive
+        on_position: Called with the number of requests ahead while waiting for a slot;
+            by default that of an enclosing block
+
+    Yields:
+        The context in effect inside the block
+    """
+    previous = getattr(_request_contexts, "current", None)
+    if request_class is None:
+        request_class = previous.request_class if previous else NovelAIRequestClass.INTERACTIVE
+    if on_position is None and previous is not None:
+        on_position = previous.on_position
+
+    context = NovelAIRequestContext(username, request_class, on_position)
+    _request_contexts.current = context
+    try:
+        yield context
+    finally:
+        _request_contexts.current = previous
+
+
+def current_request_context() -> NovelAIRequestContext | None:
+    """The context set by the innermost novelai_request() block of this thread, if any."""
+    return getattr(_request_contexts, "current", None)
+
+
+@dataclass
+class _Ticket:
+    """A request waiting for a slot."""
+
+    seq: int
+    username: str
+    request_class: NovelAIRequestClass
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _ClassStats:
+    """Slots granted to one request class and the time spent waiting for them."""
+
+    granted: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class NovelAIScheduler:
+    """Limits concurrent NovelAI generations and queues the rest fairly.
+
+    Waiting requests are ordered by request class, then by when their user was last
+    given a slot (never first), then by arrival. Interactive work can therefore keep
+    background work waiting for as long as interactive requests keep arriving.
+    """
+
+    def __init__(self, concurrency: int = 1):
+        """
+        Initialize the scheduler.
+
+        Args:
+            concurrency: Generations the account may run at once
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self._condition = threading.Condition()
+        self._waiting: list[_Ticket] = []
+        self._running = 0
+        self._next_seq = 0
+        self._granted = 0
+        # Grant number of each user's most recent slot
+        self._last_served: dict[str, int] = {}
+        self._stats = {request_class: _ClassStats() for request_class in NovelAIRequestClass}
+
+    def _queue_order(self) -> list[_Ticket]:
+        """Waiting tickets in the order they will be given slots. Caller holds the lock."""
+        return sorted(
+            self._waiting,
+            key=lambda ticket: (
+                ticket.request_class,
+                self._last_served.get(ticket.username, 0),
+                ticket.seq,
+            ),
+        )
+
+    @contextmanager
+    def slot(
+        self,
+        username: str,
+        request_class: NovelAIRequestClass = NovelAIRequestClass.INTERACTIVE,
+        on_position: Callable[[int], None] | None = None,
+    ) -> Iterator[None]:
+        """
+        Wait for a free generation slot and hold it for the duration of the block.
+
+        Args:
+            username: User the request is made for
+            request_class: Kind of work, deciding how it is queued
+            on_position: Called with the number of requests ahead whenever it changes
+                while waiting; it runs with the scheduler locked, so it must be quick
+                and must not use the scheduler
+
+        Yields:
+            Nothing; the slot is released when the block exits
+        """
+        with self._condition:
+            ticket = _Ticket(self._next_seq, username, request_class)
+            self._next_seq += 1
+            self._waiting.append(ticket)
+            reported_position = None
+            try:
+                while True:
+                    position = self._queue_order().index(ticket)
+                    if position == 0 and self._running < self.concurrency:
+                        break
+                    if on_position is not None and position != reported_position:
+                        on_position(position)
+                        reported_position = position
+                    self._condition.wait()
+            except BaseException:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+                raise
+
+            self._waiting.remove(ticket)
+            self._running += 1
+            self._granted += 1
+            self._last_served[username] = self._granted
+            waited = time.monotonic() - ticket.enqueued_at
+            stats = self._stats[request_class]
+            stats.granted += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+            # Others' positions moved up by one
+            self._condition.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def request_slot(self) -> Iterator[None]:
+        """
+        Hold a slot for a request of the current thread's novelai_request() context.
+
+        Requests made outside any context are queued as interactive ones of an unnamed user.
+
+        Yields:
+            Nothing; the slot is released when the block exits
+        """
+        context = current_request_context()
+        if context is None:
+            context = NovelAIRequestContext("", NovelAIRequestClass.INTERACTIVE)
+        with self.slot(context.username, context.request_class, context.on_position):
+            yield
+
+    def get_queue(self, username: str) -> dict[str, Any]:
+        """
+        Report where a user's requests are in the queue.
+
+        Args:
+            username: User to report on
+
+        Returns:
+            Dictionary with the slots in use, the total waiting, and the user's waiting
+            requests with their class, requests ahead and seconds waited so far
+        """
+        now = time.monotonic()
+        with self._condition:
+            order = self._queue_order()
+            waiting = [
+                {
+                    "request_class": ticket.request_class.name.lower(),
+                    "position": position,
+                    "waited_seconds": round(now - ticket.enqueued_at, 1),
+                }
+                for position, ticket in enumerate(order)
+                if ticket.username == username
+            ]
+            return {
+                "concurrency": self.concurrency,
+                "running": self._running,
+                "queued": len(order),
+                "waiting": waiting,
+            }
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Report slot use and waiting times per request class since startup.
+
+        Returns:
+            Dictionary with the slots in use, requests waiting, and per request class
+            the slots granted and the average and longest wait in milliseconds
+        """
+        with self._condition:
+            classes = {}
+            for request_class, stats in self._stats.items():
+                classes[request_class.name.lower()] = {
+                    "granted": stats.granted,
+                    "avg_wait_ms": round(stats.total_wait / stats.granted * 1000) if stats.granted else 0,
+                    "max_wait_ms": round(stats.max_wait * 1000),
+                }
+            return {
+                "concurrency": self.concurrency,
+                "running": self._running,
+                "queued": len(self._waiting),
+                "classes": classes,
+            }
@@ -13,9 +13,9 @@ try {
         sass --watch static/sass:static/css
     }
 
-    # Start the Python flask app in watch mode as a background job
+    # Start the app under the ASGI server in watch mode as a background job
     $pyJob = Start-Job -ScriptBlock {
-        python app.py
+        uvicorn chat_asgi:application --reload --host 0.0.0.0 --port 5000
     }
 
     Write-Host "Press Ctrl+C to stop..."
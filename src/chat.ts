@@ -9,6 +9,7 @@ export type ChatMessage = {
     agent_preset_id?: string;
     model?: string;
     reasoning_level?: string;
+    interrupted?: boolean;
 };
 export type MessageHistory = {
     type: string;
@@ -18,6 +19,19 @@ export type MessageHistory = {
     threadId: string;
     status: string;
     messages: ChatMessage[];
+    // Index of messages[0] in the conversation, when only a window was sent
+    firstIndex?: number;
+    totalMessages?: number;
+    activeStreamId?: string;
+    title?: string;
+};
+
+// Messages loaded when a conversation is opened, and per page of older history
+export const CHAT_MESSAGE_PAGE_SIZE = 50;
+
+export type MessageWindow = {
+    limit?: number;
+    before?: number;
 };
 
 export interface WebSearchStatus {
@@ -34,16 +48,71 @@ export interface ReasoningStatus {
     status?: string;
 }
 
+export type SseFrame = {
+    id?: string;
+    event?: string;
+    data: string;
+};
+
+/**
+ * Parse a single Server-Sent Events frame from the chat stream.
+ * @param frame - Raw frame text without the terminating blank line
+ * @returns Parsed frame, or null if the frame carries no data
+ */
+export function parseSseFrame(frame: string): SseFrame | null {
+    const parsed: SseFrame = { data: "" };
+    const dataLines: string[] = [];
+
+    for (const line of frame.split("\n")) {
+        // Skip empty lines and SSE comments
+        if (!line || line.startsWith(":")) {
+            continue;
+        }
+        const separator = line.indexOf(":");
+        const field = separator === -1 ? line : line.slice(0, separator);
+        let value = separator === -1 ? "" : line.slice(separator + 1);
+        if (value.startsWith(" ")) {
+            value = value.slice(1);
+        }
+
+        switch (field) {
+            case "id":
+                parsed.id = value;
+                break;
+            case "event":
+                parsed.event = value;
+                break;
+            case "data":
+                dataLines.push(value);
+                break;
+        }
+    }
+
+    if (dataLines.length === 0) {
+        return null;
+    }
+    parsed.data = dataLines.join("\n");
+    return parsed;
+}
+
 /**
  * Load conversation data from server.
  * @param conversationId - Conversation ID to load
+ * @param messageWindow - Load only the last `limit` messages before message index `before`
  * @returns Promise with conversation data
  */
-export async function onConversationSelected(conversationId: string): Promise<MessageHistory> {
+export async function onConversationSelected(conversationId: string, messageWindow: MessageWindow = {}): Promise<MessageHistory> {
+    let url = "/chat?thread_id=" + encodeURIComponent(conversationId);
+    if (messageWindow.limit !== undefined) {
+        url += "&limit=" + messageWindow.limit;
+    }
+    if (messageWindow.before !== undefined) {
+        url += "&before=" + messageWindow.before;
+    }
     return new Promise((resolve, reject) => {
         $.ajax({
             type: "GET",
-            url: "/chat?thread_id=" + encodeURIComponent(conversationId),
+            url: url,
             contentType: "application/json",
             scriptCharset: "utf-8",
             success: (response: string | MessageHistory) => {
@@ -113,11 +182,257 @@ function isScrolledToBottom(element: HTMLElement, threshold: number = 50): boole
     return element.scrollTop + element.clientHeight >= element.scrollHeight - threshold;
 }
 
+// Rendered HTML of completed messages keyed by their text, least recently used first
+const renderedMarkdownCache = new Map<string, string>();
+const RENDERED_MARKDOWN_CACHE_SIZE = 500;
+
+let markdownConverter: ShowdownConverter | null = null;
+
+/**
+ * Get the markdown converter shared by all chat rendering.
+ * Created on first use so the highlight extension is registered before it.
+ * @returns Markdown converter
+ */
+function getMarkdownConverter(): ShowdownConverter {
+    if (!markdownConverter) {
+        markdownConverter = new showdown.Converter({
+            strikethrough: true,
+            smoothLivePreview: true,
+            tasklists: true,
+            tables: true,
+            extensions: ["highlight"],
+        });
+    }
+    return markdownConverter;
+}
+
+/**
+ * Convert markdown to HTML without caching, for text that is still changing.
+ * @param text - Markdown text
+ * @returns HTML
+ */
+function convertMarkdown(text: string): string {
+    return utils.unescapeHTML(getMarkdownConverter().makeHtml(text));
+}
+
+/**
+ * Convert the markdown of a completed message to HTML, reusing earlier renders of the same text.
+ * @param text - Markdown text
+ * @returns HTML
+ */
+function renderMarkdown(text: string): string {
+    const cached = renderedMarkdownCache.get(text);
+    if (cached !== undefined) {
+        // Move to the most recently used end
+        renderedMarkdownCache.delete(text);
+        renderedMarkdownCache.set(text, cached);
+        return cached;
+    }
+
+    const html = convertMarkdown(text);
+    renderedMarkdownCache.set(text, html);
+    if (renderedMarkdownCache.size > RENDERED_MARKDOWN_CACHE_SIZE) {
+        renderedMarkdownCache.delete(renderedMarkdownCache.keys().next().value!);
+    }
+    return html;
+}
+
+/**
+ * Render one chat message with markdown and syntax highlighting.
+ * @param message - Message to render
+ * @param messageIndex - Index of the message in the conversation
+ * @returns Message element
+ */
+function renderChatMessage(message: ChatMessage, messageIndex: number): HTMLDivElement {
+    const messageDiv = document.createElement("div");
+    messageDiv.className = message.role === "user" ? "user-message" : "ai-message";
+    messageDiv.innerHTML = renderMarkdown(message.text);
+
+    // Add reasoning button and metadata for assistant messages
+    if (message.role === "assistant") {
+        addReasoningButton(messageDiv, messageIndex);
+        addMessageMetadata(messageDiv, message);
+    }
+    return messageDiv;
+}
+
+/**
+ * Render messages into a fragment, numbering them from firstIndex.
+ */
+function renderChatMessages(messages: ChatMessage[], firstIndex: number): DocumentFragment {
+    const fragment = document.createDocumentFragment();
+    messages.forEach((message, offset) => {
+        fragment.appendChild(renderChatMessage(message, firstIndex + offset));
+    });
+    return fragment;
+}
+
+type StreamingMessage = {
+    message: ChatMessage;
+    // Completed markdown blocks, rendered once each
+    stableElement: HTMLDivElement;
+    // The block still being written, re-rendered on every frame
+    tailElement: HTMLDivElement;
+    // Characters of message.text rendered into stableElement
+    stableLength: number;
+    // Characters of message.text already scanned for block boundaries
+    scannedLength: number;
+    inCodeFence: boolean;
+    // Whether stableElement holds the full render made when the text was done
+    renderedInFull: boolean;
+};
+
+let streamingMessage: StreamingMessage | null = null;
+let streamingFrame: number | null = null;
+
+/**
+ * Find where the completed blocks of a streaming message end.
+ * A block is complete once a blank line outside a code fence follows it. Only lines
+ * not scanned before are looked at, so the whole response is scanned once.
+ * @param state - Streaming message state, updated with the scan position
+ * @returns Length of the text made of completed blocks
+ */
+function findStableLength(state: StreamingMessage): number {
+    const text = state.message.text;
+    let stableLength = state.stableLength;
+    let lineStart = state.scannedLength;
+    let lineEnd = text.indexOf("\n", lineStart);
+    while (lineEnd !== -1) {
+        const line = text.slice(lineStart, lineEnd);
+        if (/^ {0,3}(```|~~~)/.test(line)) {
+            state.inCodeFence = !state.inCodeFence;
+        } else if (!state.inCodeFence && line.trim() === "" && lineStart > stableLength) {
+            stableLength = lineEnd + 1;
+        }
+        lineStart = lineEnd + 1;
+        lineEnd = text.indexOf("\n", lineStart);
+    }
+    state.scannedLength = lineStart;
+    return stableLength;
+}
+
+/**
+ * Render the text added to the streaming message since the last frame.
+ * Newly completed blocks are appended once; only the unfinished tail is re-rendered.
+ */
+function flushStreamingChatMessage(): void {
+    streamingFrame = null;
+    const state = streamingMessage;
+    const chatHistory = document.getElementById("chat-history") as HTMLDivElement | null;
+    if (!state || !chatHistory) {
+        return;
+    }
+
+    const wasAtBottom = isScrolledToBottom(chatHistory);
+
+    // Text continued after it was rendered in full, so render it block by block again
+    if (state.renderedInFull) {
+        state.stableElement.innerHTML = "";
+        state.renderedInFull = false;
+    }
+
+    const text = state.message.text;
+    const stableLength = findStableLength(state);
+    if (stableLength > state.stableLength) {
+        state.stableElement.insertAdjacentHTML("beforeend", convertMarkdown(text.slice(state.stableLength, stableLength)));
+        state.stableLength = stableLength;
+    }
+    state.tailElement.innerHTML = convertMarkdown(text.slice(state.stableLength));
+
+    // Only scroll to bottom if user was already at the bottom
+    if (wasAtBottom) {
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+    }
+}
+
+/**
+ * Show the latest text of the message being streamed, rendering at most once per animation frame.
+ * The first call for a message adds its element to the chat history.
+ * @param message - Message being streamed; its text grows between calls
+ * @param messageIndex - Index of the message in the conversation
+ */
+export function updateStreamingChatMessage(message: ChatMessage, messageIndex: number): void {
+    if (!streamingMessage || streamingMessage.message !== message) {
+        const chatHistory = document.getElementById("chat-history") as HTMLDivElement | null;
+        if (!chatHistory) {
+            console.error("Chat history element not found");
+            return;
+        }
+        finishStreamingChatMessage();
+
+        const element = document.createElement("div");
+        element.className = message.role === "user" ? "user-message" : "ai-message";
+        const stableElement = document.createElement("div");
+        const tailElement = document.createElement("div");
+        element.append(stableElement, tailElement);
+        if (message.role === "assistant") {
+            addReasoningButton(element, messageIndex);
+        }
+        chatHistory.appendChild(element);
+
+        streamingMessage = {
+            message,
+            stableElement,
+            tailElement,
+            stableLength: 0,
+            scannedLength: 0,
+            inCodeFence: false,
+            renderedInFull: false,
+        };
+    }
+
+    if (streamingFrame === null) {
+        streamingFrame = requestAnimationFrame(flushStreamingChatMessage);
+    }
+}
+
+/**
+ * Render the streaming message in full once its text is done.
+ * Rendering block by block can differ from the whole text, e.g. for lists split by blank lines,
+ * so the final render replaces it. More text for the same message continues streaming into it.
+ */
+export function finishStreamingChatMessage(): void {
+    if (streamingFrame !== null) {
+        cancelAnimationFrame(streamingFrame);
+        streamingFrame = null;
+    }
+    const state = streamingMessage;
+    if (!state) {
+        return;
+    }
+
+    const chatHistory = document.getElementById("chat-history") as HTMLDivElement | null;
+    const wasAtBottom = chatHistory ? isScrolledToBottom(chatHistory) : false;
+
+    state.stableElement.innerHTML = renderMarkdown(state.message.text);
+    state.tailElement.innerHTML = "";
+    state.stableLength = 0;
+    state.scannedLength = 0;
+    state.inCodeFence = false;
+    state.renderedInFull = true;
+
+    if (chatHistory && wasAtBottom) {
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+    }
+}
+
+/**
+ * Stop streaming into the current message element, e.g. because the history is re-rendered.
+ */
+function resetStreamingChatMessage(): void {
+    if (streamingFrame !== null) {
+        cancelAnimationFrame(streamingFrame);
+        streamingFrame = null;
+    }
+    streamingMessage = null;
+}
+
 /**
  * Render chat messages with markdown and syntax highlighting.
  * @param messages - Messages to render
+ * @param firstIndex - Index of messages[0] in the conversation
  */
-export function refreshChatMessages(messages: ChatMessage[]): void {
+export function refreshChatMessages(messages: ChatMessage[], firstIndex: number = 0): void {
     const chatHistory = document.getElementById("chat-history") as HTMLDivElement | null;
     if (!chatHistory) {
         console.error("Chat history element not found");
@@ -126,38 +441,52 @@ export function refreshChatMessages(messages: ChatMessage[]): void {
     
     const wasAtBottom = isScrolledToBottom(chatHistory);
 
+    resetStreamingChatMessage();
     chatHistory.innerHTML = "";
-    // Display AI response in chat history
-    messages.forEach((message, messageIndex) => {
-        const converter = new showdown.Converter({
-            strikethrough: true,
-            smoothLivePreview: true,
-            tasklists: true,
-            tables: true,
-            extensions: ["highlight"],
-        });
-        const text = message.text;
-        const html = converter.makeHtml(text);
-
-        const messageDiv = document.createElement("div");
-        messageDiv.className = message.role === "user" ? "user-message" : "ai-message";
-        messageDiv.innerHTML = utils.unescapeHTML(html);
+    chatHistory.appendChild(renderChatMessages(messages, firstIndex));
 
-        // Add reasoning button and metadata for assistant messages
-        if (message.role === "assistant") {
-            addReasoningButton(messageDiv, messageIndex);
-            addMessageMetadata(messageDiv, message);
-        }
+    // Only scroll to bottom if user was already at the bottom
+    if (wasAtBottom) {
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+    }
+}
 
-        chatHistory.appendChild(messageDiv);
-    });
+/**
+ * Render messages after the ones already shown, e.g. the new messages of a stream.
+ * @param messages - Messages to add
+ * @param firstIndex - Index of messages[0] in the conversation
+ */
+export function appendChatMessages(messages: ChatMessage[], firstIndex: number): void {
+    const chatHistory = document.getElementById("chat-history") as HTMLDivElement | null;
+    if (!chatHistory) {
+        console.error("Chat history element not found");
+        return;
+    }
 
-    // Only scroll to bottom if user was already at the bottom
+    const wasAtBottom = isScrolledToBottom(chatHistory);
+    chatHistory.appendChild(renderChatMessages(messages, firstIndex));
     if (wasAtBottom) {
         chatHistory.scrollTop = chatHistory.scrollHeight;
     }
 }
 
+/**
+ * Render older messages above the ones already shown, keeping the visible messages in place.
+ * @param messages - Messages to add
+ * @param firstIndex - Index of messages[0] in the conversation
+ */
+export function prependChatMessages(messages: ChatMessage[], firstIndex: number): void {
+    const chatHistory = document.getElementById("chat-history") as HTMLDivElement | null;
+    if (!chatHistory) {
+        console.error("Chat history element not found");
+        return;
+    }
+
+    const previousHeight = chatHistory.scrollHeight;
+    chatHistory.insertBefore(renderChatMessages(messages, firstIndex), chatHistory.firstChild);
+    chatHistory.scrollTop += chatHistory.scrollHeight - previousHeight;
+}
+
 /**
  * Add reasoning inspection button to message.
  * @param messageElement - Message element
@@ -225,6 +554,11 @@ function addMessageMetadata(messageElement: HTMLElement, message: ChatMessage):
             metadataItems.push(`<span class="metadata-preset" title="Agent Preset">Custom Agent</span>`);
         }
 
+        // Flag responses that stopped before they were complete
+        if (message.interrupted) {
+            metadataItems.push(`<span class="metadata-interrupted" title="The response was cut off before it finished">Interrupted</span>`);
+        }
+
         if (metadataItems.length > 0) {
             metadataContainer.innerHTML = metadataItems.join(' • ');
             messageElement.appendChild(metadataContainer);
@@ -9,6 +9,8 @@ interface TagSuggestion {
     tag: string;
     count: number;
     confidence: number;
+    /** Alias the tag matched by, when suggested from the local tag index */
+    alias?: string;
 }
 
 const MODEL = "nai-diffusion-3";
@@ -56,6 +58,12 @@ function buildDropdown(suggestions: TagSuggestion[], textarea: HTMLTextAreaEleme
         const tagSpan = document.createElement("span");
         tagSpan.className = "nai-tag-name";
         tagSpan.textContent = s.tag;
+        if (s.alias) {
+            const aliasSpan = document.createElement("span");
+            aliasSpan.className = "nai-tag-alias";
+            aliasSpan.textContent = ` (${s.alias})`;
+            tagSpan.appendChild(aliasSpan);
+        }
 
         const countSpan = document.createElement("span");
         countSpan.className = "nai-tag-count";
@@ -42,6 +42,12 @@ function buildDropdown(suggestions, textarea) {
         const tagSpan = document.createElement("span");
         tagSpan.className = "nai-tag-name";
         tagSpan.textContent = s.tag;
+        if (s.alias) {
+            const aliasSpan = document.createElement("span");
+            aliasSpan.className = "nai-tag-alias";
+            aliasSpan.textContent = ` (${s.alias})`;
+            tagSpan.appendChild(aliasSpan);
+        }
         const countSpan = document.createElement("span");
         countSpan.className = "nai-tag-count";
         countSpan.textContent = s.count > 0 ? s.count.toLocaleString() : "";
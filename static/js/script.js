@@ -7,11 +7,14 @@ import { parseJQueryError, extractErrorMessage } from './error-handler.js';
 import { vibePanel } from './vibe-panel.js';
 import { vibeProgressModal } from './vibe-progress.js';
 import { initTagSuggestions, attachTagSuggestToTextarea } from './novelai-tag-suggest.js';
+// Milliseconds between queue checks while a NovelAI generation is in progress
+const NOVELAI_QUEUE_POLL_MS = 1000;
 document.addEventListener("DOMContentLoaded", () => {
     $("#loading-spinner").hide();
     $("#prompt-form").on("submit", (event) => {
         event.preventDefault();
         $("#loading-spinner").show();
+        const stopQueuePolling = $("#provider").val() === "novelai" ? startNovelAIQueuePolling() : () => { };
         // Always use the unified /image endpoint - it handles both regular and grid generation
         const formData = $("#prompt-form").serialize();
         // Use new /image endpoint with JSON response
@@ -27,12 +30,14 @@ document.addEventListener("DOMContentLoaded", () => {
                 else {
                     renderImageError(response.error_message || "Unknown error occurred");
                 }
+                stopQueuePolling();
                 $("#loading-spinner").hide();
             },
             error: (xhr) => {
                 const errorResponse = parseJQueryError(xhr);
                 const errorMessage = extractErrorMessage(errorResponse);
                 renderImageError(errorMessage);
+                stopQueuePolling();
                 $("#loading-spinner").hide();
             }
         });
@@ -53,6 +58,7 @@ document.addEventListener("DOMContentLoaded", () => {
     addEventListenerToElement("lastGrid", "click", lastGrid);
     // Chat buttons
     addEventListenerToElement("send-chat", "click", sendChatMessage);
+    addEventListenerToElement("chat-history", "scroll", loadOlderChatMessagesOnScroll);
     // Reasoning modal buttons
     addEventListenerToElement("reasoning-modal-close", "click", hideReasoningModalFromScript);
     // Grid Modal Buttons
@@ -122,6 +128,42 @@ function keyDownEvent(evt) {
     }
 }
 // Helper functions for new image API
+/**
+ * Show where the user's NovelAI generations are in the queue until the returned function is called
+ */
+function startNovelAIQueuePolling() {
+    const statusElement = document.getElementById("novelai-queue-status");
+    let stopped = false;
+    const poll = () => {
+        fetch("/novelai/queue")
+            .then((response) => response.json())
+            .then((status) => {
+            if (stopped || !statusElement) {
+                return;
+            }
+            // Waiting requests are listed in queue order; show the one closest to running
+            const next = status.waiting[0];
+            if (!next) {
+                statusElement.textContent = "";
+            }
+            else if (next.position === 0) {
+                statusElement.textContent = "Waiting for NovelAI: next in line";
+            }
+            else {
+                statusElement.textContent = `Waiting for NovelAI: ${next.position} ahead in queue`;
+            }
+        })
+            .catch((error) => console.warn("Failed to check NovelAI queue:", error));
+    };
+    const timer = setInterval(poll, NOVELAI_QUEUE_POLL_MS);
+    return () => {
+        stopped = true;
+        clearInterval(timer);
+        if (statusElement) {
+            statusElement.textContent = "";
+        }
+    };
+}
 /**
  * Render successful image generation result with metadata and actions
  */
@@ -151,10 +193,22 @@ function renderImageResult(response) {
             characterPromptsHtml = `<div class="character-prompts-display"><strong>Character Prompts:</strong> ${characterPromptItems.join(', ')}</div>`;
         }
     }
+    // Thumbnails of the other images of a multi-sample generation, to switch between them
+    const samples = response.images || [];
+    let samplesHtml = '';
+    if (samples.length > 1) {
+        const thumbnails = samples.map((sample, index) => {
+            const selected = sample.image_path === response.image_path ? ' selected' : '';
+            const thumbnailPath = sample.image_path.replace(/\.png$/, ".thumb.jpg");
+            return `<img class="sample-thumbnail${selected}" data-sample-index="${index}" src="${thumbnailPath}" alt="Sample ${index + 1}" title="Seed ${sample.metadata?.seed ?? ''}">`;
+        });
+        samplesHtml = `<div class="sample-thumbnails">${thumbnails.join('')}</div>`;
+    }
     const resultHtml = `
         <div class="result-container">
             <div class="image-container">
                 <img id="generatedImage" src="${response.image_path}" alt="Generated Image" class="generated-image">
+                ${samplesHtml}
             </div>
             <div class="result-info">
                 <h3>Generated Image</h3>
@@ -185,6 +239,12 @@ function renderImageResult(response) {
     // Add event listeners for the new elements
     addEventListenerToElement("generatedImage", "click", openGenModal);
     addEventListenerToElement("generatedImageClose", "click", closeGenModal);
+    document.querySelectorAll(".sample-thumbnail").forEach((thumbnail) => {
+        thumbnail.addEventListener("click", () => {
+            const sample = samples[Number(thumbnail.dataset.sampleIndex)];
+            renderImageResult({ ...response, ...sample });
+        });
+    });
     // Add event listener for inpaint button with prompt extraction
     const editMaskBtn = document.getElementById("editMaskBtn");
     if (editMaskBtn) {
@@ -1681,55 +1741,190 @@ function scheduleConversationTitleRefresh(conversationId) {
 function onConversationSelected(ev) {
     let conversationId = this.getAttribute("data-conversation-id");
     const chatInput = document.getElementById("chat-input");
-    chat.onConversationSelected(conversationId)
+    chat.onConversationSelected(conversationId, { limit: chat.CHAT_MESSAGE_PAGE_SIZE })
         .then((chatData) => {
         chatInput.value = ""; // Clear input field
-        chat.refreshChatMessages(chatData.messages);
+        showMessageWindow(chatData);
         currentThreadId = chatData.threadId;
         // Expose currentThreadId to window for reasoning modal access
         window.currentThreadId = currentThreadId;
+        // Reattach to a response that is still being generated, e.g. after a page reload
+        if (chatData.activeStreamId) {
+            reattachChatStream(chatData.threadId, chatData.activeStreamId, chatInput);
+        }
     });
 }
-async function fetchWithStreaming(url, data, processChunk) {
+/**
+ * Replace the cached and displayed messages with a window loaded from the server
+ */
+function showMessageWindow(chatData) {
+    cachedMessageList = chatData.messages;
+    cachedFirstIndex = chatData.firstIndex ?? 0;
+    chat.refreshChatMessages(cachedMessageList, cachedFirstIndex);
+}
+// Distance from the top of the chat history at which older messages are loaded
+const OLDER_MESSAGES_SCROLL_THRESHOLD = 200;
+var loadingOlderMessages = false;
+/**
+ * Load the page of messages before the loaded window when the chat history is scrolled near the top
+ */
+function loadOlderChatMessagesOnScroll(event) {
+    const chatHistory = event.currentTarget;
+    if (loadingOlderMessages || cachedFirstIndex === 0 || !currentThreadId
+        || chatHistory.scrollTop > OLDER_MESSAGES_SCROLL_THRESHOLD) {
+        return;
+    }
+    loadingOlderMessages = true;
+    const conversationId = currentThreadId;
+    chat.onConversationSelected(conversationId, { limit: chat.CHAT_MESSAGE_PAGE_SIZE, before: cachedFirstIndex })
+        .then((chatData) => {
+        // Ignore the page if another conversation was opened meanwhile
+        if (conversationId !== currentThreadId) {
+            return;
+        }
+        const firstIndex = chatData.firstIndex ?? 0;
+        // Only keep messages that are still before the loaded window
+        const olderMessages = chatData.messages.slice(0, Math.max(0, cachedFirstIndex - firstIndex));
+        cachedMessageList = olderMessages.concat(cachedMessageList);
+        cachedFirstIndex = firstIndex;
+        chat.prependChatMessages(olderMessages, firstIndex);
+    })
+        .catch((error) => console.error("Failed to load older messages:", error))
+        .finally(() => {
+        loadingOlderMessages = false;
+    });
+}
+const CHAT_STREAM_MAX_RESUME_ATTEMPTS = 3;
+const CHAT_STREAM_RESUME_DELAY_MS = 1000;
+/**
+ * Read SSE frames from a chat stream response, tracking the last event id for resuming.
+ */
+async function readChatStream(response, state, processEvent) {
+    if (!response.body) {
+        console.error("Response body is not readable");
+        return;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let resultString = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done)
+            break;
+        const chunk = decoder.decode(value, { stream: true });
+        resultString += chunk;
+        // SSE frames are separated by a blank line
+        const frames = resultString.split("\n\n");
+        resultString = frames.pop(); // Handle the rest in the next iteration.
+        frames.forEach((rawFrame) => {
+            const frame = chat.parseSseFrame(rawFrame);
+            // Heartbeat frames only keep the connection alive
+            if (!frame || frame.event === "heartbeat") {
+                return;
+            }
+            if (frame.event === "end") {
+                state.ended = true;
+                return;
+            }
+            if (frame.event === "gap") {
+                // Some events fell out of the server's replay window
+                state.missedEvents = true;
+                return;
+            }
+            if (frame.id) {
+                state.lastEventId = parseInt(frame.id, 10);
+            }
+            try {
+                processEvent(JSON.parse(frame.data));
+            }
+            catch (e) {
+                console.error("Error parsing JSON frame:", e);
+            }
+        });
+    }
+}
+/**
+ * Follow a chat stream from the last event seen, reconnecting if the connection drops.
+ */
+async function resumeChatStream(state, processEvent) {
+    for (let attempt = 0; attempt < CHAT_STREAM_MAX_RESUME_ATTEMPTS; attempt++) {
+        if (state.ended || !state.conversationId) {
+            break;
+        }
+        await new Promise((resolve) => setTimeout(resolve, CHAT_STREAM_RESUME_DELAY_MS * attempt));
+        const query = state.streamId ? `?stream_id=${encodeURIComponent(state.streamId)}` : "";
+        try {
+            const response = await fetch(`/chat/stream/${encodeURIComponent(state.conversationId)}${query}`, {
+                headers: {
+                    "Accept": "text/event-stream",
+                    "Last-Event-ID": state.lastEventId.toString(),
+                },
+            });
+            if (response.status === 404) {
+                // The response finished too long ago or the server restarted
+                break;
+            }
+            if (response.ok) {
+                await readChatStream(response, state, processEvent);
+            }
+        }
+        catch (error) {
+            console.error("Error resuming chat stream:", error);
+        }
+    }
+    // Whatever we missed is on the server; let the caller reload the conversation
+    if (!state.ended || state.missedEvents) {
+        processEvent({ type: "stream_resync", threadId: state.conversationId });
+    }
+}
+async function fetchWithStreaming(url, data, processEvent) {
+    const state = {
+        conversationId: null,
+        streamId: null,
+        lastEventId: 0,
+        ended: false,
+        missedEvents: false,
+    };
     try {
+        // Start the response detached and read its events from the stream endpoint,
+        // which the ASGI server can serve without tying up a request thread
         const response = await fetch(url, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
             },
-            body: JSON.stringify(data),
+            body: JSON.stringify({ ...data, detach: true }),
         });
-        if (response.body) {
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            let resultString = "";
-            while (true) {
-                const { value, done } = await reader.read();
-                if (done)
-                    break;
-                const chunk = decoder.decode(value, { stream: true });
-                resultString += chunk;
-                const parts = resultString.split("␆␄");
-                resultString = parts.pop(); // Handle the rest in the next iteration.
-                parts.forEach((part) => {
-                    if (part) {
-                        try {
-                            processChunk(part);
-                        }
-                        catch (e) {
-                            console.error("Error parsing JSON chunk:", e);
-                        }
-                    }
-                });
-            }
+        if (response.ok) {
+            const started = await response.json();
+            state.conversationId = started.threadId;
+            state.streamId = started.streamId;
         }
         else {
-            console.error("Response body is not readable");
+            console.error("Failed to start chat response:", response.status, response.statusText);
         }
     }
     catch (error) {
         console.error("Fetch error:", error);
     }
+    await resumeChatStream(state, processEvent);
+}
+/**
+ * Follow a response that is already streaming, replaying it from the first event.
+ */
+function reattachChatStream(conversationId, streamId, chatInput) {
+    const sendChatButton = document.getElementById("send-chat");
+    const chatName = allConversations[conversationId]?.chat_name ?? "New Chat";
+    sendChatButton.disabled = true;
+    resumeChatStream({
+        conversationId: conversationId,
+        streamId: streamId,
+        lastEventId: 0,
+        ended: false,
+        missedEvents: false,
+    }, (chatData) => {
+        processChatChunk(chatData, chatName, chatInput, sendChatButton);
+    });
 }
 // "queued", "in_progress", "requires_action", "cancelling", "cancelled", "failed", "completed", "expired"
 let prettyStatuses = {
@@ -1737,7 +1932,9 @@ let prettyStatuses = {
     in_progress: "in progress...",
     requires_action: "processing action...",
 };
-var cachedMessageList;
+var cachedMessageList = [];
+// Index of cachedMessageList[0] in the conversation; older messages are loaded on scroll
+var cachedFirstIndex = 0;
 var progressNum = 0;
 /**
  * Send chat message and handle streaming response
@@ -1769,20 +1966,16 @@ function sendChatMessage() {
         user_input: userMessage,
         chat_name: chatName,
         thread_id: currentThreadId,
+        stream_protocol: "sse",
         ...agentPresetData,
-    }, (chunkData) => {
-        const parsedData = JSON.parse(chunkData);
-        // Handle double-stringified JSON
-        const chatData = typeof parsedData === "string"
-            ? JSON.parse(parsedData)
-            : parsedData;
+    }, (chatData) => {
         // Process chunk based on type
         processChatChunk(chatData, chatName, chatInput, sendChatButton);
     });
 }
 /**
  * Process individual chat stream chunks based on type
- * Handles different chunk types: message_list, text_created, text_delta, text_done, search, reasoning
+ * Handles different chunk types: message_list, text_created, text_delta, text_done, search, reasoning, conversation_title, stream_resync
  */
 function processChatChunk(chatData, chatName, chatInput, sendChatButton) {
     const chatStatusText = document.getElementById("chat-current-status");
@@ -1809,6 +2002,12 @@ function processChatChunk(chatData, chatName, chatInput, sendChatButton) {
         case "reasoning_completed":
             chat.handleReasoningStatus(chatData);
             break;
+        case "conversation_title":
+            handleConversationTitleChunk(chatData);
+            break;
+        case "stream_resync":
+            handleStreamResyncChunk(chatData, sendChatButton, chatStatusText);
+            break;
         default:
             // Unknown chunk type - log for debugging
             console.warn("Unknown chat chunk type:", chatData.type);
@@ -1820,13 +2019,29 @@ function processChatChunk(chatData, chatName, chatInput, sendChatButton) {
  */
 function handleMessageListChunk(chatData, chatName, chatInput, chatStatusText) {
     chatStatusText.textContent = "In queue...";
+    // The stream only sends the new messages; add them to the loaded window
+    const firstIndex = chatData.firstIndex ?? 0;
+    const nextIndex = cachedFirstIndex + cachedMessageList.length;
+    if (chatData.threadId !== currentThreadId || firstIndex === 0) {
+        cachedMessageList = chatData.messages;
+        cachedFirstIndex = firstIndex;
+        chat.refreshChatMessages(cachedMessageList, cachedFirstIndex);
+    }
+    else if (firstIndex > nextIndex) {
+        // Messages were added elsewhere since the window was loaded; reload the latest window
+        chat.onConversationSelected(chatData.threadId, { limit: chat.CHAT_MESSAGE_PAGE_SIZE })
+            .then(showMessageWindow)
+            .catch((error) => console.error("Failed to reload conversation:", error));
+    }
+    else {
+        const newMessages = chatData.messages.slice(nextIndex - firstIndex);
+        cachedMessageList.push(...newMessages);
+        chat.appendChatMessages(newMessages, nextIndex);
+    }
     // Update current thread ID
     currentThreadId = chatData.threadId;
     window.currentThreadId = currentThreadId;
-    // Update message cache and UI
-    cachedMessageList = chatData.messages;
     chatInput.value = "";
-    chat.refreshChatMessages(cachedMessageList);
     // Update conversation list
     const currentTimeEpoch = new Date(Date.now()).getUTCSeconds();
     const isNewConversation = !allConversations[chatData.threadId];
@@ -1845,6 +2060,16 @@ function handleMessageListChunk(chatData, chatName, chatInput, chatStatusText) {
         scheduleConversationTitleRefresh(chatData.threadId);
     }
 }
+/**
+ * Handle conversation_title chunk: show the generated title of a new conversation
+ */
+function handleConversationTitleChunk(chatData) {
+    const conversation = allConversations[chatData.threadId];
+    if (conversation && chatData.title) {
+        conversation.chat_name = chatData.title;
+        refreshConversationListFromCache();
+    }
+}
 /**
  * Handle text_created chunk: add new assistant message
  */
@@ -1856,8 +2081,9 @@ function handleTextCreatedChunk(chatStatusText) {
  * Handle text_delta chunk: append text to current message with animated status
  */
 function handleTextDeltaChunk(chatData, chatStatusText) {
-    cachedMessageList[cachedMessageList.length - 1].text += chatData.delta;
-    updateMostRecentChatMessage(cachedMessageList);
+    const message = cachedMessageList[cachedMessageList.length - 1];
+    message.text += chatData.delta;
+    chat.updateStreamingChatMessage(message, cachedFirstIndex + cachedMessageList.length - 1);
     // Animate status text with dots
     const statusTexts = ["In progress.", "In progress..", "In progress..."];
     chatStatusText.textContent = statusTexts[progressNum % 3];
@@ -1867,68 +2093,24 @@ function handleTextDeltaChunk(chatData, chatStatusText) {
  * Handle text_done chunk: re-enable send button and reset status
  */
 function handleTextDoneChunk(sendChatButton, chatStatusText) {
+    chat.finishStreamingChatMessage();
     sendChatButton.disabled = false;
     chatStatusText.textContent = "Awaiting Input...";
     progressNum = 0;
 }
 /**
- * Check if the chat container is scrolled to or near the bottom
- */
-function isScrolledToBottom(element, threshold = 50) {
-    return element.scrollTop + element.clientHeight >= element.scrollHeight - threshold;
-}
-/**
- * Update the most recent chat message in the display
+ * Handle stream_resync chunk: the stream could not be followed to the end, so reload the conversation
  */
-function updateMostRecentChatMessage(messages) {
-    const chatHistory = document.getElementById("chat-history");
-    const wasAtBottom = isScrolledToBottom(chatHistory);
-    var message = messages[messages.length - 1];
-    var converter = new showdown.Converter({
-        strikethrough: true,
-        smoothLivePreview: true,
-        tasklists: true,
-        extensions: ["highlight"],
-    }), text = message.text, html = converter.makeHtml(text);
-    if (chatHistory.children.length < messages.length) {
-        const div = document.createElement("div");
-        div.className = "ai-message";
-        div.innerHTML = utils.unescapeHTML(html);
-        // Add reasoning button for assistant messages
-        if (message.role === "assistant") {
-            addReasoningButtonToMessage(div, messages.length - 1);
-        }
-        chatHistory.appendChild(div);
-    }
-    else {
-        var lastChildDiv = chatHistory.lastChild;
-        lastChildDiv.innerHTML = utils.unescapeHTML(html);
-        // Re-add reasoning button if it's an assistant message and doesn't already have one
-        if (message.role === "assistant" && !lastChildDiv.querySelector('.reasoning-button')) {
-            addReasoningButtonToMessage(lastChildDiv, messages.length - 1);
-        }
-    }
-    // Only scroll to bottom if user was already at the bottom
-    if (wasAtBottom) {
-        chatHistory.scrollTop = chatHistory.scrollHeight;
+function handleStreamResyncChunk(chatData, sendChatButton, chatStatusText) {
+    sendChatButton.disabled = false;
+    chatStatusText.textContent = "Awaiting Input...";
+    progressNum = 0;
+    if (chatData.threadId) {
+        chat.onConversationSelected(chatData.threadId, { limit: chat.CHAT_MESSAGE_PAGE_SIZE })
+            .then(showMessageWindow)
+            .catch((error) => console.error("Failed to reload conversation:", error));
     }
 }
-/**
- * Add reasoning inspection button to assistant message
- */
-function addReasoningButtonToMessage(messageElement, messageIndex) {
-    const reasoningButton = document.createElement("button");
-    reasoningButton.className = "reasoning-button";
-    reasoningButton.innerHTML = "i";
-    reasoningButton.title = "View reasoning";
-    reasoningButton.setAttribute("data-message-index", messageIndex.toString());
-    reasoningButton.addEventListener("click", (e) => {
-        e.preventDefault();
-        e.stopPropagation();
-        showReasoningModalFromScript(messageIndex);
-    });
-    messageElement.appendChild(reasoningButton);
-}
 /**
  * Show reasoning modal for a specific message
  * Fetches reasoning data from server and displays it with comprehensive error handling
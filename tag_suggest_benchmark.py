@@ -0,0 +1,118 @@
+"""
+Benchmark for tag suggestion lookups.
+
+Times how fast TagSuggestionCache answers a user typing out a tag once the first
+character's answer is cached, with NovelAI replaced by a function returning at once.
+Each keystroke is answered from the cached prefix without a request. Also times
+TagIndex lookups over a synthetic dump, for prefixes broad enough to be precomputed
+and for narrow ones ranked when asked for.
+
+    python tag_suggest_benchmark.py
+    python tag_suggest_benchmark.py --iterations 5000 --tags 200000
+    python tag_suggest_benchmark.py --json
+"""
+
+import argparse
+import json
+import time
+from typing import Any
+
+from tag_suggestions import TagIndex, TagRecord, TagSuggestionCache
+
+MODEL = "nai-diffusion-4-5-full"
+TYPED_QUERIES = ["lo", "lon", "long", "long ", "long t", "long ta", "long tag"]
+INDEX_QUERIES = ["t", "ta", "tag", "tag 0", "tag 01", "word", "word1", "word42", "tag 012"]
+
+
+def run_cache_benchmark(iterations: int = 1000) -> dict[str, Any]:
+    """
+    Time keystrokes answered from a warm prefix of the cache.
+
+    Args:
+        iterations: Times the typed queries are answered, each by a fresh cache
+
+    Returns:
+        Dictionary with the number of lookups, lookups per second, the mean
+        microseconds per lookup and the upstream requests made
+    """
+    tags = [{"tag": f"long tag {index}", "count": 1000 - index, "confidence": 1} for index in range(9)]
+    fetches = 0
+
+    def fetch(model: str, query: str, lang: str) -> list[dict]:
+        nonlocal fetches
+        fetches += 1
+        return tags
+
+    elapsed = 0.0
+    for _ in range(iterations):
+        cache = TagSuggestionCache(fetch)
+        cache.suggest(MODEL, "l")
+        start = time.perf_counter()
+        for query in TYPED_QUERIES:
+            cache.suggest(MODEL, query)
+        elapsed += time.perf_counter() - start
+
+    lookups = iterations * len(TYPED_QUERIES)
+    return {
+        "benchmark": "cache warm prefix",
+        "lookups": lookups,
+        "lookups_per_second": lookups / elapsed,
+        "mean_us": elapsed / lookups * 1e6,
+        "upstream_requests": fetches,
+    }
+
+
+def run_index_benchmark(tag_count: int = 20000, iterations: int = 1000) -> dict[str, Any]:
+    """
+    Time TagIndex lookups over synthetic tags.
+
+    Args:
+        tag_count: Tags in the index
+        iterations: Times the index queries are looked up
+
+    Returns:
+        Dictionary with the number of lookups, lookups per second and the mean
+        microseconds per lookup
+    """
+    records = [TagRecord(f"tag {index:05d} word{index % 97}", index) for index in range(tag_count)]
+    index = TagIndex(records)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in INDEX_QUERIES:
+            index.lookup(query)
+    elapsed = time.perf_counter() - start
+
+    lookups = iterations * len(INDEX_QUERIES)
+    return {
+        "benchmark": f"index ({tag_count} tags)",
+        "lookups": lookups,
+        "lookups_per_second": lookups / elapsed,
+        "mean_us": elapsed / lookups * 1e6,
+        "upstream_requests": 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000, help="times each set of queries is run")
+    parser.add_argument("--tags", type=int, default=20000, help="tags in the index")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = [run_cache_benchmark(args.iterations), run_index_benchmark(args.tags, args.iterations)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'benchmark':<22}{'lookups':>9}{'lookups/s':>12}{'mean us':>9}{'requests':>10}")
+    for result in results:
+        print(
+            f"{result['benchmark']:<22}{result['lookups']:>9}{result['lookups_per_second']:>12.0f}"
+            f"{result['mean_us']:>9.1f}{result['upstream_requests']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
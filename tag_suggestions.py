@@ -0,0 +1,564 @@
+"""
+Tag autocomplete: a local tag index and caching of NovelAI tag suggestions.
+
+The tag autocomplete asks for suggestions on every keystroke, so typing "long hair"
+asks for "l", "lo", "lon" and so on, and several users typing common tags ask for the
+same prefixes. TagIndex answers from a local database of tags, imported from a dump or
+learned from NovelAI's answers. TagSuggestionCache asks NovelAI only when the index
+cannot answer, keeps recent answers, answers a longer query from a shorter one's answer
+when that answer held every matching tag, and lets concurrent identical queries share
+one upstream request.
+"""
+
+import bisect
+import csv
+import json
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any
+
+# Prefixes matching more index keys than this have their best tags precomputed; the
+# matches of others are few enough to rank when asked for
+INDEX_SCAN_LIMIT = 64
+
+# Sorts after any text starting with the same characters
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def normalize_tag_query(text: str) -> str:
+    """Lowercase text and treat underscores as spaces, as tags are written both ways."""
+    return text.replace("_", " ").lower()
+
+
+def tag_matches_query(tag: str, query: str) -> bool:
+    """
+    Check whether a tag would be suggested for a query.
+
+    A tag matches when it, or one of its words, starts with the query. Every tag that
+    matches a query also matches each shorter prefix of it.
+
+    Args:
+        tag: Suggested tag text
+        query: Incomplete tag as typed
+
+    Returns:
+        True if the tag matches the query
+    """
+    tag = normalize_tag_query(tag)
+    query = normalize_tag_query(query)
+    return tag.startswith(query) or f" {query}" in tag
+
+
+@dataclass
+class TagRecord:
+    """A tag in the local index."""
+
+    name: str
+    # Posts using the tag, ranking suggestions
+    count: int
+    aliases: tuple[str, ...] = ()
+
+
+def load_tag_dump(path: str) -> list[TagRecord]:
+    """
+    Read tags from a dump file.
+
+    CSV dumps have a row per tag of name, category, post count and optionally a quoted,
+    comma-separated list of aliases, as used by the common Danbooru tag exports; rows
+    whose count is not a number (such as a header) are skipped. JSON dumps are a list
+    of objects with "tag" (or "name"), "count" and optionally "aliases".
+
+    Args:
+        path: CSV or JSON file
+
+    Returns:
+        The tags in the file
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the JSON is malformed
+    """
+    records = []
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            for item in json.load(f):
+                name = item.get("tag") or item.get("name")
+                if name:
+                    records.append(TagRecord(name, int(item.get("count", 0)), tuple(item.get("aliases", ()))))
+        return records
+
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or not row[2].strip().isdigit():
+                continue
+            aliases = tuple(alias.strip() for alias in row[3].split(",") if alias.strip()) if len(row) > 3 else ()
+            records.append(TagRecord(row[0].strip(), int(row[2]), aliases))
+    return records
+
+
+class _TagIndexSnapshot:
+    """Immutable prefix index over a set of tags, rebuilt as a whole when tags change.
+
+    Tags are numbered by descending count, so the best matches of a prefix are the
+    lowest numbers in its range of the sorted keys. Each tag is keyed by its name, the
+    rest of its name from each word on, and its aliases. Every prefix matching more
+    than INDEX_SCAN_LIMIT keys, a node of the implied trie, has its best top_k tags
+    precomputed; other prefixes are ranked from their short range when asked for.
+    """
+
+    def __init__(self, records: Iterable[TagRecord], top_k: int):
+        self.records = sorted(records, key=lambda record: (-record.count, record.name))
+        entries = []
+        for tag_id, record in enumerate(self.records):
+            name = normalize_tag_query(record.name)
+            words = name.split(" ")
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), tag_id, None))
+            for alias in record.aliases:
+                entries.append((normalize_tag_query(alias), tag_id, alias))
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+        self.keys = [entry[0] for entry in entries]
+        self.ids = array("i", (entry[1] for entry in entries))
+        # Alias matched by each aliased entry, by entry position
+        self.aliases = {position: entry[2] for position, entry in enumerate(entries) if entry[2] is not None}
+        self.top_k = top_k
+        self.top: dict[str, list[tuple[int, str | None]]] = {}
+        self._precompute(0, 0, len(self.keys))
+
+    def _range(self, query: str, start: int = 0, end: int | None = None) -> tuple[int, int]:
+        """Positions of the keys starting with query."""
+        end = len(self.keys) if end is None else end
+        start = bisect.bisect_left(self.keys, query, start, end)
+        return start, bisect.bisect_left(self.keys, query + _MAX_CHAR, start, end)
+
+    def _scan(self, start: int, end: int, limit: int) -> list[tuple[int, str | None]]:
+        """The best tags among a range of keys."""
+        matches: dict[int, str | None] = {}
+        for position in range(start, end):
+            _add_match(matches, self.ids[position], self.aliases.get(position))
+        return sorted(matches.items())[:limit]
+
+    def _precompute(self, depth: int, start: int, end: int) -> list[tuple[int, str | None]]:
+        """Rank the keys in a range sharing their first depth characters, from its children's rankings."""
+        if end - start <= INDEX_SCAN_LIMIT:
+            return self._scan(start, end, self.top_k)
+
+        prefix = self.keys[start][:depth]
+        matches: dict[int, str | None] = {}
+        position = start
+        # Keys equal to the prefix sort first
+        while position < end and len(self.keys[position]) == depth:
+            _add_match(matches, self.ids[position], self.aliases.get(position))
+            position += 1
+        while position < end:
+            _, child_end = self._range(prefix + self.keys[position][depth], position, end)
+            for tag_id, alias in self._precompute(depth + 1, position, child_end):
+                _add_match(matches, tag_id, alias)
+            position = child_end
+
+        top = sorted(matches.items())[: self.top_k]
+        self.top[prefix] = top
+        return top
+
+    def lookup(self, query: str, limit: int) -> list[tuple[int, str | None]]:
+        """The best tags matching a normalized query, with the alias each matched by, if any."""
+        if limit <= self.top_k and query in self.top:
+            return self.top[query][:limit]
+        return self._scan(*self._range(query), limit)
+
+
+def _add_match(matches: dict[int, str | None], tag_id: int, alias: str | None) -> None:
+    """Record a tag matching a query; a match on the tag itself wins over one on an alias."""
+    if tag_id not in matches or alias is None:
+        matches[tag_id] = alias
+
+
+class TagIndex:
+    """Local database of tags answering autocomplete queries without NovelAI.
+
+    Lookups read an immutable snapshot, so they never wait for tags being added. Added
+    tags are indexed by a background rebuild at most every rebuild_interval seconds.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[TagRecord] = (),
+        complete: bool = False,
+        top_k: int = 20,
+        rebuild_interval: float = 5.0,
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            records: Tags to index
+            complete: Whether the tags include every tag worth suggesting, as a full
+                dump does, so that any matches answer a query
+            top_k: Suggestions precomputed for each prefix matching many tags
+            rebuild_interval: Seconds to wait after tags are added before indexing them
+        """
+        self.complete = complete
+        self.top_k = top_k
+        self.rebuild_interval = rebuild_interval
+        self._records: dict[str, TagRecord] = {}
+        # Tags learned from NovelAI's answers, which are saved separately from a dump
+        self._learned: dict[str, TagRecord] = {}
+        self._lock = threading.Lock()
+        self._rebuild_pending = False
+        # Bumped by every change to the tags, to tell whether the snapshot is current
+        self._version = 0
+        self._merge(records)
+        self._snapshot = _TagIndexSnapshot(self._records.values(), top_k)
+        self._snapshot_version = self._version
+        self._stats = {"learned": 0, "rebuilds": 0}
+
+    def __len__(self) -> int:
+        return len(self._snapshot.records)
+
+    def _merge(self, records: Iterable[TagRecord]) -> bool:
+        """Add or update tags, keeping the larger count. Caller holds the lock. Returns whether any changed."""
+        changed = False
+        for record in records:
+            existing = self._records.get(record.name)
+            if existing is not None:
+                aliases = existing.aliases + tuple(alias for alias in record.aliases if alias not in existing.aliases)
+                record = TagRecord(record.name, max(existing.count, record.count), aliases)
+                if record == existing:
+                    continue
+            self._records[record.name] = record
+            changed = True
+        if changed:
+            self._version += 1
+        return changed
+
+    def add(self, records: Iterable[TagRecord], complete: bool = False) -> None:
+        """
+        Add tags, indexing them after rebuild_interval seconds.
+
+        Args:
+            records: Tags to add; known tags keep the larger count and gain the aliases
+            complete: Whether the tags come from a full dump, see __init__
+        """
+        with self._lock:
+            self.complete = self.complete or complete
+            if self._merge(records):
+                self._schedule_rebuild()
+
+    def learn(self, suggestions: list[dict]) -> None:
+        """
+        Add the tags of a NovelAI suggest-tags answer.
+
+        Args:
+            suggestions: Tag suggestion dicts with 'tag' and 'count' keys
+        """
+        records = [TagRecord(item["tag"], int(item.get("count", 0))) for item in suggestions if item.get("tag")]
+        with self._lock:
+            for record in records:
+                known = self._learned.get(record.name)
+                if known is None or known.count < record.count:
+                    self._learned[record.name] = record
+            self._stats["learned"] = len(self._learned)
+            if self._merge(records):
+                self._schedule_rebuild()
+
+    def _schedule_rebuild(self) -> None:
+        """Start a background rebuild unless one is waiting. Caller holds the lock."""
+        if self._rebuild_pending:
+            return
+        self._rebuild_pending = True
+        timer = threading.Timer(self.rebuild_interval, self.rebuild)
+        timer.daemon = True
+        timer.start()
+
+    def rebuild(self) -> None:
+        """Index every tag added so far, unless they already are."""
+        with self._lock:
+            self._rebuild_pending = False
+            if self._version == self._snapshot_version:
+                return
+            version = self._version
+            records = list(self._records.values())
+        snapshot = _TagIndexSnapshot(records, self.top_k)
+        with self._lock:
+            # A slower rebuild started earlier must not replace a newer snapshot
+            if version > self._snapshot_version:
+                self._snapshot = snapshot
+                self._snapshot_version = version
+                self._stats["rebuilds"] += 1
+
+    def lookup(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Get the most used tags matching an incomplete tag.
+
+        Tags match as in tag_matches_query(), or when one of their aliases starts with
+        the query.
+
+        Args:
+            query: The incomplete tag query
+            limit: Most suggestions to return
+
+        Returns:
+            List of tag suggestion dicts with 'tag', 'count' and 'confidence' keys, as
+            NovelAI gives them, plus 'alias' when the tag matched by an alias. Local
+            tags have no model confidence, so it is always 1.0
+        """
+        snapshot = self._snapshot
+        suggestions = []
+        for tag_id, alias in snapshot.lookup(normalize_tag_query(query), limit):
+            record = snapshot.records[tag_id]
+            suggestion = {"tag": record.name, "count": record.count, "confidence": 1.0}
+            if alias is not None:
+                suggestion["alias"] = alias
+            suggestions.append(suggestion)
+        return suggestions
+
+    def load_learned(self, path: str) -> None:
+        """
+        Add tags learned in an earlier run, if the file exists.
+
+        Args:
+            path: JSON file written by save_learned()
+        """
+        if not os.path.exists(path):
+            return
+        records = load_tag_dump(path)
+        with self._lock:
+            self._learned.update((record.name, record) for record in records)
+            self._stats["learned"] = len(self._learned)
+            if self._merge(records):
+                self._schedule_rebuild()
+
+    def save_learned(self, path: str) -> None:
+        """
+        Write the tags learned from NovelAI to a JSON dump, for load_learned().
+
+        Args:
+            path: File to write; its directory is created if needed
+        """
+        with self._lock:
+            learned = [{"tag": record.name, "count": record.count} for record in self._learned.values()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(learned, f)
+        os.replace(temp_path, path)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Report the index's size and use since startup.
+
+        Returns:
+            Dictionary with the tags indexed, whether they are complete, and counts of
+            tags learned from NovelAI and of rebuilds
+        """
+        with self._lock:
+            return {"tags": len(self._snapshot.records), "complete": self.complete, **self._stats}
+
+
+@dataclass
+class _CachedSuggestions:
+    """Suggestions NovelAI gave for one query."""
+
+    tags: list[dict]
+    expires_at: float
+    # Fewer tags than NovelAI returns at most, so no other tag matches the query
+    complete: bool
+
+
+class TagSuggestionCache:
+    """Least recently used cache of tag suggestions, keyed by model, query and language.
+
+    With a local index, English queries are answered by it when it has a full page of
+    matches, or any matches if it is complete, and NovelAI is only asked otherwise.
+    NovelAI's answers are learned by the index. If NovelAI fails, or failed less than
+    upstream_cooldown seconds ago, whatever matches the index has are returned instead.
+
+    A query with no answer of its own is answered from the longest cached prefix of it
+    whose answer was complete, keeping the tags that match the longer query. Concurrent
+    misses for the same key wait for the first one's upstream request instead of
+    sending their own. Errors are not cached.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str, str], list[dict]],
+        max_entries: int = 2048,
+        ttl: float = 3600.0,
+        result_limit: int = 10,
+        index: TagIndex | None = None,
+        upstream_cooldown: float = 30.0,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            fetch: Called with model, query and language to ask NovelAI for suggestions
+            max_entries: Answers to keep (0 disables the cache, but identical
+                concurrent queries are still coalesced)
+            ttl: Seconds an answer is reused for
+            result_limit: Most suggestions NovelAI returns for one query; answers with
+                fewer hold every matching tag
+            index: Local tags to answer from before asking NovelAI
+            upstream_cooldown: Seconds after a NovelAI failure during which queries the
+                index has matches for are answered by it alone
+        """
+        self.fetch = fetch
+        self.index = index
+        self.upstream_cooldown = upstream_cooldown
+        self._upstream_failed_at: float | None = None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.result_limit = result_limit
+        self._entries: OrderedDict[tuple[str, str, str], _CachedSuggestions] = OrderedDict()
+        self._in_flight: dict[tuple[str, str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "prefix_hits": 0,
+            "index_hits": 0,
+            "index_fallbacks": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "errors": 0,
+        }
+
+    def _lookup(self, model: str, query: str, lang: str) -> list[dict] | None:
+        """Answer a query from the cache, if possible. Caller holds the lock."""
+        now = time.monotonic()
+        # Walk from the query itself towards its shortest prefix; only the query's own
+        # answer is used if incomplete
+        for length in range(len(query), 0, -1):
+            key = (model, query[:length], lang)
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry.expires_at <= now:
+                del self._entries[key]
+                continue
+            if length == len(query):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry.tags
+            if entry.complete:
+                self._entries.move_to_end(key)
+                self._stats["prefix_hits"] += 1
+                return [tag for tag in entry.tags if tag_matches_query(tag.get("tag", ""), query)]
+        return None
+
+    def _store(self, key: tuple[str, str, str], tags: list[dict]) -> None:
+        """Keep an upstream answer, evicting the least recently used. Caller holds the lock."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = _CachedSuggestions(
+            tags=tags,
+            expires_at=time.monotonic() + self.ttl,
+            complete=len(tags) < self.result_limit,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def suggest(self, model: str, query: str, lang: str = "en") -> list[dict]:
+        """
+        Get tag suggestions for an incomplete tag, from the cache or from NovelAI.
+
+        Args:
+            model: The image model (e.g. nai-diffusion-4-5-full)
+            query: The incomplete tag query
+            lang: Language of the query
+
+        Returns:
+            List of tag suggestion dicts with 'tag', 'count', 'confidence' keys; callers
+            must not modify it
+
+        Raises:
+            Whatever fetch raises, for this call and any identical ones waiting on it,
+            unless the index has matches
+        """
+        # The local tags are English
+        local = self.index.lookup(query, self.result_limit) if self.index is not None and lang == "en" else []
+        if local:
+            cooling_down = (
+                self._upstream_failed_at is not None
+                and time.monotonic() - self._upstream_failed_at < self.upstream_cooldown
+            )
+            if self.index.complete or len(local) >= self.result_limit or cooling_down:
+                with self._lock:
+                    self._stats["index_hits"] += 1
+                return local
+
+        try:
+            return self._suggest_upstream(model, query, lang)
+        except Exception:
+            if not local:
+                raise
+            with self._lock:
+                self._stats["index_fallbacks"] += 1
+            return local
+
+    def _suggest_upstream(self, model: str, query: str, lang: str) -> list[dict]:
+        """Get NovelAI's suggestions for a query, from the cache or a shared request."""
+        key = (model, query, lang)
+        with self._lock:
+            cached = self._lookup(model, query, lang)
+            if cached is not None:
+                return cached
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self._stats["misses"] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            tags = self.fetch(model, query, lang)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+                self._stats["errors"] += 1
+                self._upstream_failed_at = time.monotonic()
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            self._store(key, tags)
+            self._upstream_failed_at = None
+        future.set_result(tags)
+        if self.index is not None and lang == "en":
+            self.index.learn(tags)
+        return tags
+
+    def clear(self) -> None:
+        """Forget every cached answer."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Report how queries have been answered since startup.
+
+        Returns:
+            Dictionary with the answers cached, and counts of queries answered by their
+            own cached answer, by a prefix's, by the local index, by the index after
+            NovelAI failed, by NovelAI, by waiting on an identical query, and of NovelAI
+            requests that failed, plus the index's stats if there is one
+        """
+        with self._lock:
+            stats = {"entries": len(self._entries), **self._stats}
+        if self.index is not None:
+            stats["index"] = self.index.get_stats()
+        return stats
@@ -10,8 +10,8 @@ import os
 import tempfile
 from unittest.mock import Mock, patch
 
-# Mock OpenAI client before importing app to avoid initialization errors
-with patch('openai.OpenAI'):
+# Mock OpenAI clients before importing app to avoid initialization errors
+with patch('openai.OpenAI'), patch('openai.AsyncOpenAI'):
     from app import app
 
 
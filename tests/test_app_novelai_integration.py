@@ -1,13 +1,20 @@
 """
 Tests for the refactored generate_novelai_image function integration.
 
-Tests verify that the function correctly uses the NovelAIClient while
+Tests verify that the function correctly uses the shared NovelAIClient while
 maintaining backward compatibility with the existing function signature.
 """
 
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
 import pytest
 from unittest.mock import Mock, patch
+from PIL import Image as PILImage
 
+import app as app_module
 from app import generate_novelai_image, GeneratedImageData
 from novelai_client import NovelAIAPIError, NovelAIClientError
 
@@ -18,17 +25,15 @@ class TestGenerateNovelAIImageRefactored:
     @patch("app.NOVELAI_API_KEY", "test-api-key")
     @patch("app.make_prompt_dynamic")
     @patch("app.process_image_response")
-    @patch("app.NovelAIClient")
+    @patch("app.novelai_client")
     def test_generate_novelai_image_basic(
-        self, mock_client_class, mock_process_image, mock_make_prompt
+        self, mock_client, mock_process_image, mock_make_prompt
     ):
         """Test basic image generation using the new client."""
         # Setup mocks
         mock_make_prompt.return_value = "processed prompt"
 
-        mock_client = Mock()
-        mock_client_class.return_value = mock_client
-        mock_client.generate_image.return_value = b"fake image data"
+        mock_client.generate_images.return_value = [b"fake image data"]
 
         mock_saved_data = Mock()
         mock_saved_data.local_image_path = "/path/to/image.png"
@@ -47,11 +52,8 @@ class TestGenerateNovelAIImageRefactored:
                 seed=42,
             )
 
-        # Verify client was created with correct API key
-        mock_client_class.assert_called_once_with("test-api-key")
-
-        # Verify client.generate_image was called with correct parameters
-        mock_client.generate_image.assert_called_once_with(
+        # Verify client.generate_images was called with correct parameters
+        mock_client.generate_images.assert_called_once_with(
             prompt="processed prompt",
             negative_prompt="avoid this",
             width=512,
@@ -72,10 +74,10 @@ class TestGenerateNovelAIImageRefactored:
     @patch("app.make_prompt_dynamic")
     @patch("app.make_character_prompts_dynamic")
     @patch("app.process_image_response")
-    @patch("app.NovelAIClient")
+    @patch("app.novelai_client")
     def test_generate_novelai_image_with_character_prompts(
         self,
-        mock_client_class,
+        mock_client,
         mock_process_image,
         mock_make_char_prompts,
         mock_make_prompt,
@@ -88,9 +90,7 @@ class TestGenerateNovelAIImageRefactored:
             {"positive": "processed char 2", "negative": ""},
         ]
 
-        mock_client = Mock()
-        mock_client_class.return_value = mock_client
-        mock_client.generate_image.return_value = b"fake image data"
+        mock_client.generate_images.return_value = [b"fake image data"]
 
         mock_saved_data = Mock()
         mock_saved_data.local_image_path = "/path/to/image.png"
@@ -120,7 +120,7 @@ class TestGenerateNovelAIImageRefactored:
         )
 
         # Verify client was called with processed character prompts
-        mock_client.generate_image.assert_called_once_with(
+        mock_client.generate_images.assert_called_once_with(
             prompt="processed prompt",
             negative_prompt=None,
             width=1024,
@@ -147,17 +147,15 @@ class TestGenerateNovelAIImageRefactored:
     @patch("app.NOVELAI_API_KEY", "test-api-key")
     @patch("app.make_prompt_dynamic")
     @patch("app.process_image_response")
-    @patch("app.NovelAIClient")
+    @patch("app.novelai_client")
     def test_generate_novelai_image_with_upscale(
-        self, mock_client_class, mock_process_image, mock_make_prompt
+        self, mock_client, mock_process_image, mock_make_prompt
     ):
         """Test image generation with upscaling enabled."""
         # Setup mocks
         mock_make_prompt.return_value = "processed prompt"
 
-        mock_client = Mock()
-        mock_client_class.return_value = mock_client
-        mock_client.generate_image.return_value = b"fake image data"
+        mock_client.generate_images.return_value = [b"fake image data"]
         mock_client.upscale_image.return_value = b"upscaled image data"
 
         mock_saved_data = Mock()
@@ -212,17 +210,15 @@ class TestGenerateNovelAIImageRefactored:
 
     @patch("app.NOVELAI_API_KEY", "test-api-key")
     @patch("app.make_prompt_dynamic")
-    @patch("app.NovelAIClient")
+    @patch("app.novelai_client")
     def test_generate_novelai_image_api_error(
-        self, mock_client_class, mock_make_prompt
+        self, mock_client, mock_make_prompt
     ):
         """Test handling of NovelAI API errors."""
         # Setup mocks
         mock_make_prompt.return_value = "processed prompt"
 
-        mock_client = Mock()
-        mock_client_class.return_value = mock_client
-        mock_client.generate_image.side_effect = NovelAIAPIError(400, "Bad request")
+        mock_client.generate_images.side_effect = NovelAIAPIError(400, "Bad request")
 
         with patch("app.app") as mock_app:
             mock_app.static_folder = "/test/static"
@@ -240,17 +236,15 @@ class TestGenerateNovelAIImageRefactored:
 
     @patch("app.NOVELAI_API_KEY", "test-api-key")
     @patch("app.make_prompt_dynamic")
-    @patch("app.NovelAIClient")
+    @patch("app.novelai_client")
     def test_generate_novelai_image_client_error(
-        self, mock_client_class, mock_make_prompt
+        self, mock_client, mock_make_prompt
     ):
         """Test handling of NovelAI client errors."""
         # Setup mocks
         mock_make_prompt.return_value = "processed prompt"
 
-        mock_client = Mock()
-        mock_client_class.return_value = mock_client
-        mock_client.generate_image.side_effect = NovelAIClientError("Network error")
+        mock_client.generate_images.side_effect = NovelAIClientError("Network error")
 
         with patch("app.app") as mock_app:
             mock_app.static_folder = "/test/static"
@@ -294,3 +288,88 @@ class TestGenerateNovelAIImageRefactored:
                     size=(512, 512),
                     character_prompts=character_prompts,
                 )
+
+
+def png_bytes(color: str) -> bytes:
+    """A small PNG image of one color."""
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestNovelAIMultiSample:
+    """Test cases for generating and saving several samples in one request."""
+
+    @patch("app.NOVELAI_API_KEY", "test-api-key")
+    @patch("app.make_prompt_dynamic", return_value="processed prompt")
+    @patch("app.novelai_client")
+    def test_samples_saved_with_consecutive_seeds(self, mock_client, mock_make_prompt, tmp_path, monkeypatch):
+        """Test that every sample is saved under its own name with its own seed."""
+        monkeypatch.setattr(app_module.app, "static_folder", str(tmp_path))
+        mock_client.generate_images.return_value = [png_bytes(color) for color in ("red", "green", "blue")]
+
+        result = generate_novelai_image(
+            prompt="test prompt",
+            negative_prompt=None,
+            username="testuser",
+            size=(8, 8),
+            seed=100,
+            n_samples=3,
+        )
+
+        assert mock_client.generate_images.call_args.kwargs["n_samples"] == 3
+        assert [sample.metadata["seed"] for sample in result.samples] == ["100", "101", "102"]
+        assert result.image_name == result.samples[0].image_name
+        assert len({sample.image_name for sample in result.samples}) == 3
+        for sample, color in zip(result.samples, [(255, 0, 0), (0, 128, 0), (0, 0, 255)]):
+            with PILImage.open(tmp_path / "images" / "testuser" / sample.image_name) as image:
+                assert image.getpixel((0, 0)) == color
+                assert image.text["seed"] == sample.metadata["seed"]
+
+    def test_image_endpoint_returns_batch(self, client):
+        """Test that /image returns every sample of the generation."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+        samples = [
+            GeneratedImageData(f"static/images/testuser/{index}.png", "revised", "prompt", f"{index}.png", {"seed": str(7 + index)})
+            for index in range(2)
+        ]
+        generated_data = replace(samples[0], samples=samples)
+
+        with patch("app.generate_novelai_image", return_value=generated_data) as mock_generate:
+            response = client.post(
+                "/image",
+                data={"prompt": "prompt", "provider": "novelai", "operation": "generate", "seed": "7", "n_samples": "2"},
+            )
+
+        assert mock_generate.call_args.kwargs["n_samples"] == 2
+        assert response.json["image_name"] == "0.png"
+        assert [image["image_name"] for image in response.json["images"]] == ["0.png", "1.png"]
+        assert [image["metadata"]["seed"] for image in response.json["images"]] == ["7", "8"]
+
+    def test_reservations_do_not_overlap_before_images_are_written(self, tmp_path):
+        """Test that indexes reserved for unwritten images are not handed out again."""
+        (tmp_path / "images" / "reserveuser").mkdir(parents=True)
+
+        first = app_module.reserve_image_indexes("reserveuser", str(tmp_path), 3)
+        second = app_module.reserve_image_indexes("reserveuser", str(tmp_path), 2)
+
+        assert (first, second) == (0, 3)
+
+    def test_concurrent_requests_keep_every_image(self, tmp_path, monkeypatch):
+        """Test that concurrent multi-sample saves for one user never share a file name."""
+        monkeypatch.setattr(app_module.app, "static_folder", str(tmp_path))
+        start = threading.Barrier(4)
+
+        def save(color: str) -> list[str]:
+            start.wait()
+            result = app_module.save_generated_images(
+                [png_bytes(color)] * 3, "prompt", "revised", "concurrentuser", {}, seed=1
+            )
+            return [sample.image_name for sample in result.samples]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            names = [name for batch in executor.map(save, ["red", "green", "blue", "white"]) for name in batch]
+
+        assert len(set(names)) == 12
+        assert len(list((tmp_path / "images" / "concurrentuser").glob("*.png"))) == 12
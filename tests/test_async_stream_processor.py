@@ -0,0 +1,226 @@
+"""Tests for the asyncio chat engine's stream processor."""
+
+import asyncio
+import json
+import threading
+from queue import Queue
+from types import SimpleNamespace
+
+from app import AsyncStreamEventProcessor, StreamEventProcessor
+from tool_framework import ToolExecutor, ToolRegistry
+from tools.calculator_tool import CalculatorTool
+
+
+def make_event(event_type: str, **fields) -> SimpleNamespace:
+    """Create a fake Responses API stream event."""
+    return SimpleNamespace(type=event_type, **fields)
+
+
+def tool_call_events() -> list[SimpleNamespace]:
+    """Events for a response that calls the calculator and then stops."""
+    return [
+        make_event("response.created", response=SimpleNamespace(id="resp_1")),
+        make_event(
+            "response.output_item.added",
+            item=SimpleNamespace(
+                type="function_call",
+                id="fc_1",
+                call_id="call_1",
+                name="calculator",
+                arguments="",
+                status="in_progress",
+            ),
+        ),
+        make_event("response.function_call_arguments.delta", item_id="fc_1", delta='{"expression": '),
+        make_event(
+            "response.function_call_arguments.done",
+            item_id="fc_1",
+            arguments='{"expression": "6 * 7"}',
+        ),
+    ]
+
+
+def continuation_events() -> list[SimpleNamespace]:
+    """Events for the continuation that answers with the tool result."""
+    return [
+        make_event("response.created", response=SimpleNamespace(id="resp_2")),
+        make_event("response.output_text.delta", delta="The answer "),
+        make_event("response.output_text.delta", delta="is 42."),
+    ]
+
+
+class FakeResponses:
+    """Synchronous responses API that replays the continuation events."""
+
+    def __init__(self):
+        self.calls: list[dict] = []
+
+    def create(self, **params):
+        self.calls.append(params)
+        return iter(continuation_events())
+
+
+class FakeAsyncResponses(FakeResponses):
+    """Async responses API that replays the continuation events."""
+
+    async def create(self, **params):
+        self.calls.append(params)
+        return aiter_events(continuation_events())
+
+
+async def aiter_events(events: list[SimpleNamespace]):
+    """Yield events from an async iterator, like the AsyncOpenAI stream."""
+    for event in events:
+        await asyncio.sleep(0)
+        yield event
+
+
+def make_processor(processor_class, responses: FakeResponses, **kwargs):
+    """Create a processor with a calculator-only tool executor and a fake client."""
+    registry = ToolRegistry()
+    registry.register_tool(CalculatorTool())
+    queue: Queue = Queue()
+    processor = processor_class(
+        queue,
+        tool_executor=ToolExecutor(registry),
+        username="testuser",
+        conversation_id="conv_async_parity",
+        openai_client=SimpleNamespace(responses=responses),
+        tools=[{"type": "function", "name": "calculator"}],
+        **kwargs,
+    )
+    return processor, queue
+
+
+def drain(queue: Queue) -> list[dict]:
+    """Decode every event the processor queued."""
+    events = []
+    while not queue.empty():
+        events.append(json.loads(queue.get()))
+    return events
+
+
+class TestAsyncStreamEventProcessor:
+    """Tests that the async processor matches the synchronous one."""
+
+    def test_events_match_sync_processor(self):
+        """Test that a tool call and continuation produce the same frontend events."""
+        sync_responses = FakeResponses()
+        sync_processor, sync_queue = make_processor(StreamEventProcessor, sync_responses)
+        sync_processor.process_stream(iter(tool_call_events()))
+
+        async_responses = FakeAsyncResponses()
+        async_processor, async_queue = make_processor(AsyncStreamEventProcessor, async_responses)
+        asyncio.run(async_processor.process_stream_async(aiter_events(tool_call_events())))
+
+        sync_events = drain(sync_queue)
+        assert drain(async_queue) == sync_events
+        assert [event["type"] for event in sync_events if event["type"].startswith("tool_")] == [
+            "tool_call_started",
+            "tool_call_completed",
+        ]
+        assert async_processor.accumulated_text == sync_processor.accumulated_text == "The answer is 42."
+        assert async_processor.reasoning_data == sync_processor.reasoning_data
+
+    def test_function_outputs_submitted_once(self):
+        """Test that the tool result is submitted to the async client in one continuation."""
+        responses = FakeAsyncResponses()
+        processor, _ = make_processor(AsyncStreamEventProcessor, responses)
+
+        asyncio.run(processor.process_stream_async(aiter_events(tool_call_events())))
+
+        assert len(responses.calls) == 1
+        params = responses.calls[0]
+        assert params["previous_response_id"] == "resp_1"
+        output = params["input"][0]
+        assert output["type"] == "function_call_output"
+        assert output["call_id"] == "call_1"
+        assert json.loads(output["output"])["result"] == 42
+        assert processor.pending_function_outputs == []
+
+    def test_stream_error_reported(self):
+        """Test that an exception from the stream becomes an error event, like the sync path."""
+
+        async def failing_stream():
+            yield make_event("response.created", response=SimpleNamespace(id="resp_1"))
+            raise TimeoutError("stalled")
+
+        processor, queue = make_processor(AsyncStreamEventProcessor, FakeAsyncResponses())
+        asyncio.run(processor.process_stream_async(failing_stream()))
+
+        events = drain(queue)
+        assert events[-1]["type"] == "error"
+        assert events[-1]["error_code"] == "timeout_error"
+
+    def test_continuation_keeps_prompt_prefix(self):
+        """Test that continuations send the same tools, instructions and prompt cache key."""
+        responses = FakeAsyncResponses()
+        processor, _ = make_processor(
+            AsyncStreamEventProcessor,
+            responses,
+            instructions="Be brief.\n\nKnowledge cutoff: 2024-09-30. Current date: 2025-01-01.",
+            prompt_cache_key="preset:default",
+        )
+
+        asyncio.run(processor.process_stream_async(aiter_events(tool_call_events())))
+
+        params = responses.calls[0]
+        assert params["tools"] is processor.tools
+        assert params["instructions"] == processor.instructions
+        assert params["prompt_cache_key"] == "preset:default"
+
+    def test_checkpoint_written_before_processing_returns(self, monkeypatch):
+        """Test that a checkpoint still being written is waited for, so it cannot land after the response is saved."""
+        monkeypatch.setattr("app.CHAT_CHECKPOINT_INTERVAL_SECONDS", 0)
+        write_started = threading.Event()
+        release_write = threading.Event()
+        checkpoints = []
+
+        def slow_checkpoint(text: str) -> None:
+            write_started.set()
+            release_write.wait(timeout=2)
+            checkpoints.append(text)
+
+        async def stream():
+            yield make_event("response.created", response=SimpleNamespace(id="resp_1"))
+            yield make_event("response.output_text.delta", delta="Partial")
+            yield make_event("response.output_text.delta", delta=" answer")
+
+        async def run():
+            processor, _ = make_processor(
+                AsyncStreamEventProcessor, FakeAsyncResponses(), checkpoint_callback=slow_checkpoint
+            )
+            task = asyncio.ensure_future(processor.process_stream_async(stream()))
+            await asyncio.to_thread(write_started.wait, 2)
+            await asyncio.sleep(0.05)
+            assert not task.done()
+            release_write.set()
+            await task
+
+        asyncio.run(run())
+
+        # The second delta arrived while the first write was running, so it was not written
+        assert checkpoints == ["Partial"]
+
+    def test_usage_summed_and_logged(self, caplog):
+        """Test that token counts are summed over the response and continuations, with cached tokens logged."""
+        processor, _ = make_processor(StreamEventProcessor, FakeResponses(), prompt_cache_key="preset:default")
+
+        for input_tokens, cached_tokens in ((1200, 1024), (1500, 1280)):
+            usage = SimpleNamespace(
+                input_tokens=input_tokens,
+                output_tokens=50,
+                input_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+            )
+            with caplog.at_level("INFO"):
+                processor._handle_stream_event(
+                    make_event("response.completed", response=SimpleNamespace(id="resp_1", usage=usage))
+                )
+
+        assert processor.usage == {
+            "input_tokens": 2700,
+            "cached_tokens": 2304,
+            "output_tokens": 100,
+            "reasoning_tokens": 0,
+        }
+        assert "cached_tokens=1280 (85%)" in caplog.text
@@ -6,18 +6,22 @@ Tests cover:
 - Edge cases: division by zero, very large numbers, empty expressions
 - Storage operations: history tracking, history limit
 - Error handling: proper error messages for all failure modes
+- Bounded evaluation: oversized powers and products fail fast, sandbox limits
+- Batches: several calculations per call with named intermediate results
 """
 
 import ast
 import os
 import tempfile
+import threading
 import shutil
+import time
 from unittest.mock import Mock
 
 import pytest
 
 from tools.calculator_tool import CalculatorTool
-from tool_framework import ToolStorage
+from tool_framework import EXECUTION_PROCESS, ToolExecutor, ToolRegistry, ToolStorage
 
 
 @pytest.fixture
@@ -34,6 +38,16 @@ def calculator():
     return CalculatorTool()
 
 
+@pytest.fixture(scope='module')
+def sandboxed_executor():
+    """Create a ToolExecutor running a sandboxed calculator, shared by the tests in this module."""
+    registry = ToolRegistry()
+    registry.register_tool(CalculatorTool(sandbox_workers=1, timeout=10.0))
+    executor = ToolExecutor(registry, result_cache_size=0)
+    yield executor
+    executor.close()
+
+
 @pytest.fixture
 def storage(temp_storage_dir):
     """Create a ToolStorage instance for testing."""
@@ -418,6 +432,20 @@ class TestStorageOperations:
         # Oldest should be 50 + 1 = 51
         assert history[0]['result'] == 51
     
+    def test_concurrent_calculations_all_stored(self, calculator, storage):
+        """Test that calculations of concurrent tool calls are all kept in history."""
+        threads = [
+            threading.Thread(target=calculator.execute, args=({'expression': f'{i} * 2'}, storage))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        history = storage.get('history', [])
+        assert sorted(entry['result'] for entry in history) == [i * 2 for i in range(20)]
+    
     def test_failed_calculation_not_stored(self, calculator, storage):
         """Test that failed calculations are not stored in history."""
         calculator.execute({'expression': '1 / 0'}, storage)
@@ -541,3 +569,177 @@ class TestErrorMessages:
         result = calculator.execute({'expression': 'bad expression'}, storage)
         assert result['success'] is False
         assert result['expression'] == 'bad expression'
+
+
+class TestBoundedEvaluation:
+    """Test that expressions with huge intermediate results fail fast."""
+
+    @pytest.mark.parametrize('expression', [
+        '9 ** 9 ** 9',
+        'pow(10, 10 ** 8)',
+        '2 ** 100000',
+        '(10 ** 1000) * (10 ** 1000)',
+        '(-7) ** 99999',
+    ])
+    def test_oversized_integer_rejected(self, calculator, storage, expression):
+        """Test that results over the integer size limit are rejected before computing them."""
+        start = time.perf_counter()
+        result = calculator.execute({'expression': expression}, storage)
+
+        assert time.perf_counter() - start < 0.1
+        assert result['success'] is False
+        assert 'too large' in result['error'].lower()
+        assert result['expression'] == expression
+
+    @pytest.mark.parametrize('expression', ["[0] * 10 ** 9", "'a' * 10 ** 9"])
+    def test_sequence_repetition_rejected(self, calculator, storage, expression):
+        """Test that operators only accept numbers, so lists and strings can't be repeated."""
+        result = calculator.execute({'expression': expression}, storage)
+        assert result['success'] is False
+        assert 'unsupported operand' in result['error'].lower()
+
+    def test_huge_round_digits_rejected(self, calculator, storage):
+        """Test that round() can't be used to build a huge power of ten."""
+        result = calculator.execute({'expression': 'round(5, -10 ** 8)'}, storage)
+        assert result['success'] is False
+        assert 'round()' in result['error']
+
+    def test_large_results_within_limit(self, calculator, storage):
+        """Test that powers, products and modular powers under the limit still work."""
+        assert calculator.execute({'expression': '2 ** 4000'}, storage)['result'] == 2 ** 4000
+        assert calculator.execute({'expression': '(10 ** 600) * (10 ** 600)'}, storage)['result'] == 10 ** 1200
+        assert calculator.execute({'expression': 'pow(3, 10 ** 9, 7)'}, storage)['result'] == pow(3, 10 ** 9, 7)
+        assert calculator.execute({'expression': '2.0 ** 10000'}, storage)['success'] is False
+
+    def test_simple_expression_fast(self, calculator, storage):
+        """Test that ordinary expressions stay well under a millisecond."""
+        calculator.execute({'expression': '(2 + 3) * 4 - sqrt(16)'}, storage)
+        start = time.perf_counter()
+        for _ in range(100):
+            calculator.evaluate_expression('(2 + 3) * 4 - sqrt(16)')
+        assert (time.perf_counter() - start) / 100 < 0.001
+
+
+class TestCalculatorSandbox:
+    """Test running the calculator in sandboxed worker processes."""
+
+    def test_sandbox_profile(self):
+        """Test that a sandboxed calculator asks for worker processes with its limits."""
+        profile = CalculatorTool(sandbox_workers=3, timeout=1.5, memory_limit_mb=128).execution_profile
+
+        assert profile.mode == EXECUTION_PROCESS
+        assert (profile.timeout, profile.max_concurrency, profile.memory_limit_mb) == (1.5, 3, 128)
+        assert CalculatorTool().execution_profile.mode != EXECUTION_PROCESS
+
+    def test_results_match_in_process(self, sandboxed_executor, storage, temp_storage_dir, monkeypatch):
+        """Test that the sandboxed calculator returns the same results and errors."""
+        monkeypatch.chdir(temp_storage_dir)
+        in_process = CalculatorTool()
+
+        for expression in ['2 + 3 * 4', 'sqrt(16) + 1e308 * 10', '9 ** 9 ** 9', '10 / 0', '2 +', 'os.system("ls")']:
+            parameters = {'expression': expression}
+            assert sandboxed_executor.execute_tool_call('calculator', parameters, 'testuser', 'conv_sandbox') == (
+                in_process.execute(parameters, storage)
+            )
+        assert 'calculator' in sandboxed_executor._process_pools
+
+class TestBatchCalculations:
+    """Test evaluating several calculations in one call."""
+
+    def test_definition_advertises_batches(self, calculator):
+        """Test that the strict schema offers the batch form alongside a single expression."""
+        params = calculator.get_openai_tool_definition()['parameters']
+
+        assert params['required'] == ['expression', 'calculations']
+        items = params['properties']['calculations']['items']
+        assert items['required'] == ['name', 'expression']
+        assert items['additionalProperties'] is False
+
+    def test_named_intermediates(self, calculator, storage):
+        """Test that later expressions can use the named results of earlier ones."""
+        result = calculator.execute({'expression': None, 'calculations': [
+            {'name': 'subtotal', 'expression': '3 * 20'},
+            {'name': 'tax', 'expression': 'subtotal * 0.5'},
+            {'name': None, 'expression': 'round(subtotal + tax, 1)'},
+        ]}, storage)
+
+        assert result['success'] is True
+        assert [entry['result'] for entry in result['results']] == [60, 30.0, 90.0]
+        assert result['results'][0] == {
+            'name': 'subtotal', 'expression': '3 * 20', 'success': True, 'result': 60
+        }
+
+    def test_failure_reported_per_calculation(self, calculator, storage):
+        """Test that one failure doesn't stop the batch and names from it are undefined."""
+        result = calculator.execute({'expression': None, 'calculations': [
+            {'name': 'a', 'expression': '1 / 0'},
+            {'name': 'b', 'expression': '2 + 2'},
+            {'name': None, 'expression': 'a + b'},
+        ]}, storage)
+
+        assert result['success'] is False
+        assert result['error'] == '2 of 3 calculations failed'
+        a, b, total = result['results']
+        assert a['error'] == 'Division by zero'
+        assert b['result'] == 4
+        assert "'a' is not defined" in total['error']
+
+    def test_batch_stored_in_history(self, calculator, storage):
+        """Test that successful batch calculations are added to history in order."""
+        calculator.execute({'expression': None, 'calculations': [
+            {'name': 'x', 'expression': '2 ** 10'},
+            {'name': None, 'expression': 'x / 0'},
+            {'name': None, 'expression': 'x - 24'},
+        ]}, storage)
+
+        history = storage.get('history')
+        assert [(entry['expression'], entry['result']) for entry in history] == [
+            ('2 ** 10', 1024), ('x - 24', 1000)
+        ]
+
+    @pytest.mark.parametrize('calculations, message', [
+        ([], 'non-empty'),
+        ([{'name': 'x', 'expression': '1'}] * 26, 'too many'),
+        ([{'name': 'x', 'expression': '1'}, {'name': 'x', 'expression': '2'}], 'already used'),
+        ([{'name': 'sqrt', 'expression': '1'}], 'function name'),
+        ([{'name': '2x', 'expression': '1'}], 'not a valid identifier'),
+        ([{'name': None, 'expression': ' '}], 'empty'),
+    ])
+    def test_invalid_batch_rejected(self, calculator, storage, calculations, message):
+        """Test that malformed batches are rejected before anything is evaluated."""
+        result = calculator.execute({'expression': None, 'calculations': calculations}, storage)
+
+        assert result['success'] is False
+        assert message in result['error'].lower()
+        assert storage.get('history') is None
+
+    def test_expression_and_calculations_exclusive(self, calculator):
+        """Test that exactly one of expression and calculations must be given."""
+        both = {'expression': '1', 'calculations': [{'name': None, 'expression': '2'}]}
+        neither = {'expression': None, 'calculations': None}
+
+        assert any('not both' in error for error in calculator.validate_parameters(both))
+        assert calculator.validate_parameters(neither)
+
+    def test_batch_in_sandbox(self, sandboxed_executor, temp_storage_dir, monkeypatch):
+        """Test that batches run in sandbox workers and their history is kept."""
+        monkeypatch.chdir(temp_storage_dir)
+        result = sandboxed_executor.execute_tool_call('calculator', {'expression': None, 'calculations': [
+            {'name': 'side', 'expression': 'sqrt(49)'},
+            {'name': None, 'expression': 'side ** 2'},
+        ]}, 'testuser', 'conv_sandbox_batch')
+
+        assert [entry['result'] for entry in result['results']] == [7.0, 49.0]
+        history = ToolStorage('testuser', 'conv_sandbox_batch', 'calculator').get('history')
+        assert [entry['expression'] for entry in history] == ['sqrt(49)', 'side ** 2']
+
+    def test_batch_display(self, calculator, storage):
+        """Test that batches are shown one calculation per line."""
+        parameters = {'expression': None, 'calculations': [
+            {'name': 'x', 'expression': '6 * 7'},
+            {'name': None, 'expression': 'x / 0'},
+        ]}
+        result = calculator.execute(parameters, storage)
+
+        assert calculator.format_input_for_display(parameters) == 'x = 6 * 7\nx / 0'
+        assert calculator.format_output_for_display(result) == 'x = 42\nx / 0 = Error: Division by zero'
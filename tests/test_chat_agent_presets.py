@@ -100,9 +100,48 @@ class TestChatAgentPresets:
         })
         
         # Verify the request was processed (should return streaming response)
+        assert response.status_code == 200
+        assert response.content_type == 'text/event-stream; charset=utf-8'
+
+    def test_chat_endpoint_legacy_stream_protocol(self, client):
+        """Test chat endpoint still serves the legacy text/plain protocol when requested."""
+        with client.session_transaction() as sess:
+            sess['username'] = 'testuser'
+
+        response = client.post('/chat', json={
+            'user_input': 'Hello, test message',
+            'stream_protocol': 'legacy'
+        })
+
         assert response.status_code == 200
         assert response.content_type == 'text/plain; charset=utf-8'
 
+    def test_chat_endpoint_rejects_unknown_stream_protocol(self, client):
+        """Test chat endpoint rejects an unknown stream protocol."""
+        with client.session_transaction() as sess:
+            sess['username'] = 'testuser'
+
+        response = client.post('/chat', json={
+            'user_input': 'Hello, test message',
+            'stream_protocol': 'carrier-pigeon'
+        })
+
+        assert response.status_code == 400
+
+    def test_chat_endpoint_detach_returns_stream_ids(self, client):
+        """Test chat endpoint starts the response and returns ids for the stream endpoint when detached."""
+        with client.session_transaction() as sess:
+            sess['username'] = 'testuser'
+
+        response = client.post('/chat', json={
+            'user_input': 'Hello, test message',
+            'detach': True
+        })
+
+        assert response.status_code == 202
+        assert response.json['threadId']
+        assert response.json['streamId']
+
     def test_chat_endpoint_accepts_nonexistent_agent_preset(self, client):
         """Test chat endpoint handles non-existent agent preset gracefully."""
         # Set up session
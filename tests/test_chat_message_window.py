@@ -0,0 +1,124 @@
+"""Tests for loading long conversations a window of messages at a time."""
+
+import json
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from app import ConversationManager
+
+
+@pytest.fixture
+def conversation_manager():
+    """Create a ConversationManager backed by a temporary directory."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield ConversationManager(temp_dir)
+
+
+def create_conversation(conversation_manager, message_count: int) -> str:
+    """Create a conversation of alternating user and assistant messages numbered from 0."""
+    conversation_id = conversation_manager.create_conversation("testuser", "Long Chat")
+    for index in range(message_count):
+        role = "user" if index % 2 == 0 else "assistant"
+        conversation_manager.add_message("testuser", conversation_id, role, f"message {index}")
+    return conversation_id
+
+
+class TestMessageWindow:
+    """Tests for ConversationManager.get_message_window()."""
+
+    def test_last_messages(self, conversation_manager):
+        """Test that a limit returns the newest messages and the index of the first one."""
+        conversation_id = create_conversation(conversation_manager, 10)
+
+        messages, first_index, total = conversation_manager.get_message_window("testuser", conversation_id, 3)
+
+        assert [message["text"] for message in messages] == ["message 7", "message 8", "message 9"]
+        assert (first_index, total) == (7, 10)
+
+    def test_page_before_cursor(self, conversation_manager):
+        """Test that before pages back through older messages until the start of the conversation."""
+        conversation_id = create_conversation(conversation_manager, 10)
+
+        messages, first_index, _ = conversation_manager.get_message_window("testuser", conversation_id, 4, before=7)
+        assert [message["text"] for message in messages] == ["message 3", "message 4", "message 5", "message 6"]
+        assert first_index == 3
+
+        messages, first_index, _ = conversation_manager.get_message_window("testuser", conversation_id, 4, before=3)
+        assert [message["text"] for message in messages] == ["message 0", "message 1", "message 2"]
+        assert first_index == 0
+
+    def test_no_limit_returns_everything(self, conversation_manager):
+        """Test that without a limit the whole conversation is returned, as get_message_list() does."""
+        conversation_id = create_conversation(conversation_manager, 5)
+
+        messages, first_index, total = conversation_manager.get_message_window("testuser", conversation_id)
+
+        assert messages == conversation_manager.get_message_list("testuser", conversation_id)
+        assert (first_index, total) == (0, 5)
+
+    def test_unknown_conversation(self, conversation_manager):
+        """Test that an unknown conversation has an empty window."""
+        assert conversation_manager.get_message_window("testuser", "missing", 5) == ([], 0, 0)
+
+
+class TestChatEndpointMessageWindow:
+    """Tests for the windowed GET /chat and the new-messages-only stream."""
+
+    @pytest.fixture(autouse=True)
+    def login(self, client):
+        """Log the test client in."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+    def test_get_window(self, client, conversation_manager):
+        """Test that limit and before select the window and firstIndex locates it."""
+        conversation_id = create_conversation(conversation_manager, 10)
+
+        with patch("app.conversation_manager", conversation_manager):
+            response = client.get(f"/chat?thread_id={conversation_id}&limit=2&before=5")
+
+        data = json.loads(response.data)
+        assert [message["text"] for message in data["messages"]] == ["message 3", "message 4"]
+        assert (data["firstIndex"], data["totalMessages"]) == (3, 10)
+
+    def test_get_without_limit_returns_all(self, client, conversation_manager):
+        """Test that clients that do not ask for a window still get every message."""
+        conversation_id = create_conversation(conversation_manager, 4)
+
+        with patch("app.conversation_manager", conversation_manager):
+            data = json.loads(client.get(f"/chat?thread_id={conversation_id}").data)
+
+        assert len(data["messages"]) == 4
+        assert data["firstIndex"] == 0
+
+    def test_get_rejects_invalid_window(self, client, conversation_manager):
+        """Test that a non-numeric limit is a validation error."""
+        conversation_id = create_conversation(conversation_manager, 2)
+
+        with patch("app.conversation_manager", conversation_manager):
+            response = client.get(f"/chat?thread_id={conversation_id}&limit=-5")
+
+        assert response.status_code == 400
+
+    def test_stream_sends_only_new_messages(self, client, conversation_manager):
+        """Test that the first frame of a response carries the new user message, not the history."""
+        conversation_id = create_conversation(conversation_manager, 6)
+
+        # Keep the response from being generated, only the first frame matters here
+        with patch("app.conversation_manager", conversation_manager), patch(
+            "app.CHAT_ENGINE", "async"
+        ), patch("app.chat_event_loop.submit", side_effect=lambda coroutine: coroutine.close()):
+            from app import chat_stream_registry
+
+            response = client.post(
+                "/chat", json={"user_input": "message 6", "thread_id": conversation_id, "detach": True}
+            )
+            buffer = chat_stream_registry.get("testuser", conversation_id, response.json["streamId"])
+            events, _, _ = buffer.read_after(0, None)
+
+        first_frame = json.loads(events[0][1])
+        assert first_frame["type"] == "message_list"
+        assert first_frame["messages"] == [{"role": "user", "text": "message 6"}]
+        assert (first_frame["firstIndex"], first_frame["totalMessages"]) == (6, 7)
@@ -0,0 +1,55 @@
+"""Tests that replay the recorded chat streams, so pipeline regressions show up offline."""
+
+import json
+
+import pytest
+
+from chat_replay_benchmark import compare_to_baseline, list_fixtures, load_fixture, replay, run_benchmark
+
+
+@pytest.mark.parametrize("name", list_fixtures())
+def test_fixture_replays_to_recorded_frames(name):
+    """Test that each recorded stream still produces the frames and text it was recorded with."""
+    fixture = load_fixture(name)
+
+    result = replay(fixture)
+
+    assert result["frames"] == fixture["expected"]["frames"]
+    assert result["text"] == fixture["expected"]["text"]
+
+
+class TestChatReplayBenchmark:
+    """Tests for the replay harness itself."""
+
+    def test_function_call_continues_with_recorded_result(self):
+        """Test that the tool call is answered from the fixture and the continuation replayed."""
+        fixture = load_fixture("function_call")
+
+        result = replay(fixture)
+
+        assert "$19,427.04" in result["text"]
+        assert result["events"] == sum(len(stream) for stream in fixture["streams"])
+
+    def test_run_benchmark_reports_metrics(self):
+        """Test that a short benchmark run reports throughput, CPU and allocations."""
+        result = run_benchmark("text", iterations=2)
+
+        assert result["frames"] == load_fixture("text")["expected"]["frames"]
+        assert result["events_per_sec"] > 0
+        assert result["cpu_us_per_event"] > 0
+        assert result["peak_alloc_bytes_per_event"] > 0
+        json.dumps(result)
+
+    def test_compare_to_baseline(self):
+        """Test that slower CPU per event and changed frame counts are reported, within tolerance is not."""
+        baseline = [{"fixture": "text", "frames": 343, "cpu_us_per_event": 10.0, "cpu_us_per_frame": 1.0}]
+
+        assert compare_to_baseline(
+            [{"fixture": "text", "frames": 343, "cpu_us_per_event": 12.0, "cpu_us_per_frame": 1.0}], baseline
+        ) == []
+        problems = compare_to_baseline(
+            [{"fixture": "text", "frames": 340, "cpu_us_per_event": 15.0, "cpu_us_per_frame": 1.0}], baseline
+        )
+        assert len(problems) == 2
+        assert "340 frames" in problems[0]
+        assert "cpu_us_per_event" in problems[1]
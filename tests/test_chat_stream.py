@@ -0,0 +1,301 @@
+"""Tests for the /chat streaming wire protocol."""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from app import chat_stream_registry
+from chat_stream import (
+    END_OF_STREAM,
+    EOS_STR,
+    LEGACY_PROTOCOL,
+    SSE_PROTOCOL,
+    ChatEventLoop,
+    ChatStreamBuffer,
+    ChatStreamRegistry,
+    aiter_chat_stream,
+    format_sse_frame,
+    iter_chat_stream,
+)
+
+
+def parse_sse_frames(body: str) -> list[dict[str, str]]:
+    """Parse an SSE body into a list of {field: value} dicts."""
+    frames = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        frame = {}
+        for line in block.split("\n"):
+            field, _, value = line.partition(": ")
+            frame[field] = value
+        frames.append(frame)
+    return frames
+
+
+def make_buffer(*payloads, max_events: int = 100) -> ChatStreamBuffer:
+    """Create a stream buffer pre-filled with payloads."""
+    buffer = ChatStreamBuffer("stream_1", max_events=max_events)
+    for payload in payloads:
+        buffer.put(payload)
+    return buffer
+
+
+def delta(text: str) -> str:
+    """Create an encoded text_delta payload."""
+    return json.dumps({"type": "text_delta", "delta": text})
+
+
+class TestFormatSseFrame:
+    """Tests for SSE frame formatting."""
+
+    def test_frame_with_id(self):
+        """Test that id and data lines are emitted and the frame ends with a blank line."""
+        frame = format_sse_frame('{"type": "text_delta"}', event_id=3)
+        assert frame == 'id: 3\ndata: {"type": "text_delta"}\n\n'
+
+    def test_frame_with_event_name(self):
+        """Test that the event name is emitted for transport frames."""
+        frame = format_sse_frame("{}", event="heartbeat")
+        assert frame == "event: heartbeat\ndata: {}\n\n"
+
+
+class TestIterChatStream:
+    """Tests for turning a stream buffer into frames."""
+
+    def test_sse_payloads_are_single_encoded(self):
+        """Test that payloads are passed through without a second JSON encoding."""
+        payload = json.dumps({"type": "message_list", "threadId": "t1", "messages": []})
+        body = "".join(iter_chat_stream(make_buffer(payload, END_OF_STREAM), SSE_PROTOCOL))
+
+        frames = parse_sse_frames(body)
+        data = json.loads(frames[0]["data"])
+        assert data == {"type": "message_list", "threadId": "t1", "messages": []}
+
+    def test_sse_event_ids_increase(self):
+        """Test that every payload frame gets the next event id."""
+        payloads = [delta(str(i)) for i in range(3)]
+        body = "".join(iter_chat_stream(make_buffer(*payloads, END_OF_STREAM), SSE_PROTOCOL))
+
+        frames = parse_sse_frames(body)
+        assert [frame.get("id") for frame in frames[:3]] == ["1", "2", "3"]
+
+    def test_sse_stream_ends_with_end_frame(self):
+        """Test that the end sentinel produces an end frame and stops iteration."""
+        body = "".join(iter_chat_stream(make_buffer(END_OF_STREAM), SSE_PROTOCOL))
+
+        frames = parse_sse_frames(body)
+        assert len(frames) == 1
+        assert frames[0]["event"] == "end"
+        assert "id" not in frames[0]
+
+    def test_sse_heartbeat_when_idle(self):
+        """Test that an idle stream produces heartbeat frames without event ids."""
+        stream = iter_chat_stream(make_buffer(), SSE_PROTOCOL, heartbeat_interval=0.01)
+
+        frames = parse_sse_frames(next(stream))
+        assert frames[0]["event"] == "heartbeat"
+        assert "id" not in frames[0]
+
+    def test_legacy_frames_use_eos_separator(self):
+        """Test that the legacy protocol terminates each payload with EOS_STR."""
+        payload = delta("hi")
+        body = "".join(iter_chat_stream(make_buffer(payload, END_OF_STREAM), LEGACY_PROTOCOL))
+
+        assert body == payload + EOS_STR
+
+    def test_unknown_protocol_rejected(self):
+        """Test that an unknown protocol raises ValueError."""
+        with pytest.raises(ValueError):
+            next(iter_chat_stream(make_buffer(), "carrier-pigeon"))
+
+    def test_resume_replays_events_after_last_event_id(self):
+        """Test that reconnecting with a last event id only replays newer events."""
+        buffer = make_buffer(delta("a"), delta("b"), delta("c"), END_OF_STREAM)
+
+        body = "".join(iter_chat_stream(buffer, SSE_PROTOCOL, last_event_id=2))
+
+        frames = parse_sse_frames(body)
+        assert frames[0]["id"] == "3"
+        assert json.loads(frames[0]["data"])["delta"] == "c"
+        assert frames[1]["event"] == "end"
+
+    def test_resume_reports_gap_outside_replay_window(self):
+        """Test that a gap frame is sent when requested events were already evicted."""
+        buffer = make_buffer(*[delta(str(i)) for i in range(5)], END_OF_STREAM, max_events=2)
+
+        body = "".join(iter_chat_stream(buffer, SSE_PROTOCOL, last_event_id=1))
+
+        frames = parse_sse_frames(body)
+        assert frames[0]["event"] == "gap"
+        assert json.loads(frames[0]["data"]) == {
+            "type": "replay_gap",
+            "missed_from": 2,
+            "resumed_at": 4,
+        }
+        assert [frame.get("id") for frame in frames[1:3]] == ["4", "5"]
+
+    def test_readers_follow_live_events(self):
+        """Test that a reader receives events put after it started waiting."""
+        buffer = make_buffer()
+
+        def produce():
+            time.sleep(0.05)
+            buffer.put(delta("live"))
+            buffer.put(END_OF_STREAM)
+
+        threading.Thread(target=produce).start()
+        body = "".join(iter_chat_stream(buffer, SSE_PROTOCOL, heartbeat_interval=5))
+
+        frames = parse_sse_frames(body)
+        assert json.loads(frames[0]["data"])["delta"] == "live"
+        assert frames[-1]["event"] == "end"
+
+
+async def collect_frames(buffer: ChatStreamBuffer, *args, **kwargs) -> str:
+    """Join every frame produced by aiter_chat_stream."""
+    return "".join([frame async for frame in aiter_chat_stream(buffer, *args, **kwargs)])
+
+
+class TestAiterChatStream:
+    """Tests for reading a stream buffer from an event loop."""
+
+    def test_matches_sync_frames(self):
+        """Test that the async reader produces the same frames as the sync one."""
+        payloads = [delta("a"), delta("b"), END_OF_STREAM]
+
+        sync_body = "".join(iter_chat_stream(make_buffer(*payloads), SSE_PROTOCOL, last_event_id=1))
+        async_body = asyncio.run(collect_frames(make_buffer(*payloads), SSE_PROTOCOL, last_event_id=1))
+
+        assert async_body == sync_body
+
+    def test_follows_events_put_from_another_thread(self):
+        """Test that a waiting coroutine is woken by a put from a worker thread."""
+        buffer = make_buffer()
+
+        def produce():
+            time.sleep(0.05)
+            buffer.put(delta("live"))
+            buffer.put(END_OF_STREAM)
+
+        threading.Thread(target=produce).start()
+        body = asyncio.run(collect_frames(buffer, SSE_PROTOCOL, heartbeat_interval=5))
+
+        frames = parse_sse_frames(body)
+        assert json.loads(frames[0]["data"])["delta"] == "live"
+        assert frames[-1]["event"] == "end"
+
+    def test_heartbeat_when_idle(self):
+        """Test that an idle buffer yields a heartbeat frame instead of blocking."""
+
+        async def first_frame():
+            stream = aiter_chat_stream(make_buffer(), SSE_PROTOCOL, heartbeat_interval=0.01)
+            return await anext(stream)
+
+        frames = parse_sse_frames(asyncio.run(first_frame()))
+        assert frames[0]["event"] == "heartbeat"
+
+
+class TestChatEventLoop:
+    """Tests for the shared chat event loop."""
+
+    def test_submit_runs_on_background_loop(self):
+        """Test that submitted coroutines run on one loop shared by all callers."""
+        chat_loop = ChatEventLoop(name="test-chat-loop")
+
+        async def running_loop():
+            return asyncio.get_running_loop()
+
+        first = chat_loop.submit(running_loop()).result(timeout=5)
+        second = chat_loop.submit(running_loop()).result(timeout=5)
+
+        assert first is second is chat_loop.loop
+
+    def test_attach_uses_existing_loop(self):
+        """Test that an attached loop is used instead of starting a thread."""
+
+        async def attached():
+            chat_loop = ChatEventLoop(name="test-chat-loop")
+            chat_loop.attach(asyncio.get_running_loop())
+            future = chat_loop.submit(asyncio.sleep(0, result="done"))
+            return await asyncio.wrap_future(future)
+
+        assert asyncio.run(attached()) == "done"
+
+
+class TestChatStreamRegistry:
+    """Tests for looking up in-flight response buffers."""
+
+    def test_get_by_conversation_and_stream_id(self):
+        """Test that buffers are found by conversation and optionally checked against the stream id."""
+        registry = ChatStreamRegistry()
+        buffer = registry.create("alice", "conv_1")
+
+        assert registry.get("alice", "conv_1") is buffer
+        assert registry.get("alice", "conv_1", buffer.stream_id) is buffer
+        assert registry.get("alice", "conv_1", "other_stream") is None
+        assert registry.get("bob", "conv_1") is None
+
+    def test_new_response_replaces_previous_buffer(self):
+        """Test that starting a new response in a conversation replaces its buffer."""
+        registry = ChatStreamRegistry()
+        first = registry.create("alice", "conv_1")
+        second = registry.create("alice", "conv_1")
+
+        assert registry.get("alice", "conv_1") is second
+        assert registry.get("alice", "conv_1", first.stream_id) is None
+
+    def test_finished_buffers_expire(self):
+        """Test that finished buffers are dropped after the retention window."""
+        registry = ChatStreamRegistry(retention_seconds=0)
+        buffer = registry.create("alice", "conv_1")
+        assert registry.is_active("alice", "conv_1")
+
+        buffer.put(END_OF_STREAM)
+        buffer.finished_at = time.time() - 1
+
+        assert registry.get("alice", "conv_1") is None
+
+
+class TestResumeChatStreamEndpoint:
+    """Tests for reattaching to an in-flight response over HTTP."""
+
+    def test_resume_replays_events_after_last_event_id_header(self, client):
+        """Test that the reconnect endpoint only replays events after Last-Event-ID."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+        buffer = chat_stream_registry.create("testuser", "conv_resume")
+        for payload in (delta("a"), delta("b"), END_OF_STREAM):
+            buffer.put(payload)
+
+        response = client.get(
+            f"/chat/stream/conv_resume?stream_id={buffer.stream_id}",
+            headers={"Last-Event-ID": "1"},
+        )
+
+        assert response.status_code == 200
+        assert response.content_type == "text/event-stream; charset=utf-8"
+        frames = parse_sse_frames(response.get_data(as_text=True))
+        assert frames[0]["id"] == "2"
+        assert frames[-1]["event"] == "end"
+
+    def test_resume_unknown_stream_returns_404(self, client):
+        """Test that reconnecting to a response that is not buffered is a 404."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+        response = client.get("/chat/stream/conv_missing", headers={"Last-Event-ID": "3"})
+
+        assert response.status_code == 404
+
+    def test_resume_rejects_invalid_last_event_id(self, client):
+        """Test that a malformed Last-Event-ID is a validation error."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+        response = client.get("/chat/stream/conv_resume", headers={"Last-Event-ID": "abc"})
+
+        assert response.status_code == 400
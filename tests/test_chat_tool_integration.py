@@ -222,3 +222,17 @@ class TestChatToolIntegration:
         )
         assert calculator_tool is not None
         assert calculator_tool["name"] == "calculator"
+
+    def test_tool_stats_endpoint(self, client):
+        """Test that /tools/stats reports the app executor's per-tool stats."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+        response = client.get("/tools/stats")
+
+        assert response.status_code == 200
+        assert isinstance(response.json["tools"], dict)
+
+    def test_tool_stats_requires_login(self, client):
+        """Test that /tools/stats requires a logged-in user."""
+        assert client.get("/tools/stats").status_code == 401
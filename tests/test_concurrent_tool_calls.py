@@ -0,0 +1,148 @@
+"""Tests for running the tool calls of one response concurrently."""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from types import SimpleNamespace
+
+import pytest
+
+from app import AsyncStreamEventProcessor, StreamEventProcessor
+from tool_framework import BaseTool, ToolExecutor, ToolRegistry
+
+
+class SleepTool(BaseTool):
+    """Tool that sleeps for the requested time and echoes its label."""
+
+    @property
+    def name(self) -> str:
+        return "sleep"
+
+    @property
+    def display_name(self) -> str:
+        return "Sleep"
+
+    @property
+    def description(self) -> str:
+        return "Sleeps for a while"
+
+    def get_openai_tool_definition(self) -> dict:
+        return {
+            "type": "function",
+            "name": "sleep",
+            "description": "Sleeps for a while",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "label": {"type": "string"},
+                    "seconds": {"type": "number"},
+                },
+                "required": ["label", "seconds"],
+                "additionalProperties": False,
+            },
+            "strict": True,
+        }
+
+    def execute(self, parameters: dict, storage) -> dict:
+        time.sleep(parameters["seconds"])
+        return {"success": True, "label": parameters["label"]}
+
+
+def sleep_call_events(*calls: tuple[str, float]) -> list[SimpleNamespace]:
+    """Events for a response that makes one sleep call per (label, seconds) pair."""
+    events = [SimpleNamespace(type="response.created", response=SimpleNamespace(id="resp_1"))]
+    for index, (label, seconds) in enumerate(calls):
+        item_id = f"fc_{index}"
+        events.append(
+            SimpleNamespace(
+                type="response.output_item.added",
+                item=SimpleNamespace(
+                    type="function_call",
+                    id=item_id,
+                    call_id=f"call_{label}",
+                    name="sleep",
+                    arguments="",
+                    status="in_progress",
+                ),
+            )
+        )
+        events.append(
+            SimpleNamespace(
+                type="response.function_call_arguments.done",
+                item_id=item_id,
+                arguments=json.dumps({"label": label, "seconds": seconds}),
+            )
+        )
+    return events
+
+
+def run_engine(engine: str, events: list[SimpleNamespace], tool_call_timeout: float = 5.0):
+    """Process the events with the given engine, returning (processor, queued events, seconds)."""
+    registry = ToolRegistry()
+    registry.register_tool(SleepTool())
+    queue: Queue = Queue()
+    kwargs = dict(
+        tool_executor=ToolExecutor(registry),
+        username="testuser",
+        conversation_id="conv_concurrent_tools",
+        tool_call_timeout=tool_call_timeout,
+    )
+
+    if engine == "thread":
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            processor = StreamEventProcessor(queue, tool_call_executor=executor, **kwargs)
+            start = time.monotonic()
+            processor.process_stream(iter(events))
+            elapsed = time.monotonic() - start
+    else:
+
+        async def events_async():
+            for event in events:
+                yield event
+
+        async def process():
+            start = time.monotonic()
+            await processor.process_stream_async(events_async())
+            return time.monotonic() - start
+
+        processor = AsyncStreamEventProcessor(queue, **kwargs)
+        elapsed = asyncio.run(process())
+
+    queued = []
+    while not queue.empty():
+        queued.append(json.loads(queue.get()))
+    return processor, queued, elapsed
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+class TestConcurrentToolCalls:
+    """Tests for tool calls made in the same response."""
+
+    def test_calls_run_concurrently(self, engine):
+        """Test that a turn costs the slowest call's time, not the sum."""
+        _, _, elapsed = run_engine(engine, sleep_call_events(("a", 0.3), ("b", 0.3), ("c", 0.3)))
+
+        assert elapsed < 0.6
+
+    def test_events_in_finish_order_and_outputs_in_call_order(self, engine):
+        """Test that completion events stream as calls finish while outputs keep call order."""
+        processor, queued, _ = run_engine(engine, sleep_call_events(("slow", 0.3), ("fast", 0.01)))
+
+        completed = [event["result"]["label"] for event in queued if event["type"] == "tool_call_completed"]
+        assert completed == ["fast", "slow"]
+        assert [output["call_id"] for output in processor.pending_function_outputs] == ["call_slow", "call_fast"]
+        assert [record["output"]["label"] for record in processor.reasoning_data["tool_outputs"]] == ["slow", "fast"]
+
+    def test_slow_call_times_out(self, engine):
+        """Test that a call over the timeout is reported as a timeout error without waiting for it."""
+        processor, queued, elapsed = run_engine(
+            engine, sleep_call_events(("stuck", 1.0), ("quick", 0.01)), tool_call_timeout=0.2
+        )
+
+        assert elapsed < 0.9
+        outputs = {output["call_id"]: json.loads(output["output"]) for output in processor.pending_function_outputs}
+        assert outputs["call_stuck"]["error_code"] == "timeout"
+        assert outputs["call_quick"]["success"] is True
+        assert processor.tool_calls["fc_0"]["status"] == "error"
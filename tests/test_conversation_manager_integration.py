@@ -217,4 +217,55 @@ class TestConversationManagerIntegration:
         reasoning_2 = conversation_manager.get_message_reasoning_data(username, conversation_id, 1)
         
         assert reasoning_1["response_id"] == "resp_1"
-        assert reasoning_2["response_id"] == "resp_2"
\ No newline at end of file
+        assert reasoning_2["response_id"] == "resp_2"
+    def test_stream_checkpoint_recovered_as_interrupted_message(self, conversation_manager):
+        """Test that a leftover streaming checkpoint becomes an interrupted assistant message."""
+        username = "testuser"
+        conversation_id = conversation_manager.create_conversation(username, "Crashed Chat")
+        conversation_manager.add_message(username, conversation_id, "user", "Question")
+
+        conversation_manager.save_stream_checkpoint(
+            username, conversation_id, "stream_1", "Partial ans"
+        )
+
+        assert conversation_manager.recover_interrupted_response(username, conversation_id) is True
+
+        message_list = conversation_manager.get_message_list(username, conversation_id)
+        assert message_list[-1] == {"role": "assistant", "text": "Partial ans", "interrupted": True}
+        conversation = conversation_manager.get_conversation(username, conversation_id)
+        assert conversation.stream_checkpoint is None
+        # The partial answer has no response ID, so continuity is unchanged
+        assert conversation.last_response_id is None
+
+    def test_saved_response_clears_stream_checkpoint(self, conversation_manager):
+        """Test that storing the finished response discards its checkpoint."""
+        username = "testuser"
+        conversation_id = conversation_manager.create_conversation(username, "Finished Chat")
+        conversation_manager.add_message(username, conversation_id, "user", "Question")
+        conversation_manager.save_stream_checkpoint(
+            username, conversation_id, "stream_1", "Partial"
+        )
+
+        conversation_manager.add_message(
+            username, conversation_id, "assistant", "Full answer", "resp_1"
+        )
+
+        assert conversation_manager.recover_interrupted_response(username, conversation_id) is False
+        assert conversation_manager.get_conversation_message_count(username, conversation_id) == 2
+
+    def test_recover_ignores_checkpoint_of_other_stream(self, conversation_manager):
+        """Test that a stream only recovers the checkpoint it wrote itself."""
+        username = "testuser"
+        conversation_id = conversation_manager.create_conversation(username, "Two Streams")
+        conversation_manager.save_stream_checkpoint(
+            username, conversation_id, "stream_new", "Newer partial"
+        )
+
+        assert (
+            conversation_manager.recover_interrupted_response(
+                username, conversation_id, "stream_old"
+            )
+            is False
+        )
+        conversation = conversation_manager.get_conversation(username, conversation_id)
+        assert conversation.stream_checkpoint.stream_id == "stream_new"
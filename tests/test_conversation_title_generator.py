@@ -0,0 +1,108 @@
+"""Tests for background conversation title generation."""
+
+import tempfile
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app import ConversationManager, ConversationTitleGenerator
+
+
+class TestConversationTitleGenerator:
+    """Test ConversationTitleGenerator queuing and title updates."""
+
+    @pytest.fixture
+    def conversation_manager(self):
+        """Create a ConversationManager backed by a temporary directory."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield ConversationManager(temp_dir)
+
+    @pytest.fixture
+    def release(self):
+        """Event that lets blocked title generations finish."""
+        event = threading.Event()
+        yield event
+        event.set()
+
+    def make_generator(self, conversation_manager, title_function, **kwargs):
+        """Create a generator whose responses client returns titles from title_function."""
+        responses_client = Mock()
+        responses_client.generate_conversation_title.side_effect = title_function
+        return ConversationTitleGenerator(responses_client, conversation_manager, **kwargs)
+
+    def test_title_stored_and_reported(self, conversation_manager):
+        """Test that the generated title is saved and passed to the callback."""
+        conversation_id = conversation_manager.create_conversation("testuser", "New Chat")
+        generator = self.make_generator(conversation_manager, lambda message: "Python Help")
+        titles = []
+        done = threading.Event()
+
+        def on_title(title):
+            titles.append(title)
+            done.set()
+
+        assert generator.submit("testuser", conversation_id, "How do I use asyncio?", on_title)
+        assert done.wait(timeout=5)
+
+        assert titles == ["Python Help"]
+        conversation = conversation_manager.get_conversation("testuser", conversation_id)
+        assert conversation.chat_name == "Python Help"
+
+    def test_duplicate_requests_deduplicated(self, conversation_manager, release):
+        """Test that a conversation with a title already pending is not queued again."""
+        conversation_id = conversation_manager.create_conversation("testuser", "New Chat")
+        generator = self.make_generator(
+            conversation_manager, lambda message: release.wait(5) and "Title"
+        )
+
+        assert generator.submit("testuser", conversation_id, "first")
+        assert not generator.submit("testuser", conversation_id, "first again")
+        assert generator.is_pending("testuser", conversation_id)
+
+    def test_queue_capped_under_load(self, conversation_manager, release):
+        """Test that new conversations keep their temporary title when the queue is full."""
+        generator = self.make_generator(
+            conversation_manager, lambda message: release.wait(5) and "Title", max_pending=2
+        )
+
+        assert generator.submit("testuser", "conv_1", "one")
+        assert generator.submit("testuser", "conv_2", "two")
+        assert not generator.submit("testuser", "conv_3", "three")
+
+    def test_failure_clears_pending(self, conversation_manager):
+        """Test that a failed generation is logged and frees the conversation for a retry."""
+        conversation_id = conversation_manager.create_conversation("testuser", "New Chat")
+        failed = threading.Event()
+
+        def fail(message):
+            failed.set()
+            raise RuntimeError("model unavailable")
+
+        generator = self.make_generator(conversation_manager, fail, max_workers=1)
+        assert generator.submit("testuser", conversation_id, "hello")
+        assert failed.wait(timeout=5)
+        generator._executor.shutdown(wait=True)
+
+        assert not generator.is_pending("testuser", conversation_id)
+        assert conversation_manager.get_conversation("testuser", conversation_id).chat_name == "New Chat"
+
+
+class TestChatEndpointTitleGeneration:
+    """Test that /chat generates titles without delaying the response."""
+
+    def test_new_conversation_queues_title(self, client):
+        """Test that a new chat queues its title instead of generating it in the request."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+        with patch("app.title_generator.submit") as submit, patch(
+            "app.responses_client.generate_conversation_title"
+        ) as generate:
+            response = client.post("/chat", json={"user_input": "Hello there", "detach": True})
+
+        assert response.status_code == 202
+        generate.assert_not_called()
+        username, conversation_id, user_message, on_title = submit.call_args.args
+        assert (username, conversation_id, user_message) == ("testuser", response.json["threadId"], "Hello there")
+        assert callable(on_title)
@@ -109,6 +109,7 @@ class TestGridGeneration:
             mock_response.operation = 'generate'
             mock_response.timestamp = 1234567890
             mock_response.metadata = {}
+            mock_response.images = []
             mock_handler.return_value = mock_response
 
             response = client.post('/image', data={
@@ -179,6 +180,38 @@ class TestGridGeneration:
                 assert request_obj.character_prompts[0]['positive'] == 'character 1 positive'
                 assert request_obj.character_prompts[0]['negative'] == 'character 1 negative'
 
+    @patch('app._handle_generation_request')
+    def test_grid_cells_generate_one_sample(self, mock_handler, client):
+        """Test that grid cells ask NovelAI for one image each, whatever the form's sample count."""
+        mock_response = MagicMock()
+        mock_response.success = True
+        mock_response.image_path = 'static/images/testuser/test.png'
+        mock_response.image_name = 'test.png'
+        mock_response.revised_prompt = 'test prompt'
+        mock_handler.return_value = mock_response
+
+        os.makedirs('static/prompts/testuser', exist_ok=True)
+        os.makedirs('static/images/testuser', exist_ok=True)
+        with open('static/prompts/testuser/colors.txt', 'w') as f:
+            f.write('red\nblue')
+
+        with patch('app.WandImage'), patch('app.PILImage'), patch('app.PngInfo'), \
+             patch('app.get_file_count', return_value=1), \
+             patch('os.path.exists', return_value=True), \
+             patch('os.rename'):
+            response = client.post('/image', data={
+                'prompt': 'a __colors__ car',
+                'provider': 'novelai',
+                'advanced-generate-grid': 'on',
+                'grid-prompt-file': 'colors',
+                'seed': '12345',
+                'n_samples': '4',
+            })
+
+        assert response.status_code == 200
+        assert mock_handler.call_count == 2
+        assert [call[0][0].n_samples for call in mock_handler.call_args_list] == [1, 1]
+
     @patch('app._handle_generation_request')
     def test_grid_generation_with_detailed_errors(self, mock_handler, client):
         """Test that grid generation provides detailed error messages when individual generations fail."""
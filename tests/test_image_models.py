@@ -91,6 +91,20 @@ class TestImageGenerationRequest:
         with pytest.raises(ValueError, match="Width and height must be positive integers"):
             ImageGenerationRequest(prompt="test", height=-1)
     
+    def test_n_samples_validation(self):
+        """Test that several samples are only allowed from NovelAI, up to its limit."""
+        request = ImageGenerationRequest(prompt="test", provider=Provider.NOVELAI, n_samples=4)
+        assert request.n_samples == 4
+
+        with pytest.raises(ValueError, match="Number of samples must be between 1 and 4"):
+            ImageGenerationRequest(prompt="test", provider=Provider.NOVELAI, n_samples=5)
+
+        with pytest.raises(ValueError, match="Number of samples must be between 1 and 4"):
+            ImageGenerationRequest(prompt="test", provider=Provider.NOVELAI, n_samples=0)
+
+        with pytest.raises(ValueError, match="generates one sample at a time"):
+            ImageGenerationRequest(prompt="test", provider=Provider.OPENAI, n_samples=2)
+    
     def test_openai_dimension_validation(self):
         """Test OpenAI-specific dimension validation."""
         # Valid dimensions should work
@@ -376,6 +390,38 @@ class TestFactoryFunctions:
         assert request.base_image_path == "/path/to/image.png"
         assert request.strength == 0.8
     
+    def test_create_request_from_form_data_n_samples(self):
+        """Test that the number of samples is read for NovelAI and ignored for other providers."""
+        form_data = {
+            "prompt": "test prompt",
+            "provider": "novelai",
+            "operation": "img2img",
+            "base_image_path": "/path/to/image.png",
+            "n_samples": "3",
+        }
+
+        assert create_request_from_form_data(form_data).n_samples == 3
+
+        form_data.update({"provider": "openai", "operation": "generate"})
+        assert create_request_from_form_data(form_data).n_samples == 1
+    
+    def test_create_request_from_form_data_vibes_for_all_operations(self):
+        """Test that vibes selected in the form reach inpainting and img2img requests too."""
+        form_data = {
+            "prompt": "test prompt",
+            "provider": "novelai",
+            "base_image_path": "/path/to/image.png",
+            "mask_path": "/path/to/mask.png",
+            "vibe_guid_0": "vibe-guid",
+            "vibe_encoding_strength_0": "0.85",
+            "vibe_reference_strength_0": "0.5",
+        }
+        expected = [{"guid": "vibe-guid", "encoding_strength": 0.85, "reference_strength": 0.5}]
+
+        for operation in ["generate", "inpaint", "img2img"]:
+            form_data["operation"] = operation
+            assert create_request_from_form_data(form_data).vibe_params == expected
+    
     def test_create_request_invalid_provider_operation(self):
         """Test error when provider doesn't support operation."""
         form_data = {
@@ -404,6 +450,14 @@ class TestFactoryFunctions:
         assert response.operation == "generate"
         assert response.revised_prompt == "revised prompt"
         assert response.timestamp is not None
+        assert response.images == [
+            {
+                "image_path": "/path/to/image.png",
+                "image_name": "image.png",
+                "revised_prompt": "revised prompt",
+                "metadata": {},
+            }
+        ]
     
     def test_create_error_response(self):
         """Test creating error response."""
@@ -0,0 +1,21 @@
+"""Tests for the mask processing benchmark."""
+
+from mask_benchmark import make_mask, nearest_mask, coverage, run_benchmark
+
+
+def test_run_benchmark_reports_both_implementations():
+    """Test that a small run times both implementations and reports their coverage."""
+    result = run_benchmark(256, iterations=1)
+
+    assert result["size"] == 256
+    assert result["block_ms"] > 0
+    assert result["nearest_ms"] > 0
+    assert result["block_coverage"] == 1.0
+    assert 0 < result["nearest_coverage"] <= 1.0
+
+
+def test_nearest_mask_loses_thin_strokes():
+    """Test that the comparison implementation misses strokes the block mask keeps."""
+    mask = make_mask(512)
+
+    assert coverage(mask, nearest_mask(mask)) < 1.0
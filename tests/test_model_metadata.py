@@ -57,14 +57,15 @@ class TestModelMetadata:
         original_instructions = "You are a helpful assistant."
         enhanced = responses_client._enhance_instructions_with_metadata(original_instructions, "gpt-5")
         
-        # Should add metadata at the beginning
+        # Should add metadata at the end
         assert "Knowledge cutoff: 2024-09-30" in enhanced
         assert "Current date:" in enhanced
         assert "You are a helpful assistant." in enhanced
         
-        # Metadata should come first
+        # Instructions should come first so the prompt prefix doesn't change daily
         lines = enhanced.split('\n')
-        assert "Knowledge cutoff:" in lines[0]
+        assert lines[0] == "You are a helpful assistant."
+        assert "Current date:" in lines[-1]
 
     def test_enhance_instructions_with_metadata_existing_metadata(self, responses_client):
         """Test that existing metadata is not duplicated."""
@@ -82,19 +83,28 @@ Provide helpful responses."""
         assert enhanced.count("Current date:") == 1
 
     def test_enhance_instructions_with_model_identification(self, responses_client):
-        """Test enhancing instructions that start with model identification."""
+        """Test that instructions starting with model identification are kept intact before the metadata."""
         original_instructions = """You are CodeGPT, a large language model.
 You write clean code and provide helpful responses."""
         
         enhanced = responses_client._enhance_instructions_with_metadata(original_instructions, "gpt-5-mini")
         
-        lines = enhanced.split('\n')
-        # First line should be the model identification
-        assert "CodeGPT" in lines[0]
-        # Second line should be the metadata
-        assert "Knowledge cutoff:" in lines[1]
-        # Third line should be the rest of the instructions
-        assert "You write clean code" in lines[2]
+        # The instructions are an unchanged prefix, followed by the metadata
+        assert enhanced.startswith(original_instructions + "\n")
+        assert enhanced.split('\n')[-1] == responses_client._get_model_metadata("gpt-5-mini")
+
+    def test_instructions_prefix_stable_across_days(self, responses_client):
+        """Test that only the end of the instructions changes when the date does."""
+        with patch("app.datetime") as mock_datetime:
+            mock_datetime.today.return_value = datetime(2025, 1, 1)
+            first = responses_client.build_instructions(None, "gpt-5")
+            mock_datetime.today.return_value = datetime(2025, 1, 2)
+            second = responses_client.build_instructions(None, "gpt-5")
+
+        assert first != second
+        static_part = first.rsplit("\n", 1)[0]
+        assert second.startswith(static_part)
+        assert static_part.startswith(responses_client.DEFAULT_INSTRUCTIONS)
 
     def test_agent_preset_instructions_enhanced_in_create_response(self, responses_client):
         """Test that agent preset instructions are enhanced with metadata."""
@@ -6,10 +6,18 @@ error handling, and API request management with mocked responses.
 """
 
 import pytest
+import base64
 import json
+import os
+import threading
+import tracemalloc
 import zipfile
 import io
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch
+
+import numpy as np
+import requests
 from PIL import Image as PILImage
 from hypothesis import given, strategies as st
 
@@ -21,11 +29,24 @@ from novelai_client import (
     NovelAIInpaintPayload,
     NovelAIImg2ImgPayload,
     NovelAIClientError,
-    NovelAIAPIError
+    NovelAIAPIError,
+    NovelAIRetryPolicy,
+    NovelAITimeouts,
+    count_retries,
+    iter_zip_members,
+    parse_retry_after,
 )
 from image_models import VibeReference
 
 
+def zip_response(body: bytes) -> requests.Response:
+    """A successful streamed response with the given body."""
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
 class TestNovelAIClient:
     """Test cases for the NovelAIClient class."""
     
@@ -67,7 +88,9 @@ class TestNovelAIClient:
         assert response == mock_response
         mock_session.post.assert_called_once_with(
             "https://image.novelai.net/test-endpoint",
-            data=json.dumps(payload)
+            data=json.dumps(payload),
+            timeout=NovelAITimeouts().generate,
+            stream=False,
         )
     
     @patch('novelai_client.requests.Session')
@@ -112,8 +135,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -140,8 +162,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -157,8 +178,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -187,8 +207,7 @@ class TestNovelAIClient:
         ]
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -224,8 +243,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -254,8 +272,7 @@ class TestNovelAIClient:
     def test_generate_image_zip_extraction_error(self):
         """Test error handling when ZIP extraction fails."""
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = b"invalid zip data"
+            mock_response = zip_response(b"invalid zip data")
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -273,8 +290,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -299,8 +315,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -338,8 +353,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -368,8 +382,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -415,8 +428,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -448,8 +460,7 @@ class TestNovelAIClient:
     def test_generate_inpaint_image_zip_extraction_error(self):
         """Test error handling when inpainting ZIP extraction fails."""
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = b"invalid zip data"
+            mock_response = zip_response(b"invalid zip data")
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -479,8 +490,7 @@ class TestNovelAIClient:
         ]
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -518,8 +528,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -552,8 +561,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -583,8 +591,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             with patch.object(NovelAIClient, '_process_novelai_mask') as mock_process_mask:
@@ -629,17 +636,16 @@ class TestNovelAIClient:
         # Should be same size as original
         assert processed_mask.size == (64, 64)
         
-        # Should be RGB format
-        assert processed_mask.mode == 'RGB'
+        # Should be a 1-bit mask
+        assert processed_mask.mode == '1'
         
         # Check that the mask has the expected block structure
-        # Due to the 8x downscale and upscale, we should have 8x8 pixel blocks
-        # Sample a few pixels to verify block structure
+        # Each 8x8 block with a painted pixel is painted
         center_pixel = processed_mask.getpixel((32, 32))  # Should be white
-        assert center_pixel == (255, 255, 255) or center_pixel == (0, 0, 0)  # Should be pure black or white
+        assert center_pixel == 255
         
         corner_pixel = processed_mask.getpixel((0, 0))  # Should be black
-        assert corner_pixel == (0, 0, 0)
+        assert corner_pixel == 0
     
     def test_process_novelai_mask_grayscale_input(self):
         """Test mask processing with grayscale input."""
@@ -661,7 +667,7 @@ class TestNovelAIClient:
         # Should process without error
         processed_mask = PILImage.open(io.BytesIO(processed_mask_bytes))
         assert processed_mask.size == (32, 32)
-        assert processed_mask.mode == 'RGB'
+        assert processed_mask.mode == '1'
     
     def test_process_novelai_mask_error_handling(self):
         """Test mask processing error handling."""
@@ -706,7 +712,7 @@ class TestNovelAIClient:
         
         # Check a pixel outside the white area
         pixel_16_16 = processed_mask.getpixel((16, 16))  # Should be black
-        assert pixel_16_16 == (0, 0, 0)
+        assert pixel_16_16 == 0
         
         # The white area pixels should be different from black area pixels
         assert pixel_40_40 != pixel_16_16
@@ -721,9 +727,7 @@ class TestNovelAIClient:
         
         client = NovelAIClient("test-key")
         with patch.object(client, 'session') as mock_session:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_session.post.return_value = mock_response
             
             result = client.upscale_image(b"original image data", 512, 512)
@@ -758,9 +762,7 @@ class TestNovelAIClient:
         
         client = NovelAIClient("test-key")
         with patch.object(client, 'session') as mock_session:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_session.post.return_value = mock_response
             
             result = client.upscale_image(b"original image data", 1024, 1024)  # Large resolution
@@ -791,9 +793,7 @@ class TestNovelAIClient:
         """Test upscale ZIP extraction error handling."""
         client = NovelAIClient("test-key")
         with patch.object(client, 'session') as mock_session:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.content = b"invalid zip data"
+            mock_response = zip_response(b"invalid zip data")
             mock_session.post.return_value = mock_response
             
             with pytest.raises(NovelAIClientError) as exc_info:
@@ -959,8 +959,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -994,8 +993,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1020,8 +1018,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1050,8 +1047,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1095,8 +1091,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1118,8 +1113,7 @@ class TestNovelAIClient:
     def test_generate_img2img_image_zip_extraction_error(self):
         """Test error handling when img2img ZIP extraction fails."""
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = b"invalid zip data"
+            mock_response = zip_response(b"invalid zip data")
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1145,8 +1139,7 @@ class TestNovelAIClient:
         ]
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1180,8 +1173,7 @@ class TestNovelAIClient:
         zip_content = zip_buffer.getvalue()
         
         with patch.object(NovelAIClient, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             client = NovelAIClient("test-key")
@@ -1199,6 +1191,414 @@ class TestNovelAIClient:
             assert payload["parameters"]["skip_cfg_above_sigma"] == 58
 
 
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Answers every request with an empty JSON object over a kept-alive connection."""
+
+    protocol_version = "HTTP/1.1"
+    body = b"{}"
+
+    def _respond(self):
+        length = int(self.headers.get("content-length") or 0)
+        self.rfile.read(length)
+        body = self.body
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_HEAD = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_zip(content: bytes, compression: int = zipfile.ZIP_STORED, seekable: bool = True) -> bytes:
+    """A ZIP archive holding content as its first file.
+
+    Archives written to a stream that cannot seek put the CRC and sizes in a data
+    descriptor after the file rather than in its header.
+    """
+    buffer = io.BytesIO()
+    target = buffer
+    if not seekable:
+        target = Mock(spec=["write", "flush"], write=buffer.write)
+    with zipfile.ZipFile(target, "w", compression=compression) as zip_file:
+        zip_file.writestr("image.png", content)
+        zip_file.writestr("other.png", b"second file")
+    return buffer.getvalue()
+
+
+class ZipHandler(KeepAliveHandler):
+    """Answers every request with a zipped image, as NovelAI does for generations."""
+
+    body = make_zip(b"zipped image data", zipfile.ZIP_DEFLATED)
+
+
+def serve(handler_class):
+    """Serve a handler on a free local port, yielding its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_server():
+    """Serve KeepAliveHandler on a free local port, yielding its base URL."""
+    yield from serve(KeepAliveHandler)
+
+
+@pytest.fixture
+def zip_server():
+    """Serve ZipHandler on a free local port, yielding its base URL."""
+    yield from serve(ZipHandler)
+
+
+class TestNovelAIConnectionPool:
+    """Test cases for connection reuse, timeouts and pool stats of the shared client."""
+
+    def test_requests_reuse_connection(self, local_server):
+        """Test that consecutive requests go over one kept-alive connection."""
+        client = NovelAIClient("test-key", base_url=local_server)
+
+        for _ in range(3):
+            client._make_request("ai/generate-image", {})
+
+        stats = client.get_pool_stats()
+        assert stats["requests"] == 3
+        assert stats["hosts"]["127.0.0.1"] == {
+            "requests": 3,
+            "connections_opened": 1,
+            "idle_connections": 1,
+        }
+
+    @pytest.mark.skipif("NOVELAI_POOL_SIZE" in os.environ, reason="pool size set by the environment")
+    def test_app_uses_client_default_pool_size(self):
+        """Test that the app's shared client and a plain client default to the same pool size."""
+        import app
+
+        assert app.novelai_client.pool_size == NovelAIClient("test-key").pool_size
+
+    def test_prewarm_opens_connection(self, local_server):
+        """Test that prewarming opens the connection the first request then reuses."""
+        with patch("novelai_client.NOVELAI_API_URL", local_server):
+            client = NovelAIClient("test-key", base_url=local_server)
+            assert client.prewarm() == {local_server: True}
+
+        client._make_request("ai/generate-image", {})
+
+        assert client.get_pool_stats()["hosts"]["127.0.0.1"]["connections_opened"] == 1
+
+    def test_prewarm_failure_not_raised(self):
+        """Test that an unreachable host is reported rather than raised."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(client.session, "head", side_effect=requests.ConnectionError("refused")):
+            assert set(client.prewarm().values()) == {False}
+
+    def test_timeouts_per_operation(self):
+        """Test that each kind of request is sent with its own timeout."""
+        timeouts = NovelAITimeouts(generate=(1.0, 2.0), encode_vibe=(3.0, 4.0), suggest_tags=(5.0, 6.0))
+        client = NovelAIClient("test-key", timeouts=timeouts)
+        response = Mock(status_code=200, content=b"encoded")
+        response.json.return_value = {"tags": []}
+
+        with patch.object(client.session, "post", return_value=response) as mock_post, patch.object(
+            client.session, "get", return_value=response
+        ) as mock_get:
+            client._make_request("ai/generate-image", {})
+            client.encode_vibe(b"image", 1.0, NovelAIModel.DIFFUSION_4_5_FULL.value)
+            client.suggest_tags(NovelAIModel.DIFFUSION_4_5_FULL.value, "blue")
+
+        assert [call.kwargs["timeout"] for call in mock_post.call_args_list] == [(1.0, 2.0), (3.0, 4.0)]
+        assert mock_get.call_args.kwargs["timeout"] == (5.0, 6.0)
+
+    def test_timeout_raises_client_error_and_is_counted(self):
+        """Test that a timed-out request raises a client error and shows in the stats."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(client.session, "post", side_effect=requests.ReadTimeout("read timed out")):
+            with pytest.raises(NovelAIClientError, match="timed out"):
+                client._make_request("ai/generate-image", {})
+
+        stats = client.get_pool_stats()
+        assert (stats["requests"], stats["timeouts"], stats["network_errors"]) == (1, 1, 0)
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    """Split data into chunks as they might arrive from the network."""
+    return [data[start : start + size] for start in range(0, len(data), size)]
+
+
+class TestNovelAIMultiSample:
+    """Test cases for generating several images in one request."""
+
+    @pytest.fixture
+    def three_images(self):
+        """A response holding three generated images."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            for index in range(3):
+                zip_file.writestr(f"image_{index}.png", f"image {index}".encode())
+        return zip_response(buffer.getvalue())
+
+    @pytest.mark.parametrize(
+        "method, args",
+        [
+            ("generate_images", ()),
+            ("generate_inpaint_images", (b"base image", b"mask image")),
+            ("generate_img2img_images", (b"base image",)),
+        ],
+    )
+    def test_every_image_returned(self, three_images, method, args):
+        """Test that each generation method requests the samples and returns every image."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(client, "_make_request", return_value=three_images) as mock_request, patch.object(
+            client, "_process_novelai_mask", return_value=b"mask"
+        ):
+            images = getattr(client, method)(*args, prompt="test prompt", seed=10, n_samples=3)
+
+        assert images == [b"image 0", b"image 1", b"image 2"]
+        parameters = mock_request.call_args[0][1]["parameters"]
+        assert (parameters["n_samples"], parameters["seed"]) == (3, 10)
+
+    def test_single_image_methods_return_first(self, three_images):
+        """Test that the single-image methods still return bytes of one image."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(client, "_make_request", return_value=three_images) as mock_request:
+            assert client.generate_image("test prompt") == b"image 0"
+
+        assert mock_request.call_args[0][1]["parameters"]["n_samples"] == 1
+
+    def test_rejects_no_samples(self):
+        """Test that a request must be for at least one image."""
+        with pytest.raises(ValueError, match="n_samples"):
+            NovelAIClient("test-key").generate_images("test prompt", n_samples=0)
+
+
+class TestZipStreaming:
+    """Test cases for extracting zipped images while they download."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+    @pytest.mark.parametrize(
+        "compression, seekable",
+        [
+            (zipfile.ZIP_STORED, True),
+            (zipfile.ZIP_DEFLATED, True),
+            (zipfile.ZIP_DEFLATED, False),
+            # Read by buffering the archive for zipfile
+            (zipfile.ZIP_STORED, False),
+            (zipfile.ZIP_BZIP2, True),
+        ],
+    )
+    def test_extracts_files(self, compression, seekable, chunk_size):
+        """Test that every file is extracted however the archive is written and split."""
+        content = os.urandom(5000) + b"\x00" * 5000
+        archive = make_zip(content, compression, seekable)
+
+        assert list(iter_zip_members(chunked(archive, chunk_size))) == [content, b"second file"]
+
+    def test_falls_back_from_later_file(self):
+        """Test that files after one this cannot stream are read from the buffered rest."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            zip_file.writestr("first.png", b"first", compress_type=zipfile.ZIP_DEFLATED)
+            zip_file.writestr("second.png", b"second", compress_type=zipfile.ZIP_BZIP2)
+            zip_file.writestr("third.png", b"third", compress_type=zipfile.ZIP_DEFLATED)
+
+        assert list(iter_zip_members(chunked(buffer.getvalue(), 32))) == [b"first", b"second", b"third"]
+
+    def test_empty_file(self):
+        """Test that an empty file is extracted."""
+        assert next(iter_zip_members(chunked(make_zip(b""), 10))) == b""
+
+    @pytest.mark.parametrize(
+        "archive",
+        [
+            b"",
+            b"invalid zip data",
+            make_zip(os.urandom(1000))[:200],
+            make_zip(os.urandom(1000), zipfile.ZIP_DEFLATED)[:200],
+            make_zip(os.urandom(1000), zipfile.ZIP_DEFLATED, seekable=False)[:1045],
+        ],
+        ids=["empty", "not a zip", "truncated stored", "truncated deflated", "truncated descriptor"],
+    )
+    def test_unreadable_archive(self, archive):
+        """Test that archives cut short or not ZIP at all are reported as bad."""
+        with pytest.raises(zipfile.BadZipFile):
+            list(iter_zip_members(chunked(archive, 16)))
+
+    def test_empty_archive(self):
+        """Test that an archive without files yields nothing."""
+        buffer = io.BytesIO()
+        zipfile.ZipFile(buffer, "w").close()
+
+        assert list(iter_zip_members([buffer.getvalue()])) == []
+
+    def test_corrupt_file_detected(self):
+        """Test that a file whose bytes do not match its CRC is reported as bad."""
+        archive = bytearray(make_zip(b"image data" * 100))
+        archive[100] ^= 0xFF
+
+        with pytest.raises(zipfile.BadZipFile, match="CRC"):
+            next(iter_zip_members([bytes(archive)]))
+
+    def test_archive_not_held_in_memory(self):
+        """Test that extracting a large image allocates little more than the image itself."""
+        size = 8 * 1024 * 1024
+        archive = make_zip(os.urandom(size))
+        chunks = chunked(archive, 64 * 1024)
+
+        tracemalloc.start()
+        try:
+            image_bytes = next(iter_zip_members(chunks))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert len(image_bytes) == size
+        # Buffering the archive first, as zipfile needs, would take twice the image size
+        assert peak < size * 1.3
+
+    def test_streamed_download_reuses_connection(self, zip_server):
+        """Test that a streamed image download leaves its connection open for reuse."""
+        client = NovelAIClient("test-key", base_url=zip_server)
+
+        for _ in range(3):
+            assert client.generate_image("test prompt") == b"zipped image data"
+
+        assert client.get_pool_stats()["hosts"]["127.0.0.1"]["connections_opened"] == 1
+
+    def test_download_failure_raises_client_error(self):
+        """Test that a connection lost mid-download raises a client error and is closed."""
+        def broken_download(chunk_size):
+            yield make_zip(os.urandom(1000))[:100]
+            raise requests.ConnectionError("connection reset")
+
+        response = Mock()
+        response.iter_content.side_effect = broken_download
+        client = NovelAIClient("test-key")
+
+        with patch.object(client, "_make_request", return_value=response):
+            with pytest.raises(NovelAIClientError, match="Network error"):
+                client.generate_image("test prompt")
+
+        response.close.assert_called_once()
+
+
+def make_response(status_code, content=b"", headers=None):
+    """A mock response with the given status, body and headers."""
+    response = Mock(status_code=status_code, content=content, headers=headers or {})
+    response.json.return_value = {"message": f"HTTP {status_code}"}
+    return response
+
+
+class TestNovelAIRetries:
+    """Test cases for retrying refused, failed and timed-out requests."""
+
+    @pytest.fixture
+    def sleeps(self):
+        """Record the waits between attempts instead of sleeping."""
+        with patch("novelai_client.time.sleep") as mock_sleep:
+            yield mock_sleep
+
+    def test_generation_retried_when_refused(self, sleeps):
+        """Test that a generation refused with 429 is retried and the retry counted."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(
+            client.session, "post", side_effect=[make_response(429), make_response(200, b"ok")]
+        ) as mock_post, count_retries() as retry_count:
+            response = client._make_request("ai/generate-image", {})
+
+        assert response.content == b"ok"
+        assert mock_post.call_count == 2
+        assert retry_count.retries == 1
+        assert client.get_pool_stats()["retries"] == 1
+
+    def test_generation_not_retried_on_server_error(self, sleeps):
+        """Test that a generation is not repeated after a 500, as it may have spent Anlas."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(client.session, "post", return_value=make_response(500)) as mock_post:
+            with pytest.raises(NovelAIAPIError) as exc_info:
+                client._make_request("ai/generate-image", {})
+
+        assert exc_info.value.status_code == 500
+        assert mock_post.call_count == 1
+
+    def test_idempotent_request_retried_on_server_error_and_timeout(self, sleeps):
+        """Test that vibe encoding is retried after server errors and read timeouts."""
+        client = NovelAIClient("test-key")
+
+        with patch.object(
+            client.session,
+            "post",
+            side_effect=[make_response(503), requests.ReadTimeout("slow"), make_response(200, b"vibe")],
+        ):
+            assert client.encode_vibe(b"image", 1.0, NovelAIModel.DIFFUSION_4_5_FULL.value) == base64.b64encode(b"vibe").decode()
+
+        assert sleeps.call_count == 2
+
+    def test_gives_up_after_max_attempts(self, sleeps):
+        """Test that the last refusal is raised once the attempts run out."""
+        client = NovelAIClient("test-key", retry_policy=NovelAIRetryPolicy(max_attempts=3))
+
+        with patch.object(client.session, "post", return_value=make_response(429)) as mock_post:
+            with pytest.raises(NovelAIAPIError) as exc_info:
+                client._make_request("ai/generate-image", {})
+
+        assert exc_info.value.status_code == 429
+        assert mock_post.call_count == 3
+
+    def test_retry_after_honoured(self, sleeps):
+        """Test that a Retry-After header sets the least wait before the retry."""
+        client = NovelAIClient("test-key", retry_policy=NovelAIRetryPolicy(base_delay=0.1))
+
+        with patch.object(
+            client.session,
+            "post",
+            side_effect=[make_response(429, headers={"retry-after": "7"}), make_response(200)],
+        ):
+            client._make_request("ai/generate-image", {})
+
+        sleeps.assert_called_once_with(7.0)
+
+    def test_deadline_stops_retries(self, sleeps):
+        """Test that no retry is started that would wait past the deadline."""
+        client = NovelAIClient("test-key", retry_policy=NovelAIRetryPolicy(deadline=5))
+
+        with patch.object(
+            client.session, "post", return_value=make_response(429, headers={"retry-after": "60"})
+        ) as mock_post:
+            with pytest.raises(NovelAIAPIError):
+                client._make_request("ai/generate-image", {})
+
+        assert mock_post.call_count == 1
+        sleeps.assert_not_called()
+
+    def test_backoff_grows_with_jitter(self):
+        """Test that waits are jittered below an exponentially growing cap."""
+        policy = NovelAIRetryPolicy(base_delay=1.0, max_delay=5.0)
+
+        with patch("novelai_client.random.uniform", side_effect=lambda low, high: high):
+            assert [policy.backoff(retry) for retry in range(1, 5)] == [1.0, 2.0, 4.0, 5.0]
+        assert 0 <= policy.backoff(2) <= 2.0
+
+    def test_parse_retry_after(self):
+        """Test that Retry-After is parsed from seconds and from HTTP dates."""
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
 class TestNovelAIEnums:
     """Test cases for NovelAI enum classes."""
     
@@ -1274,6 +1674,70 @@ class TestNovelAIInpaintPayload:
         assert isinstance(payload, NovelAIGenerationPayload)
 
 
+def mask_png(pixels):
+    """Encode an array of 0-255 values as a greyscale PNG mask."""
+    image = PILImage.fromarray(np.asarray(pixels, dtype=np.uint8))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def decode_mask(mask_bytes):
+    """Decode a processed mask to a boolean array of painted pixels."""
+    return np.asarray(PILImage.open(io.BytesIO(mask_bytes)).convert("L")) > 128
+
+
+class TestNovelAIMaskProcessing:
+    """Test cases for turning an inpainting mask into NovelAI's 8x8 block mask."""
+
+    @pytest.fixture
+    def client(self):
+        return NovelAIClient("test-key")
+
+    def test_single_pixel_marks_its_block(self, client):
+        """Test that one painted pixel paints exactly the 8x8 block containing it."""
+        pixels = np.zeros((32, 32))
+        pixels[13, 22] = 255
+
+        painted = decode_mask(client._process_novelai_mask(mask_png(pixels)))
+
+        expected = np.zeros((32, 32), dtype=bool)
+        expected[8:16, 16:24] = True
+        assert (painted == expected).all()
+
+    def test_thin_stroke_kept(self, client):
+        """Test that a one-pixel stroke between sampled pixels still paints its blocks."""
+        pixels = np.zeros((64, 64))
+        pixels[:, 37] = 255
+
+        painted = decode_mask(client._process_novelai_mask(mask_png(pixels)))
+
+        assert painted[:, 32:40].all()
+        assert painted.sum() == 64 * 8
+
+    def test_threshold(self, client):
+        """Test that only pixels brighter than 128 count as painted."""
+        pixels = np.zeros((16, 8))
+        pixels[:8] = 128
+        pixels[8:][3, 3] = 129
+
+        painted = decode_mask(client._process_novelai_mask(mask_png(pixels)))
+
+        assert not painted[:8].any()
+        assert painted[8:].all()
+
+    def test_size_not_multiple_of_block(self, client):
+        """Test that partial edge blocks are painted and cropped to the original size."""
+        pixels = np.zeros((21, 19))
+        pixels[20, 18] = 255
+
+        painted = decode_mask(client._process_novelai_mask(mask_png(pixels)))
+
+        assert painted.shape == (21, 19)
+        assert painted[16:, 16:].all()
+        assert painted.sum() == 5 * 3
+
+
 class TestNovelAIImg2ImgPayload:
     """Test cases for NovelAIImg2ImgPayload dataclass."""
     
@@ -1406,8 +1870,7 @@ class TestNovelAIVibeEncoding:
         client = NovelAIClient("test-key")
         
         with patch.object(client, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             result = client.generate_image(prompt, vibes=vibes)
@@ -1466,8 +1929,7 @@ class TestNovelAIVibeEncoding:
         client = NovelAIClient("test-key")
         
         with patch.object(client, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             result = client.generate_image("test prompt")
@@ -1500,8 +1962,7 @@ class TestNovelAIVibeEncoding:
         
         with patch.object(client, '_make_request') as mock_request:
             with patch.object(client, '_process_novelai_mask', return_value=b"processed_mask"):
-                mock_response = Mock()
-                mock_response.content = zip_content
+                mock_response = zip_response(zip_content)
                 mock_request.return_value = mock_response
                 
                 result = client.generate_inpaint_image(
@@ -1586,8 +2047,7 @@ class TestNovelAIVibeEncoding:
         client = NovelAIClient("test-key")
         
         with patch.object(client, '_make_request') as mock_request:
-            mock_response = Mock()
-            mock_response.content = zip_content
+            mock_response = zip_response(zip_content)
             mock_request.return_value = mock_response
             
             result = client.generate_img2img_image(
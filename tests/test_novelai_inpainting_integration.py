@@ -226,13 +226,12 @@ class TestInpaintingImageProcessing:
         original_mask = PILImage.open(io.BytesIO(sample_mask_image))
         assert processed_mask.size == original_mask.size
         
-        # Should be RGB format
-        assert processed_mask.mode == 'RGB'
+        # Should be a 1-bit mask
+        assert processed_mask.mode == '1'
         
-        # Should have block structure due to downscale/upscale process
-        # Check that we have pure black/white pixels
+        # Should have block structure, with pure black/white pixels
         center_pixel = processed_mask.getpixel((256, 256))
-        assert center_pixel in [(0, 0, 0), (255, 255, 255)]
+        assert center_pixel == 255  # Should be white (inpaint area)
         
         corner_pixel = processed_mask.getpixel((0, 0))
-        assert corner_pixel == (0, 0, 0)  # Should be black (keep area)
\ No newline at end of file
+        assert corner_pixel == 0  # Should be black (keep area)
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""Tests for the account-level NovelAI generation scheduler."""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from novelai_client import NovelAIClient
+from novelai_scheduler import (
+    NovelAIRequestClass,
+    NovelAIScheduler,
+    current_request_context,
+    novelai_request,
+)
+
+
+def wait_until(condition, timeout: float = 2.0) -> None:
+    """Wait for a condition set by another thread."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.005)
+
+
+class QueuedRequests:
+    """Queue requests on a scheduler from threads, one at a time, recording the order they run in."""
+
+    def __init__(self, scheduler: NovelAIScheduler):
+        self.scheduler = scheduler
+        self.order: list[str] = []
+        self.threads: list[threading.Thread] = []
+
+    def add(self, name: str, username: str, request_class: NovelAIRequestClass, on_position=None) -> None:
+        """Start a request and wait until it is queued, so requests queue in the order added."""
+        queued = self.scheduler.get_stats()["queued"]
+
+        def run():
+            with self.scheduler.slot(username, request_class, on_position):
+                self.order.append(name)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+        wait_until(lambda: self.scheduler.get_stats()["queued"] == queued + 1)
+
+    def join(self) -> None:
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+
+class TestNovelAIScheduler:
+    """Test cases for slot limits and queue order."""
+
+    @pytest.fixture
+    def scheduler(self):
+        """A scheduler allowing one generation at a time."""
+        return NovelAIScheduler(concurrency=1)
+
+    @pytest.fixture
+    def held_slot(self, scheduler):
+        """Hold the only slot until the test releases it, so later requests queue."""
+        release = threading.Event()
+
+        def hold():
+            with scheduler.slot("holder"):
+                release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        wait_until(lambda: scheduler.get_stats()["running"] == 1)
+        yield release
+        release.set()
+        thread.join(timeout=2)
+
+    def test_concurrency_limit(self):
+        """Test that no more requests run at once than the account allows."""
+        scheduler = NovelAIScheduler(concurrency=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def generate():
+            with scheduler.slot("user"):
+                with lock:
+                    running.append(1)
+                    peak.append(len(running))
+                time.sleep(0.02)
+                with lock:
+                    running.pop()
+
+        threads = [threading.Thread(target=generate) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=2)
+
+        assert max(peak) == 2
+        assert scheduler.get_stats()["classes"]["interactive"]["granted"] == 6
+
+    def test_interactive_before_grid_before_background(self, scheduler, held_slot):
+        """Test that waiting requests run by class, whatever order they arrived in."""
+        queued = QueuedRequests(scheduler)
+        queued.add("preview", "alice", NovelAIRequestClass.BACKGROUND)
+        queued.add("grid", "bob", NovelAIRequestClass.GRID)
+        queued.add("interactive", "carol", NovelAIRequestClass.INTERACTIVE)
+
+        held_slot.set()
+        queued.join()
+
+        assert queued.order == ["interactive", "grid", "preview"]
+
+    def test_users_take_turns_within_class(self, scheduler, held_slot):
+        """Test that one user's batch does not keep another user's request waiting until it ends."""
+        queued = QueuedRequests(scheduler)
+        for index in range(3):
+            queued.add(f"alice {index}", "alice", NovelAIRequestClass.GRID)
+        queued.add("bob 0", "bob", NovelAIRequestClass.GRID)
+
+        held_slot.set()
+        queued.join()
+
+        assert queued.order == ["alice 0", "bob 0", "alice 1", "alice 2"]
+
+    def test_queue_position_reported(self, scheduler, held_slot):
+        """Test that a waiting request hears how many are ahead as the queue moves."""
+        positions = []
+        queued = QueuedRequests(scheduler)
+        queued.add("first", "alice", NovelAIRequestClass.INTERACTIVE)
+        queued.add("second", "bob", NovelAIRequestClass.INTERACTIVE, on_position=positions.append)
+
+        assert scheduler.get_queue("bob")["waiting"] == [
+            {"request_class": "interactive", "position": 1, "waited_seconds": pytest.approx(0, abs=1)}
+        ]
+
+        held_slot.set()
+        queued.join()
+
+        # 0 is only heard if the first request is still running when the second is next
+        assert positions[0] == 1
+        assert positions == sorted(positions, reverse=True)
+        assert scheduler.get_queue("bob")["waiting"] == []
+
+    def test_rejects_invalid_concurrency(self):
+        """Test that the scheduler needs at least one slot."""
+        with pytest.raises(ValueError):
+            NovelAIScheduler(concurrency=0)
+
+
+class TestNovelAIRequestContext:
+    """Test cases for attributing a thread's requests to a user and class."""
+
+    def test_class_inherited_from_enclosing_block(self):
+        """Test that generation functions called by a grid keep the grid's class."""
+        with novelai_request("alice", NovelAIRequestClass.GRID):
+            with novelai_request("alice") as context:
+                assert context.request_class == NovelAIRequestClass.GRID
+            assert current_request_context().request_class == NovelAIRequestClass.GRID
+        assert current_request_context() is None
+
+    def test_default_class_is_interactive(self):
+        """Test that requests outside any block are interactive."""
+        with novelai_request("alice") as context:
+            assert context.request_class == NovelAIRequestClass.INTERACTIVE
+
+    def test_client_generation_holds_slot(self):
+        """Test that a client request holds a slot of the context's class while it is sent."""
+        scheduler = NovelAIScheduler()
+        client = NovelAIClient("test-key", scheduler=scheduler)
+        seen_stats = []
+
+        def post(*args, **kwargs):
+            seen_stats.append(scheduler.get_stats())
+            return Mock(status_code=200, content=b"ok")
+
+        with patch.object(client.session, "post", side_effect=post):
+            with novelai_request("alice", NovelAIRequestClass.BACKGROUND):
+                client._make_request("ai/generate-image", {})
+
+        assert seen_stats[0]["running"] == 1
+        assert scheduler.get_stats()["classes"]["background"]["granted"] == 1
+        assert scheduler.get_stats()["running"] == 0
+
+
+class TestNovelAIQueueEndpoint:
+    """Test cases for the /novelai/queue endpoint."""
+
+    def test_requires_login(self, client):
+        """Test that the queue endpoint requires a session."""
+        assert client.get("/novelai/queue").status_code == 401
+
+    def test_returns_users_queue(self, client):
+        """Test that the endpoint reports the logged-in user's waiting requests."""
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+        with patch("app.novelai_scheduler.get_queue", return_value={"waiting": []}) as get_queue:
+            response = client.get("/novelai/queue")
+
+        get_queue.assert_called_once_with("testuser")
+        assert response.json == {"waiting": []}
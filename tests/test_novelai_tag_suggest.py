@@ -4,10 +4,14 @@ Tests for NovelAI tag suggestion functionality.
 Covers NovelAIClient.suggest_tags() and the /novelai/suggest-tags Flask endpoint.
 """
 
+import threading
+import time
+
 import pytest
 from unittest.mock import Mock, patch
 
-from novelai_client import NovelAIClient, NovelAIAPIError, NovelAIClientError
+from novelai_client import NovelAIClient, NovelAIAPIError, NovelAIClientError, NovelAIRetryPolicy
+from tag_suggestions import TagIndex, TagRecord, TagSuggestionCache, load_tag_dump, tag_matches_query
 
 
 # ---------------------------------------------------------------------------
@@ -16,7 +20,8 @@ from novelai_client import NovelAIClient, NovelAIAPIError, NovelAIClientError
 
 class TestSuggestTags:
     def _make_client(self):
-        return NovelAIClient("test-key")
+        # Server errors are retried; don't wait between attempts
+        return NovelAIClient("test-key", retry_policy=NovelAIRetryPolicy(base_delay=0))
 
     def _mock_get(self, client, json_body, status_code=200):
         mock_response = Mock()
@@ -49,6 +54,7 @@ class TestSuggestTags:
         client.session.get.assert_called_once_with(
             "https://image.novelai.net/ai/generate-image/suggest-tags",
             params={"model": "nai-diffusion-4-5-full", "prompt": "blue", "lang": "en"},
+            timeout=client.timeouts.suggest_tags,
         )
 
     def test_empty_tags_list(self):
@@ -122,6 +128,12 @@ class TestSuggestTags:
 # ---------------------------------------------------------------------------
 
 class TestSuggestTagsEndpoint:
+    @pytest.fixture(autouse=True)
+    def empty_cache(self, monkeypatch):
+        """Each test asks NovelAI afresh instead of getting an earlier test's answer."""
+        import app
+        monkeypatch.setattr(app, "tag_suggestion_cache", TagSuggestionCache(app.tag_suggestion_cache.fetch, index=TagIndex()))
+
     def _login(self, client):
         with client.session_transaction() as sess:
             sess["username"] = "testuser"
@@ -155,8 +167,8 @@ class TestSuggestTagsEndpoint:
         tags = [{"tag": "blue eyes", "count": 100000, "confidence": 0.95}]
 
         with patch("app.NOVELAI_API_KEY", "fake-key"):
-            with patch("app.NovelAIClient") as MockClient:
-                MockClient.return_value.suggest_tags.return_value = tags
+            with patch("app.novelai_client") as mock_client:
+                mock_client.suggest_tags.return_value = tags
                 resp = client.get("/novelai/suggest-tags?prompt=blue&model=nai-diffusion-4-5-full")
 
         assert resp.status_code == 200
@@ -167,11 +179,11 @@ class TestSuggestTagsEndpoint:
         self._login(client)
 
         with patch("app.NOVELAI_API_KEY", "fake-key"):
-            with patch("app.NovelAIClient") as MockClient:
-                MockClient.return_value.suggest_tags.return_value = []
+            with patch("app.novelai_client") as mock_client:
+                mock_client.suggest_tags.return_value = []
                 client.get("/novelai/suggest-tags?prompt=blue")
-                MockClient.return_value.suggest_tags.assert_called_once()
-                _, kwargs = MockClient.return_value.suggest_tags.call_args
+                mock_client.suggest_tags.assert_called_once()
+                _, kwargs = mock_client.suggest_tags.call_args
                 # model kwarg should be the default
                 assert "model" in kwargs
 
@@ -179,8 +191,8 @@ class TestSuggestTagsEndpoint:
         self._login(client)
 
         with patch("app.NOVELAI_API_KEY", "fake-key"):
-            with patch("app.NovelAIClient") as MockClient:
-                MockClient.return_value.suggest_tags.side_effect = NovelAIAPIError(401, "Unauthorized")
+            with patch("app.novelai_client") as mock_client:
+                mock_client.suggest_tags.side_effect = NovelAIAPIError(401, "Unauthorized")
                 resp = client.get("/novelai/suggest-tags?prompt=blue&model=nai-diffusion-4-5-full")
 
         assert resp.status_code == 500
@@ -189,12 +201,356 @@ class TestSuggestTagsEndpoint:
         self._login(client)
 
         with patch("app.NOVELAI_API_KEY", "fake-key"):
-            with patch("app.NovelAIClient") as MockClient:
-                MockClient.return_value.suggest_tags.side_effect = NovelAIClientError("timeout")
+            with patch("app.novelai_client") as mock_client:
+                mock_client.suggest_tags.side_effect = NovelAIClientError("timeout")
                 resp = client.get("/novelai/suggest-tags?prompt=blue&model=nai-diffusion-4-5-full")
 
         assert resp.status_code == 500
 
+    def test_repeated_query_served_from_cache(self, client):
+        self._login(client)
+        tags = [{"tag": "blue eyes", "count": 100000, "confidence": 0.95}]
+
+        with patch("app.NOVELAI_API_KEY", "fake-key"):
+            with patch("app.novelai_client") as mock_client:
+                mock_client.suggest_tags.return_value = tags
+                first = client.get("/novelai/suggest-tags?prompt=blue&model=nai-diffusion-4-5-full")
+                second = client.get("/novelai/suggest-tags?prompt=blue&model=nai-diffusion-4-5-full")
+
+        assert first.get_json() == second.get_json() == {"tags": tags}
+        mock_client.suggest_tags.assert_called_once()
+
+    def test_local_index_answers(self, client, monkeypatch):
+        import app
+        self._login(client)
+        monkeypatch.setattr(app.tag_suggestion_cache, "index", TagIndex(TAGS, complete=True))
+
+        with patch("app.NOVELAI_API_KEY", "fake-key"):
+            with patch("app.novelai_client") as mock_client:
+                resp = client.get("/novelai/suggest-tags?prompt=yellow&model=nai-diffusion-4-5-full")
+
+        assert resp.get_json() == {
+            "tags": [{"tag": "blonde hair", "count": 300000, "confidence": 1.0, "alias": "yellow hair"}]
+        }
+        mock_client.suggest_tags.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# TagSuggestionCache unit tests
+# ---------------------------------------------------------------------------
+
+MODEL = "nai-diffusion-4-5-full"
+
+
+def suggestion(tag, count=1000):
+    return {"tag": tag, "count": count, "confidence": 0.9}
+
+
+class TestTagMatchesQuery:
+    @pytest.mark.parametrize("tag,query,expected", [
+        ("long hair", "lon", True),
+        ("very long hair", "long", True),
+        ("long hair", "long_h", True),
+        ("Long Hair", "long h", True),
+        ("blonde hair", "long", False),
+        ("long hair", "hairs", False),
+    ])
+    def test_matches_tag_or_word_start(self, tag, query, expected):
+        assert tag_matches_query(tag, query) is expected
+
+
+class TestTagSuggestionCache:
+    def test_repeated_query_fetched_once(self):
+        fetch = Mock(return_value=[suggestion("blue eyes")])
+        cache = TagSuggestionCache(fetch)
+
+        assert cache.suggest(MODEL, "blue") == [suggestion("blue eyes")]
+        assert cache.suggest(MODEL, "blue") == [suggestion("blue eyes")]
+
+        fetch.assert_called_once_with(MODEL, "blue", "en")
+        assert cache.get_stats()["hits"] == 1
+
+    def test_key_includes_model_and_lang(self):
+        fetch = Mock(return_value=[])
+        cache = TagSuggestionCache(fetch)
+
+        cache.suggest(MODEL, "blue")
+        cache.suggest("other-model", "blue")
+        cache.suggest(MODEL, "blue", lang="jp")
+
+        assert fetch.call_count == 3
+
+    def test_longer_query_filtered_from_complete_prefix(self):
+        fetch = Mock(return_value=[suggestion("long hair"), suggestion("looking at viewer"), suggestion("very long hair")])
+        cache = TagSuggestionCache(fetch, result_limit=10)
+
+        cache.suggest(MODEL, "lo")
+        result = cache.suggest(MODEL, "long")
+
+        assert [tag["tag"] for tag in result] == ["long hair", "very long hair"]
+        fetch.assert_called_once()
+        assert cache.get_stats()["prefix_hits"] == 1
+
+    def test_longer_query_fetched_when_prefix_truncated(self):
+        fetch = Mock(side_effect=[
+            [suggestion("long hair"), suggestion("looking at viewer")],
+            [suggestion("long hair"), suggestion("long sleeves")],
+        ])
+        cache = TagSuggestionCache(fetch, result_limit=2)
+
+        cache.suggest(MODEL, "lo")
+        result = cache.suggest(MODEL, "long")
+
+        # "long sleeves" would have been missed by filtering the truncated "lo" answer
+        assert [tag["tag"] for tag in result] == ["long hair", "long sleeves"]
+        assert fetch.call_count == 2
+
+    def test_entries_expire(self):
+        fetch = Mock(return_value=[])
+        cache = TagSuggestionCache(fetch, ttl=60)
+
+        with patch("tag_suggestions.time.monotonic", return_value=1000.0):
+            cache.suggest(MODEL, "blue")
+        with patch("tag_suggestions.time.monotonic", return_value=1061.0):
+            cache.suggest(MODEL, "blue")
+
+        assert fetch.call_count == 2
+
+    def test_least_recently_used_evicted(self):
+        fetch = Mock(return_value=[])
+        cache = TagSuggestionCache(fetch, max_entries=2)
+
+        cache.suggest(MODEL, "red")
+        cache.suggest(MODEL, "blue")
+        cache.suggest(MODEL, "red")
+        cache.suggest(MODEL, "green")  # evicts "blue"
+        fetch.reset_mock()
+
+        cache.suggest(MODEL, "red")
+        cache.suggest(MODEL, "blue")
+
+        fetch.assert_called_once_with(MODEL, "blue", "en")
+
+    def test_errors_not_cached(self):
+        fetch = Mock(side_effect=[NovelAIClientError("timeout"), [suggestion("blue eyes")]])
+        cache = TagSuggestionCache(fetch)
+
+        with pytest.raises(NovelAIClientError):
+            cache.suggest(MODEL, "blue")
+
+        assert cache.suggest(MODEL, "blue") == [suggestion("blue eyes")]
+        assert cache.get_stats()["errors"] == 1
+
+    def test_concurrent_identical_queries_coalesced(self):
+        release = threading.Event()
+        fetch = Mock(side_effect=lambda *args: release.wait(2) and [suggestion("blue eyes")])
+        cache = TagSuggestionCache(fetch)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.suggest(MODEL, "blue"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 2
+        while cache.get_stats()["coalesced"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=2)
+
+        fetch.assert_called_once()
+        assert results == [[suggestion("blue eyes")]] * 5
+
+    def test_coalesced_queries_share_error(self):
+        release = threading.Event()
+
+        def fail(*args):
+            release.wait(2)
+            raise NovelAIAPIError(500, "Internal Server Error")
+
+        cache = TagSuggestionCache(Mock(side_effect=fail))
+        errors = []
+
+        def suggest():
+            try:
+                cache.suggest(MODEL, "blue")
+            except NovelAIAPIError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=suggest) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 2
+        while cache.get_stats()["coalesced"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=2)
+
+        assert len(errors) == 3
+        assert cache.get_stats()["misses"] == 1
+
+    def test_warm_prefix_answers_longer_queries_from_cache(self):
+        tags = [suggestion(f"long tag {index}") for index in range(9)]
+        fetch = Mock(return_value=tags)
+        cache = TagSuggestionCache(fetch)
+        cache.suggest(MODEL, "l")
+
+        queries = ["lo", "lon", "long", "long ", "long t", "long ta", "long tag"]
+        for query in queries:
+            assert len(cache.suggest(MODEL, query)) == 9
+
+        fetch.assert_called_once()
+        assert cache.get_stats()["prefix_hits"] == len(queries)
+
+
+# ---------------------------------------------------------------------------
+# TagIndex unit tests
+# ---------------------------------------------------------------------------
+
+TAGS = [
+    TagRecord("long hair", 500000, ("long_hair",)),
+    TagRecord("looking at viewer", 400000),
+    TagRecord("very long hair", 100000),
+    TagRecord("long sleeves", 200000),
+    TagRecord("1girl", 900000, ("female",)),
+    TagRecord("blonde hair", 300000, ("yellow hair",)),
+]
+
+
+class TestTagIndex:
+    def test_ranked_by_count(self):
+        index = TagIndex(TAGS)
+
+        assert [tag["tag"] for tag in index.lookup("lo")] == ["long hair", "looking at viewer", "long sleeves", "very long hair"]
+        assert index.lookup("lo")[0] == {"tag": "long hair", "count": 500000, "confidence": 1.0}
+
+    @pytest.mark.parametrize("query", ["lo", "long", "long h", "long_ha", "LONG HAIR"])
+    def test_short_and_long_prefixes_agree_with_matching(self, query):
+        index = TagIndex(TAGS)
+
+        expected = sorted(
+            (record for record in TAGS if tag_matches_query(record.name, query)), key=lambda record: -record.count
+        )
+        assert [tag["tag"] for tag in index.lookup(query)] == [record.name for record in expected]
+
+    def test_matches_aliases(self):
+        index = TagIndex(TAGS)
+
+        assert index.lookup("fem") == [{"tag": "1girl", "count": 900000, "confidence": 1.0, "alias": "female"}]
+        assert [tag["tag"] for tag in index.lookup("yellow")] == ["blonde hair"]
+
+    def test_tag_listed_once(self):
+        index = TagIndex([TagRecord("hair hair", 10, ("hair",))])
+
+        assert index.lookup("hai") == [{"tag": "hair hair", "count": 10, "confidence": 1.0}]
+        assert index.lookup("hair h") == [{"tag": "hair hair", "count": 10, "confidence": 1.0}]
+
+    def test_limit(self):
+        index = TagIndex(TAGS)
+
+        assert len(index.lookup("l", limit=2)) == 2
+        assert len(index.lookup("long", limit=1)) == 1
+
+    def test_learned_tags_indexed_on_rebuild(self, tmp_path):
+        index = TagIndex(rebuild_interval=60)
+        index.learn([suggestion("blue eyes", 100), suggestion("blue sky", 50)])
+
+        assert index.lookup("blue") == []
+        index.rebuild()
+        assert [tag["tag"] for tag in index.lookup("blue")] == ["blue eyes", "blue sky"]
+
+        path = str(tmp_path / "tags" / "learned.json")
+        index.save_learned(path)
+        restored = TagIndex()
+        restored.load_learned(path)
+        restored.rebuild()
+        assert restored.lookup("blue") == index.lookup("blue")
+
+    def test_load_csv_dump(self, tmp_path):
+        path = tmp_path / "tags.csv"
+        path.write_text('name,category,count,aliases\nlong_hair,0,500000,"longhair,long-hair"\n1girl,0,900000\n')
+
+        records = load_tag_dump(str(path))
+
+        assert records == [TagRecord("long_hair", 500000, ("longhair", "long-hair")), TagRecord("1girl", 900000)]
+
+    def test_load_json_dump(self, tmp_path):
+        path = tmp_path / "tags.json"
+        path.write_text('[{"tag": "long hair", "count": 500000, "aliases": ["long_hair"]}, {"name": "1girl", "count": 9}]')
+
+        assert load_tag_dump(str(path)) == [TagRecord("long hair", 500000, ("long_hair",)), TagRecord("1girl", 9)]
+
+    def test_broad_prefixes_answered_without_scanning(self):
+        records = [TagRecord(f"tag {index:05d} word{index % 97}", index) for index in range(20000)]
+        index = TagIndex(records)
+        ranked = sorted(records, key=lambda record: -record.count)
+
+        with patch.object(index._snapshot, "_scan", side_effect=AssertionError("scanned")):
+            for query in ["t", "ta", "tag", "tag 0", "tag 01", "word", "word1"]:
+                assert query in index._snapshot.top
+                expected = [record.name for record in ranked if tag_matches_query(record.name, query)][:10]
+                assert [tag["tag"] for tag in index.lookup(query)] == expected
+
+
+class TestTagSuggestionCacheWithIndex:
+    def test_complete_index_answers_without_novelai(self):
+        fetch = Mock(return_value=[])
+        cache = TagSuggestionCache(fetch, index=TagIndex(TAGS, complete=True))
+
+        assert [tag["tag"] for tag in cache.suggest(MODEL, "blon")] == ["blonde hair"]
+        fetch.assert_not_called()
+        assert cache.get_stats()["index_hits"] == 1
+
+    def test_novelai_asked_when_index_has_no_matches(self):
+        fetch = Mock(return_value=[suggestion("zettai ryouiki")])
+        cache = TagSuggestionCache(fetch, index=TagIndex(TAGS, complete=True))
+
+        assert cache.suggest(MODEL, "zett") == [suggestion("zettai ryouiki")]
+        fetch.assert_called_once()
+
+    def test_partial_index_defers_to_novelai_and_learns(self):
+        index = TagIndex(TAGS, rebuild_interval=60)
+        fetch = Mock(return_value=[suggestion("blonde hair", 300000), suggestion("blue eyes", 250000)])
+        cache = TagSuggestionCache(fetch, index=index)
+
+        assert cache.suggest(MODEL, "bl") == fetch.return_value
+        index.rebuild()
+
+        assert [tag["tag"] for tag in index.lookup("blu")] == ["blue eyes"]
+
+    def test_full_page_from_partial_index_answers(self):
+        fetch = Mock(return_value=[])
+        cache = TagSuggestionCache(fetch, result_limit=2, index=TagIndex(TAGS))
+
+        assert len(cache.suggest(MODEL, "lo")) == 2
+        fetch.assert_not_called()
+
+    def test_index_used_when_novelai_fails(self):
+        fetch = Mock(side_effect=NovelAIAPIError(429, "Too Many Requests"))
+        cache = TagSuggestionCache(fetch, index=TagIndex(TAGS))
+
+        assert [tag["tag"] for tag in cache.suggest(MODEL, "blon")] == ["blonde hair"]
+        # During the cooldown NovelAI is not asked again for queries the index can answer
+        assert [tag["tag"] for tag in cache.suggest(MODEL, "1gi")] == ["1girl"]
+
+        fetch.assert_called_once()
+        assert cache.get_stats()["index_fallbacks"] == 1
+        assert cache.get_stats()["index_hits"] == 1
+
+    def test_error_raised_when_index_has_no_matches(self):
+        cache = TagSuggestionCache(Mock(side_effect=NovelAIClientError("timeout")), index=TagIndex(TAGS))
+
+        with pytest.raises(NovelAIClientError):
+            cache.suggest(MODEL, "zett")
+
+    def test_other_languages_skip_index(self):
+        fetch = Mock(return_value=[])
+        cache = TagSuggestionCache(fetch, index=TagIndex(TAGS, complete=True))
+
+        cache.suggest(MODEL, "blon", lang="jp")
+
+        fetch.assert_called_once_with(MODEL, "blon", "jp")
+
 
 # ---------------------------------------------------------------------------
 # Integration test (skipped without real key)
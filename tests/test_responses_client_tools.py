@@ -181,3 +181,30 @@ class TestResponsesAPIClientToolIntegration:
         tools = params["tools"]
         assert len(tools) == 1
         assert tools[0]["type"] == "web_search"
+
+    def test_tools_array_reused_per_tool_list(self, mock_openai_client, tool_registry):
+        """Test that the same tool list gets the same array, keeping the request prefix stable."""
+        client = ResponsesAPIClient(mock_openai_client, tool_registry=tool_registry)
+
+        first = client._build_tools_array(["web_search", "calculator"])
+
+        assert client._build_tools_array(["web_search", "calculator"]) is first
+        assert client._build_tools_array(["calculator"]) is not first
+
+    def test_create_response_sends_prompt_cache_key(self, mock_openai_client):
+        """Test that the prompt cache key is passed to the API."""
+        client = ResponsesAPIClient(mock_openai_client)
+        mock_openai_client.responses.create.return_value = Mock()
+
+        client.create_response(input_text="Test message", prompt_cache_key="preset:default")
+
+        params = mock_openai_client.responses.create.call_args.kwargs
+        assert params["prompt_cache_key"] == "preset:default"
+
+    def test_prompt_cache_key_stable_per_preset(self, mock_openai_client):
+        """Test that the default preset shares one key and custom presets get one per user."""
+        client = ResponsesAPIClient(mock_openai_client)
+
+        assert client.get_prompt_cache_key("alice", None) == client.get_prompt_cache_key("bob", "default")
+        assert client.get_prompt_cache_key("alice", "coder") == "preset:alice:coder"
+        assert client.get_prompt_cache_key("alice", "coder") != client.get_prompt_cache_key("bob", "coder")
@@ -1,7 +1,20 @@
 """Tests for the tool framework infrastructure."""
 
+import asyncio
+import os
+import threading
+import time
+
 import pytest
-from tool_framework import BaseTool, ToolRegistry, ToolInfo
+from tool_framework import (
+    EXECUTION_PROCESS,
+    EXECUTION_THREAD,
+    BaseTool,
+    ExecutionProfile,
+    ToolExecutor,
+    ToolInfo,
+    ToolRegistry,
+)
 
 
 class MockTool(BaseTool):
@@ -45,6 +58,26 @@ class MockTool(BaseTool):
         }
 
 
+
+class ProfiledTool(MockTool):
+    """Tool that sleeps, counts its calls in storage and reports its process id."""
+    
+    def __init__(self, profile: ExecutionProfile):
+        self.profile = profile
+    
+    @property
+    def name(self) -> str:
+        return "profiled_tool"
+    
+    @property
+    def execution_profile(self) -> ExecutionProfile:
+        return self.profile
+    
+    def execute(self, parameters: dict, storage) -> dict:
+        time.sleep(parameters.get("seconds", 0))
+        storage.set("calls", storage.get("calls", 0) + 1)
+        return {"success": True, "pid": os.getpid()}
+
 class TestToolInfo:
     """Tests for ToolInfo dataclass."""
     
@@ -536,6 +569,30 @@ class TestToolStorage:
                 assert key in all_data
                 assert all_data[key] == f"value_{i}"
     
+    def test_update_is_atomic(self, tmp_path):
+        """Test that concurrent updates of one key don't lose each other's changes."""
+        from tool_framework import ToolStorage
+        
+        storage = ToolStorage(
+            username="testuser",
+            conversation_id="conv_123",
+            tool_name="calculator",
+            static_folder=str(tmp_path)
+        )
+        
+        def increment():
+            for _ in range(50):
+                storage.update("count", lambda count: count + 1, 0)
+        
+        threads = [threading.Thread(target=increment) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert storage.get("count") == 250
+        assert storage.update("count", lambda count: count * 2) == 500
+    
     def test_storage_file_path_structure(self, tmp_path):
         """Test that storage file is created in correct location."""
         from tool_framework import ToolStorage
@@ -561,6 +618,163 @@ class TestToolStorage:
 
 
 
+class TestToolStorageCache:
+    """Tests for ToolStorageCache class."""
+    
+    def make_storage(self, tmp_path, cache, conversation_id="conv_123", tool_name="calculator"):
+        """Create a ToolStorage that uses the given cache."""
+        from tool_framework import ToolStorage
+        
+        return ToolStorage(
+            username="testuser",
+            conversation_id=conversation_id,
+            tool_name=tool_name,
+            static_folder=str(tmp_path),
+            cache=cache
+        )
+    
+    def read_file(self, tmp_path, conversation_id="conv_123", tool_name="calculator"):
+        """Read a storage file straight from disk, bypassing any cache."""
+        import json
+        
+        path = tmp_path / "chats" / "testuser" / conversation_id / f"{tool_name}.json"
+        return json.loads(path.read_text()) if path.exists() else None
+    
+    def test_file_read_once(self, tmp_path, monkeypatch):
+        """Test that repeated gets and sets only read the file once."""
+        from tool_framework import ToolStorage, ToolStorageCache
+        
+        reads = []
+        original_read = ToolStorage._read_file
+        monkeypatch.setattr(
+            ToolStorage, "_read_file", lambda self: reads.append(1) or original_read(self)
+        )
+        cache = ToolStorageCache(flush_interval=None)
+        
+        for i in range(3):
+            storage = self.make_storage(tmp_path, cache)
+            history = storage.get("history", [])
+            history.append(i)
+            storage.set("history", history)
+        
+        assert len(reads) == 1
+        assert self.make_storage(tmp_path, cache).get("history") == [0, 1, 2]
+    
+    def test_write_back_defers_writes_until_flush(self, tmp_path):
+        """Test that write-back mode only writes dirty data when flushed."""
+        from tool_framework import WRITE_BACK, ToolStorageCache
+        
+        cache = ToolStorageCache(durability=WRITE_BACK, flush_interval=None)
+        self.make_storage(tmp_path, cache).set("count", 1)
+        
+        # The directory isn't even created until the first write
+        assert not (tmp_path / "chats" / "testuser" / "conv_123").exists()
+        
+        assert cache.flush("testuser", "conv_123") == 1
+        assert self.read_file(tmp_path) == {"count": 1}
+        assert cache.flush("testuser", "conv_123") == 0
+    
+    def test_flush_limited_to_conversation(self, tmp_path):
+        """Test that flushing one conversation leaves the others dirty."""
+        from tool_framework import ToolStorageCache
+        
+        cache = ToolStorageCache(flush_interval=None)
+        self.make_storage(tmp_path, cache, conversation_id="conv_1").set("a", 1)
+        self.make_storage(tmp_path, cache, conversation_id="conv_2").set("b", 2)
+        
+        cache.flush("testuser", "conv_1")
+        
+        assert self.read_file(tmp_path, conversation_id="conv_1") == {"a": 1}
+        assert self.read_file(tmp_path, conversation_id="conv_2") is None
+    
+    def test_write_through_writes_immediately(self, tmp_path):
+        """Test that write-through mode writes every change before set returns."""
+        from tool_framework import WRITE_THROUGH, ToolStorageCache
+        
+        cache = ToolStorageCache(durability=WRITE_THROUGH)
+        self.make_storage(tmp_path, cache).set("count", 1)
+        
+        assert self.read_file(tmp_path) == {"count": 1}
+    
+    def test_timer_flushes_dirty_entries(self, tmp_path):
+        """Test that the background timer writes changes without an explicit flush."""
+        import time
+        from tool_framework import ToolStorageCache
+        
+        cache = ToolStorageCache(flush_interval=0.05)
+        self.make_storage(tmp_path, cache).set("count", 1)
+        
+        deadline = time.monotonic() + 5
+        while self.read_file(tmp_path) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cache.close()
+        
+        assert self.read_file(tmp_path) == {"count": 1}
+    
+    def test_eviction_bounds_memory_and_keeps_changes(self, tmp_path):
+        """Test that the cache stays bounded and writes dirty entries it evicts."""
+        from tool_framework import ToolStorageCache
+        
+        cache = ToolStorageCache(max_entries=2, flush_interval=None)
+        for i in range(4):
+            self.make_storage(tmp_path, cache, conversation_id=f"conv_{i}").set("value", i)
+        
+        assert len(cache) == 2
+        assert self.read_file(tmp_path, conversation_id="conv_0") == {"value": 0}
+        assert self.read_file(tmp_path, conversation_id="conv_1") == {"value": 1}
+    
+    def test_values_are_copied(self, tmp_path):
+        """Test that changing a value after set or get doesn't change the cached data."""
+        from tool_framework import ToolStorageCache
+        
+        cache = ToolStorageCache(flush_interval=None)
+        storage = self.make_storage(tmp_path, cache)
+        
+        history = [1]
+        storage.set("history", history)
+        history.append(2)
+        storage.get("history").append(3)
+        
+        assert storage.get("history") == [1]
+    
+    def test_set_rejects_unserializable_value(self, tmp_path):
+        """Test that values that can't be saved as JSON are rejected when set, not at flush."""
+        from tool_framework import ToolStorageCache
+        
+        storage = self.make_storage(tmp_path, ToolStorageCache(flush_interval=None))
+        
+        with pytest.raises(ValueError):
+            storage.set("bad", object())
+    
+    def test_unknown_durability_rejected(self):
+        """Test that an unknown durability mode raises ValueError."""
+        from tool_framework import ToolStorageCache
+        
+        with pytest.raises(ValueError):
+            ToolStorageCache(durability="eventually")
+    
+    def test_executor_uses_cache_and_flushes_storage(self, tmp_path, monkeypatch):
+        """Test that the executor hands tools cached storage and flushes it per conversation."""
+        from tool_framework import ToolExecutor, ToolRegistry, ToolStorageCache
+        
+        class CountingTool(MockTool):
+            def execute(self, parameters: dict, storage) -> dict:
+                storage.set("calls", storage.get("calls", 0) + 1)
+                return {"success": True}
+        
+        monkeypatch.chdir(tmp_path)
+        registry = ToolRegistry()
+        registry.register_tool(CountingTool())
+        executor = ToolExecutor(registry, storage_cache=ToolStorageCache(flush_interval=None))
+        
+        for _ in range(3):
+            executor.execute_tool_call("mock_tool", {}, "testuser", "conv_123")
+        assert self.read_file(tmp_path / "static", tool_name="mock_tool") is None
+        
+        executor.flush_storage("testuser", "conv_123")
+        assert self.read_file(tmp_path / "static", tool_name="mock_tool") == {"calls": 3}
+
+
 class TestToolExecutor:
     """Tests for ToolExecutor class."""
     
@@ -949,3 +1163,450 @@ class TestToolExecutor:
         
         # Verify error logging occurred
         assert any("not found" in record.message.lower() for record in caplog.records)
+    
+    def test_execute_tool_call_async_success(self, tmp_path):
+        """Test that the async entry point runs the tool and returns the same result shape."""
+        import asyncio
+        from tool_framework import ToolExecutor, ToolRegistry
+        
+        registry = ToolRegistry()
+        registry.register_tool(MockTool())
+        executor = ToolExecutor(registry)
+        
+        result = asyncio.run(executor.execute_tool_call_async(
+            tool_name="mock_tool",
+            parameters={"test_param": "test_value"},
+            username="testuser",
+            conversation_id="conv_123"
+        ))
+        
+        assert result["success"] is True
+        assert "test_value" in result["result"]
+    
+    def test_execute_tool_call_async_not_found(self, tmp_path):
+        """Test that the async entry point reports unknown tools like the sync one."""
+        import asyncio
+        from tool_framework import ToolExecutor, ToolRegistry
+        
+        executor = ToolExecutor(ToolRegistry())
+        
+        result = asyncio.run(executor.execute_tool_call_async(
+            tool_name="nonexistent_tool",
+            parameters={},
+            username="testuser",
+            conversation_id="conv_123"
+        ))
+        
+        assert result["success"] is False
+        assert result["error_code"] == "tool_not_found"
+    
+    def test_execute_tool_call_async_does_not_block_loop(self, tmp_path):
+        """Test that a slow synchronous tool runs off the event loop."""
+        import asyncio
+        import time
+        from tool_framework import ToolExecutor, ToolRegistry
+        
+        class SlowTool(MockTool):
+            def execute(self, parameters: dict, storage) -> dict:
+                time.sleep(0.2)
+                return super().execute(parameters, storage)
+        
+        registry = ToolRegistry()
+        registry.register_tool(SlowTool())
+        executor = ToolExecutor(registry)
+        
+        async def run_two():
+            start = time.monotonic()
+            await asyncio.gather(*[
+                executor.execute_tool_call_async(
+                    tool_name="mock_tool",
+                    parameters={"test_param": str(i)},
+                    username="testuser",
+                    conversation_id=f"conv_{i}"
+                )
+                for i in range(2)
+            ])
+            return time.monotonic() - start
+        
+        # Two calls overlap instead of running back to back on the loop thread
+        assert asyncio.run(run_two()) < 0.35
+
+
+def _increment(count: int) -> int:
+    return count + 1
+
+
+class UpdatingTool(ProfiledTool):
+    """ProfiledTool that counts its calls with update() instead of get() and set()."""
+    
+    def execute(self, parameters: dict, storage) -> dict:
+        time.sleep(parameters.get("seconds", 0))
+        storage.update("calls", _increment, 0)
+        return {"success": True, "pid": os.getpid()}
+
+
+class TestToolExecutionProfile:
+    """Tests for running tools according to their ExecutionProfile."""
+    
+    @pytest.fixture
+    def make_executor(self, tmp_path, monkeypatch):
+        """Create executors for a ProfiledTool, stopping their workers afterwards."""
+        monkeypatch.chdir(tmp_path)
+        executors = []
+        
+        def make(**profile_fields) -> ToolExecutor:
+            registry = ToolRegistry()
+            registry.register_tool(ProfiledTool(ExecutionProfile(**profile_fields)))
+            executor = ToolExecutor(registry)
+            executors.append(executor)
+            return executor
+        
+        yield make
+        for executor in executors:
+            executor.close()
+    
+    def call(self, executor: ToolExecutor, seconds: float = 0) -> dict:
+        return executor.execute_tool_call("profiled_tool", {"seconds": seconds}, "testuser", "conv_123")
+    
+    def test_default_profile_is_inline(self):
+        """Test that tools run inline without limits unless they say otherwise."""
+        assert MockTool().execution_profile == ExecutionProfile()
+    
+    @pytest.mark.parametrize("fields", [
+        {"mode": "fiber"},
+        {"timeout": 1.0},
+        {"mode": EXECUTION_THREAD, "timeout": 0},
+        {"mode": EXECUTION_THREAD, "max_concurrency": 0},
+    ])
+    def test_invalid_profile_rejected(self, fields):
+        """Test that unknown modes, inline timeouts and non-positive limits are rejected."""
+        with pytest.raises(ValueError):
+            ExecutionProfile(**fields)
+    
+    def test_thread_call_times_out(self, make_executor):
+        """Test that a thread call over its timeout is reported without waiting for it."""
+        executor = make_executor(mode=EXECUTION_THREAD, timeout=0.1)
+        
+        start = time.monotonic()
+        result = self.call(executor, seconds=1.0)
+        
+        assert time.monotonic() - start < 0.5
+        assert result["success"] is False
+        assert result["error_code"] == "timeout"
+        assert executor.get_stats()["profiled_tool"]["timeouts"] == 1
+    
+    def test_thread_call_times_out_async(self, make_executor):
+        """Test that the async path enforces the timeout without blocking the event loop."""
+        executor = make_executor(mode=EXECUTION_THREAD, timeout=0.1)
+        
+        async def call_with_ticks():
+            ticks = 0
+            task = asyncio.ensure_future(executor.execute_tool_call_async(
+                "profiled_tool", {"seconds": 1.0}, "testuser", "conv_123"
+            ))
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return task.result(), ticks
+        
+        result, ticks = asyncio.run(call_with_ticks())
+        
+        assert result["error_code"] == "timeout"
+        assert ticks > 3
+    
+    def test_concurrency_limit(self, make_executor):
+        """Test that calls over the concurrency limit wait for a free slot."""
+        executor = make_executor(mode=EXECUTION_THREAD, max_concurrency=1)
+        threads = [threading.Thread(target=self.call, args=(executor, 0.2)) for _ in range(2)]
+        
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert time.monotonic() - start >= 0.4
+    
+    def test_process_call_saves_storage(self, make_executor, tmp_path):
+        """Test that a process call runs in a worker process and its storage changes are kept."""
+        from tool_framework import ToolStorage
+        
+        executor = make_executor(mode=EXECUTION_PROCESS, timeout=30.0)
+        
+        first = self.call(executor)
+        second = self.call(executor)
+        
+        assert first["success"] is True
+        assert first["pid"] != os.getpid()
+        assert second["success"] is True
+        assert ToolStorage("testuser", "conv_123", "profiled_tool").get("calls") == 2
+    
+    def test_concurrent_process_calls_keep_updates(self, tmp_path, monkeypatch):
+        """Test that updates made by concurrent process calls are applied to the current storage."""
+        from tool_framework import ToolStorage
+        
+        monkeypatch.chdir(tmp_path)
+        registry = ToolRegistry()
+        registry.register_tool(UpdatingTool(ExecutionProfile(mode=EXECUTION_PROCESS, timeout=30.0, max_concurrency=2)))
+        executor = ToolExecutor(registry)
+        
+        def call():
+            executor.execute_tool_call("profiled_tool", {"seconds": 0.5}, "testuser", "conv_updates")
+        
+        try:
+            threads = [threading.Thread(target=call) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            executor.close()
+        
+        assert ToolStorage("testuser", "conv_updates", "profiled_tool").get("calls") == 2
+    
+    def test_process_call_killed_on_timeout(self, make_executor):
+        """Test that a process call over its timeout is killed and the next call still works."""
+        executor = make_executor(mode=EXECUTION_PROCESS, timeout=2.0)
+        worker_pid = self.call(executor)["pid"]
+        
+        result = self.call(executor, seconds=30)
+        
+        assert result["error_code"] == "timeout"
+        next_result = self.call(executor)
+        assert next_result["success"] is True
+        assert next_result["pid"] != worker_pid
+    
+    def test_timeout_kills_only_its_worker(self):
+        """Test that stopping a timed-out call leaves the pool's other calls running."""
+        from tool_framework import ToolProcessPool
+        
+        pool = ToolProcessPool("sleepy", workers=2)
+        try:
+            stuck = pool.submit(time.sleep, 30)
+            other = pool.submit(divmod, 7, 2)
+            assert other.result(timeout=30) == (3, 1)
+            running = pool.submit(time.sleep, 0.5)
+            
+            pool.cancel(stuck)
+            
+            assert running.result(timeout=30) is None
+            with pytest.raises(RuntimeError, match="was stopped"):
+                stuck.result(timeout=1)
+            assert pool.submit(divmod, 9, 4).result(timeout=30) == (2, 1)
+        finally:
+            pool.terminate()
+    
+    def test_calls_beyond_workers_wait(self):
+        """Test that a pool runs no more calls at once than it has workers."""
+        from tool_framework import ToolProcessPool
+        
+        pool = ToolProcessPool("sleepy", workers=1)
+        try:
+            first = pool.submit(time.sleep, 0.3)
+            second = pool.submit(os.getpid)
+            assert not second.done()
+            first.result(timeout=30)
+            assert second.result(timeout=30) != os.getpid()
+            assert len(pool._workers) == 1
+        finally:
+            pool.terminate()
+    
+    def test_timeout_fails_only_that_call(self, make_executor):
+        """Test that a timed-out process call leaves the tool's other running calls alone."""
+        executor = make_executor(mode=EXECUTION_PROCESS, timeout=2.0, max_concurrency=2)
+        self.call(executor)
+        results = {}
+        
+        def call(name, seconds):
+            results[name] = self.call(executor, seconds)
+        
+        threads = [threading.Thread(target=call, args=("stuck", 30)), threading.Thread(target=call, args=("quick", 1.0))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results["stuck"]["error_code"] == "timeout"
+        assert results["quick"]["success"] is True
+    
+    def test_worker_startup_not_counted_in_timeout(self):
+        """Test that a call's timeout starts when a ready worker picks it up."""
+        from tool_framework import ToolProcessPool
+        
+        pool = ToolProcessPool("sleepy", workers=1, timeout=0.1)
+        try:
+            assert pool.submit(divmod, 7, 2).result(timeout=30) == (3, 1)
+            with pytest.raises(TimeoutError, match="timed out after 0.1 seconds"):
+                pool.submit(time.sleep, 30).result(timeout=30)
+            assert pool.submit(divmod, 9, 4).result(timeout=30) == (2, 1)
+        finally:
+            pool.terminate()
+    
+    def test_memory_limit_applied_in_workers(self):
+        """Test that process workers run their initializer, here capping their memory."""
+        from tool_framework import ToolProcessPool, _limit_process_memory
+        
+        pool = ToolProcessPool("hungry", workers=1, initializer=_limit_process_memory, initargs=(256 * 1024 * 1024,))
+        try:
+            assert len(pool.submit(bytearray, 1024 * 1024).result(timeout=30)) == 1024 * 1024
+            with pytest.raises(MemoryError):
+                pool.submit(bytearray, 512 * 1024 * 1024).result(timeout=30)
+        finally:
+            pool.terminate()
+    
+    def test_failed_worker_start_fails_waiting_calls(self):
+        """Test that calls fail, instead of waiting forever, when workers can't start."""
+        from tool_framework import ToolProcessPool
+        
+        pool = ToolProcessPool("broken", workers=1, initializer=os._exit, initargs=(3,))
+        try:
+            with pytest.raises(RuntimeError, match="exited with code 3 while starting"):
+                pool.submit(divmod, 7, 2).result(timeout=30)
+        finally:
+            pool.terminate()
+    
+    def test_memory_limit_only_for_processes(self):
+        """Test that memory limits are rejected for tools not run in a worker process."""
+        assert ExecutionProfile(mode=EXECUTION_PROCESS, memory_limit_mb=64).memory_limit_mb == 64
+        with pytest.raises(ValueError):
+            ExecutionProfile(mode=EXECUTION_THREAD, memory_limit_mb=64)
+    
+    def test_latency_stats(self, make_executor):
+        """Test that each tool's call count and latency are reported."""
+        executor = make_executor()
+        
+        self.call(executor, seconds=0.05)
+        self.call(executor)
+        
+        stats = executor.get_stats()["profiled_tool"]
+        assert stats["calls"] == 2
+        assert stats["failures"] == 0
+        assert stats["max_ms"] >= 50
+        assert 25 <= stats["mean_ms"] < stats["max_ms"]
+
+
+class DeterministicTool(MockTool):
+    """Deterministic tool that counts how often it really runs."""
+    
+    def __init__(self):
+        self.executions = 0
+        self.recorded = []
+    
+    @property
+    def deterministic(self) -> bool:
+        return True
+    
+    def execute(self, parameters: dict, storage) -> dict:
+        self.executions += 1
+        if parameters.get("fail"):
+            return {"success": False, "error": "failed"}
+        return {"success": True, "result": {"echo": parameters}}
+    
+    def record_cached_result(self, parameters: dict, result: dict, storage) -> None:
+        self.recorded.append(parameters)
+
+
+class TestToolResultCache:
+    """Tests for ToolExecutor's cache of deterministic tool results."""
+    
+    @pytest.fixture(autouse=True)
+    def in_tmp_path(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+    
+    def make_executor(self, tool: BaseTool, **kwargs) -> ToolExecutor:
+        registry = ToolRegistry()
+        registry.register_tool(tool)
+        return ToolExecutor(registry, **kwargs)
+    
+    def call(self, executor: ToolExecutor, tool_name: str = "mock_tool", **parameters) -> dict:
+        return executor.execute_tool_call(tool_name, parameters, "testuser", "conv_123")
+    
+    def test_hit_skips_execution_and_records(self):
+        """Test that a repeated call is answered from the cache and still recorded by the tool."""
+        tool = DeterministicTool()
+        executor = self.make_executor(tool)
+        
+        first = self.call(executor, a=1, b=2)
+        second = self.call(executor, b=2, a=1)
+        
+        assert second == first
+        assert tool.executions == 1
+        assert tool.recorded == [{"b": 2, "a": 1}]
+        stats = executor.get_stats()["mock_tool"]
+        assert stats["calls"] == 2
+        assert stats["cache_hits"] == 1
+        assert stats["cache_hit_rate"] == 0.5
+    
+    def test_hit_async(self):
+        """Test that the async path shares the cache."""
+        tool = DeterministicTool()
+        executor = self.make_executor(tool)
+        
+        self.call(executor, a=1)
+        result = asyncio.run(executor.execute_tool_call_async("mock_tool", {"a": 1}, "testuser", "conv_123"))
+        
+        assert result["success"] is True
+        assert tool.executions == 1
+    
+    def test_cached_result_is_a_copy(self):
+        """Test that changing a returned result doesn't change the cached one."""
+        executor = self.make_executor(DeterministicTool())
+        
+        self.call(executor, a=1)["result"]["echo"]["a"] = "changed"
+        
+        assert self.call(executor, a=1)["result"] == {"echo": {"a": 1}}
+    
+    def test_failures_and_nondeterministic_tools_not_cached(self):
+        """Test that only successful results of deterministic tools are kept."""
+        tool = DeterministicTool()
+        executor = self.make_executor(tool)
+        self.call(executor, fail=True)
+        self.call(executor, fail=True)
+        assert tool.executions == 2
+        
+        class CountingTool(MockTool):
+            executions = 0
+            
+            def execute(self, parameters: dict, storage) -> dict:
+                CountingTool.executions += 1
+                return {"success": True}
+        
+        executor = self.make_executor(CountingTool())
+        self.call(executor, a=1)
+        self.call(executor, a=1)
+        assert CountingTool.executions == 2
+    
+    def test_least_recently_used_evicted(self):
+        """Test that the cache keeps only the most recently used results."""
+        tool = DeterministicTool()
+        executor = self.make_executor(tool, result_cache_size=2)
+        
+        self.call(executor, n=1)
+        self.call(executor, n=2)
+        self.call(executor, n=1)
+        self.call(executor, n=3)
+        assert tool.executions == 3
+        
+        self.call(executor, n=1)
+        assert tool.executions == 3
+        self.call(executor, n=2)
+        assert tool.executions == 4
+    
+    def test_calculator_history_recorded_on_hit(self):
+        """Test that cached calculator results are still added to the conversation's history."""
+        from tool_framework import ToolStorage
+        from tools.calculator_tool import CalculatorTool
+        
+        executor = self.make_executor(CalculatorTool())
+        for _ in range(2):
+            self.call(executor, "calculator", expression="6 * 7")
+        self.call(executor, "calculator", expression=None, calculations=[
+            {"name": "x", "expression": "2 + 2"}, {"name": None, "expression": "x * 2"}
+        ])
+        self.call(executor, "calculator", expression=None, calculations=[
+            {"name": "x", "expression": "2 + 2"}, {"name": None, "expression": "x * 2"}
+        ])
+        
+        history = ToolStorage("testuser", "conv_123", "calculator").get("history")
+        assert [entry["result"] for entry in history] == [42, 42, 4, 8, 4, 8]
+        assert executor.get_stats()["calculator"]["cache_hits"] == 2
@@ -0,0 +1,139 @@
+"""Tests for per-response usage capture and the per-user usage rollups."""
+
+import tempfile
+import time
+from queue import Queue
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app import ResponseUsage, StreamEventProcessor, UsageManager, UsageRollups
+from tool_framework import ToolExecutor, ToolRegistry
+from tools.calculator_tool import CalculatorTool
+
+
+def completed_event(input_tokens: int, cached_tokens: int, output_tokens: int, reasoning_tokens: int):
+    """A response.completed event with a usage block."""
+    usage = SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        output_tokens_details=SimpleNamespace(reasoning_tokens=reasoning_tokens),
+    )
+    return SimpleNamespace(type="response.completed", response=SimpleNamespace(id="resp_1", usage=usage))
+
+
+class TestResponseUsageCapture:
+    """Tests that the stream processor measures tokens and timings."""
+
+    def test_tokens_and_first_token_time(self):
+        """Test that reasoning tokens are counted and time to first token is measured from creation."""
+        processor = StreamEventProcessor(Queue())
+        time.sleep(0.05)
+        processor._handle_stream_event(SimpleNamespace(type="response.output_text.delta", delta="Hi"))
+        processor._handle_stream_event(completed_event(1000, 512, 300, 200))
+
+        usage = processor.get_usage()
+
+        assert (usage.input_tokens, usage.cached_tokens, usage.output_tokens, usage.reasoning_tokens) == (
+            1000,
+            512,
+            300,
+            200,
+        )
+        assert usage.time_to_first_token_ms >= 50
+        assert usage.duration_ms >= usage.time_to_first_token_ms
+        assert usage.tool_calls == 0
+
+    def test_no_text_has_no_first_token_time(self):
+        """Test that a response without text deltas reports no time to first token."""
+        assert StreamEventProcessor(Queue()).get_usage().time_to_first_token_ms is None
+
+    def test_inline_tool_time_recorded(self):
+        """Test that tool calls run inline are counted in the tool time."""
+        registry = ToolRegistry()
+        registry.register_tool(CalculatorTool())
+        processor = StreamEventProcessor(
+            Queue(), tool_executor=ToolExecutor(registry), username="testuser", conversation_id="conv_usage"
+        )
+        processor._handle_stream_event(
+            SimpleNamespace(
+                type="response.output_item.added",
+                item=SimpleNamespace(
+                    type="function_call", id="fc_1", call_id="call_1", name="calculator", arguments="", status="in_progress"
+                ),
+            )
+        )
+        processor._handle_stream_event(
+            SimpleNamespace(
+                type="response.function_call_arguments.done", item_id="fc_1", arguments='{"expression": "6 * 7"}'
+            )
+        )
+
+        usage = processor.get_usage()
+
+        assert usage.tool_calls == 1
+        assert usage.tool_ms <= usage.duration_ms
+
+
+class TestUsageRollups:
+    """Tests for summing usage per user, preset and reasoning level."""
+
+    @pytest.fixture
+    def usage_manager(self):
+        """Create a UsageManager backed by a temporary directory."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield UsageManager(temp_dir)
+
+    def test_rollups_by_preset_and_level(self, usage_manager):
+        """Test that responses are summed in total and under their preset and reasoning level."""
+        fast = ResponseUsage(input_tokens=100, cached_tokens=50, output_tokens=10, duration_ms=1000, time_to_first_token_ms=200)
+        slow = ResponseUsage(input_tokens=100, output_tokens=500, reasoning_tokens=400, duration_ms=9000, tool_ms=3000, tool_calls=2)
+
+        usage_manager.record_response("testuser", None, "low", fast)
+        usage_manager.record_response("testuser", "coder", "high", slow)
+        usage_manager.record_response("testuser", "coder", "high", slow)
+
+        summary = usage_manager.get_rollups("testuser").summary()
+        assert summary["total"]["responses"] == 3
+        assert summary["total"]["cached_percent"] == pytest.approx(16.7)
+        assert summary["presets"]["default"]["low"]["avg_time_to_first_token_ms"] == 200
+        coder = summary["presets"]["coder"]["high"]
+        assert (coder["responses"], coder["reasoning_tokens"], coder["avg_duration_ms"], coder["avg_tool_ms"]) == (
+            2,
+            800,
+            9000,
+            3000,
+        )
+        assert coder["avg_time_to_first_token_ms"] is None
+
+    def test_users_kept_separate(self, usage_manager):
+        """Test that each user has their own rollups."""
+        usage_manager.record_response("alice", None, None, ResponseUsage(input_tokens=10))
+
+        assert usage_manager.get_rollups("alice").total.responses == 1
+        assert usage_manager.get_rollups("bob") == UsageRollups()
+
+
+class TestUsageEndpoint:
+    """Tests for the /usage endpoint."""
+
+    def test_requires_login(self, client):
+        """Test that the usage endpoint requires a session."""
+        assert client.get("/usage").status_code == 401
+
+    def test_returns_summary(self, client):
+        """Test that the endpoint returns the logged-in user's rollups."""
+        rollups = UsageRollups()
+        rollups.add("coder", "medium", ResponseUsage(input_tokens=200, output_tokens=20, duration_ms=500))
+        with client.session_transaction() as sess:
+            sess["username"] = "testuser"
+
+        with patch("app.usage_manager.get_rollups", return_value=rollups) as get_rollups:
+            response = client.get("/usage")
+
+        get_rollups.assert_called_once_with("testuser")
+        assert response.status_code == 200
+        assert response.json["total"]["responses"] == 1
+        assert response.json["presets"]["coder"]["medium"]["avg_duration_ms"] == 500
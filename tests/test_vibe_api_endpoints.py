@@ -197,7 +197,7 @@ class TestVibeAPIEndpoints:
         # Mock storage manager
         
         
-        mock_storage_manager.load_collection.return_value = sample_vibe_collection
+        mock_storage_manager.load_collection_metadata.return_value = sample_vibe_collection
         
         response = authenticated_session.get('/vibes/550e8400-e29b-41d4-a716-446655440000')
         
@@ -216,7 +216,7 @@ class TestVibeAPIEndpoints:
         # Mock storage manager to return None
         
         
-        mock_storage_manager.load_collection.return_value = None
+        mock_storage_manager.load_collection_metadata.return_value = None
         
         response = authenticated_session.get('/vibes/nonexistent-guid')
         
@@ -280,7 +280,7 @@ class TestVibeAPIEndpoints:
         # Mock storage manager
         
         
-        mock_storage_manager.load_collection.return_value = sample_vibe_collection
+        mock_storage_manager.load_collection_metadata.return_value = sample_vibe_collection
         
         response = authenticated_session.get('/vibes/550e8400-e29b-41d4-a716-446655440000/preview/1.0/1.0')
         
@@ -295,7 +295,7 @@ class TestVibeAPIEndpoints:
         # Mock storage manager to return None
         
         
-        mock_storage_manager.load_collection.return_value = None
+        mock_storage_manager.load_collection_metadata.return_value = None
         
         response = authenticated_session.get('/vibes/nonexistent-guid/preview/1.0/1.0')
         
@@ -326,7 +326,7 @@ class TestVibeAPIEndpoints:
         # Mock storage manager to return None
         
         
-        mock_storage_manager.load_collection.return_value = None
+        mock_storage_manager.load_collection_metadata.return_value = None
         
         response = authenticated_session.get('/vibes/nonexistent-guid/progress')
         
@@ -346,7 +346,7 @@ class TestVibeAPIEndpoints:
     def test_vibe_progress_endpoint_with_tracking(self, mock_storage_manager, authenticated_session, sample_vibe_collection):
         """Test progress endpoint with active progress tracking."""
         # Mock storage manager to return the collection
-        mock_storage_manager.load_collection.return_value = sample_vibe_collection
+        mock_storage_manager.load_collection_metadata.return_value = sample_vibe_collection
         
         # Set up progress tracking
         guid = sample_vibe_collection.guid
@@ -501,3 +501,31 @@ class TestVibeAPIErrorHandling:
         # Verify background thread was started (errors will be reported via progress stream)
         mock_thread.assert_called_once()
         mock_thread_instance.start.assert_called_once()
+
+
+class TestResolveVibeParams:
+    """Test resolving the vibe parameters of an image request."""
+    
+    @pytest.mark.parametrize('vibe_params', [None, []])
+    @patch('app.vibe_storage_manager')
+    def test_no_vibes_requested(self, mock_storage_manager, vibe_params):
+        """Test that requests without vibes resolve to None without reading any encoding."""
+        from app import resolve_vibe_params
+        
+        assert resolve_vibe_params('testuser', vibe_params) is None
+        mock_storage_manager.get_encoding.assert_not_called()
+    
+    @patch('app.vibe_storage_manager')
+    def test_vibes_resolved_at_requested_strengths(self, mock_storage_manager):
+        """Test that each vibe's encoding is read at its strength and unknown encodings are skipped."""
+        from app import resolve_vibe_params
+        
+        mock_storage_manager.get_encoding.side_effect = lambda user, guid, strength: 'encoded' if guid == 'guid1' else None
+        
+        vibes = resolve_vibe_params('testuser', [
+            {'guid': 'guid1', 'encoding_strength': 0.5, 'reference_strength': 0.3},
+            {'guid': 'missing'},
+        ])
+        
+        assert [(vibe.encoded_data, vibe.reference_strength) for vibe in vibes] == [('encoded', 0.3)]
+        mock_storage_manager.get_encoding.assert_any_call('testuser', 'guid1', 0.5)
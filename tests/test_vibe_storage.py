@@ -5,11 +5,14 @@ This module contains property-based tests to validate the correctness of
 vibe storage operations and GUID generation.
 """
 
+import base64
+import json
 import os
 import tempfile
 import time
 import uuid
 from typing import Dict
+from unittest.mock import patch
 
 import pytest
 from hypothesis import given, strategies as st
@@ -235,4 +238,222 @@ class TestVibeStorageBasic:
         
         assert len(summaries) == 3
         # Should be sorted by creation date, newest first
-        assert summaries[0].created_at >= summaries[1].created_at >= summaries[2].created_at
\ No newline at end of file
+        assert summaries[0].created_at >= summaries[1].created_at >= summaries[2].created_at
+
+
+def make_collection(encoded_data=None, name="Test Vibe"):
+    """A collection whose encodings are NovelAI-style base64 unless given."""
+    encodings = {}
+    for strength in [1.0, 0.85, 0.7, 0.5, 0.35]:
+        data = encoded_data or base64.b64encode(f"vibe bytes {strength}".encode() + bytes(range(256))).decode()
+        encodings[str(strength)] = VibeEncoding(encoding_strength=strength, encoded_data=data)
+    return VibeCollection(
+        guid=str(uuid.uuid4()),
+        name=name,
+        model="nai-diffusion-4-5-full",
+        created_at=int(time.time()),
+        source_image_path="/test/path.png",
+        encodings=encodings,
+        preview_images={"enc0.85_ref0.5": "/test/preview.jpg"},
+    )
+
+
+class TestVibeStorageLayout:
+    """Tests for the metadata index and the per-strength encoding files."""
+
+    @pytest.fixture
+    def storage_manager(self, tmp_path):
+        return VibeStorageManager(str(tmp_path))
+
+    def test_encodings_stored_as_binary_files(self, storage_manager):
+        """Test that base64 encodings are stored decoded, one file per strength, and kept out of the index."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        collection_dir = storage_manager.get_collection_directory("testuser", collection.guid)
+        with open(os.path.join(collection_dir, "encoding_0.85.bin"), "rb") as f:
+            assert f.read() == base64.b64decode(collection.encodings["0.85"].encoded_data)
+
+        with open(os.path.join(storage_manager.data_dir, "testuser.json"), encoding="utf-8") as f:
+            index = json.load(f)
+        entry = index["collections"][collection.guid]
+        assert "encodings" not in entry
+        assert entry["encoding_files"]["1.0"] == "encoding_1.0.bin"
+
+        loaded = storage_manager.load_collection("testuser", collection.guid)
+        assert loaded == collection
+
+    def test_non_base64_encoding_round_trips(self, storage_manager):
+        """Test that encodings which are not base64 are kept as text."""
+        collection = make_collection(encoded_data="not base64 ✓")
+        storage_manager.save_collection("testuser", collection)
+
+        assert storage_manager.get_encoding("testuser", collection.guid, 0.5) == "not base64 ✓"
+
+    def test_listing_and_metadata_do_not_read_encodings(self, storage_manager):
+        """Test that listing collections and loading their metadata never read encoding files."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        with patch.object(VibeStorageManager, "_read_encoding", side_effect=AssertionError("read")):
+            summaries = storage_manager.list_collections("testuser")
+            metadata = storage_manager.load_collection_metadata("testuser", collection.guid)
+
+        assert [summary.guid for summary in summaries] == [collection.guid]
+        assert summaries[0].preview_image == "/test/preview.jpg"
+        assert metadata.preview_images == collection.preview_images
+        assert not hasattr(metadata, "encodings")
+
+    def test_get_encoding_reads_one_file(self, storage_manager):
+        """Test that getting an encoding reads only its own file."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        with patch.object(VibeStorageManager, "_read_encoding", wraps=storage_manager._read_encoding) as read:
+            encoded_data = storage_manager.get_encoding("testuser", collection.guid, 0.7)
+
+        assert encoded_data == collection.encodings["0.7"].encoded_data
+        read.assert_called_once_with("testuser", collection.guid, "encoding_0.7.bin")
+
+    def test_get_encoding_accepts_integer_strength(self, storage_manager):
+        """Test that a strength of 1 finds the 1.0 encoding, as JSON clients send it."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        assert storage_manager.get_encoding("testuser", collection.guid, 1) == collection.encodings["1.0"].encoded_data
+
+    def test_get_encoding_missing(self, storage_manager):
+        """Test that unknown collections and strengths give None."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        assert storage_manager.get_encoding("testuser", str(uuid.uuid4()), 1.0) is None
+        assert storage_manager.get_encoding("testuser", collection.guid, 0.6) is None
+
+    def test_delete_removes_encoding_files(self, storage_manager):
+        """Test that deleting a collection removes its encoding files."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+        collection_dir = storage_manager.get_collection_directory("testuser", collection.guid)
+
+        assert storage_manager.delete_collection("testuser", collection.guid)
+
+        assert not os.path.exists(collection_dir)
+        assert storage_manager.get_encoding("testuser", collection.guid, 1.0) is None
+
+    def test_inline_encodings_migrated(self, storage_manager):
+        """Test that an index with inline encodings has them moved to files on first load."""
+        collection = make_collection()
+        index_path = os.path.join(storage_manager.data_dir, "testuser.json")
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump({"collections": {collection.guid: collection.model_dump()}}, f)
+
+        assert storage_manager.get_encoding("testuser", collection.guid, 0.35) == collection.encodings["0.35"].encoded_data
+
+        with open(index_path, encoding="utf-8") as f:
+            entry = json.load(f)["collections"][collection.guid]
+        assert "encodings" not in entry
+        assert storage_manager.load_collection("testuser", collection.guid) == collection
+
+    def test_index_read_again_after_external_change(self, storage_manager):
+        """Test that the cached index is replaced when its file changes."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+        storage_manager.list_collections("testuser")
+
+        index_path = os.path.join(storage_manager.data_dir, "testuser.json")
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        index["collections"][collection.guid]["name"] = "Renamed elsewhere"
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+        assert storage_manager.list_collections("testuser")[0].name == "Renamed elsewhere"
+
+
+class TestVibeEncodingCache:
+    """Tests for the in-memory cache of encodings served by get_encoding()."""
+
+    @pytest.fixture
+    def storage_manager(self, tmp_path):
+        return VibeStorageManager(str(tmp_path), encoding_cache_size=3)
+
+    def test_repeated_get_encoding_reads_file_once(self, storage_manager):
+        """Test that generations reusing a vibe are served from memory."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        with patch.object(VibeStorageManager, "_read_encoding", wraps=storage_manager._read_encoding) as read:
+            for _ in range(5):
+                encoded_data = storage_manager.get_encoding("testuser", collection.guid, 0.85)
+
+        assert encoded_data == collection.encodings["0.85"].encoded_data
+        read.assert_called_once()
+        stats = storage_manager.get_encoding_cache_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (4, 1, 1)
+
+    def test_save_replaces_cached_encoding(self, storage_manager):
+        """Test that saving a collection again serves its new encodings."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+        storage_manager.get_encoding("testuser", collection.guid, 1.0)
+
+        updated = collection.model_copy(update={"encodings": make_collection(encoded_data="updated").encodings})
+        storage_manager.save_collection("testuser", updated)
+
+        assert storage_manager.get_encoding("testuser", collection.guid, 1.0) == "updated"
+
+    def test_delete_evicts_cached_encodings(self, storage_manager):
+        """Test that a deleted collection's encodings are no longer served."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+        storage_manager.get_encoding("testuser", collection.guid, 1.0)
+
+        storage_manager.delete_collection("testuser", collection.guid)
+
+        assert storage_manager.get_encoding("testuser", collection.guid, 1.0) is None
+        assert storage_manager.get_encoding_cache_stats()["entries"] == 0
+
+    def test_cache_is_bounded_lru(self, storage_manager):
+        """Test that the least recently used encoding is evicted when the cache is full."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+        for strength in [1.0, 0.85, 0.7]:
+            storage_manager.get_encoding("testuser", collection.guid, strength)
+        storage_manager.get_encoding("testuser", collection.guid, 1.0)
+        storage_manager.get_encoding("testuser", collection.guid, 0.5)
+
+        with patch.object(VibeStorageManager, "_read_encoding", wraps=storage_manager._read_encoding) as read:
+            storage_manager.get_encoding("testuser", collection.guid, 1.0)
+            storage_manager.get_encoding("testuser", collection.guid, 0.85)
+
+        read.assert_called_once_with("testuser", collection.guid, "encoding_0.85.bin")
+        assert storage_manager.get_encoding_cache_stats()["entries"] == 3
+
+    def test_read_racing_save_not_cached(self, storage_manager):
+        """Test that an encoding read while its collection changed is not kept."""
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+        read_encoding = storage_manager._read_encoding
+
+        def read_during_save(*args):
+            encoded_data = read_encoding(*args)
+            storage_manager._invalidate_encodings("testuser", collection.guid)
+            return encoded_data
+
+        with patch.object(VibeStorageManager, "_read_encoding", side_effect=read_during_save):
+            storage_manager.get_encoding("testuser", collection.guid, 1.0)
+
+        assert storage_manager.get_encoding_cache_stats()["entries"] == 0
+
+    def test_cache_disabled(self, tmp_path):
+        """Test that a cache size of 0 reads the file every time."""
+        storage_manager = VibeStorageManager(str(tmp_path), encoding_cache_size=0)
+        collection = make_collection()
+        storage_manager.save_collection("testuser", collection)
+
+        with patch.object(VibeStorageManager, "_read_encoding", wraps=storage_manager._read_encoding) as read:
+            storage_manager.get_encoding("testuser", collection.guid, 1.0)
+            storage_manager.get_encoding("testuser", collection.guid, 1.0)
+
+        assert read.call_count == 2
@@ -5,18 +5,28 @@ that can be used by chat agents. It includes:
 - BaseTool: Abstract base class for all custom tools
 - ToolRegistry: Central registry for managing available tools
 - ToolInfo: Metadata about tools
+- ExecutionProfile: How, and for how long, a tool's execute() may run
 - ToolStorage: Per-chat persistent storage for tool data
-- ToolExecutor: Execute tool calls with error handling and logging
+- ToolStorageCache: Shared write-back cache for ToolStorage files
+- ToolExecutor: Execute tool calls with error handling, limits and latency stats
 """
 
 from __future__ import annotations
 
+import asyncio
+import copy
+import json
 import logging
+import multiprocessing
 import os
 import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Callable
 
 from file_manager_utils import load_json_file_with_backup, save_json_file_atomic
 
@@ -42,6 +52,56 @@ class ToolInfo:
     category: str
 
 
+# Where ToolExecutor runs a tool's execute()
+EXECUTION_INLINE = 'inline'
+EXECUTION_THREAD = 'thread'
+EXECUTION_PROCESS = 'process'
+
+
+@dataclass(frozen=True)
+class ExecutionProfile:
+    """How ToolExecutor runs a tool.
+    
+    Attributes:
+        mode: EXECUTION_INLINE runs execute() in the caller's thread,
+            EXECUTION_THREAD in a shared worker thread and EXECUTION_PROCESS in
+            a worker process of the tool's own (for CPU-bound tools, which
+            would otherwise hold the GIL)
+        timeout: Seconds a call may take before it is reported as timed out,
+            or None for no limit. Thread calls can't be interrupted and finish
+            in the background; process calls are killed. A process call's time
+            starts when a worker picks it up, so starting the worker isn't
+            counted.
+        max_concurrency: Calls of this tool that may run at once, or None for
+            no limit. Further calls wait for a free slot.
+        memory_limit_mb: Address space cap of each worker process, or None for
+            no cap. Process mode only, and only enforced on POSIX systems.
+    
+    Example:
+        @property
+        def execution_profile(self) -> ExecutionProfile:
+            return ExecutionProfile(mode=EXECUTION_PROCESS, timeout=10.0, max_concurrency=2)
+    """
+    mode: str = EXECUTION_INLINE
+    timeout: float | None = None
+    max_concurrency: int | None = None
+    memory_limit_mb: int | None = None
+    
+    def __post_init__(self):
+        if self.mode not in (EXECUTION_INLINE, EXECUTION_THREAD, EXECUTION_PROCESS):
+            raise ValueError(f"Unknown execution mode: {self.mode}")
+        if self.timeout is not None and self.mode == EXECUTION_INLINE:
+            raise ValueError("Inline tools can't have a timeout; use the thread or process mode")
+        if self.timeout is not None and self.timeout <= 0:
+            raise ValueError("Timeout must be positive")
+        if self.max_concurrency is not None and self.max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if self.memory_limit_mb is not None and self.mode != EXECUTION_PROCESS:
+            raise ValueError("Only process tools can have a memory limit")
+        if self.memory_limit_mb is not None and self.memory_limit_mb < 1:
+            raise ValueError("memory_limit_mb must be at least 1")
+
+
 class BaseTool(ABC):
     """Base class for all custom tools.
     
@@ -93,6 +153,9 @@ class BaseTool(ABC):
             ) -> dict[str, Any]:
                 # Implementation here
                 pass
+    
+    Slow or CPU-bound tools should override execution_profile so they don't
+    block the response stream.
     """
     
     @property
@@ -197,6 +260,52 @@ class BaseTool(ABC):
         """
         pass
     
+    @property
+    def execution_profile(self) -> ExecutionProfile:
+        """How ToolExecutor runs this tool.
+        
+        The default runs execute() inline with no timeout or concurrency
+        limit, which suits quick tools. Tools using EXECUTION_PROCESS must be
+        picklable, and get a copy of their storage whose changes are saved
+        when the call returns.
+        
+        Returns:
+            ExecutionProfile for this tool
+        """
+        return ExecutionProfile()
+    
+    @property
+    def deterministic(self) -> bool:
+        """Whether the same parameters always give the same result.
+        
+        ToolExecutor caches the successful results of deterministic tools and
+        returns them without calling execute() again, calling
+        record_cached_result() instead. Only return True for tools whose
+        result depends on nothing but their parameters.
+        
+        Returns:
+            False by default
+        """
+        return False
+    
+    def record_cached_result(
+        self,
+        parameters: dict[str, Any],
+        result: dict[str, Any],
+        storage: ToolStorage
+    ) -> None:
+        """Record a call answered from ToolExecutor's result cache.
+        
+        Override this in deterministic tools that keep per-chat state such as
+        a history, so the state stays the same whether or not execute() ran.
+        
+        Args:
+            parameters: Dictionary of parameters from the AI's tool call
+            result: The cached result returned for the call
+            storage: ToolStorage instance for persisting data
+        """
+        pass
+    
     def validate_parameters(self, parameters: dict[str, Any]) -> list[str]:
         """Validate parameters and return list of errors.
         
@@ -220,6 +329,26 @@ class BaseTool(ABC):
         """
         return []
 
+    async def execute_async(
+        self,
+        parameters: dict[str, Any],
+        storage: ToolStorage
+    ) -> dict[str, Any]:
+        """Execute the tool from the asyncio chat engine.
+        
+        The default implementation runs execute() in a worker thread so that
+        blocking tools never stall the event loop. Tools that do their work
+        over the network can override this with a native coroutine.
+        
+        Args:
+            parameters: Dictionary of parameters from the AI's tool call
+            storage: ToolStorage instance for persisting data
+        
+        Returns:
+            Same result dictionary as execute()
+        """
+        return await asyncio.to_thread(self.execute, parameters, storage)
+
     def format_input_for_display(self, parameters: dict[str, Any]) -> str:
         """Format input parameters for display in the UI.
         
@@ -410,11 +539,14 @@ class ToolStorage:
     - Atomic file writes to prevent corruption
     - Automatic directory creation
     - Comprehensive error handling
+    - Optional ToolStorageCache so repeated calls don't re-read the file and
+      writes can be deferred
     
     Example:
         storage = ToolStorage('john', 'conv_123', 'calculator')
         storage.set('history', [{'expr': '2+2', 'result': 4}])
         history = storage.get('history', [])
+        storage.update('count', lambda count: count + 1, 0)
         storage.delete('history')
         storage.clear()
     """
@@ -428,7 +560,8 @@ class ToolStorage:
         username: str, 
         conversation_id: str, 
         tool_name: str,
-        static_folder: str = 'static'
+        static_folder: str = 'static',
+        cache: ToolStorageCache | None = None
     ):
         """Initialize storage for a specific tool in a conversation.
         
@@ -437,11 +570,14 @@ class ToolStorage:
             conversation_id: Unique identifier for the conversation
             tool_name: Name of the tool using this storage
             static_folder: Base static folder path (default: 'static')
+            cache: Shared cache to read and write through (default: read and
+                write the file on every call)
         """
         self.username = username
         self.conversation_id = conversation_id
         self.tool_name = tool_name
         self.static_folder = static_folder
+        self._cache = cache
         
         # Build storage path: static/chats/{username}/{conversation_id}/{tool_name}.json
         self.conversation_dir = os.path.join(
@@ -452,8 +588,9 @@ class ToolStorage:
         )
         self.storage_file = os.path.join(self.conversation_dir, f'{tool_name}.json')
         
-        # Ensure directory exists
-        os.makedirs(self.conversation_dir, exist_ok=True)
+        # Ensure directory exists; with a cache it is created on the first write
+        if cache is None:
+            os.makedirs(self.conversation_dir, exist_ok=True)
         
         # Get lock for this conversation
         self._lock = self._get_conversation_lock(username, conversation_id)
@@ -477,20 +614,18 @@ class ToolStorage:
             return cls._conversation_locks[lock_key]
     
     def _load_data(self) -> dict[str, Any]:
-        """Load all data from storage file.
+        """Load all data from the cache or the storage file.
         
         Returns:
-            Dictionary containing all stored data, or empty dict if file doesn't exist
+            Dictionary containing all stored data, or empty dict if file doesn't exist.
+            With a cache this is the cached dictionary itself.
         """
-        return load_json_file_with_backup(
-            self.storage_file,
-            f"tool storage ({self.tool_name})",
-            self.username,
-            {}
-        )
+        if self._cache is not None:
+            return self._cache.get_data(self)
+        return self._read_file()
     
     def _save_data(self, data: dict[str, Any]) -> None:
-        """Save all data to storage file atomically.
+        """Save all data to the cache or the storage file.
         
         Args:
             data: Dictionary containing all data to save
@@ -499,6 +634,22 @@ class ToolStorage:
             IOError: If file write operation fails
             ValueError: If JSON encoding fails
         """
+        if self._cache is not None:
+            self._cache.store_data(self, data)
+        else:
+            self._write_file(data)
+    
+    def _read_file(self) -> dict[str, Any]:
+        """Load all data from storage file."""
+        return load_json_file_with_backup(
+            self.storage_file,
+            f"tool storage ({self.tool_name})",
+            self.username,
+            {}
+        )
+    
+    def _write_file(self, data: dict[str, Any]) -> None:
+        """Save all data to storage file atomically."""
         save_json_file_atomic(
             self.storage_file,
             data,
@@ -506,6 +657,23 @@ class ToolStorage:
             self.username
         )
     
+    def _copy_out(self, value: Any) -> Any:
+        """Copy a value read from shared cached data so callers can modify it freely."""
+        return copy.deepcopy(value) if self._cache is not None else value
+    
+    def _copy_in(self, key: str, value: Any) -> Any:
+        """Copy a value into cached data, checking it can be saved as JSON.
+        
+        Raises:
+            ValueError: If value is not JSON-serializable
+        """
+        if self._cache is None:
+            return value
+        try:
+            return json.loads(json.dumps(value))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Value for '{key}' is not JSON-serializable: {e}")
+    
     def get(self, key: str, default: Any = None) -> Any:
         """Get a value from storage.
         
@@ -522,7 +690,7 @@ class ToolStorage:
         """
         with self._lock:
             data = self._load_data()
-            return data.get(key, default)
+            return self._copy_out(data.get(key, default))
     
     def set(self, key: str, value: Any) -> None:
         """Set a value in storage.
@@ -541,9 +709,41 @@ class ToolStorage:
         """
         with self._lock:
             data = self._load_data()
-            data[key] = value
+            data[key] = self._copy_in(key, value)
             self._save_data(data)
     
+    def update(self, key: str, function: Callable[[Any], Any], default: Any = None) -> Any:
+        """Replace a value with the result of a function of it, atomically.
+        
+        Use this instead of get() followed by set() when concurrent tool calls
+        change the same key, so neither call's change is lost.
+        
+        Args:
+            key: Key to update
+            function: Called with the current value (or default) under the
+                storage lock and returns the new value; it must not use the
+                storage itself. Tools running in a worker process must pass a
+                picklable function, e.g. a module-level function or a
+                functools.partial of one
+            default: Value passed to function if key doesn't exist
+        
+        Returns:
+            The new value
+        
+        Raises:
+            IOError: If file write operation fails
+            ValueError: If the new value is not JSON-serializable
+        
+        Example:
+            storage.update('count', lambda count: count + 1, 0)
+        """
+        with self._lock:
+            data = self._load_data()
+            value = function(self._copy_out(data.get(key, default)))
+            data[key] = self._copy_in(key, value)
+            self._save_data(data)
+            return self._copy_out(data[key])
+    
     def delete(self, key: str) -> None:
         """Delete a value from storage.
         
@@ -573,7 +773,7 @@ class ToolStorage:
             print(all_data)  # {'history': [...], 'count': 42}
         """
         with self._lock:
-            return self._load_data()
+            return self._copy_out(self._load_data())
     
     def clear(self) -> None:
         """Clear all stored data.
@@ -585,8 +785,668 @@ class ToolStorage:
         """
         with self._lock:
             self._save_data({})
+    
+    def replace_all(self, data: dict[str, Any]) -> None:
+        """Replace all stored data in one write.
+        
+        Args:
+            data: Dictionary of key-value pairs to store (must be JSON-serializable)
+        
+        Raises:
+            IOError: If file write operation fails
+            ValueError: If data is not JSON-serializable
+        """
+        with self._lock:
+            self._save_data(self._copy_in('*', data))
 
 
+class SnapshotToolStorage(ToolStorage):
+    """In-memory copy of a tool's storage, for tools running in a worker process.
+    
+    The worker can't share the app's locks or cache, so it works on a copy of
+    the data. If the tool only used update(), ToolExecutor applies the same
+    updates to the real storage, so concurrent calls don't lose each other's
+    changes; otherwise it saves the copy back.
+    """
+    
+    def __init__(
+        self,
+        username: str,
+        conversation_id: str,
+        tool_name: str,
+        data: dict[str, Any]
+    ):
+        """Initialize the snapshot.
+        
+        Args:
+            username: Username who owns the conversation
+            conversation_id: Unique identifier for the conversation
+            tool_name: Name of the tool using this storage
+            data: Copy of the tool's stored data
+        """
+        self.username = username
+        self.conversation_id = conversation_id
+        self.tool_name = tool_name
+        self.data = data
+        self.changed = False
+        # (key, function, default) of each update(), in call order
+        self.updates: list[tuple[str, Callable[[Any], Any], Any]] = []
+        self._cache = None
+        self._lock = threading.Lock()
+    
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle without the lock, which can't cross process boundaries."""
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def update(self, key: str, function: Callable[[Any], Any], default: Any = None) -> Any:
+        """Update the snapshot data and record the update to apply to the real storage."""
+        with self._lock:
+            self.data[key] = function(self.data.get(key, default))
+            self.updates.append((key, function, default))
+            return self.data[key]
+    
+    def _load_data(self) -> dict[str, Any]:
+        """Return the snapshot data."""
+        return self.data
+    
+    def _save_data(self, data: dict[str, Any]) -> None:
+        """Update the snapshot data."""
+        self.data = data
+        self.changed = True
+
+
+# Durability modes for ToolStorageCache
+WRITE_THROUGH = 'write_through'
+WRITE_BACK = 'write_back'
+
+
+@dataclass
+class CachedToolData:
+    """Cached contents of one tool storage file.
+    
+    Attributes:
+        storage_file: Path of the JSON file the data belongs to
+        username: Username who owns the conversation
+        conversation_id: Conversation the data belongs to
+        tool_name: Tool the data belongs to
+        data: Current contents, including changes not yet written
+        dirty: True if data has changes that are not on disk yet
+    """
+    storage_file: str
+    username: str
+    conversation_id: str
+    tool_name: str
+    data: dict[str, Any]
+    dirty: bool = False
+
+
+class ToolStorageCache:
+    """Shared in-memory cache of tool storage files.
+    
+    ToolStorage instances created with a cache read each file once and then
+    work on the cached data, so a tool that calls get() and set() several
+    times per call no longer reads and rewrites the whole file each time.
+    
+    Durability modes:
+    - WRITE_THROUGH: every change is written to disk before set() returns,
+      as without a cache; only the reads are saved.
+    - WRITE_BACK: changes are marked dirty and written by flush(), which the
+      app calls at the end of each chat turn, by a background timer every
+      flush_interval seconds, and when a dirty entry is evicted. Changes made
+      since the last flush are lost if the process is killed.
+    
+    The cache holds at most max_entries files; the least recently used are
+    evicted first, after writing them out if they are dirty.
+    
+    Example:
+        cache = ToolStorageCache(durability=WRITE_BACK, flush_interval=5.0)
+        executor = ToolExecutor(registry, storage_cache=cache)
+        ...
+        cache.flush('john', 'conv_123')  # end of turn
+        cache.close()                    # shutdown
+    """
+    
+    def __init__(
+        self,
+        durability: str = WRITE_BACK,
+        max_entries: int = 256,
+        flush_interval: float | None = 5.0
+    ):
+        """Initialize the cache.
+        
+        Args:
+            durability: WRITE_THROUGH or WRITE_BACK
+            max_entries: Maximum number of storage files kept in memory
+            flush_interval: Seconds between background flushes in WRITE_BACK
+                mode, or None to only flush when asked to
+        
+        Raises:
+            ValueError: If durability is not a known mode
+        """
+        if durability not in (WRITE_THROUGH, WRITE_BACK):
+            raise ValueError(f"Unknown tool storage durability: {durability}")
+        
+        self.durability = durability
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        
+        self._entries: OrderedDict[str, CachedToolData] = OrderedDict()
+        self._lock = threading.Lock()
+        # Directories already created, so writes don't call makedirs every time
+        self._known_dirs: set[str] = set()
+        self._flush_thread: threading.Thread | None = None
+        self._stop_flushing = threading.Event()
+    
+    def __len__(self) -> int:
+        """Number of storage files currently cached."""
+        with self._lock:
+            return len(self._entries)
+    
+    def get_data(self, storage: ToolStorage) -> dict[str, Any]:
+        """Return the cached data for a storage file, loading it on first use.
+        
+        The caller must hold the storage's conversation lock.
+        
+        Args:
+            storage: ToolStorage whose data to return
+        
+        Returns:
+            The cached dictionary itself; changes must be saved with store_data()
+        """
+        with self._lock:
+            entry = self._entries.get(storage.storage_file)
+            if entry is not None:
+                self._entries.move_to_end(storage.storage_file)
+                return entry.data
+        
+        # Read outside the cache lock; the conversation lock keeps other
+        # users of this file out in the meantime
+        data = storage._read_file()
+        with self._lock:
+            entry = self._entries.setdefault(
+                storage.storage_file,
+                CachedToolData(
+                    storage_file=storage.storage_file,
+                    username=storage.username,
+                    conversation_id=storage.conversation_id,
+                    tool_name=storage.tool_name,
+                    data=data,
+                ),
+            )
+            self._evict_over_limit()
+            return entry.data
+    
+    def store_data(self, storage: ToolStorage, data: dict[str, Any]) -> None:
+        """Replace the cached data for a storage file and mark it changed.
+        
+        The caller must hold the storage's conversation lock.
+        
+        Args:
+            storage: ToolStorage whose data changed
+            data: New contents of the storage file
+        
+        Raises:
+            IOError: If writing fails in WRITE_THROUGH mode
+        """
+        with self._lock:
+            entry = self._entries.get(storage.storage_file)
+            if entry is None:
+                entry = CachedToolData(
+                    storage_file=storage.storage_file,
+                    username=storage.username,
+                    conversation_id=storage.conversation_id,
+                    tool_name=storage.tool_name,
+                    data=data,
+                )
+                self._entries[storage.storage_file] = entry
+                self._evict_over_limit()
+            entry.data = data
+            entry.dirty = True
+        
+        if self.durability == WRITE_THROUGH:
+            self._write_entry(entry)
+        else:
+            self._start_flush_thread()
+    
+    def flush(
+        self,
+        username: str | None = None,
+        conversation_id: str | None = None
+    ) -> int:
+        """Write dirty entries to disk.
+        
+        Args:
+            username: Only flush this user's entries (default: all users)
+            conversation_id: Only flush this conversation's entries (default: all)
+        
+        Returns:
+            Number of files written
+        """
+        with self._lock:
+            entries = [
+                entry for entry in self._entries.values()
+                if entry.dirty
+                and (username is None or entry.username == username)
+                and (conversation_id is None or entry.conversation_id == conversation_id)
+            ]
+        
+        written = 0
+        for entry in entries:
+            with ToolStorage._get_conversation_lock(entry.username, entry.conversation_id):
+                try:
+                    if self._write_entry(entry):
+                        written += 1
+                except Exception as e:
+                    # Keep the entry dirty so the next flush retries it
+                    logger.error(
+                        f"Failed to flush tool storage {entry.storage_file}: {e}"
+                    )
+        
+        if written:
+            logger.debug(f"Flushed {written} tool storage file(s)")
+        return written
+    
+    def close(self) -> None:
+        """Stop the background flush and write all dirty entries."""
+        self._stop_flushing.set()
+        self.flush()
+    
+    def _write_entry(self, entry: CachedToolData) -> bool:
+        """Write an entry if it is dirty. The caller must hold its conversation lock.
+        
+        Returns:
+            True if the entry was written
+        """
+        if not entry.dirty:
+            return False
+        
+        directory = os.path.dirname(entry.storage_file)
+        if directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._known_dirs.add(directory)
+        
+        save_json_file_atomic(
+            entry.storage_file,
+            entry.data,
+            f"tool storage ({entry.tool_name})",
+            entry.username
+        )
+        entry.dirty = False
+        return True
+    
+    def _evict_over_limit(self) -> None:
+        """Evict least recently used entries beyond max_entries. The caller must hold _lock."""
+        # The most recent entry is the one being used right now
+        for storage_file in list(self._entries)[:-1]:
+            if len(self._entries) <= self.max_entries:
+                return
+            
+            entry = self._entries[storage_file]
+            if entry.dirty:
+                # Don't wait for a conversation that is in use, that could
+                # deadlock with its own cache lookups; evict another entry
+                lock = ToolStorage._get_conversation_lock(entry.username, entry.conversation_id)
+                if not lock.acquire(blocking=False):
+                    continue
+                try:
+                    self._write_entry(entry)
+                except Exception as e:
+                    logger.error(f"Failed to write evicted tool storage {storage_file}: {e}")
+                    continue
+                finally:
+                    lock.release()
+            
+            del self._entries[storage_file]
+    
+    def _start_flush_thread(self) -> None:
+        """Start the background flush thread on the first deferred write."""
+        if self.flush_interval is None or self._flush_thread is not None:
+            return
+        
+        with self._lock:
+            if self._flush_thread is not None:
+                return
+            self._flush_thread = threading.Thread(
+                target=self._flush_periodically,
+                name="tool-storage-flush",
+                daemon=True
+            )
+            self._flush_thread.start()
+    
+    def _flush_periodically(self) -> None:
+        """Flush dirty entries every flush_interval seconds until closed."""
+        while not self._stop_flushing.wait(self.flush_interval):
+            self.flush()
+
+
+@dataclass
+class ToolCallStats:
+    """Latency and outcome counts for one tool's calls.
+    
+    Attributes:
+        calls: Number of calls made
+        failures: Calls that returned or raised an error (including timeouts)
+        timeouts: Calls that ran over the tool's timeout
+        total_seconds: Combined duration of all calls
+        max_seconds: Duration of the slowest call
+        cache_hits: Calls answered from the result cache
+    """
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    cache_hits: int = 0
+    
+    def record(self, seconds: float, success: bool, timed_out: bool, cache_hit: bool = False) -> None:
+        """Add one call."""
+        self.calls += 1
+        self.failures += not success
+        self.timeouts += timed_out
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.cache_hits += cache_hit
+    
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a JSON-serializable summary with latencies in milliseconds."""
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'mean_ms': round(self.total_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_hit_rate': round(self.cache_hits / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+def _execute_in_process(
+    tool: BaseTool,
+    parameters: dict[str, Any],
+    storage: SnapshotToolStorage
+) -> tuple[dict[str, Any], dict[str, Any] | None, list[tuple[str, Callable[[Any], Any], Any]]]:
+    """Run a tool in a worker process.
+    
+    Returns:
+        (result, data, updates) tuple, where data is the changed storage or None
+        if only update() changed it, and updates are the update() calls made
+    """
+    result = tool.execute(parameters, storage)
+    return result, storage.data if storage.changed else None, storage.updates
+
+
+def _limit_process_memory(memory_limit_bytes: int) -> None:
+    """Cap the address space of a worker process, where the OS supports it."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows; the timeout still applies
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+
+def _process_worker_main(
+    connection: Any,
+    initializer: Callable[..., None] | None = None,
+    initargs: tuple[Any, ...] = ()
+) -> None:
+    """Run the calls a ToolProcessPool sends to this worker process until its pipe closes.
+    
+    The worker runs initializer(*initargs) first, then tells the pool it is ready.
+    """
+    if initializer is not None:
+        initializer(*initargs)
+    connection.send(None)
+    while True:
+        try:
+            function, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            reply = (function(*args), None)
+        except BaseException as e:
+            reply = (None, e)
+        try:
+            connection.send(reply)
+        except Exception as e:
+            # The result or error couldn't be pickled
+            connection.send((None, RuntimeError(f"Tool result could not be returned: {e}")))
+
+
+@dataclass
+class _ProcessWorker:
+    """One worker process of a ToolProcessPool and the call it is running, if any."""
+    process: Any
+    connection: Any
+    ready: bool = False
+    future: Future | None = None
+    timer: threading.Timer | None = None
+
+
+class ToolProcessPool:
+    """Worker processes for one EXECUTION_PROCESS tool.
+    
+    Each worker is its own process, started with "spawn" so it doesn't inherit
+    the app's threads and locks, and runs one call at a time; calls beyond the
+    number of workers wait for a free one. A call that runs over its timeout is
+    stopped by killing only the worker running it, so other calls carry on.
+    
+    Spawned workers import the app's main module before they are ready, which
+    can take seconds, so a call's timeout only starts once a ready worker picks
+    it up.
+    """
+    
+    def __init__(
+        self,
+        tool_name: str,
+        workers: int,
+        timeout: float | None = None,
+        initializer: Callable[..., None] | None = None,
+        initargs: tuple[Any, ...] = ()
+    ):
+        """Initialize the pool. Worker processes are started as calls need them.
+        
+        Args:
+            tool_name: Name of the tool, for error messages
+            workers: Number of worker processes
+            timeout: Seconds a call may run before its worker is killed and it
+                fails with TimeoutError, or None for no limit
+            initializer: Called with initargs in each worker process before it
+                takes calls
+            initargs: Arguments for initializer
+        """
+        self.tool_name = tool_name
+        self.workers = workers
+        self.timeout = timeout
+        self.initializer = initializer
+        self.initargs = initargs
+        self._workers: list[_ProcessWorker] = []
+        # Calls waiting for a free worker: (future, function, args)
+        self._queue: deque[tuple[Future, Any, tuple[Any, ...]]] = deque()
+        self._lock = threading.Lock()
+    
+    def start(self) -> None:
+        """Start all the worker processes now rather than when calls need them."""
+        with self._lock:
+            while len(self._workers) < self.workers:
+                self._start_worker()
+    
+    def submit(self, function: Any, *args: Any) -> Future:
+        """Run function(*args) in a worker process.
+        
+        Returns:
+            Future for the function's result
+        """
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            self._queue.append((future, function, args))
+            self._dispatch()
+        return future
+    
+    def cancel(self, future: Future) -> None:
+        """Stop a call, killing the worker process running it; other calls are not affected."""
+        with self._lock:
+            self._queue = deque(call for call in self._queue if call[0] is not future)
+            worker = next((w for w in self._workers if w.future is future), None)
+            if worker is not None:
+                self._remove_worker(worker)
+        if worker is not None:
+            worker.process.kill()
+        self._complete(future, None, RuntimeError(f"Call to tool '{self.tool_name}' was stopped"))
+    
+    def terminate(self) -> None:
+        """Kill the worker processes, failing their calls and those waiting."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            queued, self._queue = self._queue, deque()
+            for worker in workers:
+                self._stop_timer(worker)
+        for worker in workers:
+            worker.process.kill()
+        for future, _, _ in queued:
+            self._complete(future, None, self._stopped_error())
+    
+    def _dispatch(self) -> None:
+        """Send waiting calls to ready workers, starting workers up to the limit. The caller must hold _lock."""
+        while self._queue:
+            worker = next((w for w in self._workers if w.ready and w.future is None), None)
+            if worker is None:
+                starting = sum(1 for w in self._workers if not w.ready)
+                while starting < len(self._queue) and len(self._workers) < self.workers:
+                    self._start_worker()
+                    starting += 1
+                return
+            future, function, args = self._queue.popleft()
+            try:
+                worker.connection.send((function, args))
+            except Exception as e:
+                # Arguments that can't be pickled, or a worker that just died
+                self._complete(future, None, e)
+                continue
+            worker.future = future
+            if self.timeout is not None:
+                worker.timer = threading.Timer(self.timeout, self._expire, (worker, future))
+                worker.timer.daemon = True
+                worker.timer.start()
+    
+    def _start_worker(self) -> _ProcessWorker:
+        """Start a worker process and the thread reading its results. The caller must hold _lock."""
+        context = multiprocessing.get_context('spawn')
+        connection, worker_connection = context.Pipe()
+        process = context.Process(
+            target=_process_worker_main,
+            args=(worker_connection, self.initializer, self.initargs),
+            name=f"tool-{self.tool_name}",
+            daemon=True,
+        )
+        process.start()
+        worker_connection.close()
+        worker = _ProcessWorker(process, connection)
+        self._workers.append(worker)
+        threading.Thread(
+            target=self._read_results,
+            args=(worker,),
+            name=f"tool-{self.tool_name}-results",
+            daemon=True,
+        ).start()
+        return worker
+    
+    def _remove_worker(self, worker: _ProcessWorker) -> None:
+        """Forget a worker about to be killed, letting waiting calls start another. The caller must hold _lock."""
+        self._stop_timer(worker)
+        self._workers.remove(worker)
+        self._dispatch()
+    
+    def _expire(self, worker: _ProcessWorker, future: Future) -> None:
+        """Kill the worker running a call that ran over the timeout, and fail the call."""
+        with self._lock:
+            if worker.future is not future or worker not in self._workers:
+                # Finished, or was stopped, meanwhile
+                return
+            worker.future = None
+            self._remove_worker(worker)
+        worker.process.kill()
+        self._complete(
+            future, None, TimeoutError(f"Tool '{self.tool_name}' timed out after {self.timeout:g} seconds")
+        )
+    
+    def _read_results(self, worker: _ProcessWorker) -> None:
+        """Mark a worker ready, then complete the calls it runs until it exits."""
+        try:
+            worker.connection.recv()
+        except (EOFError, OSError):
+            self._worker_failed(worker)
+            return
+        with self._lock:
+            worker.ready = True
+            self._dispatch()
+        
+        while True:
+            try:
+                result, error = worker.connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                self._stop_timer(worker)
+                future, worker.future = worker.future, None
+                self._dispatch()
+            if future is not None:
+                self._complete(future, result, error)
+        
+        # Killed by cancel(), a timeout or terminate(), or crashed
+        with self._lock:
+            if worker in self._workers:
+                self._remove_worker(worker)
+            future, worker.future = worker.future, None
+        worker.connection.close()
+        worker.process.join()
+        if future is not None:
+            self._complete(future, None, self._stopped_error())
+    
+    def _worker_failed(self, worker: _ProcessWorker) -> None:
+        """Fail the waiting calls of a worker that exited before it was ready, as its replacements would too."""
+        queued: deque[tuple[Future, Any, tuple[Any, ...]]] = deque()
+        with self._lock:
+            # Unless killed while starting by terminate()
+            if worker in self._workers:
+                self._workers.remove(worker)
+                queued, self._queue = self._queue, deque()
+        worker.connection.close()
+        worker.process.join()
+        error = RuntimeError(
+            f"Worker process for tool '{self.tool_name}' exited with code {worker.process.exitcode} while starting"
+        )
+        for future, _, _ in queued:
+            self._complete(future, None, error)
+    
+    def _stopped_error(self) -> RuntimeError:
+        return RuntimeError(f"Worker process for tool '{self.tool_name}' was stopped")
+    
+    @staticmethod
+    def _stop_timer(worker: _ProcessWorker) -> None:
+        """Stop the timeout of a worker's call. The caller must hold _lock."""
+        timer, worker.timer = worker.timer, None
+        if timer is not None:
+            timer.cancel()
+    
+    @staticmethod
+    def _complete(future: Future, result: Any, error: BaseException | None) -> None:
+        """Complete a call's future unless it already is, e.g. by cancel()."""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
 
 class ToolExecutor:
     """Execute tool calls from OpenAI responses.
@@ -600,6 +1460,11 @@ class ToolExecutor:
     - Comprehensive error handling with structured responses
     - Logging of all tool execution events
     - Graceful degradation on errors
+    - Runs each tool as its ExecutionProfile says: inline, on a worker thread
+      or in a worker process, with a timeout and a concurrency limit
+    - Per-tool latency and outcome stats (get_stats())
+    - LRU cache of deterministic tools' results, keyed on the tool and its
+      canonicalized parameters
     
     Example:
         registry = ToolRegistry()
@@ -619,15 +1484,79 @@ class ToolExecutor:
             print(f"Error: {result['error']}")
     """
     
-    def __init__(self, tool_registry: ToolRegistry):
+    # How often an async call waiting for a concurrency slot checks again
+    SLOT_POLL_INTERVAL = 0.01
+    
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        storage_cache: ToolStorageCache | None = None,
+        thread_workers: int = 8,
+        process_workers: int = 2,
+        result_cache_size: int = 1024
+    ):
         """Initialize the tool executor.
         
         Args:
             tool_registry: ToolRegistry instance containing registered tools
+            storage_cache: Shared cache for the tools' storage (default: no cache)
+            thread_workers: Worker threads shared by EXECUTION_THREAD tools
+            process_workers: Worker processes per EXECUTION_PROCESS tool without
+                a concurrency limit (with one, the limit is used)
+            result_cache_size: Results of deterministic tools to keep (0 disables
+                the cache)
         """
         self.registry = tool_registry
+        self.storage_cache = storage_cache
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self._process_pools: dict[str, ToolProcessPool] = {}
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._stats: dict[str, ToolCallStats] = {}
+        self.result_cache_size = result_cache_size
+        self._results: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
         logger.info("ToolExecutor initialized")
     
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Get latency and outcome counts for each tool that has been called.
+        
+        Returns:
+            Dictionary mapping tool names to ToolCallStats summaries
+        """
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
+    
+    def close(self) -> None:
+        """Stop the worker threads and processes."""
+        with self._lock:
+            thread_pool, self._thread_pool = self._thread_pool, None
+            process_pools, self._process_pools = list(self._process_pools.values()), {}
+        if thread_pool is not None:
+            thread_pool.shutdown(wait=False, cancel_futures=True)
+        for pool in process_pools:
+            pool.terminate()
+    
+    def start_process_workers(self) -> None:
+        """Start the worker processes of every EXECUTION_PROCESS tool now, rather than on first use."""
+        for info in self.registry.list_tools():
+            tool = self.registry.get_tool(info.name)
+            if tool is not None and tool.execution_profile.mode == EXECUTION_PROCESS:
+                self._get_process_pool(tool.name, tool.execution_profile).start()
+    
+    def flush_storage(self, username: str, conversation_id: str) -> None:
+        """Write any cached tool storage changes for a conversation to disk.
+        
+        Called at the end of each chat turn. Does nothing without a cache.
+        
+        Args:
+            username: Username who owns the conversation
+            conversation_id: Unique identifier for the conversation
+        """
+        if self.storage_cache is not None:
+            self.storage_cache.flush(username, conversation_id)
+    
     def execute_tool_call(
         self,
         tool_name: str,
@@ -664,7 +1593,7 @@ class ToolExecutor:
             {
                 'success': False,
                 'error': 'Error message',
-                'error_code': 'tool_not_found' | 'execution_error' | 'storage_error',
+                'error_code': 'tool_not_found' | 'execution_error' | 'storage_error' | 'timeout',
                 'tool_name': <tool name>
             }
         
@@ -682,73 +1611,406 @@ class ToolExecutor:
         )
         
         try:
-            # Get tool from registry
-            tool = self.registry.get_tool(tool_name)
-            if not tool:
-                error_msg = f"Tool '{tool_name}' not found in registry"
-                logger.error(error_msg)
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'error_code': 'tool_not_found',
-                    'tool_name': tool_name
-                }
+            prepared = self._prepare_tool_call(tool_name, username, conversation_id)
+            if isinstance(prepared, dict):
+                return prepared
+            tool, storage = prepared
             
-            # Create storage for this tool in this conversation
+            # Execute tool with error handling
+            started_at = time.monotonic()
+            cache_key = self._result_cache_key(tool, parameters)
+            cached = self._get_cached_result(tool, cache_key, parameters, storage)
+            if cached is not None:
+                self._record_call(tool_name, time.monotonic() - started_at, cached, cache_hit=True)
+                return cached
             try:
-                storage = ToolStorage(username, conversation_id, tool_name)
+                result = self._run_tool(tool, parameters, storage)
             except Exception as e:
-                error_msg = f"Failed to create storage for tool '{tool_name}': {str(e)}"
-                logger.error(error_msg, exc_info=True)
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'error_code': 'storage_error',
-                    'tool_name': tool_name
-                }
+                result = self._execution_error(e, tool_name, username, conversation_id)
+            else:
+                self._log_result(result, tool_name, username, conversation_id)
+                self._cache_result(cache_key, result)
+            self._record_call(tool_name, time.monotonic() - started_at, result)
+            return result
+        
+        except Exception as e:
+            return self._unexpected_error(e, tool_name)
+    
+    async def execute_tool_call_async(
+        self,
+        tool_name: str,
+        parameters: dict[str, Any],
+        username: str,
+        conversation_id: str
+    ) -> dict[str, Any]:
+        """Execute a tool call from the asyncio chat engine.
+        
+        Behaves exactly like execute_tool_call() but never blocks the event
+        loop: inline tools are run by awaiting their execute_async() hook, and
+        thread and process calls are awaited.
+        
+        Args:
+            tool_name: Name of the tool to execute
+            parameters: Dictionary of parameters for the tool
+            username: Username who owns the conversation
+            conversation_id: Unique identifier for the conversation
+        
+        Returns:
+            Dictionary containing execution result, see execute_tool_call()
+        """
+        logger.info(
+            f"Executing tool call: tool={tool_name}, user={username}, "
+            f"conversation={conversation_id}, params={parameters}"
+        )
+        
+        try:
+            prepared = self._prepare_tool_call(tool_name, username, conversation_id)
+            if isinstance(prepared, dict):
+                return prepared
+            tool, storage = prepared
             
-            # Execute tool with error handling
+            started_at = time.monotonic()
+            cache_key = self._result_cache_key(tool, parameters)
+            cached = self._get_cached_result(tool, cache_key, parameters, storage)
+            if cached is not None:
+                self._record_call(tool_name, time.monotonic() - started_at, cached, cache_hit=True)
+                return cached
             try:
-                result = tool.execute(parameters, storage)
-                
-                # Log execution result
-                if result.get('success'):
-                    logger.info(
-                        f"Tool execution succeeded: tool={tool_name}, "
-                        f"user={username}, conversation={conversation_id}"
-                    )
-                else:
-                    logger.warning(
-                        f"Tool execution returned error: tool={tool_name}, "
-                        f"error={result.get('error')}"
-                    )
-                
-                return result
-                
+                result = await self._run_tool_async(tool, parameters, storage)
             except Exception as e:
-                error_msg = f"Tool execution failed: {str(e)}"
-                logger.error(
-                    f"Exception during tool execution: tool={tool_name}, "
-                    f"user={username}, conversation={conversation_id}",
-                    exc_info=True
-                )
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'error_code': 'execution_error',
-                    'tool_name': tool_name
-                }
+                result = self._execution_error(e, tool_name, username, conversation_id)
+            else:
+                self._log_result(result, tool_name, username, conversation_id)
+                self._cache_result(cache_key, result)
+            self._record_call(tool_name, time.monotonic() - started_at, result)
+            return result
         
         except Exception as e:
-            # Catch-all for any unexpected errors
-            error_msg = f"Unexpected error during tool execution: {str(e)}"
-            logger.error(
-                f"Unexpected exception in execute_tool_call: tool={tool_name}",
-                exc_info=True
+            return self._unexpected_error(e, tool_name)
+    
+    def _run_tool(
+        self,
+        tool: BaseTool,
+        parameters: dict[str, Any],
+        storage: ToolStorage
+    ) -> dict[str, Any]:
+        """Run a tool as its execution profile says, waiting for a free slot first."""
+        profile = tool.execution_profile
+        slot = self._get_slot(tool.name, profile)
+        if slot is not None:
+            slot.acquire()
+        
+        if profile.mode == EXECUTION_INLINE:
+            try:
+                return tool.execute(parameters, storage)
+            finally:
+                if slot is not None:
+                    slot.release()
+        
+        future = self._start(tool, profile, parameters, storage, slot)
+        try:
+            return self._finish(tool, future.result(timeout=self._wait_timeout(profile)), storage)
+        except FutureTimeoutError:
+            return self._timed_out(tool, profile, future)
+    
+    async def _run_tool_async(
+        self,
+        tool: BaseTool,
+        parameters: dict[str, Any],
+        storage: ToolStorage
+    ) -> dict[str, Any]:
+        """Async counterpart of _run_tool."""
+        profile = tool.execution_profile
+        slot = self._get_slot(tool.name, profile)
+        if slot is not None:
+            # Poll rather than block, so waiting never holds up the event loop
+            while not slot.acquire(blocking=False):
+                await asyncio.sleep(self.SLOT_POLL_INTERVAL)
+        
+        if profile.mode == EXECUTION_INLINE:
+            try:
+                return await tool.execute_async(parameters, storage)
+            finally:
+                if slot is not None:
+                    slot.release()
+        
+        future = self._start(tool, profile, parameters, storage, slot)
+        try:
+            # Shielded so a timeout doesn't cancel the future before _timed_out sees it
+            output = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), self._wait_timeout(profile)
             )
+        except TimeoutError:
+            return self._timed_out(tool, profile, future)
+        return self._finish(tool, output, storage)
+    
+    def _start(
+        self,
+        tool: BaseTool,
+        profile: ExecutionProfile,
+        parameters: dict[str, Any],
+        storage: ToolStorage,
+        slot: threading.BoundedSemaphore | None
+    ) -> Future:
+        """Start a thread or process call, holding its slot until the call really ends."""
+        try:
+            if profile.mode == EXECUTION_THREAD:
+                future = self._get_thread_pool().submit(tool.execute, parameters, storage)
+            else:
+                snapshot = SnapshotToolStorage(
+                    storage.username, storage.conversation_id, storage.tool_name, storage.get_all()
+                )
+                future = self._get_process_pool(tool.name, profile).submit(
+                    _execute_in_process, tool, parameters, snapshot
+                )
+        except Exception:
+            if slot is not None:
+                slot.release()
+            raise
+        if slot is not None:
+            future.add_done_callback(lambda _: slot.release())
+        return future
+    
+    def _finish(self, tool: BaseTool, output: Any, storage: ToolStorage) -> dict[str, Any]:
+        """Unpack a thread or process call's output, saving a process call's storage changes."""
+        if tool.execution_profile.mode != EXECUTION_PROCESS:
+            return output
+        result, data, updates = output
+        if data is not None:
+            storage.replace_all(data)
+        else:
+            # Applied to the current data, which other calls may have changed meanwhile
+            for key, function, default in updates:
+                storage.update(key, function, default)
+        return result
+    
+    @staticmethod
+    def _wait_timeout(profile: ExecutionProfile) -> float | None:
+        """Seconds to wait for a thread or process call's future before it has timed out."""
+        if profile.mode == EXECUTION_PROCESS:
+            # The process pool times the call from when a worker picks it up, and
+            # fails its future with TimeoutError
+            return None
+        return profile.timeout
+    
+    def _timed_out(self, tool: BaseTool, profile: ExecutionProfile, future: Future) -> dict[str, Any]:
+        """Abandon a call that ran over its timeout and build its error result."""
+        if profile.mode == EXECUTION_THREAD:
+            # A running thread can't be interrupted; its late result is discarded
+            future.cancel()
+        # A process call's pool has already killed its worker; the tool's other calls carry on
+        error_msg = f"Tool '{tool.name}' timed out after {profile.timeout:g} seconds"
+        logger.warning(error_msg)
+        return {
+            'success': False,
+            'error': error_msg,
+            'error_code': 'timeout',
+            'tool_name': tool.name
+        }
+    
+    def _get_slot(
+        self,
+        tool_name: str,
+        profile: ExecutionProfile
+    ) -> threading.BoundedSemaphore | None:
+        """Get the semaphore limiting a tool's concurrent calls, or None without a limit."""
+        if profile.max_concurrency is None:
+            return None
+        with self._lock:
+            if tool_name not in self._slots:
+                self._slots[tool_name] = threading.BoundedSemaphore(profile.max_concurrency)
+            return self._slots[tool_name]
+    
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        """Get the shared worker threads, starting them if needed."""
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix='tool'
+                )
+            return self._thread_pool
+    
+    def _get_process_pool(self, tool_name: str, profile: ExecutionProfile) -> ToolProcessPool:
+        """Get a tool's worker processes."""
+        with self._lock:
+            if tool_name not in self._process_pools:
+                initializer, initargs = None, ()
+                if profile.memory_limit_mb is not None:
+                    initializer, initargs = _limit_process_memory, (profile.memory_limit_mb * 1024 * 1024,)
+                self._process_pools[tool_name] = ToolProcessPool(
+                    tool_name,
+                    profile.max_concurrency or self.process_workers,
+                    timeout=profile.timeout,
+                    initializer=initializer,
+                    initargs=initargs,
+                )
+            return self._process_pools[tool_name]
+    
+    def _result_cache_key(
+        self,
+        tool: BaseTool,
+        parameters: dict[str, Any]
+    ) -> tuple[str, str] | None:
+        """Key a deterministic tool's call by its canonical JSON parameters.
+        
+        Returns:
+            Cache key, or None if the call can't be cached
+        """
+        if self.result_cache_size <= 0 or not tool.deterministic:
+            return None
+        try:
+            canonical = json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+        except (TypeError, ValueError):
+            return None
+        return tool.name, canonical
+    
+    def _get_cached_result(
+        self,
+        tool: BaseTool,
+        cache_key: tuple[str, str] | None,
+        parameters: dict[str, Any],
+        storage: ToolStorage
+    ) -> dict[str, Any] | None:
+        """Return a copy of a cached result, letting the tool record the call.
+        
+        Returns:
+            The cached result, or None on a miss
+        """
+        if cache_key is None:
+            return None
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is None:
+                return None
+            self._results.move_to_end(cache_key)
+        result = copy.deepcopy(cached)
+        try:
+            tool.record_cached_result(parameters, result, storage)
+        except Exception:
+            # The result is still valid; only the tool's bookkeeping failed
+            logger.error(f"Failed to record cached result: tool={tool.name}", exc_info=True)
+        return result
+    
+    def _cache_result(self, cache_key: tuple[str, str] | None, result: dict[str, Any]) -> None:
+        """Keep a successful result of a deterministic tool, evicting the least recently used."""
+        if cache_key is None or not result.get('success'):
+            return
+        with self._lock:
+            self._results[cache_key] = copy.deepcopy(result)
+            self._results.move_to_end(cache_key)
+            while len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+    
+    def _record_call(
+        self,
+        tool_name: str,
+        seconds: float,
+        result: dict[str, Any],
+        cache_hit: bool = False
+    ) -> None:
+        """Add a call to the tool's stats and log its latency."""
+        success = bool(result.get('success'))
+        timed_out = result.get('error_code') == 'timeout'
+        with self._lock:
+            self._stats.setdefault(tool_name, ToolCallStats()).record(
+                seconds, success, timed_out, cache_hit
+            )
+        logger.info(
+            f"Tool call finished: tool={tool_name}, duration_ms={seconds * 1000:.1f}"
+            + (", cached" if cache_hit else "")
+        )
+    
+    def _prepare_tool_call(
+        self,
+        tool_name: str,
+        username: str,
+        conversation_id: str
+    ) -> tuple[BaseTool, ToolStorage] | dict[str, Any]:
+        """Look up the tool and create its per-chat storage.
+        
+        Returns:
+            (tool, storage) tuple, or a structured error result if either step failed
+        """
+        # Get tool from registry
+        tool = self.registry.get_tool(tool_name)
+        if not tool:
+            error_msg = f"Tool '{tool_name}' not found in registry"
+            logger.error(error_msg)
+            return {
+                'success': False,
+                'error': error_msg,
+                'error_code': 'tool_not_found',
+                'tool_name': tool_name
+            }
+        
+        # Create storage for this tool in this conversation
+        try:
+            storage = ToolStorage(
+                username, conversation_id, tool_name, cache=self.storage_cache
+            )
+        except Exception as e:
+            error_msg = f"Failed to create storage for tool '{tool_name}': {str(e)}"
+            logger.error(error_msg, exc_info=True)
             return {
                 'success': False,
                 'error': error_msg,
-                'error_code': 'execution_error',
+                'error_code': 'storage_error',
                 'tool_name': tool_name
             }
+        
+        return tool, storage
+    
+    def _log_result(
+        self,
+        result: dict[str, Any],
+        tool_name: str,
+        username: str,
+        conversation_id: str
+    ) -> None:
+        """Log the outcome of a tool execution."""
+        if result.get('success'):
+            logger.info(
+                f"Tool execution succeeded: tool={tool_name}, "
+                f"user={username}, conversation={conversation_id}"
+            )
+        else:
+            logger.warning(
+                f"Tool execution returned error: tool={tool_name}, "
+                f"error={result.get('error')}"
+            )
+    
+    def _execution_error(
+        self,
+        error: Exception,
+        tool_name: str,
+        username: str,
+        conversation_id: str
+    ) -> dict[str, Any]:
+        """Build the result for a tool that raised during execution."""
+        error_msg = f"Tool execution failed: {str(error)}"
+        logger.error(
+            f"Exception during tool execution: tool={tool_name}, "
+            f"user={username}, conversation={conversation_id}",
+            exc_info=True
+        )
+        return {
+            'success': False,
+            'error': error_msg,
+            'error_code': 'execution_error',
+            'tool_name': tool_name
+        }
+    
+    def _unexpected_error(self, error: Exception, tool_name: str) -> dict[str, Any]:
+        """Build the result for any other unexpected failure."""
+        # Catch-all for any unexpected errors
+        error_msg = f"Unexpected error during tool execution: {str(error)}"
+        logger.error(
+            f"Unexpected exception in execute_tool_call: tool={tool_name}",
+            exc_info=True
+        )
+        return {
+            'success': False,
+            'error': error_msg,
+            'error_code': 'execution_error',
+            'tool_name': tool_name
+        }
@@ -1,10 +1,78 @@
 import ast
+import functools
+import keyword
 import math
-from math import sqrt
+import operator
 import time
-from typing import Any
+from math import sqrt
+from typing import Any, Callable
+
+from tool_framework import EXECUTION_PROCESS, BaseTool, ExecutionProfile, ToolStorage
+
+# Largest integer (in bits, about 1233 decimal digits) any step of a calculation may produce
+MAX_INTEGER_BITS = 4096
+
+# Largest number of digits round() may be asked to round to, in either direction
+MAX_ROUND_DIGITS = 1000
+
+# Calculations kept in a conversation's history
+MAX_HISTORY_ENTRIES = 100
+
+
+def _check_integer_size(value: Any) -> None:
+    """Raise ValueError if value is an integer over MAX_INTEGER_BITS."""
+    if isinstance(value, int) and value.bit_length() > MAX_INTEGER_BITS:
+        raise ValueError(f"Result too large (over {MAX_INTEGER_BITS} bits)")
+
+
+def _check_power(base: Any, exponent: Any) -> None:
+    """Raise ValueError if base ** exponent would be an integer over MAX_INTEGER_BITS.
+
+    Estimates the size from the operands, so the power is never computed.
+    """
+    if not (isinstance(base, int) and isinstance(exponent, int)):
+        return
+    if exponent > 0 and abs(base) > 1 and exponent * math.log2(abs(base)) > MAX_INTEGER_BITS:
+        raise ValueError(f"Result too large (over {MAX_INTEGER_BITS} bits)")
+
+
+def _check_product(left: Any, right: Any) -> None:
+    """Raise ValueError if left * right would be an integer over MAX_INTEGER_BITS."""
+    if isinstance(left, int) and isinstance(right, int):
+        if left.bit_length() + right.bit_length() > MAX_INTEGER_BITS + 1:
+            raise ValueError(f"Result too large (over {MAX_INTEGER_BITS} bits)")
+
+
+def _require_number(value: Any) -> None:
+    """Raise ValueError if an arithmetic operand isn't a number.
+
+    Keeps operators from repeating strings and lists, e.g. [0] * 10**9.
+    """
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"Unsupported operand type: {type(value).__name__}")
+
+
+def _bounded_pow(base: Any, exponent: Any, modulus: Any = None) -> Any:
+    """pow() that refuses to build integers over MAX_INTEGER_BITS."""
+    _require_number(base)
+    _require_number(exponent)
+    if modulus is None:
+        _check_power(base, exponent)
+        return pow(base, exponent)
+    # Modular results are bounded by the modulus, which is already size-checked
+    return pow(base, exponent, modulus)
 
-from tool_framework import BaseTool, ToolStorage
+
+def _bounded_round(number: Any, ndigits: Any = None) -> Any:
+    """round() that refuses digit counts whose power of ten would be huge."""
+    if ndigits is not None and isinstance(ndigits, int) and abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ValueError(f"round() digits must be between -{MAX_ROUND_DIGITS} and {MAX_ROUND_DIGITS}")
+    return round(number, ndigits)
+
+
+def _append_history(entries: list[dict[str, Any]], history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """History with entries added, keeping only the last MAX_HISTORY_ENTRIES."""
+    return (history + entries)[-MAX_HISTORY_ENTRIES:]
 
 
 class CalculatorTool(BaseTool):
@@ -16,6 +84,8 @@ class CalculatorTool(BaseTool):
     - Preventing code execution, imports, and attribute access
     - Limiting allowed functions to a safe whitelist
     - Storing calculation history per conversation
+    - Evaluating a batch of calculations in one call, where later
+      expressions can use the named results of earlier ones
 
     Supported operations:
     - Arithmetic: +, -, *, /, **, % (add, subtract, multiply, divide, power, modulo)
@@ -29,6 +99,10 @@ class CalculatorTool(BaseTool):
     - No variable assignments allowed
     - Expression length limited to 1000 characters
     - Only safe AST node types allowed
+    - Integers limited to MAX_INTEGER_BITS, checked statically and before each
+      power or product is computed, so 9**9**9 fails instantly
+    - Optionally sandboxed: ToolExecutor then runs each call in a worker
+      process with wall-clock and memory caps
 
     Example expressions:
     - "2 + 2" -> 4
@@ -37,11 +111,19 @@ class CalculatorTool(BaseTool):
     - "max(10, 20, 30)" -> 30
     - "(5 + 3) * 2" -> 16
     - "round(3.14159, 2)" -> 3.14
+
+    Example batch:
+    - [{"name": "subtotal", "expression": "3 * 19.99"},
+       {"name": "total", "expression": "subtotal * 1.08"}]
+      -> subtotal 59.97, total 64.7676
     """
 
     # Maximum expression length to prevent abuse
     MAX_EXPRESSION_LENGTH = 1000
 
+    # Maximum number of calculations in one batch
+    MAX_BATCH_SIZE = 25
+
     # Allowed AST node types for safe evaluation
     ALLOWED_NODES = {
         ast.Expression,  # Top-level expression wrapper
@@ -65,6 +147,20 @@ class CalculatorTool(BaseTool):
         ast.UAdd,  # Unary plus (+)
     }
 
+    # Arithmetic for each allowed operator node
+    BINARY_OPERATORS: dict[type[ast.operator], Callable[[Any, Any], Any]] = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.Pow: operator.pow,
+        ast.Mod: operator.mod,
+    }
+    UNARY_OPERATORS: dict[type[ast.unaryop], Callable[[Any], Any]] = {
+        ast.USub: operator.neg,
+        ast.UAdd: operator.pos,
+    }
+
     # Allowed function names
     ALLOWED_FUNCTIONS = {
         "abs",  # Absolute value
@@ -76,6 +172,25 @@ class CalculatorTool(BaseTool):
         "sqrt",  # Square root function
     }
 
+    def __init__(
+        self,
+        sandbox_workers: int = 0,
+        timeout: float = 2.0,
+        memory_limit_mb: int | None = 256,
+    ):
+        """Initialize the calculator.
+
+        Args:
+            sandbox_workers: Worker processes ToolExecutor runs calculations in,
+                each killed after timeout seconds and capped at memory_limit_mb
+                (POSIX only); 0 runs them inline, without either limit
+            timeout: Wall-clock seconds a sandboxed call may take
+            memory_limit_mb: Address space cap per worker, or None for no cap
+        """
+        self.sandbox_workers = sandbox_workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+
     @property
     def name(self) -> str:
         """Tool identifier."""
@@ -91,6 +206,23 @@ class CalculatorTool(BaseTool):
         """Tool description for users."""
         return "Evaluate mathematical expressions safely"
 
+    @property
+    def execution_profile(self) -> ExecutionProfile:
+        """Run in worker processes when sandboxed, so a runaway calculation is killed."""
+        if self.sandbox_workers <= 0:
+            return ExecutionProfile()
+        return ExecutionProfile(
+            mode=EXECUTION_PROCESS,
+            timeout=self.timeout,
+            max_concurrency=self.sandbox_workers,
+            memory_limit_mb=self.memory_limit_mb,
+        )
+
+    @property
+    def deterministic(self) -> bool:
+        """Results depend only on the expression, so ToolExecutor may cache them."""
+        return True
+
     def get_openai_tool_definition(self) -> dict[str, Any]:
         """Get OpenAI function tool definition.
 
@@ -109,25 +241,56 @@ class CalculatorTool(BaseTool):
                 "Evaluates mathematical expressions and returns the numeric result. "
                 "Use this when the user asks for calculations, math operations, or numeric computations. "
                 "Supports basic arithmetic operators (+, -, *, /, **, %) and mathematical functions "
-                "(abs, min, max, round, sum, pow). "
+                "(abs, min, max, round, sum, pow, sqrt). "
+                "When a problem needs several calculations, send them all in one call with "
+                "'calculations' instead of making one call per expression: give intermediate "
+                "results a name and use that name in later expressions. "
                 "Returns an error for invalid expressions or unsafe operations."
             ),
             "parameters": {
                 "type": "object",
                 "properties": {
                     "expression": {
-                        "type": "string",
+                        "type": ["string", "null"],
                         "description": (
-                            "A valid mathematical expression to evaluate. "
+                            "A single mathematical expression to evaluate, or null when using "
+                            "'calculations'. "
                             "Examples: '2 + 2' (addition), 'pow(2, 8)' (exponentiation), "
                             "'abs(-5)' (absolute value), 'max(10, 20, 30)' (maximum), "
                             "'(5 + 3) * 2' (with parentheses). "
                             "Do not include variable assignments or code statements - "
                             "only mathematical expressions."
                         ),
-                    }
+                    },
+                    "calculations": {
+                        "type": ["array", "null"],
+                        "description": (
+                            f"Up to {self.MAX_BATCH_SIZE} calculations evaluated in order in one call, "
+                            "or null when using 'expression'. Each result is returned separately. "
+                            "Example: [{'name': 'area', 'expression': '3.5 * 2'}, "
+                            "{'name': null, 'expression': 'area * 4'}]"
+                        ),
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {
+                                    "type": ["string", "null"],
+                                    "description": (
+                                        "Identifier later expressions can use for this result "
+                                        "(letters, digits and underscores), or null"
+                                    ),
+                                },
+                                "expression": {
+                                    "type": "string",
+                                    "description": "Mathematical expression, which may use earlier names",
+                                },
+                            },
+                            "required": ["name", "expression"],
+                            "additionalProperties": False,
+                        },
+                    },
                 },
-                "required": ["expression"],
+                "required": ["expression", "calculations"],
                 "additionalProperties": False,
             },
             "strict": True,
@@ -144,18 +307,65 @@ class CalculatorTool(BaseTool):
         """
         errors = []
 
-        if "expression" in parameters:
+        calculations = parameters.get("calculations")
+        if calculations is not None:
+            if parameters.get("expression") is not None:
+                errors.append("Provide either 'expression' or 'calculations', not both")
+            errors.extend(self._validate_calculations(calculations))
+            return errors
+
+        if parameters.get("expression") is not None:
             expr = parameters["expression"]
+            errors.extend(self._validate_expression(expr))
+        elif "expression" in parameters:
+            errors.append("Provide an 'expression' or 'calculations'")
 
-            # Check expression length
-            if len(expr) > self.MAX_EXPRESSION_LENGTH:
-                errors.append(
-                    f"Expression too long (max {self.MAX_EXPRESSION_LENGTH} characters)"
-                )
+        return errors
+
+    def _validate_expression(self, expr: str) -> list[str]:
+        """Check a single expression's length and that it isn't empty."""
+        errors = []
+
+        # Check expression length
+        if len(expr) > self.MAX_EXPRESSION_LENGTH:
+            errors.append(
+                f"Expression too long (max {self.MAX_EXPRESSION_LENGTH} characters)"
+            )
+
+        # Check for empty expression
+        if not expr or not expr.strip():
+            errors.append("Expression cannot be empty")
+
+        return errors
+
+    def _validate_calculations(self, calculations: Any) -> list[str]:
+        """Check a batch's size, names and expressions."""
+        if not isinstance(calculations, list) or not calculations:
+            return ["Calculations must be a non-empty list"]
+        if len(calculations) > self.MAX_BATCH_SIZE:
+            return [f"Too many calculations (max {self.MAX_BATCH_SIZE})"]
+
+        errors = []
+        names: set[str] = set()
+        for index, calculation in enumerate(calculations, start=1):
+            if not isinstance(calculation, dict) or not isinstance(calculation.get("expression"), str):
+                errors.append(f"Calculation {index}: expression must be a string")
+                continue
+            errors.extend(
+                f"Calculation {index}: {error}"
+                for error in self._validate_expression(calculation["expression"])
+            )
 
-            # Check for empty expression
-            if not expr or not expr.strip():
-                errors.append("Expression cannot be empty")
+            name = calculation.get("name")
+            if name is None:
+                continue
+            if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name):
+                errors.append(f"Calculation {index}: name '{name}' is not a valid identifier")
+            elif name in self.ALLOWED_FUNCTIONS:
+                errors.append(f"Calculation {index}: name '{name}' is a function name")
+            elif name in names:
+                errors.append(f"Calculation {index}: name '{name}' is already used")
+            names.add(name)
 
         return errors
 
@@ -165,7 +375,8 @@ class CalculatorTool(BaseTool):
         """Execute calculation and store in history.
 
         Args:
-            parameters: Dictionary containing 'expression' key
+            parameters: Dictionary containing an 'expression' or a
+                'calculations' batch (see execute_batch())
             storage: ToolStorage instance for persisting calculation history
 
         Returns:
@@ -186,7 +397,10 @@ class CalculatorTool(BaseTool):
                 'expression': '1 / 0'
             }
         """
-        expression = parameters.get("expression", "")
+        if parameters.get("calculations") is not None:
+            return self.execute_batch(parameters, storage)
+
+        expression = parameters.get("expression") or ""
 
         # Validate parameters
         validation_errors = self.validate_parameters(parameters)
@@ -198,52 +412,120 @@ class CalculatorTool(BaseTool):
             }
 
         try:
-            # Parse expression into AST
-            tree = ast.parse(expression, mode="eval")
-
-            # Validate AST for safety
-            self._validate_ast(tree)
-
-            # Evaluate expression safely
-            result = eval(
-                compile(tree, "<string>", "eval"),
-                {"__builtins__": {}},  # No access to builtins
-                self._get_safe_functions(),  # Only allowed functions
-            )
-
             # Convert non-finite floats to strings for valid JSON
-            result = self._sanitize_result(result)
+            result = self._sanitize_result(self.evaluate_expression(expression))
 
             # Store in history
             self._store_calculation(storage, expression, result)
 
             return {"success": True, "result": result, "expression": expression}
 
-        except SyntaxError as e:
-            return {
-                "success": False,
-                "error": f"Invalid expression syntax: {str(e)}",
-                "expression": expression,
-            }
-        except ValueError as e:
-            return {
-                "success": False,
-                "error": f"Invalid expression: {str(e)}",
-                "expression": expression,
-            }
-        except ZeroDivisionError:
-            return {
-                "success": False,
-                "error": "Division by zero",
-                "expression": expression,
-            }
         except Exception as e:
             return {
                 "success": False,
-                "error": f"Calculation error: {str(e)}",
+                "error": self._error_message(e),
                 "expression": expression,
             }
 
+    def execute_batch(
+        self, parameters: dict[str, Any], storage: ToolStorage
+    ) -> dict[str, Any]:
+        """Evaluate a batch of calculations in order and store them in history.
+
+        A named calculation's result can be used by later expressions. A
+        failed calculation doesn't stop the batch, but expressions using its
+        name fail too.
+
+        Args:
+            parameters: Dictionary containing a 'calculations' list of
+                {'name': str | None, 'expression': str} items
+            storage: ToolStorage instance for persisting calculation history
+
+        Returns:
+            Dictionary with overall success and a result for each calculation.
+
+        Example response:
+            {
+                'success': True,
+                'results': [
+                    {'name': 'subtotal', 'expression': '3 * 20', 'success': True, 'result': 60},
+                    {'name': 'total', 'expression': 'subtotal * 1.5', 'success': True, 'result': 90.0}
+                ]
+            }
+        """
+        calculations = parameters.get("calculations")
+
+        validation_errors = self.validate_parameters(parameters)
+        if validation_errors:
+            return {"success": False, "error": "; ".join(validation_errors)}
+
+        variables: dict[str, Any] = {}
+        results = []
+        stored = []
+        for calculation in calculations:  # type: ignore[union-attr]
+            name = calculation.get("name")
+            expression = calculation["expression"]
+            entry: dict[str, Any] = {"name": name, "expression": expression}
+            try:
+                value = self.evaluate_expression(expression, variables)
+            except Exception as e:
+                entry.update(success=False, error=self._error_message(e))
+            else:
+                if name is not None:
+                    variables[name] = value
+                result = self._sanitize_result(value)
+                entry.update(success=True, result=result)
+                stored.append((expression, result))
+            results.append(entry)
+
+        # Store the whole batch with a single storage write
+        self._store_calculations(storage, stored)
+
+        failed = sum(1 for entry in results if not entry["success"])
+        response: dict[str, Any] = {"success": failed == 0, "results": results}
+        if failed:
+            response["error"] = f"{failed} of {len(results)} calculations failed"
+        return response
+
+    def _error_message(self, error: Exception) -> str:
+        """Describe a failed evaluation for the model and the user."""
+        if isinstance(error, SyntaxError):
+            return f"Invalid expression syntax: {str(error)}"
+        if isinstance(error, ValueError):
+            return f"Invalid expression: {str(error)}"
+        if isinstance(error, ZeroDivisionError):
+            return "Division by zero"
+        if isinstance(error, MemoryError):
+            return "Calculation exceeded the memory limit"
+        return f"Calculation error: {str(error)}"
+
+    def evaluate_expression(
+        self, expression: str, variables: dict[str, Any] | None = None
+    ) -> Any:
+        """Parse, validate and evaluate an expression in the calling thread.
+
+        Args:
+            expression: Mathematical expression to evaluate
+            variables: Named results of earlier calculations the expression may use
+
+        Returns:
+            The raw result of the expression
+
+        Raises:
+            SyntaxError: If the expression can't be parsed
+            ValueError: If the expression is unsafe or its numbers are too large
+        """
+        # Parse expression into AST
+        tree = ast.parse(expression, mode="eval")
+
+        # Validate AST for safety
+        self._validate_ast(tree)
+
+        # Reject literal powers that are too large before doing any work
+        self._check_magnitudes(tree)
+
+        return self._evaluate(tree, variables or {})
+
     def _validate_ast(self, tree: ast.AST) -> None:
         """Validate that AST only contains safe node types.
 
@@ -272,6 +554,91 @@ class CalculatorTool(BaseTool):
                 else:
                     raise ValueError("Only simple function calls are allowed")
 
+    def _check_magnitudes(self, tree: ast.AST) -> None:
+        """Statically reject integer literals and literal powers that are too large.
+
+        Args:
+            tree: Validated AST tree
+
+        Raises:
+            ValueError: If a literal or a power of literals exceeds MAX_INTEGER_BITS
+        """
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant):
+                _check_integer_size(node.value)
+            elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+                _check_power(self._literal_value(node.left), self._literal_value(node.right))
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "pow":
+                if len(node.args) == 2:
+                    _check_power(self._literal_value(node.args[0]), self._literal_value(node.args[1]))
+
+    def _literal_value(self, node: ast.AST) -> Any:
+        """Return the value of a (possibly negated) numeric literal, or None for anything else."""
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.operand, ast.Constant):
+            value = node.operand.value
+            if isinstance(value, (int, float)):
+                return -value if isinstance(node.op, ast.USub) else value
+        return None
+
+    def _evaluate(self, node: ast.AST, variables: dict[str, Any]) -> Any:
+        """Evaluate a validated AST node, checking integer sizes at every step.
+
+        Args:
+            node: Node of a tree that passed _validate_ast
+            variables: Values of the names the expression may use
+
+        Returns:
+            The value of the node
+
+        Raises:
+            ValueError: If a step would produce an integer over MAX_INTEGER_BITS
+        """
+        if isinstance(node, ast.Expression):
+            return self._evaluate(node.body, variables)
+
+        if isinstance(node, ast.Constant):
+            return node.value
+
+        if isinstance(node, ast.List):
+            return [self._evaluate(element, variables) for element in node.elts]
+
+        if isinstance(node, ast.Tuple):
+            return tuple(self._evaluate(element, variables) for element in node.elts)
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._evaluate(node.operand, variables)
+            _require_number(operand)
+            return self.UNARY_OPERATORS[type(node.op)](operand)
+
+        if isinstance(node, ast.BinOp):
+            left = self._evaluate(node.left, variables)
+            right = self._evaluate(node.right, variables)
+            _require_number(left)
+            _require_number(right)
+            if isinstance(node.op, ast.Pow):
+                _check_power(left, right)
+            elif isinstance(node.op, ast.Mult):
+                _check_product(left, right)
+            result = self.BINARY_OPERATORS[type(node.op)](left, right)
+            _check_integer_size(result)
+            return result
+
+        if isinstance(node, ast.Call):
+            function = self._get_safe_functions()[node.func.id]  # type: ignore[attr-defined]
+            result = function(*(self._evaluate(argument, variables) for argument in node.args))
+            _check_integer_size(result)
+            return result
+
+        if isinstance(node, ast.Name):
+            if node.id in variables:
+                return variables[node.id]
+            # Function names are only valid as the target of a call
+            raise NameError(f"name '{node.id}' is not defined")
+
+        raise ValueError(f"Unsafe operation: {type(node).__name__} is not allowed")
+
     def _get_safe_functions(self) -> dict[str, Any]:
         """Get dictionary of safe functions for evaluation.
 
@@ -282,9 +649,9 @@ class CalculatorTool(BaseTool):
             "abs": abs,
             "min": min,
             "max": max,
-            "round": round,
+            "round": _bounded_round,
             "sum": sum,
-            "pow": pow,
+            "pow": _bounded_pow,
             "sqrt": sqrt,
         }
 
@@ -309,6 +676,24 @@ class CalculatorTool(BaseTool):
                 return "-Infinity"
         return result
 
+    def record_cached_result(
+        self, parameters: dict[str, Any], result: dict[str, Any], storage: ToolStorage
+    ) -> None:
+        """Add a calculation answered from ToolExecutor's cache to history.
+
+        Args:
+            parameters: The call's parameters
+            result: The cached result of execute()
+            storage: ToolStorage instance for persisting calculation history
+        """
+        if "results" in result:
+            self._store_calculations(
+                storage,
+                [(entry["expression"], entry["result"]) for entry in result["results"] if entry["success"]],
+            )
+        elif result.get("success"):
+            self._store_calculation(storage, result["expression"], result["result"])
+
     def _store_calculation(
         self, storage: ToolStorage, expression: str, result: Any
     ) -> None:
@@ -321,33 +706,48 @@ class CalculatorTool(BaseTool):
             expression: The expression that was evaluated
             result: The result of the evaluation
         """
-        # Get existing history
-        history = storage.get("history", [])
+        self._store_calculations(storage, [(expression, result)])
 
-        # Add new calculation
-        history.append(
-            {"expression": expression, "result": result, "timestamp": int(time.time())}
-        )
+    def _store_calculations(
+        self, storage: ToolStorage, calculations: list[tuple[str, Any]]
+    ) -> None:
+        """Store several calculations in history with a single storage write.
+
+        Args:
+            storage: ToolStorage instance
+            calculations: (expression, result) pairs in the order they were evaluated
+        """
+        if not calculations:
+            return
 
-        # Keep only last 100 entries
-        if len(history) > 100:
-            history = history[-100:]
+        timestamp = int(time.time())
+        entries = [
+            {"expression": expression, "result": result, "timestamp": timestamp}
+            for expression, result in calculations
+        ]
 
-        # Save updated history
-        storage.set("history", history)
+        # Read and written under the storage lock, so concurrent calls keep each other's entries
+        storage.update("history", functools.partial(_append_history, entries), [])
 
     def format_input_for_display(self, parameters: dict[str, Any]) -> str:
         """Format calculator input for display.
 
-        Shows just the expression without JSON wrapper.
+        Shows just the expression without JSON wrapper, or one line per
+        calculation of a batch.
 
         Args:
-            parameters: Dictionary containing 'expression' key
+            parameters: Dictionary containing an 'expression' or 'calculations'
 
         Returns:
             The expression string
         """
-        return parameters.get("expression", "")
+        calculations = parameters.get("calculations")
+        if calculations:
+            return "\n".join(
+                f"{c.get('name')} = {c.get('expression', '')}" if c.get("name") else c.get("expression", "")
+                for c in calculations
+            )
+        return parameters.get("expression") or ""
 
     def format_output_for_display(self, result: dict[str, Any]) -> str:
         """Format calculator output for display.
@@ -360,6 +760,13 @@ class CalculatorTool(BaseTool):
         Returns:
             The result value or error message
         """
+        if "results" in result:
+            return "\n".join(
+                f"{entry.get('name') or entry.get('expression')} = "
+                + (str(entry.get("result")) if entry.get("success") else f"Error: {entry.get('error')}")
+                for entry in result["results"]
+            )
         if result.get("success"):
             return str(result.get("result", ""))
         return f"Error: {result.get('error', 'Unknown error')}"
+
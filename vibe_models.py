@@ -27,15 +27,14 @@ class VibeEncoding(BaseModel):
         return v
 
 
-class VibeCollection(BaseModel):
-    """Complete vibe collection with all encodings and preview images."""
+class VibeCollectionMetadata(BaseModel):
+    """Vibe collection without its encodings, as kept in the user's collection index."""
     
     guid: str = Field(..., description="Unique identifier for the collection")
     name: str = Field(..., description="User-provided name")
     model: str = Field(..., description="Model used for encoding")
     created_at: int = Field(..., description="Unix timestamp of creation")
     source_image_path: str = Field(..., description="Path to original source image")
-    encodings: Dict[str, VibeEncoding] = Field(..., description="Encodings keyed by strength as string")
     preview_images: Dict[str, str] = Field(..., description="Preview image paths keyed by 'enc{X}_ref{Y}'")
     
     @field_validator("guid")
@@ -55,6 +54,12 @@ class VibeCollection(BaseModel):
         if not v or not v.strip():
             raise ValueError("Name cannot be empty")
         return v.strip()
+
+
+class VibeCollection(VibeCollectionMetadata):
+    """Complete vibe collection with all encodings and preview images."""
+    
+    encodings: Dict[str, VibeEncoding] = Field(..., description="Encodings keyed by strength as string")
     
     @field_validator("encodings")
     @classmethod
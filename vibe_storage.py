@@ -1,33 +1,79 @@
 """
-Storage manager for NovelAI vibe collections with JSON persistence.
+Storage manager for NovelAI vibe collections.
 
 This module provides the VibeStorageManager class for managing vibe collection
-storage, including JSON persistence and file organization.
+storage. Each user has a small JSON index of their collections' metadata, and each
+collection's encodings are kept as one file per encoding strength in the collection's
+directory, so listing collections never reads encoding data.
 """
 
+import base64
+import binascii
+import logging
 import os
 import shutil
+import threading
 import time
 import uuid
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 from file_manager_utils import UserFileManager, load_json_file_with_backup, save_json_file_atomic
-from vibe_models import VibeCollection, VibeCollectionSummary
+from vibe_models import VibeCollection, VibeCollectionMetadata, VibeCollectionSummary, VibeEncoding
+
+# Encodings in NovelAI's base64 format are stored decoded; any other text is kept as is
+BINARY_ENCODING_EXTENSION = ".bin"
+TEXT_ENCODING_EXTENSION = ".txt"
+
+
+def _encoding_file_content(encoded_data: str) -> Tuple[bytes, str]:
+    """Bytes to store an encoding as, and the file extension telling how to read them back.
+    
+    Args:
+        encoded_data: Encoding as given to VibeEncoding
+        
+    Returns:
+        Tuple of file content and extension
+    """
+    try:
+        raw = base64.b64decode(encoded_data, validate=True)
+        if base64.b64encode(raw).decode("ascii") == encoded_data:
+            return raw, BINARY_ENCODING_EXTENSION
+    except (binascii.Error, ValueError):
+        pass
+    return encoded_data.encode("utf-8"), TEXT_ENCODING_EXTENSION
 
 
 class VibeStorageManager(UserFileManager):
-    """Manages vibe collection storage per user with JSON persistence."""
+    """Manages vibe collection storage per user.
     
-    def __init__(self, static_folder: str):
+    The parsed index of each user is kept in memory and read again only when the
+    file changes. Encodings handed out by get_encoding() are kept in a bounded LRU
+    cache, so generations reusing a vibe do not read its file again; saving or
+    deleting a collection drops its entries.
+    """
+    
+    def __init__(self, static_folder: str, encoding_cache_size: int = 128):
         """Initialize the vibe storage manager.
         
         Args:
             static_folder: Base static folder path
+            encoding_cache_size: Encodings kept in memory for get_encoding(); 0 disables the cache
         """
         super().__init__(static_folder, "vibes")
+        # Parsed index per user, with the modification time and size of the file it was read from
+        self._index_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        self.encoding_cache_size = encoding_cache_size
+        # Encodings by (username, guid, strength key), least recently used first
+        self._encoding_cache: OrderedDict[Tuple[str, str, str], str] = OrderedDict()
+        # Bumped whenever a collection changes, so a read that raced the change is not cached
+        self._collection_versions: Dict[Tuple[str, str], int] = {}
+        self._encoding_cache_lock = threading.Lock()
+        self._encoding_cache_hits = 0
+        self._encoding_cache_misses = 0
     
     def save_collection(self, username: str, collection: VibeCollection) -> None:
-        """Save vibe collection to user's vibes.json and create directory structure.
+        """Save vibe collection's encodings and add it to the user's index.
         
         Args:
             username: Username to save collection for
@@ -38,21 +84,22 @@ class VibeStorageManager(UserFileManager):
             ValueError: If collection validation fails
         """
         with self._get_user_lock(username):
-            # Load existing collections
-            collections_data = self._load_collections_data(username)
-            
-            # Add new collection
-            collections_data["collections"][collection.guid] = collection.model_dump()
-            
-            # Save updated collections
-            file_path = self._get_user_file_path(username)
-            save_json_file_atomic(file_path, collections_data, "vibe collections", username)
-            
-            # Create directory structure for this collection
+            self._invalidate_encodings(username, collection.guid)
+            # Encodings are written first, so the index never refers to missing files
             self._create_collection_directory(username, collection.guid)
+            encoding_files = {
+                key: self._write_encoding(username, collection.guid, key, encoding.encoded_data)
+                for key, encoding in collection.encodings.items()
+            }
+            
+            entry = collection.model_dump(exclude={"encodings"})
+            entry["encoding_files"] = encoding_files
+            collections = dict(self._load_index(username)["collections"])
+            collections[collection.guid] = entry
+            self._save_index(username, {"collections": collections})
     
     def load_collection(self, username: str, guid: str) -> Optional[VibeCollection]:
-        """Load a specific vibe collection by GUID.
+        """Load a specific vibe collection by GUID, with all its encodings.
         
         Args:
             username: Username to load collection for
@@ -62,13 +109,40 @@ class VibeStorageManager(UserFileManager):
             VibeCollection if found, None otherwise
         """
         with self._get_user_lock(username):
-            collections_data = self._load_collections_data(username)
+            entry = self._load_index(username)["collections"].get(guid)
+            if entry is None:
+                return None
             
-            collection_data = collections_data["collections"].get(guid)
-            if collection_data is None:
+            try:
+                encodings = {
+                    key: VibeEncoding(
+                        encoding_strength=float(key),
+                        encoded_data=self._read_encoding(username, guid, file_name),
+                    )
+                    for key, file_name in entry["encoding_files"].items()
+                }
+            except OSError as e:
+                logging.error(f"Failed to read encodings of vibe {guid} for {username}: {e}")
                 return None
             
-            return VibeCollection(**collection_data)
+            return VibeCollection(**entry, encodings=encodings)
+    
+    def load_collection_metadata(self, username: str, guid: str) -> Optional[VibeCollectionMetadata]:
+        """Load a specific vibe collection's metadata by GUID, without reading its encodings.
+        
+        Args:
+            username: Username to load collection for
+            guid: GUID of the collection to load
+            
+        Returns:
+            VibeCollectionMetadata if found, None otherwise
+        """
+        with self._get_user_lock(username):
+            entry = self._load_index(username)["collections"].get(guid)
+            if entry is None:
+                return None
+            
+            return VibeCollectionMetadata(**entry)
     
     def list_collections(self, username: str) -> List[VibeCollectionSummary]:
         """List all vibe collections for a user.
@@ -80,7 +154,7 @@ class VibeStorageManager(UserFileManager):
             List of VibeCollectionSummary objects
         """
         with self._get_user_lock(username):
-            collections_data = self._load_collections_data(username)
+            collections_data = self._load_index(username)
             
             summaries = []
             for guid, collection_data in collections_data["collections"].items():
@@ -115,20 +189,18 @@ class VibeStorageManager(UserFileManager):
             True if collection was deleted, False if not found
         """
         with self._get_user_lock(username):
-            collections_data = self._load_collections_data(username)
+            collections = dict(self._load_index(username)["collections"])
             
             # Check if collection exists
-            if guid not in collections_data["collections"]:
+            if guid not in collections:
                 return False
             
-            # Remove from collections data
-            del collections_data["collections"][guid]
-            
-            # Save updated collections
-            file_path = self._get_user_file_path(username)
-            save_json_file_atomic(file_path, collections_data, "vibe collections", username)
+            self._invalidate_encodings(username, guid)
+            # Remove from the index
+            del collections[guid]
+            self._save_index(username, {"collections": collections})
             
-            # Delete collection directory and all files
+            # Delete collection directory and all files, encodings included
             collection_dir = self._get_collection_directory(username, guid)
             if os.path.exists(collection_dir):
                 shutil.rmtree(collection_dir)
@@ -136,7 +208,9 @@ class VibeStorageManager(UserFileManager):
             return True
     
     def get_encoding(self, username: str, guid: str, encoding_strength: float) -> Optional[str]:
-        """Get encoded vibe data for specific strength.
+        """Get encoded vibe data for specific strength, reading only that encoding.
+        
+        Encodings are served from memory when the same one was read recently.
         
         Args:
             username: Username to get encoding for
@@ -146,16 +220,55 @@ class VibeStorageManager(UserFileManager):
         Returns:
             Base64 encoded vibe data if found, None otherwise
         """
-        collection = self.load_collection(username, guid)
-        if collection is None:
-            return None
+        # JSON clients send 1.0 as 1
+        encoding_key = str(float(encoding_strength))
+        cache_key = (username, guid, encoding_key)
+        with self._encoding_cache_lock:
+            encoded_data = self._encoding_cache.get(cache_key)
+            if encoded_data is not None:
+                self._encoding_cache.move_to_end(cache_key)
+                self._encoding_cache_hits += 1
+                return encoded_data
+            self._encoding_cache_misses += 1
         
-        encoding_key = str(encoding_strength)
-        encoding = collection.encodings.get(encoding_key)
-        if encoding is None:
-            return None
+        with self._get_user_lock(username):
+            with self._encoding_cache_lock:
+                version = self._collection_versions.get((username, guid), 0)
+            
+            entry = self._load_index(username)["collections"].get(guid)
+            if entry is None:
+                return None
+            
+            file_name = entry["encoding_files"].get(encoding_key)
+            if file_name is None:
+                return None
+            
+            try:
+                encoded_data = self._read_encoding(username, guid, file_name)
+            except OSError as e:
+                logging.error(f"Failed to read encoding {encoding_key} of vibe {guid} for {username}: {e}")
+                return None
+        
+        with self._encoding_cache_lock:
+            if self.encoding_cache_size > 0 and self._collection_versions.get((username, guid), 0) == version:
+                self._encoding_cache[cache_key] = encoded_data
+                while len(self._encoding_cache) > self.encoding_cache_size:
+                    self._encoding_cache.popitem(last=False)
+        return encoded_data
+    
+    def get_encoding_cache_stats(self) -> Dict[str, int]:
+        """Report the size and use of the encoding cache since startup.
         
-        return encoding.encoded_data
+        Returns:
+            Dictionary with the encodings cached, the cache size, hits and misses
+        """
+        with self._encoding_cache_lock:
+            return {
+                "entries": len(self._encoding_cache),
+                "max_entries": self.encoding_cache_size,
+                "hits": self._encoding_cache_hits,
+                "misses": self._encoding_cache_misses,
+            }
     
     def get_collection_directory(self, username: str, guid: str) -> str:
         """Get the directory path for a collection's files.
@@ -169,22 +282,146 @@ class VibeStorageManager(UserFileManager):
         """
         return self._get_collection_directory(username, guid)
     
-    def _load_collections_data(self, username: str) -> Dict:
-        """Load collections data from JSON file.
+    def _invalidate_encodings(self, username: str, guid: str) -> None:
+        """Drop a collection's cached encodings before it changes. Caller holds the user lock.
+        
+        Args:
+            username: Username
+            guid: Collection GUID
+        """
+        with self._encoding_cache_lock:
+            key = (username, guid)
+            self._collection_versions[key] = self._collection_versions.get(key, 0) + 1
+            for cache_key in [k for k in self._encoding_cache if k[:2] == key]:
+                del self._encoding_cache[cache_key]
+    
+    def _load_index(self, username: str) -> Dict:
+        """Load the user's collection index. Caller holds the user lock.
+        
+        Indexes written before encodings were split out are migrated on first load.
         
         Args:
             username: Username to load data for
             
         Returns:
-            Dictionary with collections data
+            Dictionary with collections data; callers must not modify it
         """
         file_path = self._get_user_file_path(username)
-        return load_json_file_with_backup(
-            file_path, 
-            "vibe collections", 
-            username, 
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return {"collections": {}}
+        
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._index_cache.get(username)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
+        collections_data = load_json_file_with_backup(
+            file_path,
+            "vibe collections",
+            username,
             {"collections": {}}
         )
+        if self._migrate_inline_encodings(username, collections_data):
+            self._save_index(username, collections_data)
+        else:
+            self._index_cache[username] = (signature, collections_data)
+        return collections_data
+    
+    def _save_index(self, username: str, collections_data: Dict) -> None:
+        """Write the user's collection index and keep it as the parsed copy. Caller holds the user lock.
+        
+        Args:
+            username: Username to save data for
+            collections_data: Dictionary with collections data
+        """
+        file_path = self._get_user_file_path(username)
+        # A failed write leaves the old file, which is read again on the next load
+        self._index_cache.pop(username, None)
+        save_json_file_atomic(file_path, collections_data, "vibe collections", username)
+        stat = os.stat(file_path)
+        self._index_cache[username] = ((stat.st_mtime_ns, stat.st_size), collections_data)
+    
+    def _migrate_inline_encodings(self, username: str, collections_data: Dict) -> bool:
+        """Move encodings kept inline in an older index out to their own files.
+        
+        Args:
+            username: Username the index belongs to
+            collections_data: Loaded index, updated in place
+            
+        Returns:
+            True if any collection was migrated
+        """
+        migrated = 0
+        for guid, entry in collections_data["collections"].items():
+            if "encodings" not in entry:
+                continue
+            self._create_collection_directory(username, guid)
+            entry["encoding_files"] = {
+                key: self._write_encoding(username, guid, key, encoding["encoded_data"])
+                for key, encoding in entry.pop("encodings").items()
+            }
+            migrated += 1
+        
+        if migrated:
+            logging.info(f"Moved the encodings of {migrated} vibe collections for {username} to their own files")
+        return migrated > 0
+    
+    def _write_encoding(self, username: str, guid: str, encoding_key: str, encoded_data: str) -> str:
+        """Write one encoding of a collection to its file.
+        
+        Args:
+            username: Username
+            guid: Collection GUID
+            encoding_key: Encoding strength as string
+            encoded_data: Encoding as given to VibeEncoding
+            
+        Returns:
+            Name of the file within the collection directory
+        """
+        content, extension = _encoding_file_content(encoded_data)
+        collection_dir = self._get_collection_directory(username, guid)
+        file_name = f"encoding_{encoding_key}{extension}"
+        file_path = os.path.join(collection_dir, file_name)
+        
+        temp_path = f"{file_path}.tmp.{threading.current_thread().ident}.{int(time.time() * 1000000)}"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, file_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        # A rewrite in the other format leaves the old file behind
+        for other_extension in (BINARY_ENCODING_EXTENSION, TEXT_ENCODING_EXTENSION):
+            other_path = os.path.join(collection_dir, f"encoding_{encoding_key}{other_extension}")
+            if other_extension != extension and os.path.exists(other_path):
+                os.remove(other_path)
+        
+        return file_name
+    
+    def _read_encoding(self, username: str, guid: str, file_name: str) -> str:
+        """Read one encoding of a collection from its file.
+        
+        Args:
+            username: Username
+            guid: Collection GUID
+            file_name: Name of the file within the collection directory
+            
+        Returns:
+            Encoding as given to VibeEncoding
+            
+        Raises:
+            OSError: If the file cannot be read
+        """
+        with open(os.path.join(self._get_collection_directory(username, guid), file_name), "rb") as file:
+            content = file.read()
+        if file_name.endswith(BINARY_ENCODING_EXTENSION):
+            return base64.b64encode(content).decode("ascii")
+        return content.decode("utf-8")
     
     def _create_collection_directory(self, username: str, guid: str) -> None:
         """Create directory structure for a collection.
@@ -215,4 +452,4 @@ class VibeStorageManager(UserFileManager):
         Returns:
             String representation of a new UUID
         """
-        return str(uuid.uuid4())
\ No newline at end of file
+        return str(uuid.uuid4())